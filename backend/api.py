@@ -1,11 +1,19 @@
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Body, status
-from sqlalchemy import Column, Integer, String, Text
-from sqlalchemy.orm import Session
-from backend.db import Base, SessionLocal
-from backend.schemas import Bot, BotCreate
-import pandas as pd
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Body, Header, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import Column, Integer, Float, String, Text, Index, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.db import Base, SessionLocal, AsyncSessionLocal, get_async_engine, get_engine, pool_metrics
+from backend.schemas import Bot, BotCreate, BacktestRequest, PredictBatchRequest, SentimentItem
 from backend.strategy import Strategy
+from backend.audit import log_audit
+from backend.cache import bot_cache, etag_matches
+from backend.history import MAX_PAGE_SIZE, decode_cursor, fetch_page
+from backend.ledger import trade_ledger
+from backend.runtime import bot_runtime
 
 logger = logging.getLogger("api_audit")
 logger.setLevel(logging.INFO)
@@ -19,6 +27,13 @@ class BotORM(Base):
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     status = Column(String(20), default="paused")  # "running", "paused"
+    # Konfigurace runtime: symbol a interval svíček, perioda ticku (s), velikost objednávky
+    symbol = Column(String(32), nullable=True)
+    interval = Column(String(8), nullable=True, default="1m")
+    tick_interval = Column(Float, nullable=True)
+    quantity = Column(Float, nullable=True)
+
+    __table_args__ = (Index("ix_bots_status_id", "status", "id"),)
 
 # Dependency pro získání DB session
 def get_db():
@@ -28,124 +43,184 @@ def get_db():
     finally:
         db.close()
 
+# Dependency pro asynchronní DB session (CRUD routy)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def _get_bot_or_404(db: AsyncSession, bot_id: int) -> BotORM:
+    bot = await db.get(BotORM, bot_id)
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot nenalezen")
+    return bot
+
+async def _commit(db: AsyncSession, bot_id: int = None):
+    """Commit mutace + invalidace cache (lokálně a přes NOTIFY v téže transakci)."""
+    await db.flush()
+    await bot_cache.notify_in(db, bot_id)
+    await db.commit()
+    bot_cache.invalidate(bot_id)
+
 # CRUD operace
 @router.get("/", response_model=list[Bot])
-def list_bots(db: Session = Depends(get_db)):
+async def list_bots(
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: str = Header(None),
+    status_filter: str = Query(None, alias="status"),
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Boti podle id (keyset stránkování); kurzor další stránky je v hlavičce X-Next-Cursor."""
     try:
-        bots = db.query(BotORM).all()
-        log_audit(db, user="system", action="list_bots", detail=f"Listed {len(bots)} bots", status="success")
-        return [Bot.from_orm(bot) for bot in bots]
+        params = (status_filter, cursor, limit)
+        # Verze před dotazem: invalidace během čtení zabrání uložení zastaralé stránky
+        version = bot_cache.list_version
+        cached = bot_cache.get_list(params)
+        if cached is None:
+            stmt = select(BotORM)
+            if status_filter:
+                stmt = stmt.where(BotORM.status == status_filter)
+            after = decode_cursor(cursor, (int,)) if cursor else None
+            bots, next_cursor = await fetch_page(db, stmt, (BotORM.id,), after, limit, descending=False)
+            page = {"items": jsonable_encoder([Bot.from_orm(bot) for bot in bots]), "next_cursor": next_cursor}
+            cached = (bot_cache.put_list(page, params, version), page)
+        etag, page = cached
+        items = page["items"]
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if page["next_cursor"]:
+            headers["X-Next-Cursor"] = page["next_cursor"]
+        # Podmíněný GET: nezměněný seznam = 304 bez těla
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        log_audit(db, user="system", action="list_bots", detail=f"Listed {len(items)} bots", status="success")
+        return JSONResponse(items, headers=headers)
     except Exception as e:
         log_audit(db, user="system", action="list_bots", detail="Failed to list bots", status="error", error=str(e))
         raise
 
 @router.post("/", response_model=Bot, status_code=status.HTTP_201_CREATED)
-def create_bot(bot: BotCreate, db: Session = Depends(get_db)):
+async def create_bot(bot: BotCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_bot = BotORM(name=bot.name, description=bot.description)
+        db_bot = BotORM(**bot.dict())
         db.add(db_bot)
-        db.commit()
+        await db.flush()
+        await _commit(db, db_bot.id)
+        await db.refresh(db_bot)
+        logger.info(f"Vytvořen bot: id={db_bot.id}, name={db_bot.name}")
         log_audit(db, user="system", action="create_bot", detail=f"Created bot {bot.name}", status="success")
         return Bot.from_orm(db_bot)
     except Exception as e:
         log_audit(db, user="system", action="create_bot", detail=f"Failed to create bot {bot.name}", status="error", error=str(e))
         raise
-# AuditLog ORM model
-class AuditLog(Base):
-    __tablename__ = "audit_logs"
-    id = Column(Integer, primary_key=True, index=True)
-    user = Column(String(100), nullable=True)
-    action = Column(String(100), nullable=False)
-    detail = Column(Text, nullable=True)
-    status = Column(String(20), nullable=False)
-    error = Column(Text, nullable=True)
-
-def log_audit(db: Session, user: str, action: str, detail: str = None, status: str = "success", error: str = None):
-    audit = AuditLog(user=user, action=action, detail=detail, status=status, error=error)
-    db.add(audit)
-    db.commit()
-    db.commit()
-    db.refresh(db_bot)
-    logger.info(f"Vytvořen bot: id={db_bot.id}, name={db_bot.name}")
-    return Bot.from_orm(db_bot)
 
 @router.get("/{bot_id}", response_model=Bot)
-def get_bot(bot_id: int, db: Session = Depends(get_db)):
-    bot = db.query(BotORM).filter(BotORM.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot nenalezen")
-    return Bot.from_orm(bot)
+async def get_bot(bot_id: int, db: AsyncSession = Depends(get_async_db)):
+    version = bot_cache.list_version
+    cached = bot_cache.get_bot(bot_id)
+    if cached is not None:
+        return cached
+    bot = Bot.from_orm(await _get_bot_or_404(db, bot_id))
+    bot_cache.put_bot(bot_id, bot, version)
+    return bot
 
 @router.put("/{bot_id}", response_model=Bot)
-def update_bot(bot_id: int, bot_update: BotCreate, db: Session = Depends(get_db)):
-    bot = db.query(BotORM).filter(BotORM.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot nenalezen")
+async def update_bot(bot_id: int, bot_update: BotCreate, db: AsyncSession = Depends(get_async_db)):
+    bot = await _get_bot_or_404(db, bot_id)
     old_name = bot.name
-    bot.name = bot_update.name
-    bot.description = bot_update.description
-    db.commit()
-    db.refresh(bot)
+    for field, value in bot_update.dict().items():
+        setattr(bot, field, value)
+    await _commit(db, bot_id)
+    await db.refresh(bot)
+    if bot.status == "running":
+        # Změněná konfigurace -> restart tasku
+        await bot_runtime.start_bot(bot)
     logger.info(f"Upraven bot: id={bot.id}, old_name={old_name}, new_name={bot.name}")
     return Bot.from_orm(bot)
 
 @router.delete("/{bot_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_bot(bot_id: int, db: Session = Depends(get_db)):
-    bot = db.query(BotORM).filter(BotORM.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot nenalezen")
-    db.delete(bot)
-    db.commit()
+async def delete_bot(bot_id: int, db: AsyncSession = Depends(get_async_db)):
+    bot = await _get_bot_or_404(db, bot_id)
+    await db.delete(bot)
+    await _commit(db, bot_id)
+    await bot_runtime.stop_bot(bot_id)
     logger.info(f"Smazán bot: id={bot.id}, name={bot.name}")
     return
 
 @router.post("/{bot_id}/start", response_model=Bot)
-def start_bot(bot_id: int, db: Session = Depends(get_db)):
-    bot = db.query(BotORM).filter(BotORM.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot nenalezen")
+async def start_bot(bot_id: int, db: AsyncSession = Depends(get_async_db)):
+    bot = await _get_bot_or_404(db, bot_id)
     bot.status = "running"
-    db.commit()
-    db.refresh(bot)
+    await _commit(db, bot_id)
+    await db.refresh(bot)
+    await bot_runtime.start_bot(bot)
     logger.info(f"Spuštěn bot: id={bot.id}, name={bot.name}")
     return Bot.from_orm(bot)
 
 @router.post("/{bot_id}/pause", response_model=Bot)
-def pause_bot(bot_id: int, db: Session = Depends(get_db)):
-    bot = db.query(BotORM).filter(BotORM.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot nenalezen")
+async def pause_bot(bot_id: int, db: AsyncSession = Depends(get_async_db)):
+    bot = await _get_bot_or_404(db, bot_id)
     bot.status = "paused"
-    db.commit()
-    db.refresh(bot)
+    await _commit(db, bot_id)
+    await db.refresh(bot)
+    await bot_runtime.stop_bot(bot_id)
     logger.info(f"Pozastaven bot: id={bot.id}, name={bot.name}")
     return Bot.from_orm(bot)
 
 @router.post("/{bot_id}/manual_trade")
 
-def manual_trade(
+async def manual_trade(
     bot_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     symbol: str = Body(...),
     side: str = Body(...),
     price: float = Body(...),
     quantity: float = Body(...),
-    type_: str = Body("LIMIT")
+    type_: str = Body("LIMIT"),
+    client_order_id: str = Body(None)
 ):
-    bot = db.query(BotORM).filter(BotORM.id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot nenalezen")
+    bot = await _get_bot_or_404(db, bot_id)
+    # Opakovaný požadavek se stejným client_order_id objednávku nezdvojí (burza i place_orders deduplikují)
+    client_order_id = client_order_id or new_client_order_id(f"manual-{bot_id}")
     try:
-        from backend.pionex import PionexAPI
-        pionex = PionexAPI()
-        order = pionex.place_order(symbol, side, price, quantity, type_)
-        # Optionally update bot status or log trade in DB
-        bot.status = "manual_trade"
-        db.commit()
-        return {"id": bot.id, "order": order}
+        [result] = await get_pionex().place_orders([{
+            "symbol": symbol, "side": side, "price": price, "quantity": quantity, "type": type_,
+            "client_order_id": client_order_id,
+        }])
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Trade failed: {str(e)}")
+        result = {"ok": False, "error": str(e)}
+    if not result["ok"]:
+        raise HTTPException(status_code=500, detail=f"Trade failed: {result['error']}")
+    order = result["order"]
+    # Objednávka je na burze; selhání zápisu do ledgeru ji nesmí shodit (reconcile ji doplní)
+    bot.status = "manual_trade"
+    try:
+        await trade_ledger.record_order(db, order, symbol, side, price, quantity, type_, bot_id=bot.id,
+                                        client_order_id=client_order_id)
+        await _commit(db, bot_id)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Zápis ruční objednávky do ledgeru selhal: {e}")
+        bot = await _get_bot_or_404(db, bot_id)
+        bot.status = "manual_trade"
+        await _commit(db, bot_id)
+    # Bot přešel na ruční obchodování: jeho task se zastaví stejně jako při pause
+    await bot_runtime.stop_bot(bot_id)
+    return {"id": bot_id, "order": order, "client_order_id": client_order_id}
+
+@router.get("/db/pool")
+def get_pool_metrics():
+    """Metriky poolu spojení (asynchronní engine CRUD rout i synchronní engine) a cache botů."""
+    return {"async": pool_metrics(get_async_engine()), "sync": pool_metrics(get_engine()), "bot_cache": bot_cache.info()}
+
+@router.get("/runtime/status")
+def get_runtime_status():
+    """Stav runtime: běžící boti, ticky, zmeškané deadliny a zpoždění plánovače (a shard workeru)."""
+    info = bot_runtime.info()
+    if bot_runtime.shard is not None:
+        info["shard"] = bot_runtime.shard.info()
+    return info
 
 @router.post("/strategy/demo")
 async def strategy_demo(
@@ -154,6 +229,7 @@ async def strategy_demo(
     """
     Demo výpočtu indikátorů a řízení rizika.
     """
+    import pandas as pd
     df = pd.DataFrame({"close": prices})
     strat = Strategy()
     df = strat.compute_indicators(df)
@@ -166,78 +242,228 @@ async def strategy_demo(
         "can_open_position": can_open,
         "panic_mode": panic
     }
+# --- Registr ML modelů ---
+from backend.model import model_registry, ModelRegistryError
+
+@router.get("/models/{symbol}")
+def get_model_info(symbol: str):
+    """Aktivní a uložené verze modelu symbolu."""
+    try:
+        return model_registry.info(symbol)
+    except ModelRegistryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/models/{symbol}/rollback")
+async def rollback_model(symbol: str, version: int = None):
+    """Přepne živý model na zadanou (jinak předchozí) verzi."""
+    try:
+        active = await run_in_threadpool(model_registry.rollback, symbol, version)
+    except ModelRegistryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return model_registry.info(symbol) | {"current": active}
+
 # --- Pionex Endpoints ---
-from backend.pionex import PionexAPI, PionexAPIError
-from fastapi import Query
+from backend.pionex import AsyncPionexAPI, get_async_pionex, new_client_order_id
+from backend.orderbook import order_books
+
+# Dependency: sdílený asynchronní klient s poolem spojení (jeden na proces)
+def get_pionex() -> AsyncPionexAPI:
+    try:
+        return get_async_pionex()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/pionex/orders")
-def get_pionex_orders(symbol: str = Query(None)):
+async def get_pionex_orders(symbol: str = Query(None), api: AsyncPionexAPI = Depends(get_pionex)):
     try:
-        api = PionexAPI()
-        return api.get_orders(symbol)
+        return await api.get_orders(symbol)
     except Exception as e:
         logger.error(f"Pionex get_orders error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/pionex/order")
-def place_pionex_order(
+async def place_pionex_order(
     symbol: str = Body(...),
     side: str = Body(...),
     price: float = Body(...),
     quantity: float = Body(...),
-    type_: str = Body("LIMIT")
+    type_: str = Body("LIMIT"),
+    api: AsyncPionexAPI = Depends(get_pionex),
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        api = PionexAPI()
-        return api.place_order(symbol, side, price, quantity, type_)
+        order = await api.place_order(symbol, side, price, quantity, type_)
     except Exception as e:
         logger.error(f"Pionex place_order error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    # Objednávka je na burze; selhání zápisu do ledgeru ji nesmí shodit (reconcile ji doplní)
+    try:
+        await trade_ledger.record_order(db, order, symbol, side, price, quantity, type_)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Zápis objednávky do ledgeru selhal: {e}")
+    return order
 
 @router.delete("/pionex/orders")
-def cancel_pionex_orders(symbol: str = Query(None)):
+async def cancel_pionex_orders(symbol: str = Query(None), api: AsyncPionexAPI = Depends(get_pionex)):
     try:
-        api = PionexAPI()
-        return api.cancel_all_orders(symbol)
+        return await api.cancel_all_orders(symbol)
     except Exception as e:
         logger.error(f"Pionex cancel_orders error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/pionex/market_trades")
-def get_pionex_market_trades(symbol: str = Query(...), limit: int = Query(50)):
+async def get_pionex_market_trades(symbol: str = Query(...), limit: int = Query(50), api: AsyncPionexAPI = Depends(get_pionex)):
     try:
-        api = PionexAPI()
-        return api.get_market_trades(symbol, limit)
+        return await api.get_market_trades(symbol, limit)
     except Exception as e:
         logger.error(f"Pionex get_market_trades error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/pionex/coalesce/stats")
+def get_pionex_coalesce_stats(api: AsyncPionexAPI = Depends(get_pionex)):
+    """Sloučené a z mikro-cache obsloužené požadavky na burzu (ušetřená volání, hit rate) podle třídy."""
+    return api.coalescer.info()
+
 @router.get("/pionex/market_depth")
-def get_pionex_market_depth(symbol: str = Query(...), limit: int = Query(20)):
+async def get_pionex_market_depth(symbol: str = Query(...), limit: int = Query(20, ge=1, le=1000),
+                                  api: AsyncPionexAPI = Depends(get_pionex)):
+    # Aktuální lokální kniha z websocket feedu má přednost před REST dotazem na burzu
+    book = order_books.fresh(symbol)
+    if book is not None:
+        return book.depth(limit)
     try:
-        api = PionexAPI()
-        return api.get_market_depth(symbol, limit)
+        resp = await api.get_market_depth(symbol, limit)
     except Exception as e:
         logger.error(f"Pionex get_market_depth error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    # Snapshot zároveň založí / obnoví lokální knihu
+    order_books.apply_rest_snapshot(symbol, resp)
+    return resp
+
+@router.get("/orderbook/{symbol}")
+def get_order_book(symbol: str, depth: int = Query(5, ge=1, le=1000)):
+    """Nejlepší bid/ask, spread a imbalance z lokální knihy (bez dotazu na burzu)."""
+    book = order_books.get(symbol)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Kniha pro symbol není k dispozici")
+    return book.top(depth) | {"fresh": book.is_fresh(), "stats": book.stats}
+
+# --- Backtest ---
+import asyncio
+from backend.klines import kline_store
+
+def _validate_kline_request(symbols, interval):
+    # Symbol a interval jsou součástí cesty v úložišti svíček
+    try:
+        for symbol in symbols:
+            kline_store.validate(symbol, interval)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.post("/backtest")
+async def run_backtest(req: BacktestRequest):
+    """Backtest Strategy nad zadanými cenami nebo klíny z Pionexu; volitelně sweep parametrů."""
+    closes = req.closes
+    if not closes:
+        if not req.symbols:
+            raise HTTPException(status_code=422, detail="Zadejte closes nebo symbols")
+        _validate_kline_request(req.symbols, req.interval)
+        try:
+            api = get_pionex()
+            # Stáhnou se jen chybějící svíčky, zbytek se čte z lokálního úložiště
+            await asyncio.gather(*(kline_store.update(api, s, req.interval, lookback=req.limit) for s in req.symbols))
+            closes = {s: kline_store.get(s, req.interval, last=req.limit).close for s in req.symbols}
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Backtest klines error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    # pandas/numpy simulace se načte až s prvním backtestem, ne při startu API
+    from backend import backtest
+    try:
+        market = backtest.Market.from_closes(closes)
+        if req.sweep:
+            results = await run_in_threadpool(backtest.sweep, market, req.sweep)
+            return {"results": results}
+        result = await run_in_threadpool(
+            backtest.run_backtest, market, stop_loss_pct=req.stop_loss_pct,
+            max_positions=req.max_positions, panic_volatility=req.panic_volatility,
+            record_fills=req.include_fills,
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+# --- Dávkové predikce ---
+from backend.prediction import prediction_service
+
+@router.post("/predict/batch")
+async def predict_batch(req: PredictBatchRequest):
+    """Predikce ceny pro více symbolů a horizontů jedním voláním."""
+    closes = req.closes
+    if closes is None:
+        _validate_kline_request(req.symbols, req.interval)
+        try:
+            # Dotáhne jen svíčky uzavřené od poslední aktualizace (jinak bez volání API)
+            api = get_async_pionex()
+            await asyncio.gather(*(kline_store.update(api, s, req.interval, lookback=req.limit) for s in req.symbols))
+        except Exception as e:
+            logger.error(f"Predict klines error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        closes = {s: kline_store.get(s, req.interval, last=req.limit).close for s in req.symbols}
+    else:
+        closes = {s: closes[s] for s in req.symbols if s in closes}
+    try:
+        result = await run_in_threadpool(prediction_service.predict_batch, closes, req.horizons)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    result["missing"] += [s for s in req.symbols if s not in closes]
+    return result
 
 # --- Gemini Endpoints ---
-from backend.gemini import GeminiClient
+from backend.gemini import AsyncGeminiClient, get_async_gemini
+from backend.sentiment import sentiment_pipeline
+
+# Dependency: sdílený asynchronní klient s poolem spojení (jeden na proces)
+def get_gemini() -> AsyncGeminiClient:
+    try:
+        return get_async_gemini()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/gemini/sentiment")
-def gemini_sentiment(text: str = Body(...)):
+async def gemini_sentiment(text: str = Body(...), symbol: Optional[str] = Body(None)):
+    """Sentiment textu přes cache a dávkování (viz backend/sentiment.py); se symbolem jde do jeho řady."""
+    get_gemini()
     try:
-        client = GeminiClient()
-        return client.analyze_sentiment(text)
+        return await sentiment_pipeline.analyze(text, symbol)
     except Exception as e:
         logger.error(f"Gemini analyze_sentiment error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/gemini/hypotheses")
-def gemini_hypotheses(prompt: str = Body(...)):
+async def gemini_hypotheses(prompt: str = Body(...), client: AsyncGeminiClient = Depends(get_gemini)):
     try:
-        client = GeminiClient()
-        return client.generate_hypotheses(prompt)
+        return await client.generate_hypotheses(prompt)
     except Exception as e:
         logger.error(f"Gemini generate_hypotheses error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/sentiment/batch")
+async def sentiment_batch(items: List[SentimentItem] = Body(..., max_length=1000)):
+    """Sentiment dávky textů; výsledky ve stejném pořadí, chyba položky jako {"error": ...}."""
+    get_gemini()
+    return await sentiment_pipeline.analyze_many(item.dict() for item in items)
+
+@router.get("/sentiment/series/{symbol}")
+def sentiment_series_endpoint(symbol: str, since: Optional[float] = None, window: float = Query(3600, gt=0)):
+    """Předpočítaná časová řada sentimentu symbolu a průměr za posledních `window` s."""
+    series = sentiment_pipeline.series
+    return {"symbol": symbol, "bucket_seconds": series.bucket_seconds, "latest": series.latest(symbol, window),
+            "series": series.series(symbol, since)}
+
+@router.get("/sentiment/stats")
+def sentiment_stats():
+    return sentiment_pipeline.info()
\ No newline at end of file
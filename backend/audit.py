@@ -0,0 +1,263 @@
+"""
+Asynchronní dávkový zápis audit logu.
+
+    log_audit() -> AuditWriter.log() -> omezená fronta -> vlákno writeru -> INSERT ... VALUES (...), (...)
+
+Volající nečeká na databázi: záznam se jen vloží do fronty. Vlákno writeru
+skládá dávky podle `batch_size` / `flush_interval` a zapisuje je jedním
+vícřádkovým INSERTem (executemany SQLAlchemy -> insertmanyvalues).
+
+Paměť je omezená velikostí fronty. Když je fronta plná (Postgres nestíhá),
+záznam jde do seznamu přetečení, který vlákno writeru připíše do spill
+souboru (JSONL, fsync) – volající na disk nikdy nečeká; co se nevejde ani
+tam, se zahodí a započítá do `stats["dropped"]`. Neúspěšné dávky jdou do
+spillu také a po obnovení databáze se do ní znovu nahrají. Při ukončení
+aplikace stop() dopíše vše, co ve frontě zbylo.
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, insert
+
+from backend.db import Base
+
+logger = logging.getLogger("audit")
+logger.setLevel(logging.INFO)
+
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+# Max. záznamů čekajících na spill při plné frontě; nad tento počet se zahazují
+AUDIT_OVERFLOW_SIZE = int(os.getenv("AUDIT_OVERFLOW_SIZE", "100000"))
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "data/audit_spill.jsonl")
+# Po neúspěšném zápisu se spill soubor znovu zkouší nahrát až po této době (s)
+AUDIT_RETRY_INTERVAL = float(os.getenv("AUDIT_RETRY_INTERVAL", "30"))
+
+
+# AuditLog ORM model
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+    id = Column(Integer, primary_key=True, index=True)
+    user = Column(String(100), nullable=True)
+    action = Column(String(100), nullable=False)
+    detail = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False)
+    error = Column(Text, nullable=True)
+    # Čas události (ne zápisu) – dávka se do DB dostane se zpožděním
+    created_at = Column(DateTime, nullable=True)
+
+    # Filtry historie (backend.history) – stránkuje se podle id
+    __table_args__ = (
+        Index("ix_audit_logs_created_at", "created_at"),
+        Index("ix_audit_logs_action_id", "action", "id"),
+    )
+
+
+_STOP = object()
+
+
+class AuditWriter:
+    def __init__(self, engine=None, batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 queue_size: int = AUDIT_QUEUE_SIZE, spill_path: str = AUDIT_SPILL_PATH,
+                 retry_interval: float = AUDIT_RETRY_INTERVAL, overflow_size: int = AUDIT_OVERFLOW_SIZE):
+        self._engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.retry_interval = retry_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.overflow_size = overflow_size
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "spilled": 0, "replayed": 0, "failed_batches": 0,
+                      "dropped": 0}
+        # Přetečení fronty; do spillu ho zapisuje vlákno writeru, ne volající
+        self._overflow: List[Dict] = []
+        self._overflow_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._next_replay = 0.0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from backend.db import get_engine
+            self._engine = get_engine()
+        return self._engine
+
+    # --- vstup ---
+
+    def log(self, user: Optional[str], action: str, detail: Optional[str] = None, status: str = "success",
+            error: Optional[str] = None):
+        """Zařadí záznam k zápisu; nikdy neblokuje na databázi."""
+        row = {"user": user, "action": action, "detail": detail, "status": status, "error": error,
+               "created_at": datetime.now(timezone.utc)}
+        self.start()
+        try:
+            self.queue.put_nowait(row)
+            self.stats["queued"] += 1
+        except queue.Full:
+            with self._overflow_lock:
+                if len(self._overflow) < self.overflow_size:
+                    self._overflow.append(row)
+                    return
+            self.stats["dropped"] += 1
+
+    # --- vlákno writeru ---
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> Tuple[List[Dict], object]:
+        """Dávka do batch_size / flush_interval; druhá hodnota je případný řídicí prvek fronty."""
+        batch: List[Dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP or isinstance(item, threading.Event):
+                return batch, item
+            batch.append(item)
+        return batch, None
+
+    def _run(self):
+        while True:
+            batch, control = self._collect()
+            if batch:
+                self._flush(batch)
+            self._spill_overflow()
+            if isinstance(control, threading.Event):
+                control.set()
+            elif control is _STOP:
+                # Dopsat, co do fronty přibylo po signálu ukončení
+                rest = []
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        item.set()
+                    elif item is not _STOP:
+                        rest.append(item)
+                for i in range(0, len(rest), self.batch_size):
+                    self._flush(rest[i:i + self.batch_size])
+                self._spill_overflow()
+                self._replay()
+                return
+            if time.monotonic() >= self._next_replay:
+                self._replay()
+
+    def _insert(self, rows: List[Dict]):
+        with self.engine.begin() as conn:
+            conn.execute(insert(AuditLog.__table__), rows)
+
+    def _flush(self, batch: List[Dict]) -> bool:
+        try:
+            self._insert(batch)
+        except Exception as e:
+            logger.warning(f"Zápis {len(batch)} audit záznamů selhal ({e}), ukládám do {self.spill_path}")
+            self.stats["failed_batches"] += 1
+            self._next_replay = time.monotonic() + self.retry_interval
+            self._spill(batch)
+            return False
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        return True
+
+    # --- spill soubor ---
+
+    def _spill(self, rows: List[Dict], count: bool = True):
+        with self._spill_lock:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if count:
+                self.stats["spilled"] += len(rows)
+
+    def _spill_overflow(self):
+        with self._overflow_lock:
+            rows, self._overflow = self._overflow, []
+        if rows:
+            self._spill(rows)
+
+    def _replay(self):
+        """Nahraje spill soubor do DB; co se nepodaří, vrátí zpět do spillu."""
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+        rows = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # nedopsaný řádek po pádu procesu
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+                rows.append(row)
+        for i in range(0, len(rows), self.batch_size):
+            chunk = rows[i:i + self.batch_size]
+            try:
+                self._insert(chunk)
+            except Exception as e:
+                logger.warning(f"Obnova audit záznamů ze spill souboru selhala: {e}")
+                self._next_replay = time.monotonic() + self.retry_interval
+                self._spill(rows[i:], count=False)
+                break
+            self.stats["replayed"] += len(chunk)
+        os.remove(replay_path)
+
+    # --- řízení ---
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Počká, až writer zapíše vše, co je aktuálně ve frontě (pro testy a skripty)."""
+        self.start()
+        done = threading.Event()
+        self.queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Dopíše frontu a ukončí vlákno (volá se při vypnutí aplikace)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            # Writer visí na databázi; shutdown nesmí čekat donekonečna
+            logger.warning(f"Audit writer nestihl frontu zpracovat do {timeout} s, ukončuji bez dopsání")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+
+# Singleton instance
+audit_writer = AuditWriter()
+
+
+def log_audit(db=None, user: str = None, action: str = None, detail: str = None, status: str = "success",
+              error: str = None):
+    """Zápis do audit logu mimo request path; `db` se kvůli kompatibilitě přijímá, ale nepoužívá."""
+    audit_writer.log(user=user, action=action, detail=detail, status=status, error=error)
@@ -0,0 +1,316 @@
+"""
+Vektorizovaný backtest Strategy nad více symboly.
+
+OHLCV všech symbolů se zarovná do sloupcových NumPy polí tvaru (bar, symbol).
+Indikátory, signály (Strategy.generate_signals) a panic volatilita se spočítají
+jednou pro celé pole; simulace pak prochází bary a pravidla (stop-loss, max.
+počet pozic, panic režim) vyhodnocuje vektorově přes všechny symboly naráz.
+Plnění probíhá za close baru, na kterém signál vznikl.
+
+Sweep parametrů (stop_loss_pct, max_positions, panic_volatility) běží
+ve sdíleném process poolu (spawn, BACKTEST_WORKERS procesů); připravená pole
+jdou do workerů s každým blokem, bloků je jen několik na proces.
+
+    python -m backend.backtest data/BTCUSDT.csv data/ETHUSDT.csv --max-positions 2
+    python -m backend.backtest data/*.csv --sweep stop_loss_pct=0.01,0.02,0.05 max_positions=1,2,3
+    python -m backend.backtest BTCUSDT ETHUSDT --interval 1m
+"""
+import os
+import argparse
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.indicators import INDICATOR_COLUMNS
+from backend.strategy import Strategy
+
+SWEEP_PARAMS = ("stop_loss_pct", "max_positions", "panic_volatility")
+# Počet procesů sdíleného poolu pro sweep z API
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "2"))
+
+
+class Market:
+    """Zarovnaná OHLCV data: pole tvaru (bar, symbol), chybějící bary jsou NaN."""
+
+    def __init__(self, symbols: Sequence[str], index: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.symbols = list(symbols)
+        self.index = index
+        self.columns = columns
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.columns["close"]
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> "Market":
+        """DataFrame na symbol (sloupec `close`, volitelně `time`, open/high/low/volume)."""
+        symbols = list(frames)
+        indexed = []
+        for symbol in symbols:
+            df = frames[symbol]
+            if "time" in df.columns:
+                df = df.set_index("time")
+            indexed.append(df[~df.index.duplicated(keep="last")])
+        index = indexed[0].index
+        for df in indexed[1:]:
+            index = index.union(df.index)
+        columns = {}
+        for name in ("open", "high", "low", "close", "volume"):
+            if all(name in df.columns for df in indexed):
+                columns[name] = np.column_stack([
+                    df[name].reindex(index).to_numpy(dtype=float) for df in indexed
+                ])
+        return cls(symbols, np.asarray(index), columns)
+
+    @classmethod
+    def from_closes(cls, closes: Dict[str, Iterable[float]]) -> "Market":
+        return cls.from_frames({s: pd.DataFrame({"close": list(v)}) for s, v in closes.items()})
+
+    @classmethod
+    def from_store(cls, symbols: Sequence[str], interval: str, start: Optional[int] = None,
+                   end: Optional[int] = None, store=None) -> "Market":
+        """Načte svíčky z lokálního KlineStore (časy v ms)."""
+        from backend.klines import kline_store
+        store = store or kline_store
+        return cls.from_frames({
+            s: pd.DataFrame(store.get(s, interval, start=start, end=end).columns) for s in symbols
+        })
+
+    @classmethod
+    def from_csv(cls, paths: Sequence[str]) -> "Market":
+        """Symbol se bere z názvu souboru (BTCUSDT.csv -> BTCUSDT)."""
+        frames = {os.path.splitext(os.path.basename(p))[0]: pd.read_csv(p) for p in paths}
+        return cls.from_frames(frames)
+
+
+class Prepared:
+    """Vše, co nezávisí na sweepovaných parametrech – počítá se jednou."""
+
+    def __init__(self, market: Market, strategy: Optional[Strategy] = None):
+        strategy = strategy or Strategy()
+        close = market.close
+        self.symbols = market.symbols
+        self.close = close
+        ind = {col: np.full_like(close, np.nan) for col in INDICATOR_COLUMNS}
+        for j in range(close.shape[1]):
+            col = close[:, j]
+            valid = ~np.isnan(col)
+            if valid.sum() == 0:
+                continue
+            df = strategy.compute_indicators(pd.DataFrame({"close": col[valid]}))
+            for name in INDICATOR_COLUMNS:
+                ind[name][valid, j] = df[name].to_numpy(dtype=float)
+        self.indicators = ind
+        with np.errstate(invalid="ignore"):
+            entries, exits = strategy.generate_signals(close, ind)
+        self.entries = entries & ~np.isnan(close)
+        self.exits = exits
+        self.volatility = rolling_volatility(close, strategy.PANIC_WINDOW)
+
+
+def rolling_volatility(close: np.ndarray, window: int) -> np.ndarray:
+    """Klouzavá směrodatná odchylka výnosů (ddof=1) jako v Strategy.check_panic_mode."""
+    returns = np.full_like(close, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    vol = np.full_like(close, np.nan)
+    if close.shape[0] > window:
+        windows = np.lib.stride_tricks.sliding_window_view(returns[1:], window, axis=0)
+        vol[window:] = windows.std(axis=-1, ddof=1)
+    return vol
+
+
+def simulate(prep: Prepared, stop_loss_pct: float = 0.03, max_positions: int = 3,
+             panic_volatility: float = 0.08, capital: float = 10_000.0, fee_rate: float = 0.0,
+             record_fills: bool = True) -> dict:
+    close = prep.close
+    n_bars, n_symbols = close.shape
+    max_positions = int(max_positions)
+    alloc = capital / max(max_positions, 1)
+    with np.errstate(invalid="ignore"):
+        panic = prep.volatility > panic_volatility
+    valid = ~np.isnan(close)
+    can_enter = prep.entries & ~panic
+    any_entry = can_enter.any(axis=1)
+
+    open_pos = np.zeros(n_symbols, dtype=bool)
+    entry_price = np.zeros(n_symbols)
+    units = np.zeros(n_symbols)
+    last_price = np.zeros(n_symbols)
+    cash = capital
+    equity = np.empty(n_bars)
+    fills: List[dict] = []
+    n_trades = wins = 0
+
+    for t in range(n_bars):
+        if not any_entry[t] and not open_pos.any():
+            # Bez pozic a bez signálu se nic neděje (většina barů)
+            equity[t] = cash
+            continue
+        c = close[t]
+        has_price = valid[t]
+        last_price = np.where(has_price, c, last_price)
+
+        # Výstupy: stop-loss, výstupní signál nebo panic režim symbolu
+        held = open_pos & has_price
+        stop = held & (c <= entry_price * (1 - stop_loss_pct))
+        exit_mask = held & (stop | prep.exits[t] | panic[t])
+        if exit_mask.any():
+            proceeds = units[exit_mask] * c[exit_mask]
+            cash += float((proceeds * (1 - fee_rate)).sum())
+            pnl = proceeds * (1 - fee_rate) - alloc
+            n_trades += int(exit_mask.sum())
+            wins += int((pnl > 0).sum())
+            if record_fills:
+                for j, price, reason_stop, value in zip(np.flatnonzero(exit_mask), c[exit_mask],
+                                                        stop[exit_mask], pnl):
+                    fills.append({"bar": t, "symbol": prep.symbols[j], "side": "SELL", "price": float(price),
+                                  "reason": "stop_loss" if reason_stop else "exit", "pnl": float(value)})
+            open_pos &= ~exit_mask
+            units[exit_mask] = 0
+
+        # Vstupy: signál, bez panic režimu, jen do limitu max_positions (nejnižší RSI má přednost)
+        free = max_positions - int(open_pos.sum())
+        if free > 0:
+            candidates = np.flatnonzero(can_enter[t] & ~open_pos & ~exit_mask)
+            if candidates.size:
+                if candidates.size > free:
+                    order = np.argsort(prep.indicators["rsi"][t, candidates], kind="stable")
+                    candidates = candidates[order[:free]]
+                entry_price[candidates] = c[candidates]
+                units[candidates] = alloc * (1 - fee_rate) / c[candidates]
+                open_pos[candidates] = True
+                cash -= alloc * candidates.size
+                if record_fills:
+                    for j in candidates:
+                        fills.append({"bar": t, "symbol": prep.symbols[j], "side": "BUY",
+                                      "price": float(c[j]), "reason": "entry"})
+
+        equity[t] = cash + float((units * last_price).sum())
+
+    peak = np.maximum.accumulate(equity) if n_bars else equity
+    drawdown = (peak - equity) / peak if n_bars else equity
+    result = {
+        "stop_loss_pct": stop_loss_pct,
+        "max_positions": max_positions,
+        "panic_volatility": panic_volatility,
+        "final_equity": float(equity[-1]) if n_bars else capital,
+        "pnl": float(equity[-1] - capital) if n_bars else 0.0,
+        "return_pct": float(equity[-1] / capital - 1) * 100 if n_bars else 0.0,
+        "max_drawdown_pct": float(drawdown.max()) * 100 if n_bars else 0.0,
+        "trades": n_trades,
+        "win_rate": wins / n_trades if n_trades else 0.0,
+        "open_positions": [prep.symbols[j] for j in np.flatnonzero(open_pos)],
+    }
+    if record_fills:
+        result["fills"] = fills
+    return result
+
+
+def run_backtest(market: Market, **params) -> dict:
+    return simulate(Prepared(market), **params)
+
+
+# --- sweep v process poolu ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _new_pool(processes: int) -> ProcessPoolExecutor:
+    # spawn: fork vícevláknového procesu API (event loop, audit writer, pooly spojení) není bezpečný
+    return ProcessPoolExecutor(max_workers=max(1, processes), mp_context=multiprocessing.get_context("spawn"))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool(BACKTEST_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_chunk(prep: Prepared, combos: List[dict]) -> List[dict]:
+    return [simulate(prep, record_fills=False, **combo) for combo in combos]
+
+
+def expand_grid(grid: Dict[str, Sequence[float]]) -> List[dict]:
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Neznámé parametry sweepu: {sorted(unknown)}")
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def sweep(market: Market, grid: Dict[str, Sequence[float]], processes: Optional[int] = None,
+          chunk_size: int = 16) -> List[dict]:
+    """Spustí backtest pro všechny kombinace parametrů; výsledky seřazené podle PnL.
+
+    Bez `processes` běží ve sdíleném poolu (BACKTEST_WORKERS procesů), jinak
+    v dočasném poolu s `processes` procesy (CLI).
+    """
+    prep = Prepared(market)
+    combos = expand_grid(grid)
+    workers = BACKTEST_WORKERS if processes is None else processes
+    # Prepared se pickluje s každým blokem: nejvýše ~4 bloky na proces
+    chunk_size = max(chunk_size, -(-len(combos) // (max(1, workers) * 4)))
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [r for chunk in chunks for r in _run_chunk(prep, chunk)]
+    elif processes is None:
+        pool = _get_pool()
+        results = [r for chunk_result in pool.map(_run_chunk, [prep] * len(chunks), chunks) for r in chunk_result]
+    else:
+        with _new_pool(workers) as pool:
+            results = [r for chunk_result in pool.map(_run_chunk, [prep] * len(chunks), chunks) for r in chunk_result]
+    return sorted(results, key=lambda r: r["pnl"], reverse=True)
+
+
+def _parse_grid(items: Sequence[str]) -> Dict[str, List[float]]:
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        grid[name] = [float(v) for v in values.split(",")]
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest Strategy nad OHLCV CSV soubory (jeden soubor = jeden symbol)")
+    parser.add_argument("csv", nargs="+", help="CSV soubory, nebo symboly s --interval (lokální KlineStore)")
+    parser.add_argument("--interval", help="číst symboly z lokálního úložiště svíček v tomto intervalu")
+    parser.add_argument("--stop-loss", type=float, default=0.03)
+    parser.add_argument("--max-positions", type=int, default=3)
+    parser.add_argument("--panic-volatility", type=float, default=0.08)
+    parser.add_argument("--sweep", nargs="+", metavar="PARAM=V1,V2", help="např. stop_loss_pct=0.01,0.03")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    market = Market.from_store(args.csv, args.interval) if args.interval else Market.from_csv(args.csv)
+    if args.sweep:
+        results = sweep(market, _parse_grid(args.sweep), processes=args.processes)
+        print(f"{len(results)} kombinací, nejlepších {args.top}:")
+        for r in results[:args.top]:
+            print(f"  SL={r['stop_loss_pct']:.3f} max_pos={r['max_positions']} panic={r['panic_volatility']:.3f}: "
+                  f"PnL {r['pnl']:.2f} ({r['return_pct']:.2f} %), DD {r['max_drawdown_pct']:.2f} %, obchodů {r['trades']}")
+        return
+    r = run_backtest(market, stop_loss_pct=args.stop_loss, max_positions=args.max_positions,
+                     panic_volatility=args.panic_volatility)
+    print(f"PnL {r['pnl']:.2f} ({r['return_pct']:.2f} %), max. drawdown {r['max_drawdown_pct']:.2f} %, "
+          f"obchodů {r['trades']}, úspěšnost {r['win_rate']:.0%}, plnění {len(r['fills'])}")
+
+
+if __name__ == "__main__":
+    main()
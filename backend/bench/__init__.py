@@ -0,0 +1 @@
+"""Offline benchmarky hot-path částí backendu (spouštět jako `python -m backend.bench.<modul>`, sadu s JSON výsledky jako `python -m backend.bench`)."""
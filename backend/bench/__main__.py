@@ -0,0 +1,6 @@
+"""Sada benchmarků: `python -m backend.bench` (viz backend/bench/suite.py)."""
+import sys
+
+from backend.bench.suite import main
+
+sys.exit(main())
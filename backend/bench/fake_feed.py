@@ -0,0 +1,84 @@
+"""
+Lokální falešný market-data feed ve formátu Pionex websocketu (TRADE/DEPTH).
+
+    python -m backend.bench.fake_feed --port 8765 --rate 50000 --trades-per-msg 1
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+
+
+def trade_message(symbol: str, n: int, seq: int, price: float) -> str:
+    now = int(time.time() * 1000)
+    return json.dumps({
+        "topic": "TRADE",
+        "symbol": symbol,
+        "data": [
+            {"symbol": symbol, "tradeId": str(seq + i), "price": f"{price:.2f}", "size": "0.01",
+             "side": "BUY" if (seq + i) % 2 else "SELL", "timestamp": now}
+            for i in range(n)
+        ],
+        "timestamp": now,
+    })
+
+
+def depth_message(symbol: str, price: float) -> str:
+    return json.dumps({
+        "topic": "DEPTH",
+        "symbol": symbol,
+        "data": {"bids": [[f"{price - 0.5:.2f}", "1.0"]], "asks": [[f"{price + 0.5:.2f}", "1.0"]]},
+        "timestamp": int(time.time() * 1000),
+    })
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, rate: int = 50_000, trades_per_msg: int = 1):
+    """Každému klientovi posílá `rate` zpráv/s pro všechny přihlášené symboly."""
+    from websockets.asyncio.server import serve as ws_serve
+
+    async def handler(ws):
+        symbols = set()
+
+        async def reader():
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("op") == "SUBSCRIBE":
+                    symbols.add(msg["symbol"])
+
+        read_task = asyncio.create_task(reader())
+        seq = 0
+        price = 30_000.0
+        tick = 0.01
+        per_tick = max(1, int(rate * tick))
+        try:
+            while True:
+                started = time.perf_counter()
+                for symbol in list(symbols):
+                    for _ in range(max(1, per_tick // len(symbols))):
+                        price += random.uniform(-1, 1)
+                        await ws.send(trade_message(symbol, trades_per_msg, seq, price))
+                        seq += trades_per_msg
+                    await ws.send(depth_message(symbol, price))
+                await asyncio.sleep(max(0.0, tick - (time.perf_counter() - started)))
+        except Exception:
+            pass
+        finally:
+            read_task.cancel()
+
+    async with ws_serve(handler, host, port, max_queue=None):
+        await asyncio.Future()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Falešný Pionex market-data feed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=int, default=50_000, help="zpráv za sekundu")
+    parser.add_argument("--trades-per-msg", type=int, default=1)
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.rate, args.trades_per_msg))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: dávkový Strategy.compute_indicators vs. inkrementální IndicatorEngine.
+
+Dávková cesta přepočítává celou historii při každém ticku (O(N)),
+inkrementální zpracuje jen novou svíčku (O(1)).
+
+    python -m backend.bench.indicators --sizes 10000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.indicators import IndicatorEngine
+from backend.strategy import Strategy, TA_LIB_AVAILABLE
+
+
+def synthetic_closes(n: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100.0 + np.cumsum(rng.normal(0, 0.5, n))
+
+
+def bench_size(n: int, ticks: int = 1000, batch_repeats: int = 3) -> dict:
+    closes = synthetic_closes(n + ticks)
+    history, live = closes[:n], closes[n:]
+    strat = Strategy()
+
+    # Dávková cesta: jeden přepočet celé historie = cena jednoho ticku
+    batch_times = []
+    for _ in range(batch_repeats):
+        df = pd.DataFrame({"close": history})
+        t0 = time.perf_counter()
+        strat.compute_indicators(df)
+        batch_times.append(time.perf_counter() - t0)
+    batch_tick = min(batch_times)
+
+    engine = IndicatorEngine()
+    t0 = time.perf_counter()
+    engine.warmup("BENCH", history)
+    warmup = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for close in live:
+        engine.update("BENCH", close)
+    incremental_tick = (time.perf_counter() - t0) / len(live)
+
+    return {
+        "candles": n,
+        "backend": "talib" if TA_LIB_AVAILABLE else "pandas-ta",
+        "batch_tick_ms": batch_tick * 1e3,
+        "incremental_tick_us": incremental_tick * 1e6,
+        "warmup_s": warmup,
+        "speedup": batch_tick / incremental_tick if incremental_tick else float("inf"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--ticks", type=int, default=1000)
+    args = parser.parse_args(argv)
+    for n in args.sizes:
+        r = bench_size(n, ticks=args.ticks)
+        print(
+            f"{r['candles']:>9} svíček [{r['backend']}]: dávka {r['batch_tick_ms']:.3f} ms/tick, "
+            f"inkrementálně {r['incremental_tick_us']:.2f} µs/tick "
+            f"(warmup {r['warmup_s']:.2f} s), zrychlení {r['speedup']:.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
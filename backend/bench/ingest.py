@@ -0,0 +1,74 @@
+"""
+Zátěžový test příjmu tržních dat proti lokálnímu falešnému feedu.
+
+Feed běží v samostatném procesu, ingestor zapisuje do NullSink (výchozí)
+nebo do skutečné InfluxDB (--influx).
+
+    python -m backend.bench.ingest --rate 50000 --duration 10
+"""
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+from backend.bench.fake_feed import serve
+from backend.ingest import MarketDataIngestor, NullSink, InfluxSink
+
+
+def _run_feed(port, rate, trades_per_msg):
+    asyncio.run(serve(port=port, rate=rate, trades_per_msg=trades_per_msg))
+
+
+async def run(args) -> dict:
+    sink = InfluxSink(batch_size=args.batch_size) if args.influx else NullSink()
+    ingestor = MarketDataIngestor(
+        args.symbols, sink=sink, url=f"ws://127.0.0.1:{args.port}",
+        batch_size=args.batch_size, flush_interval=args.flush_interval,
+        queue_size=args.queue_size, overflow=args.overflow,
+    )
+    ingestor.start()
+    await asyncio.sleep(1.0)  # zahřátí a připojení
+    start_stats = dict(ingestor.stats)
+    started = time.perf_counter()
+    max_queue = 0
+    while time.perf_counter() - started < args.duration:
+        await asyncio.sleep(0.1)
+        max_queue = max(max_queue, ingestor.queue.qsize())
+    elapsed = time.perf_counter() - started
+    stats = dict(ingestor.stats)
+    await ingestor.stop()
+    return {
+        "received_per_s": (stats["received"] - start_stats["received"]) / elapsed,
+        "written_per_s": (stats["written"] - start_stats["written"]) / elapsed,
+        "dropped": stats["dropped"],
+        "max_queue": max_queue,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zátěžový test příjmu tržních dat")
+    parser.add_argument("--rate", type=int, default=50_000)
+    parser.add_argument("--trades-per-msg", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", nargs="+", default=["BTC_USDT"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--queue-size", type=int, default=100_000)
+    parser.add_argument("--overflow", choices=["block", "drop"], default="block")
+    parser.add_argument("--influx", action="store_true", help="zapisovat do InfluxDB z backend.db")
+    args = parser.parse_args(argv)
+
+    feed = multiprocessing.Process(target=_run_feed, args=(args.port, args.rate, args.trades_per_msg), daemon=True)
+    feed.start()
+    time.sleep(0.5)
+    try:
+        r = asyncio.run(run(args))
+    finally:
+        feed.terminate()
+    print(f"přijato {r['received_per_s']:.0f}/s, zapsáno {r['written_per_s']:.0f}/s, "
+          f"zahozeno {r['dropped']}, max. fronta {r['max_queue']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Zátěžový test s otevřenou smyčkou: požadavky v pevném rytmu a latence p50/p99.
+
+Požadavek i odchází v čase t0 + i/rps bez ohledu na to, zda předchozí odpověděly
+(otevřená smyčka), a latence se měří od plánovaného odeslání – zahlcený server
+se tak projeví v latenci, ne jen v nižší propustnosti. Nad `--max-inflight`
+rozpracovaných požadavků se další zahodí a započtou jako `dropped`.
+
+Režimy:
+  http    GET cesty na běžící backend (cesty se střídají dokola), např. backend
+          spuštěný s PIONEX_BASE_URL na falešnou burzu (backend/bench/mock_exchange.py)
+  pionex  AsyncPionexAPI proti falešné burze v procesu – mix tržních dat
+          a objednávek přes limiter, coalescing a retry klienta
+
+    python -m backend.bench.loadtest http --url http://127.0.0.1:8000 --path "/bots/pionex/market_trades?symbol=BTC_USDT" --rps 200
+    python -m backend.bench.loadtest pionex --rps 100 200 --latency 0.02 --rate-429 0.01 --error-rate 0.005
+"""
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+
+def percentiles(latencies: Sequence[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1e3
+    return {"p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99), "max_ms": max(latencies) * 1e3}
+
+
+async def run_load(call: Callable[[int], Awaitable[Any]], rps: float, duration: float,
+                   max_inflight: int = 1000, label: Callable[[int], str] = lambda i: "all") -> dict:
+    """
+    Spouští `call(i)` v rytmu `rps` po dobu `duration`. Výjimka = chyba (počítá se podle
+    typu / HTTP statusu); výsledky i po `label(i)` (typ požadavku).
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    inflight = set()
+    dropped = 0
+    loop = asyncio.get_running_loop()
+    total = int(rps * duration)
+    t0 = loop.time()
+
+    async def one(i: int, scheduled: float):
+        try:
+            await call(i)
+        except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            errors[str(status) if status else type(e).__name__] += 1
+            return
+        latencies[label(i)].append(loop.time() - scheduled)
+
+    for i in range(total):
+        scheduled = t0 + i / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            dropped += 1
+            continue
+        task = loop.create_task(one(i, scheduled))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.gather(*inflight)
+    elapsed = loop.time() - t0
+    everything = [x for values in latencies.values() for x in values]
+    return {
+        "rps": rps,
+        "sent": total - dropped,
+        "ok": len(everything),
+        "errors": dict(errors),
+        "dropped": dropped,
+        "throughput": len(everything) / elapsed if elapsed else 0.0,
+        **percentiles(everything),
+        "by_label": {name: {"count": len(values), **percentiles(values)} for name, values in latencies.items()}
+        if len(latencies) > 1 else {},
+    }
+
+
+# --- režim http ---
+
+DEFAULT_PATH = "/bots/pionex/market_trades?symbol=BTC_USDT"
+
+
+async def run_http(url: str, paths: Sequence[str], rps: float, duration: float, max_inflight: int) -> dict:
+    limits = httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+    async with httpx.AsyncClient(base_url=url, timeout=30, limits=limits) as client:
+        async def call(i: int):
+            resp = await client.get(paths[i % len(paths)])
+            resp.raise_for_status()
+
+        return await run_load(call, rps, duration, max_inflight, label=lambda i: paths[i % len(paths)])
+
+
+# --- režim pionex ---
+
+PIONEX_MIX = ("ticker", "book_ticker", "depth", "klines", "trades", "order", "ticker", "depth")
+
+
+async def run_pionex(rps: float, duration: float, max_inflight: int, latency: float, jitter: float,
+                     rate_429: float, error_rate: float, client_rate: float,
+                     symbols: Sequence[str] = ("BTC_USDT", "ETH_USDT")) -> dict:
+    from backend.bench.mock_exchange import MockExchange, create_app
+    from backend.pionex import AsyncPionexAPI, PionexAPI
+    from backend.ratelimit import RateLimiter
+
+    exchange = MockExchange(symbols, latency=latency, jitter=jitter, rate_429=rate_429, error_rate=error_rate)
+    client = httpx.AsyncClient(base_url=PionexAPI.BASE_URL, transport=httpx.ASGITransport(create_app(exchange)))
+    limiter = RateLimiter(buckets={b: (client_rate, client_rate) for b in ("market", "account", "orders")})
+    api = AsyncPionexAPI("key", "secret", client=client, rate_limiter=limiter)
+
+    async def call(i: int):
+        symbol = symbols[i % len(symbols)]
+        op = PIONEX_MIX[i % len(PIONEX_MIX)]
+        if op == "ticker":
+            return await api.get_ticker_24hr(symbol)
+        if op == "book_ticker":
+            return await api.get_book_ticker(symbol)
+        if op == "depth":
+            return await api.get_market_depth(symbol, 20)
+        if op == "klines":
+            return await api.get_klines(symbol, "1M", 100)
+        if op == "trades":
+            return await api.get_market_trades(symbol, 50)
+        # Malá MARKET objednávka – páruje se proti market makerovi
+        return await api.place_order(symbol, "BUY" if i % 2 else "SELL", None, 0.001, "MARKET")
+
+    try:
+        result = await run_load(call, rps, duration, max_inflight, label=lambda i: PIONEX_MIX[i % len(PIONEX_MIX)])
+    finally:
+        await api.aclose()
+    return result | {"exchange": dict(exchange.stats), "coalesce": api.coalescer.info()["saved"]}
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def report(r: dict):
+    print(f"{r['rps']:>7.0f} req/s: ok {r['ok']}, chyby {r['errors'] or 0}, zahozeno {r['dropped']}, "
+          f"propustnost {r['throughput']:.0f}/s, p50 {_fmt(r['p50_ms'])} ms, p90 {_fmt(r['p90_ms'])} ms, "
+          f"p99 {_fmt(r['p99_ms'])} ms, max {_fmt(r['max_ms'])} ms")
+    for name, stats in sorted(r["by_label"].items()):
+        print(f"          {name:<20} {stats['count']:>6}x  p50 {_fmt(stats['p50_ms'])} ms, "
+              f"p99 {_fmt(stats['p99_ms'])} ms")
+    if "exchange" in r:
+        print(f"          burza: {r['exchange']}, ušetřeno coalescingem {r['coalesce']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="mode", required=True)
+    for name in ("http", "pionex"):
+        p = sub.add_parser(name)
+        p.add_argument("--rps", type=float, nargs="+", default=[50, 200])
+        p.add_argument("--duration", type=float, default=10.0)
+        p.add_argument("--max-inflight", type=int, default=1000)
+        if name == "http":
+            p.add_argument("--url", default="http://127.0.0.1:8000")
+            p.add_argument("--path", action="append", help="cesta (opakovatelné); výchozí obchody BTC_USDT přes backend")
+        else:
+            p.add_argument("--latency", type=float, default=0.02)
+            p.add_argument("--jitter", type=float, default=0.01)
+            p.add_argument("--rate-429", type=float, default=0.0)
+            p.add_argument("--error-rate", type=float, default=0.0)
+            p.add_argument("--client-rate", type=float, default=10_000.0,
+                           help="budget limiteru klienta req/s (výchozí prakticky bez limitu)")
+    args = parser.parse_args(argv)
+    for rps in args.rps:
+        if args.mode == "http":
+            r = asyncio.run(run_http(args.url, args.path or [DEFAULT_PATH], rps, args.duration, args.max_inflight))
+        else:
+            r = asyncio.run(run_pionex(rps, args.duration, args.max_inflight, args.latency, args.jitter,
+                                       args.rate_429, args.error_rate, args.client_rate))
+        report(r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Lokální falešná burza s REST API ve tvaru Pionexu pro zátěžové a latenční testy.
+
+Implementuje endpointy, které používá PionexAPI (objednávky, fill, účet, hloubka,
+obchody, tickery, klíny), s párovacím enginem (cena-čas priorita) nad knihou,
+kterou drží syntetický market maker kolem referenční ceny. Chování sítě se
+nastavuje: latence (+ náhodný jitter), náhodné 429, serverový rate limit
+(`rate_limit` req/s -> 429) a podíl chyb 500.
+
+Použití přímo v procesu (testy, loadtest) přes httpx.ASGITransport:
+
+    exchange = MockExchange(latency=0.02, rate_429=0.01)
+    client = httpx.AsyncClient(base_url=AsyncPionexAPI.BASE_URL, transport=httpx.ASGITransport(create_app(exchange)))
+    api = AsyncPionexAPI("key", "secret", client=client)
+
+nebo jako server (backend pak s PIONEX_BASE_URL=http://127.0.0.1:9000):
+
+    python -m backend.bench.mock_exchange --port 9000 --latency 0.02 --rate-429 0.01 --error-rate 0.01
+"""
+import math
+import time
+import bisect
+import random
+import asyncio
+import argparse
+import hashlib
+import itertools
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MM_OWNER = "mm"
+FEE_RATE = 0.0005
+_INTERVALS_MS = {"1M": 60_000, "5M": 300_000, "15M": 900_000, "30M": 1_800_000, "60M": 3_600_000,
+                 "4H": 14_400_000, "8H": 28_800_000, "12H": 43_200_000, "1D": 86_400_000}
+
+
+def _interval_ms(interval: str) -> int:
+    key = interval.upper()
+    if key in _INTERVALS_MS:
+        return _INTERVALS_MS[key]
+    unit = {"M": 60_000, "H": 3_600_000, "D": 86_400_000}[key[-1]]
+    return int(key[:-1]) * unit
+
+
+def _noise(symbol: str, i: int) -> float:
+    """Deterministický šum v [-1, 1] pro (symbol, index svíčky)."""
+    digest = hashlib.blake2b(f"{symbol}:{i}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 63 - 1.0
+
+
+class Order:
+    __slots__ = ("order_id", "client_order_id", "owner", "symbol", "side", "type", "price", "size", "filled",
+                 "filled_amount", "status", "create_time", "update_time")
+
+    def __init__(self, order_id, client_order_id, owner, symbol, side, type_, price, size, now_ms):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.owner = owner
+        self.symbol = symbol
+        self.side = side
+        self.type = type_
+        self.price = price
+        self.size = size
+        self.filled = 0.0
+        self.filled_amount = 0.0
+        self.status = "NEW"
+        self.create_time = now_ms
+        self.update_time = now_ms
+
+    @property
+    def remaining(self) -> float:
+        return self.size - self.filled
+
+    def to_dict(self) -> dict:
+        return {"orderId": self.order_id, "clientOrderId": self.client_order_id, "symbol": self.symbol,
+                "side": self.side, "type": self.type, "price": self.price, "size": self.size,
+                "filledSize": self.filled, "filledAmount": self.filled_amount, "status": self.status,
+                "createTime": self.create_time, "updateTime": self.update_time}
+
+
+class Book:
+    """Limitní kniha jednoho symbolu: cenové úrovně s FIFO frontou objednávek."""
+
+    def __init__(self):
+        self.levels = {"BUY": {}, "SELL": {}}  # strana -> cena -> deque[Order]
+        self.prices = {"BUY": [], "SELL": []}  # seřazené vzestupně
+
+    def best(self, side: str) -> Optional[float]:
+        prices = self.prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == "BUY" else prices[0]
+
+    def add(self, order: Order):
+        levels = self.levels[order.side]
+        queue = levels.get(order.price)
+        if queue is None:
+            queue = levels[order.price] = deque()
+            bisect.insort(self.prices[order.side], order.price)
+        queue.append(order)
+
+    def remove(self, order: Order):
+        queue = self.levels[order.side].get(order.price)
+        if queue is None:
+            return
+        try:
+            queue.remove(order)
+        except ValueError:
+            return
+        if not queue:
+            self._drop_level(order.side, order.price)
+
+    def _drop_level(self, side: str, price: float):
+        del self.levels[side][price]
+        prices = self.prices[side]
+        del prices[bisect.bisect_left(prices, price)]
+
+    def front(self, side: str):
+        """(cena, fronta) nejlepší úrovně strany."""
+        price = self.best(side)
+        return (price, self.levels[side][price]) if price is not None else (None, None)
+
+    def pop_front(self, side: str, price: float):
+        queue = self.levels[side][price]
+        queue.popleft()
+        if not queue:
+            self._drop_level(side, price)
+
+    def depth(self, side: str, limit: int) -> List[List[float]]:
+        prices = self.prices[side]
+        chosen = reversed(prices[-limit:]) if side == "BUY" else prices[:limit]
+        return [[p, round(sum(o.remaining for o in self.levels[side][p]), 8)] for p in chosen]
+
+
+class MockExchange:
+    def __init__(self, symbols: Sequence[str] = ("BTC_USDT", "ETH_USDT"), base_prices: Optional[Dict[str, float]] = None,
+                 latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, mm_levels: int = 20, mm_size: float = 1.0,
+                 tick_size: float = 0.01, seed: int = 42, clock: Callable[[], float] = time.time):
+        self.base_prices = {s: 30_000.0 if s.startswith("BTC") else 2_000.0 for s in symbols}
+        self.base_prices.update(base_prices or {})
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.mm_levels = mm_levels
+        self.mm_size = mm_size
+        self.tick_size = tick_size
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.books: Dict[str, Book] = {s: Book() for s in self.base_prices}
+        self.orders: Dict[str, Order] = {}
+        self.by_client_id: Dict[str, str] = {}
+        self.fills: List[dict] = []
+        self.trades: Dict[str, Deque[dict]] = {s: deque(maxlen=1000) for s in self.base_prices}
+        self.last_price: Dict[str, float] = {}
+        self.balances: Dict[str, float] = {"USDT": 1_000_000.0}
+        self._ids = itertools.count(1)
+        self._tat = 0.0  # GCRA serverového rate limitu
+        self.stats = {"requests": 0, "injected_429": 0, "limited_429": 0, "injected_500": 0, "orders": 0,
+                      "fills": 0, "cancels": 0}
+        for symbol in self.base_prices:
+            self.balances.setdefault(symbol.split("_")[0], 100.0)
+            self._requote(symbol)
+
+    def now_ms(self) -> int:
+        return int(self.clock() * 1000)
+
+    # --- ceny ---
+
+    def reference_price(self, symbol: str, i: int) -> float:
+        """Syntetická cena minutové svíčky `i` (deterministická, bez stavu)."""
+        base = self.base_prices[symbol]
+        return base * (1 + 0.02 * math.sin(i / 240) + 0.004 * math.sin(i / 17) + 0.001 * _noise(symbol, i))
+
+    def mid(self, symbol: str) -> float:
+        return self.last_price.get(symbol) or self.reference_price(symbol, self.now_ms() // 60_000)
+
+    def _round(self, price: float) -> float:
+        return round(round(price / self.tick_size) * self.tick_size, 8)
+
+    def _requote(self, symbol: str):
+        """Market maker doplní `mm_levels` úrovní na každou stranu kolem aktuální ceny (bez křížení knihy)."""
+        book = self.books[symbol]
+        mid = self.mid(symbol)
+        for side, sign in (("BUY", -1), ("SELL", 1)):
+            mm = [o for q in book.levels[side].values() for o in q if o.owner == MM_OWNER]
+            for order in mm:
+                book.remove(order)
+                self.orders.pop(order.order_id, None)
+            opposite = book.best("SELL" if side == "BUY" else "BUY")
+            for k in range(1, self.mm_levels + 1):
+                price = self._round(mid + sign * k * self.tick_size * max(1.0, mid * 1e-5 / self.tick_size))
+                if opposite is not None and (price >= opposite if side == "BUY" else price <= opposite):
+                    continue
+                order = Order(f"mm{next(self._ids)}", None, MM_OWNER, symbol, side, "LIMIT", price,
+                              self.mm_size, self.now_ms())
+                self.orders[order.order_id] = order
+                book.add(order)
+
+    # --- párování ---
+
+    def place(self, symbol: str, side: str, type_: str, price: Optional[float], size: float,
+              client_order_id: Optional[str] = None, owner: str = "user") -> Order:
+        if symbol not in self.books:
+            raise KeyError("SYMBOL_NOT_FOUND")
+        if client_order_id and client_order_id in self.by_client_id:
+            raise ValueError("DUPLICATE_CLIENT_ORDER_ID")
+        side, type_ = side.upper(), type_.upper()
+        if size <= 0 or (type_ == "LIMIT" and not price):
+            raise ValueError("INVALID_PARAMETER")
+        now = self.now_ms()
+        order = Order(str(next(self._ids)), client_order_id, owner, symbol, side, type_,
+                      self._round(float(price)) if type_ == "LIMIT" else None, float(size), now)
+        self.orders[order.order_id] = order
+        if client_order_id:
+            self.by_client_id[client_order_id] = order.order_id
+        self.stats["orders"] += 1
+        self._match(order)
+        if order.remaining > 1e-12:
+            if type_ == "LIMIT":
+                self.books[symbol].add(order)
+            else:
+                # Nevyplněný zbytek MARKET objednávky se ruší
+                order.status = "CANCELED" if order.filled == 0 else "PARTIALLY_CANCELED"
+        if order.filled > 0:
+            self._requote(symbol)
+        return order
+
+    def _match(self, taker: Order):
+        book = self.books[taker.symbol]
+        maker_side = "SELL" if taker.side == "BUY" else "BUY"
+        while taker.remaining > 1e-12:
+            price, queue = book.front(maker_side)
+            if price is None:
+                break
+            if taker.type == "LIMIT" and (price > taker.price if taker.side == "BUY" else price < taker.price):
+                break
+            maker = queue[0]
+            qty = min(taker.remaining, maker.remaining)
+            self._fill(taker, maker, price, qty)
+            if maker.remaining <= 1e-12:
+                book.pop_front(maker_side, price)
+
+    def _fill(self, taker: Order, maker: Order, price: float, qty: float):
+        now = self.now_ms()
+        for order in (taker, maker):
+            order.filled = round(order.filled + qty, 12)
+            order.filled_amount += qty * price
+            order.status = "FILLED" if order.remaining <= 1e-12 else "PARTIALLY_FILLED"
+            order.update_time = now
+            if order.owner == MM_OWNER:
+                continue
+            fee = qty * price * FEE_RATE
+            base = order.symbol.split("_")[0]
+            sign = 1 if order.side == "BUY" else -1
+            self.balances[base] = self.balances.get(base, 0.0) + sign * qty
+            self.balances["USDT"] -= sign * qty * price + fee
+            self.fills.append({"id": str(next(self._ids)), "orderId": order.order_id, "symbol": order.symbol,
+                               "side": order.side, "role": "TAKER" if order is taker else "MAKER",
+                               "price": price, "size": qty, "fee": round(fee, 8), "feeCoin": "USDT",
+                               "timestamp": now})
+            self.stats["fills"] += 1
+        self.last_price[taker.symbol] = price
+        self.trades[taker.symbol].append({"symbol": taker.symbol, "tradeId": str(next(self._ids)), "price": price,
+                                          "size": qty, "side": taker.side, "timestamp": now})
+
+    def cancel(self, order_id: str) -> Order:
+        order = self.orders.get(order_id)
+        if order is None or order.owner == MM_OWNER:
+            raise KeyError("ORDER_NOT_FOUND")
+        if order.status in ("NEW", "PARTIALLY_FILLED"):
+            self.books[order.symbol].remove(order)
+            order.status = "CANCELED"
+            order.update_time = self.now_ms()
+            self.stats["cancels"] += 1
+        return order
+
+    def user_orders(self, symbol: Optional[str] = None, open_only: bool = False, start_time: Optional[int] = None):
+        out = [o for o in self.orders.values() if o.owner != MM_OWNER
+               and (symbol is None or o.symbol == symbol)
+               and (not open_only or o.status in ("NEW", "PARTIALLY_FILLED"))
+               and (start_time is None or o.update_time >= start_time)]
+        return sorted(out, key=lambda o: o.create_time)
+
+    # --- tržní data ---
+
+    def klines(self, symbol: str, interval: str, limit: int = 100, end_time: Optional[int] = None) -> List[dict]:
+        step = _interval_ms(interval)
+        end = (end_time or self.now_ms()) // step * step
+        out = []
+        for t in range(end - (limit - 1) * step, end + 1, step):
+            first, last = t // 60_000, (t + step) // 60_000 - 1
+            points = [self.reference_price(symbol, i) for i in range(first, last + 1, max(1, (last - first) // 8))]
+            points.append(self.reference_price(symbol, last))
+            out.append({"time": t, "open": round(points[0], 2), "close": round(points[-1], 2),
+                        "high": round(max(points), 2), "low": round(min(points), 2),
+                        "volume": round(10 + 5 * abs(_noise(symbol, t)), 4)})
+        return out
+
+    def ticker(self, symbol: str) -> dict:
+        day = self.klines(symbol, "60M", 24)
+        close = self.mid(symbol)
+        return {"symbol": symbol, "open": day[0]["open"], "close": close, "high": max(k["high"] for k in day),
+                "low": min(k["low"] for k in day), "volume": sum(k["volume"] for k in day), "time": self.now_ms()}
+
+    def book_ticker(self, symbol: str) -> dict:
+        book = self.books[symbol]
+        bid, ask = book.depth("BUY", 1), book.depth("SELL", 1)
+        return {"symbol": symbol, "bidPrice": bid[0][0] if bid else None, "bidSize": bid[0][1] if bid else None,
+                "askPrice": ask[0][0] if ask else None, "askSize": ask[0][1] if ask else None,
+                "timestamp": self.now_ms()}
+
+    # --- síťové chování ---
+
+    async def network(self) -> Optional[int]:
+        """Latence a injektované chyby; vrací HTTP status chyby, nebo None."""
+        self.stats["requests"] += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.rate_limit:
+            now = self.clock()
+            interval = 1.0 / self.rate_limit
+            tat = max(self._tat, now)
+            if tat - now > interval * max(1.0, self.rate_limit):  # burst = 1 s budgetu
+                self.stats["limited_429"] += 1
+                return 429
+            self._tat = tat + interval
+        if self.rate_429 and self.rng.random() < self.rate_429:
+            self.stats["injected_429"] += 1
+            return 429
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["injected_500"] += 1
+            return 500
+        return None
+
+
+def _ok(exchange: MockExchange, data: Any) -> dict:
+    return {"result": True, "data": data, "timestamp": exchange.now_ms()}
+
+
+def _error(code: str, status: int = 400) -> JSONResponse:
+    return JSONResponse({"result": False, "code": code, "message": code}, status_code=status)
+
+
+def create_app(exchange: Optional[MockExchange] = None) -> FastAPI:
+    exchange = exchange or MockExchange()
+    app = FastAPI(title="Mock Pionex")
+    app.state.exchange = exchange
+
+    @app.middleware("http")
+    async def faults(request: Request, call_next):
+        if request.url.path.startswith("/mock/"):
+            return await call_next(request)
+        status = await exchange.network()
+        if status is not None:
+            return _error("RATE_LIMIT" if status == 429 else "INTERNAL_ERROR", status)
+        return await call_next(request)
+
+    @app.get("/mock/stats")
+    def mock_stats():
+        return {**exchange.stats, "open_orders": len(exchange.user_orders(open_only=True))}
+
+    # --- účet ---
+
+    @app.get("/api/v1/account")
+    @app.get("/api/v1/account/balance")
+    def balances():
+        return _ok(exchange, {"balances": [{"coin": c, "free": round(v, 8), "frozen": 0.0}
+                                           for c, v in sorted(exchange.balances.items())]})
+
+    # --- objednávky ---
+
+    @app.post("/api/v1/orders")
+    async def place_order(request: Request):
+        body = await request.json()
+        try:
+            order = exchange.place(body.get("symbol"), body.get("side", ""), body.get("type", "LIMIT"),
+                                   body.get("price"), float(body.get("size") or body.get("quantity") or 0),
+                                   body.get("clientOrderId"))
+        except (KeyError, ValueError) as e:
+            return _error(e.args[0] if e.args else "INVALID_PARAMETER")
+        return _ok(exchange, {"orderId": order.order_id, "clientOrderId": order.client_order_id})
+
+    @app.delete("/api/v1/orders")
+    def cancel_all(symbol: Optional[str] = None):
+        orders = exchange.user_orders(symbol, open_only=True)
+        for order in orders:
+            exchange.cancel(order.order_id)
+        return _ok(exchange, {"canceled": len(orders)})
+
+    @app.get("/api/v1/orders")
+    def list_orders(symbol: Optional[str] = None, limit: int = 100):
+        return _ok(exchange, {"orders": [o.to_dict() for o in exchange.user_orders(symbol)[-limit:]]})
+
+    @app.get("/api/v1/orders/client-order-id/{client_order_id}")
+    def get_by_client_id(client_order_id: str):
+        order_id = exchange.by_client_id.get(client_order_id)
+        if order_id is None:
+            return _error("ORDER_NOT_FOUND")
+        return _ok(exchange, exchange.orders[order_id].to_dict())
+
+    @app.get("/api/v1/orders/{order_id}")
+    def get_order(order_id: str):
+        order = exchange.orders.get(order_id)
+        if order is None or order.owner == MM_OWNER:
+            return _error("ORDER_NOT_FOUND")
+        return _ok(exchange, order.to_dict())
+
+    @app.delete("/api/v1/orders/{order_id}")
+    def cancel_order(order_id: str):
+        try:
+            order = exchange.cancel(order_id)
+        except KeyError as e:
+            return _error(e.args[0])
+        return _ok(exchange, {"orderId": order.order_id, "status": order.status})
+
+    @app.get("/api/v1/openOrders")
+    def open_orders(symbol: Optional[str] = None):
+        return _ok(exchange, {"orders": [o.to_dict() for o in exchange.user_orders(symbol, open_only=True)]})
+
+    @app.get("/api/v1/allOrders")
+    def all_orders(symbol: Optional[str] = None, startTime: Optional[int] = None, limit: int = 100):
+        orders = exchange.user_orders(symbol, start_time=startTime)[:limit]
+        return _ok(exchange, {"orders": [o.to_dict() for o in orders]})
+
+    @app.get("/api/v1/fills")
+    def fills(orderId: Optional[str] = None, symbol: Optional[str] = None, startTime: Optional[int] = None,
+              endTime: Optional[int] = None):
+        out = [f for f in exchange.fills
+               if (orderId is None or f["orderId"] == orderId) and (symbol is None or f["symbol"] == symbol)
+               and (startTime is None or f["timestamp"] >= startTime)
+               and (endTime is None or f["timestamp"] <= endTime)]
+        return _ok(exchange, {"fills": out})
+
+    # --- tržní data ---
+
+    @app.get("/api/v1/trades")
+    def trades(symbol: str, limit: int = 50):
+        if symbol not in exchange.books:
+            return _error("SYMBOL_NOT_FOUND")
+        return _ok(exchange, {"trades": list(exchange.trades[symbol])[-limit:][::-1]})
+
+    @app.get("/api/v1/depth")
+    def depth(symbol: str, limit: int = 20):
+        if symbol not in exchange.books:
+            return _error("SYMBOL_NOT_FOUND")
+        book = exchange.books[symbol]
+        return _ok(exchange, {"bids": book.depth("BUY", limit), "asks": book.depth("SELL", limit),
+                              "updateTime": exchange.now_ms()})
+
+    @app.get("/api/v1/ticker/24hr")
+    def ticker_24hr(symbol: Optional[str] = None):
+        symbols = [symbol] if symbol else list(exchange.books)
+        if any(s not in exchange.books for s in symbols):
+            return _error("SYMBOL_NOT_FOUND")
+        return _ok(exchange, {"tickers": [exchange.ticker(s) for s in symbols]})
+
+    @app.get("/api/v1/ticker/bookTicker")
+    def book_ticker(symbol: Optional[str] = None):
+        symbols = [symbol] if symbol else list(exchange.books)
+        if any(s not in exchange.books for s in symbols):
+            return _error("SYMBOL_NOT_FOUND")
+        return _ok(exchange, {"tickers": [exchange.book_ticker(s) for s in symbols]})
+
+    @app.get("/api/v1/klines")
+    def klines(symbol: str, interval: str, limit: int = 100, endTime: Optional[int] = None):
+        if symbol not in exchange.books:
+            return _error("SYMBOL_NOT_FOUND")
+        return _ok(exchange, {"klines": exchange.klines(symbol, interval, min(limit, 500), endTime)})
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--symbols", nargs="+", default=["BTC_USDT", "ETH_USDT"])
+    parser.add_argument("--latency", type=float, default=0.0, help="základní latence odpovědi v s")
+    parser.add_argument("--jitter", type=float, default=0.0, help="náhodná přidaná latence 0..jitter s")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="podíl náhodných odpovědí 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="podíl náhodných odpovědí 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="serverový limit req/s (nad ním 429)")
+    args = parser.parse_args(argv)
+    import uvicorn
+    exchange = MockExchange(args.symbols, latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit)
+    uvicorn.run(create_app(exchange), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
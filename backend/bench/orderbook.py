@@ -0,0 +1,118 @@
+"""
+Benchmark: aplikace DEPTH diffů na lokální order book a čtení vrcholu knihy.
+
+Diffy jsou syntetické a soustředěné u vrcholu knihy (jako reálný feed):
+změna množství, nová úroveň a zrušení úrovně. Srovnání se slovníkem cen,
+který nejlepší cenu hledá přes max()/min() při každém čtení.
+
+    python -m backend.bench.orderbook --levels 100 1000 --updates 200000
+"""
+import argparse
+import random
+import time
+
+from backend.orderbook import OrderBook
+
+
+def synthetic_diffs(n: int, levels: int, tick: float = 0.01, seed: int = 42) -> list:
+    """(strana, cena, množství); množství 0 = zrušení úrovně."""
+    rng = random.Random(seed)
+    mid = 30_000.0
+    diffs = []
+    for _ in range(n):
+        is_bid = rng.random() < 0.5
+        # Geometrické rozdělení vzdálenosti od vrcholu – většina změn u nejlepších cen
+        distance = min(int(rng.expovariate(0.1)), levels - 1)
+        price = round(mid - (distance + 1) * tick if is_bid else mid + (distance + 1) * tick, 2)
+        size = 0.0 if rng.random() < 0.2 else round(rng.uniform(0.01, 5), 4)
+        diffs.append((is_bid, price, size))
+    return diffs
+
+
+def snapshot(levels: int, tick: float = 0.01):
+    mid = 30_000.0
+    bids = [(round(mid - (i + 1) * tick, 2), 1.0) for i in range(levels)]
+    asks = [(round(mid + (i + 1) * tick, 2), 1.0) for i in range(levels)]
+    return bids, asks
+
+
+class DictBook:
+    """Referenční kniha: jen slovníky, vrchol přes max()/min()."""
+
+    def __init__(self, bids, asks):
+        self.bids = dict(bids)
+        self.asks = dict(asks)
+
+    def update(self, is_bid, price, size):
+        side = self.bids if is_bid else self.asks
+        if size > 0:
+            side[price] = size
+        else:
+            side.pop(price, None)
+
+    def best(self):
+        return max(self.bids), min(self.asks)
+
+
+def bench(levels: int, updates: int = 200_000) -> dict:
+    diffs = synthetic_diffs(updates, levels)
+    bids, asks = snapshot(levels)
+
+    book = OrderBook("BTC_USDT", max_levels=levels * 2)
+    book.apply_snapshot(bids, asks)
+    bid_side, ask_side = book.bids, book.asks
+    t0 = time.perf_counter()
+    for is_bid, price, size in diffs:
+        (bid_side if is_bid else ask_side).update(price, size)
+        bid_side.best()
+        ask_side.best()
+    book_s = time.perf_counter() - t0
+
+    # Celé apply_diff po zprávách o 10 úrovních (včetně kontroly sekvence)
+    book.apply_snapshot(bids, asks, seq=0)
+    messages = [diffs[i:i + 10] for i in range(0, len(diffs), 10)]
+    t0 = time.perf_counter()
+    for seq, chunk in enumerate(messages, 1):
+        book.apply_diff([(p, s) for b, p, s in chunk if b], [(p, s) for b, p, s in chunk if not b],
+                        ts_ms=0, seq=seq, prev_seq=seq - 1)
+    message_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(updates):
+        book.best_bid()
+        book.best_ask()
+    top_s = time.perf_counter() - t0
+
+    ref = DictBook(bids, asks)
+    t0 = time.perf_counter()
+    for is_bid, price, size in diffs:
+        ref.update(is_bid, price, size)
+        ref.best()
+    ref_s = time.perf_counter() - t0
+
+    return {
+        "levels": levels,
+        "update_us": book_s / updates * 1e6,
+        "message_us": message_s / len(messages) * 1e6,
+        "top_ns": top_s / updates * 1e9,
+        "dict_update_us": ref_s / updates * 1e6,
+        "speedup": ref_s / book_s,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--updates", type=int, default=200_000)
+    args = parser.parse_args(argv)
+    for levels in args.levels:
+        r = bench(levels, args.updates)
+        print(
+            f"{r['levels']:>6} úrovní: diff + vrchol {r['update_us']:.2f} µs, zpráva (10 úrovní) "
+            f"{r['message_us']:.2f} µs, best bid+ask {r['top_ns']:.0f} ns; slovník + max/min "
+            f"{r['dict_update_us']:.2f} µs ({r['speedup']:.0f}x pomalejší)"
+        )
+
+
+if __name__ == "__main__":
+    main()
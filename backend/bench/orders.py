@@ -0,0 +1,136 @@
+"""
+Benchmark: uzavření pozic (flatten) sériově vs. dávkou place_orders/submit_batch.
+
+Burza je simulovaná v procesu (httpx.MockTransport) s latencí odpovědi a
+deduplikací podle clientOrderId; rate limit je skutečný GCRA limiter klienta
+s budgetem `--rate` požadavků/s pro objednávky. Měří se celková doba a kdy
+skončilo poslední rušení a poslední výstup (dávka je odbaví přednostně).
+
+    python -m backend.bench.orders --orders 100 --cancels 20 --rates 10 50 --latency 0.05
+"""
+import time
+import random
+import asyncio
+import argparse
+import json
+
+import httpx
+
+from backend.pionex import AsyncPionexAPI
+from backend.ratelimit import RateLimiter
+
+
+class SimulatedExchange:
+    """Minimální burza pro /api/v1/orders: latence, deduplikace clientOrderId, rušení."""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.orders = {}
+        self.by_client_id = {}
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        path = request.url.path
+        if request.method == "POST" and path == "/api/v1/orders":
+            body = json.loads(request.content)
+            cid = body.get("clientOrderId")
+            if cid in self.by_client_id:
+                return httpx.Response(400, json={"code": "DUPLICATE_CLIENT_ORDER_ID"})
+            order_id = f"o{len(self.orders) + 1}"
+            self.orders[order_id] = body | {"orderId": order_id, "status": "FILLED"}
+            if cid:
+                self.by_client_id[cid] = order_id
+            return httpx.Response(200, json={"orderId": order_id})
+        if request.method == "DELETE" and path.startswith("/api/v1/orders/"):
+            order = self.orders.get(path.rsplit("/", 1)[-1])
+            if order is not None:
+                order["status"] = "CANCELED"
+            return httpx.Response(200, json={"result": True})
+        if path.startswith("/api/v1/orders/client-order-id/"):
+            order_id = self.by_client_id.get(path.rsplit("/", 1)[-1])
+            return httpx.Response(200, json=self.orders[order_id] if order_id else {})
+        return httpx.Response(404)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=AsyncPionexAPI.BASE_URL, transport=httpx.MockTransport(self.handle))
+
+
+def flatten_request(n_orders: int, n_cancels: int):
+    cancels = [f"open{i}" for i in range(n_cancels)]
+    orders = [{"symbol": f"SYM{i}_USDT", "side": "SELL", "quantity": 1.0, "type": "MARKET", "exit": True}
+              for i in range(n_orders)]
+    return cancels, orders
+
+
+def _api(exchange: SimulatedExchange, rate: float) -> AsyncPionexAPI:
+    # Objednávky na vlastním bucketu; burst jako výchozí limiter (10)
+    limiter = RateLimiter(buckets={"orders": (rate, 10), "account": (rate, 10), "market": (rate, 10)})
+    return AsyncPionexAPI("key", "secret", client=exchange.client(), rate_limiter=limiter)
+
+
+async def run_serial(n_orders: int, n_cancels: int, rate: float, latency: float) -> dict:
+    exchange = SimulatedExchange(latency)
+    api = _api(exchange, rate)
+    cancels, orders = flatten_request(n_orders, n_cancels)
+    t0 = time.perf_counter()
+    # Původní postup: jedna objednávka po druhé, vstupy a výstupy v pořadí, jak přišly
+    for order in orders:
+        await api.place_order(order["symbol"], order["side"], None, order["quantity"], "MARKET")
+    exits_done = time.perf_counter() - t0
+    for order_id in cancels:
+        await api.cancel_order(order_id)
+    total = time.perf_counter() - t0
+    await api.aclose()
+    return {"total_s": total, "cancels_s": total, "exits_s": exits_done, "requests": exchange.requests}
+
+
+async def run_batch(n_orders: int, n_cancels: int, rate: float, latency: float, concurrency: int) -> dict:
+    exchange = SimulatedExchange(latency)
+    api = _api(exchange, rate)
+    cancels, orders = flatten_request(n_orders, n_cancels)
+    done = {"cancel": 0.0, "order": 0.0}
+    t0 = time.perf_counter()
+    place_one, cancel_one = api._place_one, api._cancel_one
+
+    async def timed_place(order):
+        result = await place_one(order)
+        done["order"] = time.perf_counter() - t0
+        return result
+
+    async def timed_cancel(order_id):
+        result = await cancel_one(order_id)
+        done["cancel"] = time.perf_counter() - t0
+        return result
+
+    api._place_one, api._cancel_one = timed_place, timed_cancel
+    result = await api.submit_batch(cancels, orders, max_concurrent=concurrency)
+    total = time.perf_counter() - t0
+    await api.aclose()
+    ok = sum(r["ok"] for r in result["orders"]) + sum(r["ok"] for r in result["cancels"])
+    return {"total_s": total, "cancels_s": done["cancel"], "exits_s": done["order"], "requests": exchange.requests,
+            "ok": ok}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--cancels", type=int, default=20)
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 50])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=AsyncPionexAPI.BATCH_CONCURRENCY)
+    args = parser.parse_args(argv)
+    for rate in args.rates:
+        serial = asyncio.run(run_serial(args.orders, args.cancels, rate, args.latency))
+        batch = asyncio.run(run_batch(args.orders, args.cancels, rate, args.latency, args.concurrency))
+        print(f"limit {rate:.0f} req/s, {args.orders} výstupů + {args.cancels} rušení: "
+              f"sériově {serial['total_s']:.2f} s (rušení hotová v {serial['cancels_s']:.2f} s), "
+              f"dávka {batch['total_s']:.2f} s (rušení {batch['cancels_s']:.2f} s, výstupy {batch['exits_s']:.2f} s), "
+              f"{serial['total_s'] / batch['total_s']:.1f}x rychleji")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: dávkové PredictionService.predict_batch vs. volání po jednom symbolu.
+
+Po jednom = jeden predict_batch na symbol (jako Strategy.predict_next_price),
+dávka = všechny symboly a horizonty jedním voláním. Výsledek v predikcích/s
+(predikce = jeden symbol x jeden horizont).
+
+    python -m backend.bench.prediction --symbols 10 100 1000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from backend.model import ModelRegistry
+from backend.prediction import PredictionService
+
+
+def synthetic_closes(n_symbols: int, n: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    return {f"S{i}": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))) for i in range(n_symbols)}
+
+
+def bench(n_symbols: int, bars: int = 500, repeats: int = 5) -> dict:
+    closes = synthetic_closes(n_symbols, bars)
+    with tempfile.TemporaryDirectory() as root:
+        service = PredictionService(ModelRegistry(root))
+        t0 = time.perf_counter()
+        service.fit_many(closes)
+        fit_s = time.perf_counter() - t0
+        n_predictions = n_symbols * len(service.horizons)
+
+        batch = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            service.predict_batch(closes)
+            batch.append(time.perf_counter() - t0)
+
+        single = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            for symbol, close in closes.items():
+                service.predict_batch({symbol: close})
+            single.append(time.perf_counter() - t0)
+
+    return {
+        "symbols": n_symbols,
+        "horizons": len(service.horizons),
+        "fit_s": fit_s,
+        "batch_per_s": n_predictions / min(batch),
+        "single_per_s": n_predictions / min(single),
+        "speedup": min(single) / min(batch),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--bars", type=int, default=500)
+    args = parser.parse_args(argv)
+    for n in args.symbols:
+        r = bench(n, bars=args.bars)
+        print(
+            f"{r['symbols']:>5} symbolů x {r['horizons']} horizonty: dávka {r['batch_per_s']:,.0f} predikcí/s, "
+            f"po jednom {r['single_per_s']:,.0f} predikcí/s, zrychlení {r['speedup']:.1f}x (fit {r['fit_s']:.2f} s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Zátěžový test broadcast hubu /ws/realtime: počet dotazů do úložiště
+nezávisí na počtu připojených klientů.
+
+    python -m backend.bench.realtime --clients 1 10 200 --duration 3
+"""
+import time
+import asyncio
+import argparse
+import random
+
+from backend.realtime import RealtimeHub
+
+
+def make_fetch(symbols, calls):
+    def fetch(wanted):
+        calls.append(time.perf_counter())
+        return {s: {"symbol": s, "price": round(random.uniform(99, 101), 2), "volume": 1.0,
+                    "timestamp": time.time()} for s in symbols}
+    return fetch
+
+
+async def run(clients: int, duration: float, interval: float, symbols) -> dict:
+    calls = []
+    hub = RealtimeHub(fetch=make_fetch(symbols, calls), interval=interval)
+    received = [0] * clients
+    lags = []
+
+    async def client(i):
+        sub = hub.subscribe([symbols[i % len(symbols)]])
+        while not sub.closed:
+            ticks = await sub.next(timeout=interval * 2)
+            received[i] += len(ticks)
+            now = time.time()
+            lags.extend(now - t["timestamp"] for t in ticks)
+
+    tasks = [asyncio.create_task(client(i)) for i in range(clients)]
+    await asyncio.sleep(duration)
+    await hub.stop()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "clients": clients,
+        "queries": len(calls),
+        "queries_per_s": len(calls) / duration,
+        "ticks_delivered": sum(received),
+        "max_lag_ms": max(lags) * 1e3 if lags else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zátěžový test realtime hubu")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 200])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--symbols", nargs="+", default=["BTC_USDT", "ETH_USDT", "SOL_USDT"])
+    args = parser.parse_args(argv)
+    for n in args.clients:
+        r = asyncio.run(run(n, args.duration, args.interval, args.symbols))
+        print(f"{r['clients']:>5} klientů: {r['queries']} dotazů ({r['queries_per_s']:.1f}/s), "
+              f"doručeno {r['ticks_delivered']} ticků, max. zpoždění {r['max_lag_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
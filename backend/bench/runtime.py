@@ -0,0 +1,88 @@
+"""
+Zátěžový test runtime botů: stovky botů jako asyncio tasky v jednom procesu.
+
+Svíčky jsou syntetické v dočasném kline store (bez sítě) a každý interval
+ticku přibude nová; bot při ticku načte nové svíčky, posune indikátory
+a vyhodnotí signál (paper režim, bez audit logu). Měří se počet ticků,
+zpoždění startu ticku za deadlinem (p50/p99) a zmeškané deadliny.
+
+    python -m backend.bench.runtime --bots 100 500 1000 --tick 1.0 --duration 5
+"""
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+from backend.klines import KlineStore
+from backend.runtime import BotRuntime, BotSpec, MarketDataCache
+
+
+START = 1_700_000_000_000
+
+
+def candles(closes, first: int) -> list:
+    return [{"time": START + (first + i) * 60_000, "open": c, "high": c, "low": c, "close": c, "volume": 1.0}
+            for i, c in enumerate(closes)]
+
+
+def fill_store(store: KlineStore, symbols, bars: int = 500, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    for symbol in symbols:
+        store.append(symbol, "1m", candles(100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars))), 0))
+    return bars
+
+
+async def feed(store: KlineStore, symbols, bars: int, tick: float):
+    """Každý `tick` jedna nová svíčka pro každý symbol."""
+    rng = np.random.default_rng(0)
+    while True:
+        await asyncio.sleep(tick)
+        for symbol in symbols:
+            last = float(store.get(symbol, "1m", last=1).close[-1])
+            store.append(symbol, "1m", candles([last * float(np.exp(rng.normal(0, 0.01)))], bars))
+        bars += 1
+
+
+async def run(n_bots: int, tick: float, duration: float, symbols) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        store = KlineStore(root)
+        bars = fill_store(store, symbols)
+        runtime = BotRuntime(market=MarketDataCache(store), api_factory=None, enabled=True,
+                             audit=lambda **kwargs: None)
+        for i in range(n_bots):
+            await runtime.start_bot(BotSpec(i, f"bot{i}", symbols[i % len(symbols)], "1m", tick, None))
+        feeder = asyncio.create_task(feed(store, symbols, bars, tick))
+        threads = threading.active_count()
+        await asyncio.sleep(duration)
+        feeder.cancel()
+        await runtime.shutdown()
+        info = runtime.info()
+    return {
+        "bots": n_bots,
+        "ticks_per_s": info["ticks"] / duration,
+        "expected_per_s": n_bots / tick,
+        "lag_p50_ms": info["lag_p50_ms"] or 0.0,
+        "lag_p99_ms": info["lag_p99_ms"] or 0.0,
+        "missed": info["missed"],
+        "threads": threads,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bots", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--tick", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--symbols", nargs="+", default=["BTC_USDT", "ETH_USDT", "SOL_USDT"])
+    args = parser.parse_args(argv)
+    for n in args.bots:
+        r = asyncio.run(run(n, args.tick, args.duration, args.symbols))
+        print(f"{r['bots']:>5} botů: {r['ticks_per_s']:.0f} ticků/s (cíl {r['expected_per_s']:.0f}), "
+              f"zpoždění p50 {r['lag_p50_ms']:.1f} ms / p99 {r['lag_p99_ms']:.1f} ms, "
+              f"zmeškáno {r['missed']}, vláken {r['threads']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: sentiment textů po jednom vs. pipeline s cache a dávkováním.
+
+Gemini nahrazuje lokální stub (FastAPI v procesu přes httpx.ASGITransport, nebo
+samostatný server s `--serve`), který odpovídá na generateContent po `--latency` s
+plus `--per-text` s za každý text v požadavku a skóre odvodí z hashe textu.
+Vstupem je `--texts` textů, z nichž `--duplicates` je opakovaných (zprávy
+přebírané více zdroji). Měří se doba, počet volání modelu a druhý průchod
+nad zaplněnou cache (SQLite v dočasném adresáři).
+
+    python -m backend.bench.sentiment --texts 200 --duplicates 0.5 --latency 0.05
+    python -m backend.bench.sentiment --serve --port 9100   # GEMINI_BASE_URL=http://127.0.0.1:9100
+"""
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+
+import httpx
+from fastapi import FastAPI, Request
+
+
+def stub_score(text: str) -> float:
+    return int(hashlib.md5(text.encode()).hexdigest()[:4], 16) / 0xFFFF * 2 - 1
+
+
+def create_stub_app(latency: float = 0.05, per_text: float = 0.002) -> FastAPI:
+    """Stub Gemini generateContent: první část je instrukce, další části texty "[i] ..."."""
+    app = FastAPI(title="Gemini stub")
+    app.state.calls = 0
+
+    @app.post("/{path:path}")
+    async def generate(path: str, request: Request):
+        body = await request.json()
+        parts = body["contents"][0]["parts"][1:] or body["contents"][0]["parts"]
+        app.state.calls += 1
+        await asyncio.sleep(latency + per_text * len(parts))
+        items = []
+        for i, part in enumerate(parts):
+            text = part["text"].split("] ", 1)[-1]
+            items.append(f'{{"i": {i}, "score": {stub_score(text):.4f}}}')
+        return {"candidates": [{"content": {"parts": [{"text": "[" + ", ".join(items) + "]"}]}}]}
+
+    return app
+
+
+def make_texts(n: int, duplicates: float, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    unique = max(1, int(n * (1 - duplicates)))
+    pool = [f"Zpráva {i}: {rng.choice(['BTC', 'ETH', 'SOL'])} {rng.choice(['roste', 'padá', 'stagnuje'])}"
+            for i in range(unique)]
+    return [{"text": pool[i] if i < unique else rng.choice(pool), "symbol": pool[i % unique].split()[2]}
+            for i in range(n)]
+
+
+def _client(app):
+    from backend.gemini import AsyncGeminiClient
+    http = httpx.AsyncClient(base_url=AsyncGeminiClient.BASE_URL, transport=httpx.ASGITransport(app))
+    return AsyncGeminiClient("key", client=http)
+
+
+async def run_naive(items, latency: float, per_text: float) -> dict:
+    """Původní chování: jeden požadavek na text, po jednom (bez cache)."""
+    app = create_stub_app(latency, per_text)
+    client = _client(app)
+    t0 = time.perf_counter()
+    for item in items:
+        await client.analyze_batch([item["text"]])
+    elapsed = time.perf_counter() - t0
+    await client.aclose()
+    return {"seconds": elapsed, "calls": app.state.calls}
+
+
+async def run_pipeline(items, latency: float, per_text: float, root: str) -> dict:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from backend.sentiment import SentimentCacheORM, SentimentPipeline
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{root}/sentiment.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SentimentCacheORM.__table__.create(c, checkfirst=True))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    app = create_stub_app(latency, per_text)
+    client = _client(app)
+    out = {}
+    for name in ("cold", "warm"):
+        # Každý průchod jako nový proces: prázdná paměť, sdílená perzistentní cache
+        pipeline = SentimentPipeline(session_factory=sessions, client_factory=lambda: client)
+        calls = app.state.calls
+        t0 = time.perf_counter()
+        results = await pipeline.analyze_many(items)
+        out[name] = {"seconds": time.perf_counter() - t0, "calls": app.state.calls - calls,
+                     "errors": sum("error" in r for r in results), "hit_rate": pipeline.info()["hit_rate"]}
+        await pipeline.stop()
+    await client.aclose()
+    await engine.dispose()
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--duplicates", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-text", type=float, default=0.002)
+    parser.add_argument("--serve", action="store_true", help="jen spustit stub server")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args(argv)
+    if args.serve:
+        import uvicorn
+        uvicorn.run(create_stub_app(args.latency, args.per_text), host="127.0.0.1", port=args.port,
+                    log_level="warning")
+        return
+    items = make_texts(args.texts, args.duplicates)
+    naive = asyncio.run(run_naive(items, args.latency, args.per_text))
+    with tempfile.TemporaryDirectory() as root:
+        r = asyncio.run(run_pipeline(items, args.latency, args.per_text, root))
+    print(f"{args.texts} textů ({args.duplicates:.0%} duplicit), latence {args.latency * 1e3:.0f} ms:")
+    print(f"  po jednom:          {naive['seconds']:.2f} s, {naive['calls']} volání modelu")
+    for name, label in (("cold", "pipeline (studená)"), ("warm", "pipeline (z cache)")):
+        p = r[name]
+        print(f"  {label}: {p['seconds']:.3f} s, {p['calls']} volání modelu, hit rate {p['hit_rate']:.0%}, "
+              f"chyb {p['errors']} ({naive['seconds'] / p['seconds']:.0f}x rychleji)")
+
+
+if __name__ == "__main__":
+    main()
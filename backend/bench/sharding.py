@@ -0,0 +1,109 @@
+"""
+Lokální test škálování shardingu botů přes více procesů.
+
+Rodič založí SQLite databázi s `--bots` běžícími boty a spustí 1, 2, 4 ...
+worker procesů. Každý proces má vlastní BotRuntime a ShardCoordinator, boty
+si rozdělí přes lease v databázi a každý tick spočítá Strategy.compute_indicators
+nad `--bars` svíčkami (CPU práce). Po ustálení rozdělení se měří součet ticků/s.
+Škálování je vidět jen na stroji s více jádry (`os.cpu_count()` se vypisuje).
+
+    python -m backend.bench.sharding --workers 1 2 4 --bots 200 --duration 5
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+
+def _worker(worker_id: str, db_path: str, bars: int, tick: float, warmup: float, duration: float) -> dict:
+    import numpy as np
+    import pandas as pd
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from backend.runtime import BotRuntime, MarketDataCache
+    from backend.sharding import ShardCoordinator
+    from backend.strategy import Strategy
+
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, bars)))
+    strategy = Strategy()
+
+    async def cpu_tick(state):
+        strategy.compute_indicators(pd.DataFrame({"close": closes}))
+        await asyncio.sleep(0)
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"timeout": 30})
+        runtime = BotRuntime(market=MarketDataCache(api_factory=None), api_factory=None, enabled=True,
+                             jitter=0.0, max_concurrent=1, audit=lambda **kwargs: None)
+        runtime.tick = cpu_tick
+        coordinator = ShardCoordinator(runtime, worker_id, async_sessionmaker(engine), lease_ttl=max(3.0, warmup),
+                                       heartbeat_interval=0.5)
+        runtime.shard = coordinator
+        coordinator.start()
+        await asyncio.sleep(warmup)
+        ticks_before = runtime.stats["ticks"]
+        await asyncio.sleep(duration)
+        ticks = runtime.stats["ticks"] - ticks_before
+        owned = len(coordinator.owned)
+        await coordinator.stop()
+        await engine.dispose()
+        return {"worker": worker_id, "ticks": ticks, "owned": owned}
+
+    return asyncio.run(run())
+
+
+def _setup(db_path: str, n_bots: int, tick: float):
+    from sqlalchemy import create_engine
+    from backend import api
+    from backend.sharding import WorkerORM, LeaseORM
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        api.Base.metadata.create_all(conn, tables=[api.BotORM.__table__, WorkerORM.__table__, LeaseORM.__table__])
+        conn.execute(api.BotORM.__table__.insert(), [
+            {"name": f"bot{i}", "status": "running", "symbol": "BTC_USDT", "tick_interval": tick}
+            for i in range(n_bots)
+        ])
+    engine.dispose()
+
+
+def bench(n_workers: int, n_bots: int = 200, bars: int = 500, tick: float = 0.01, warmup: float = 4.0,
+          duration: float = 5.0) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        db_path = os.path.join(root, "shard.db")
+        _setup(db_path, n_bots, tick)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(n_workers) as pool:
+            results = pool.starmap(_worker, [(f"w{i}", db_path, bars, tick, warmup, duration)
+                                             for i in range(n_workers)])
+    return {
+        "workers": n_workers,
+        "ticks_per_s": sum(r["ticks"] for r in results) / duration,
+        "owned": sorted(r["owned"] for r in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--bots", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=500)
+    parser.add_argument("--tick", type=float, default=0.01)
+    parser.add_argument("--warmup", type=float, default=4.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args(argv)
+    # Sdílená databáze pro import backend modulů ve workerech (spawn dědí prostředí)
+    os.environ.setdefault("POSTGRES_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bench_sharding.db"))
+    print(f"CPU jader: {os.cpu_count()}")
+    base = None
+    for n in args.workers:
+        started = time.perf_counter()
+        r = bench(n, args.bots, args.bars, args.tick, args.warmup, args.duration)
+        base = base or r["ticks_per_s"]
+        print(f"{r['workers']:>3} workerů: {r['ticks_per_s']:,.0f} ticků/s ({r['ticks_per_s'] / base:.2f}x), "
+              f"botů na worker {r['owned']} ({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
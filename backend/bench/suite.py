@@ -0,0 +1,384 @@
+"""
+Sada benchmarků hot-path částí: strategie, model, CRUD API a fan-out /ws/realtime.
+
+Vše běží offline nad syntetickými daty: DB je dočasná SQLite (nebo `--url`),
+websocket klienty nahrazují odběratelé hubu se serializací jako send_json.
+Každý případ má primární metriku (`value`, `unit`, `better`); výsledky se
+ukládají jako JSON (`--output`) i s popisem prostředí a lze je porovnat
+s předchozím během (`--compare`). Zhoršení primární metriky nad `--threshold`
+se vypíše jako regrese a příkaz skončí s kódem 1 (vhodné pro CI).
+
+    python -m backend.bench --output bench.json
+    python -m backend.bench --quick --only "strategy.*" --compare bench.json
+    python -m backend.bench --list
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import fnmatch
+import importlib.util
+import statistics
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+PROFILES = {
+    "full": {"sizes": [1_000, 10_000, 100_000], "repeats": 7, "fit_rows": [1_000, 100_000], "bots": 300,
+             "ws_clients": [10, 100, 1000], "ws_ticks": 200},
+    "quick": {"sizes": [1_000, 10_000], "repeats": 3, "fit_rows": [1_000], "bots": 50,
+              "ws_clients": [10, 100], "ws_ticks": 50},
+}
+WS_SYMBOLS = ("BTC_USDT", "ETH_USDT", "SOL_USDT", "XRP_USDT")
+
+# název případu -> funkce(profil) generující (id výsledku, výsledek)
+CASES: Dict[str, Callable[[dict], Iterable[Tuple[str, dict]]]] = {}
+
+
+def case(name: str):
+    def decorator(fn):
+        CASES[name] = fn
+        return fn
+    return decorator
+
+
+def synthetic_closes(n: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100.0 + np.cumsum(rng.normal(0, 0.5, n))
+
+
+# Jedno opakování má trvat aspoň tolik sekund (krátké operace se volají víckrát, jako timeit.autorange)
+MIN_REPEAT_TIME = 0.05
+
+
+def measure(fn: Callable[[], object], repeats: int, number: Optional[int] = None) -> dict:
+    """Minimum a medián doby jednoho volání (ms) z `repeats` opakování po `number` voláních."""
+    fn()  # zahřátí (importy, cache)
+    if number is None:
+        number = 1
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - t0 >= MIN_REPEAT_TIME:
+                break
+            number *= 2
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number * 1e3)
+    # Primární hodnota je minimum – nejméně zatížené šumem ostatních procesů; medián pro informaci
+    return {"value": min(times), "unit": "ms", "better": "lower", "median_ms": statistics.median(times),
+            "repeats": repeats, "number": number}
+
+
+def ta_backends() -> Dict[str, bool]:
+    return {"talib": importlib.util.find_spec("talib") is not None,
+            "pandas-ta": importlib.util.find_spec("pandas_ta") is not None}
+
+
+@contextmanager
+def ta_backend(strategy, name: str):
+    """Dočasně přepne backend.strategy na TA-Lib nebo pandas-ta (bez ohledu na to, co se načetlo při importu)."""
+    saved = {attr: getattr(strategy, attr) for attr in ("TA_LIB_AVAILABLE", "talib", "ta")}
+    if name == "talib":
+        import talib
+        strategy.talib = talib
+    else:
+        np.NaN = np.nan  # stejný patch jako v backend.strategy
+        import pandas_ta
+        strategy.ta = pandas_ta
+    strategy.TA_LIB_AVAILABLE = name == "talib"
+    try:
+        yield
+    finally:
+        for attr, value in saved.items():
+            setattr(strategy, attr, value)
+
+
+# --- strategie ---
+
+@case("strategy.compute_indicators")
+def bench_compute_indicators(p: dict):
+    """Dávkový výpočet indikátorů (TA-Lib i pandas-ta) podle délky historie."""
+    import pandas as pd
+    from backend import strategy
+
+    for name, available in ta_backends().items():
+        if not available:
+            yield f"strategy.compute_indicators[{name}]", {"skipped": f"{name} není nainstalovaný"}
+            continue
+        with ta_backend(strategy, name):
+            strat = strategy.Strategy()
+            for n in p["sizes"]:
+                df = pd.DataFrame({"close": synthetic_closes(n)})
+                yield f"strategy.compute_indicators[{name},n={n}]", measure(
+                    lambda: strat.compute_indicators(df), p["repeats"])
+
+
+@case("strategy.check_panic_mode")
+def bench_check_panic_mode(p: dict):
+    """Volatilita výnosů a panic režim podle délky historie."""
+    import pandas as pd
+    from backend.strategy import Strategy
+
+    strat = Strategy()
+    for n in p["sizes"]:
+        df = pd.DataFrame({"close": synthetic_closes(n)})
+        yield f"strategy.check_panic_mode[n={n}]", measure(lambda: strat.check_panic_mode(df), p["repeats"])
+
+
+# --- model ---
+
+@case("model.ts_model")
+def bench_ts_model(p: dict):
+    """TimeSeriesModel.fit (včetně publikace verze) a predict pro jeden řádek i dávku."""
+    from backend.model import ModelRegistry, TimeSeriesModel
+
+    with tempfile.TemporaryDirectory() as root:
+        # Vlastní registr v dočasném adresáři – fit publikuje verzi na disk jako v produkci
+        model = TimeSeriesModel(ModelRegistry(root=root, keep=2), symbol="BENCH")
+        for n in p["fit_rows"]:
+            closes = synthetic_closes(n + 1)
+            X, y = closes[:-1].reshape(-1, 1), closes[1:]
+            yield f"model.ts_model.fit[n={n}]", measure(lambda: model.fit(X, y), p["repeats"])
+        last = closes[-1:].reshape(-1, 1)
+        yield "model.ts_model.predict[rows=1]", measure(lambda: model.predict(last), p["repeats"])
+        for n in p["fit_rows"]:
+            X = synthetic_closes(n).reshape(-1, 1)
+            yield f"model.ts_model.predict[rows={n}]", measure(lambda: model.predict(X), p["repeats"])
+
+
+# --- CRUD API ---
+
+async def _crud(n_bots: int) -> Dict[str, dict]:
+    import httpx
+    from fastapi import FastAPI
+    from backend import api
+    from backend.audit import AuditLog
+    from backend.db import Base, get_engine
+
+    Base.metadata.create_all(get_engine(), tables=[api.BotORM.__table__, AuditLog.__table__])
+    app = FastAPI()
+    app.include_router(api.router)
+    results = {}
+    ids: List[int] = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def run(op: str, call):
+            latencies = []
+            t0 = time.perf_counter()
+            for i in range(n_bots):
+                started = time.perf_counter()
+                resp = await call(i)
+                latencies.append(time.perf_counter() - started)
+                assert resp.status_code < 300, f"{op}: {resp.status_code} {resp.text}"
+                if op == "create":
+                    ids.append(resp.json()["id"])
+            elapsed = time.perf_counter() - t0
+            results[op] = {"value": n_bots / elapsed, "unit": "req/s", "better": "higher",
+                           "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+                           "p99_ms": float(np.percentile(latencies, 99) * 1e3), "requests": n_bots}
+
+        await run("create", lambda i: client.post("/bots/", json={"name": f"bench{i}", "description": "bench"}))
+        await run("get", lambda i: client.get(f"/bots/{ids[i]}"))
+        await run("update", lambda i: client.put(f"/bots/{ids[i]}", json={"name": f"bench{i}b"}))
+        await run("list", lambda i: client.get("/bots/", params={"limit": 100}))
+        await run("delete", lambda i: client.delete(f"/bots/{ids[i]}"))
+    return results
+
+
+@case("api.bots_crud")
+def bench_bots_crud(p: dict):
+    """Propustnost CRUD rout /bots (create, get, update, list, delete) přes ASGI."""
+    from backend.audit import audit_writer
+
+    try:
+        results = asyncio.run(_crud(p["bots"]))
+    finally:
+        # Dopsání audit záznamů, ať writer neběží do dalších případů
+        audit_writer.stop()
+    for op, r in results.items():
+        yield f"api.bots_crud.{op}", r
+
+
+# --- websocket fan-out ---
+
+async def _fanout(clients: int, ticks: int, symbols=WS_SYMBOLS) -> dict:
+    from backend.realtime import RealtimeHub
+
+    hub = RealtimeHub(fetch=None)
+    delivered = [0] * clients
+    lags: List[float] = []
+
+    async def client(i: int):
+        # Polovina klientů odebírá vše, polovina jeden symbol
+        sub = hub.subscribe(None if i % 2 else [symbols[i % len(symbols)]])
+        while not sub.closed:
+            batch = await sub.next(timeout=1.0)
+            if not batch:
+                continue
+            for tick in batch:
+                json.dumps(tick, separators=(",", ":"))  # jako websocket.send_json
+            lags.append(hub.clock() - sub.batch_since)
+            hub.mark_sent(sub)
+            delivered[i] += len(batch)
+
+    tasks = [asyncio.create_task(client(i)) for i in range(clients)]
+    await asyncio.sleep(0)
+    publish = 0.0
+    t0 = time.perf_counter()
+    for k in range(ticks):
+        started = time.perf_counter()
+        for symbol in symbols:
+            hub.publish(symbol, {"symbol": symbol, "price": 100.0 + k, "volume": 1.0, "timestamp": time.time()})
+        publish += time.perf_counter() - started
+        # Feed předá řízení event loopu mezi zprávami
+        await asyncio.sleep(0)
+    while any(sub.pending for sub in hub.subscribers):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - t0
+    await hub.stop()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {"value": sum(delivered) / elapsed, "unit": "ticks/s", "better": "higher",
+            "publish_us": publish / (ticks * len(symbols)) * 1e6, "delivered": sum(delivered),
+            "lag_p50_ms": float(np.percentile(lags, 50) * 1e3) if lags else None,
+            "lag_p99_ms": float(np.percentile(lags, 99) * 1e3) if lags else None,
+            "dropped_clients": hub.stats["dropped_clients"]}
+
+
+@case("ws.realtime_fanout")
+def bench_ws_fanout(p: dict):
+    """Rozeslání ticků hubem /ws/realtime odběratelům a zpoždění do odeslání."""
+    for clients in p["ws_clients"]:
+        yield f"ws.realtime_fanout[clients={clients}]", asyncio.run(_fanout(clients, p["ws_ticks"]))
+
+
+# --- běh, uložení a porovnání ---
+
+def configure_offline(url: Optional[str] = None) -> str:
+    """DB a spill audit logu do dočasného adresáře (engine se vytváří při importu backend.db)."""
+    root = tempfile.mkdtemp(prefix="minibot-bench-")
+    url = url or f"sqlite:///{root}/bench.db"
+    os.environ["POSTGRES_URL"] = url
+    os.environ.setdefault("AUDIT_SPILL_PATH", os.path.join(root, "audit_spill.jsonl"))
+    return url
+
+
+def environment(profile: str) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "ta_backends": ta_backends(), "profile": profile}
+
+
+def run(patterns: Optional[List[str]] = None, profile: dict = PROFILES["full"],
+        report: Callable[[str, dict], None] = lambda name, r: None) -> Dict[str, dict]:
+    """Spustí případy odpovídající vzorům (fnmatch na název případu); chyba případu se zapíše do výsledku."""
+    results: Dict[str, dict] = {}
+    for name, fn in CASES.items():
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        try:
+            for result_id, r in fn(profile):
+                results[result_id] = r
+                report(result_id, r)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            report(name, results[name])
+    return results
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float = 0.2) -> List[dict]:
+    """Změna primární metriky proti baseline; status regression / improved / same / new / missing."""
+    rows = []
+    for result_id in sorted(set(current) | set(baseline)):
+        cur, base = current.get(result_id, {}), baseline.get(result_id, {})
+        row = {"id": result_id, "baseline": base.get("value"), "current": cur.get("value"),
+               "unit": cur.get("unit") or base.get("unit"), "change": None}
+        if row["baseline"] is None or row["current"] is None:
+            row["status"] = ("skipped" if row["current"] is None and row["baseline"] is None
+                             else "new" if row["baseline"] is None else "missing")
+            rows.append(row)
+            continue
+        change = (row["current"] - row["baseline"]) / row["baseline"] if row["baseline"] else 0.0
+        worse = change if (cur.get("better") or base.get("better")) == "lower" else -change
+        row["change"] = change
+        row["status"] = "regression" if worse > threshold else "improved" if worse < -threshold else "same"
+        rows.append(row)
+    return rows
+
+
+def _format(r: dict) -> str:
+    if "error" in r:
+        return f"CHYBA {r['error']}"
+    if "skipped" in r:
+        return f"přeskočeno ({r['skipped']})"
+    extra = ", ".join(f"{k} {v:.3g}" for k, v in r.items()
+                      if k not in ("value", "unit", "better") and isinstance(v, float))
+    return f"{r['value']:.4g} {r['unit']}" + (f" ({extra})" if extra else "")
+
+
+STATUS_LABELS = {"regression": "REGRESE", "improved": "zlepšení", "same": "beze změny", "new": "nové",
+                 "missing": "chybí", "skipped": "přeskočeno"}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", nargs="+", help="vzory názvů případů (fnmatch), např. 'strategy.*'")
+    parser.add_argument("--quick", action="store_true", help="menší velikosti a méně opakování")
+    parser.add_argument("--output", help="uložit výsledky jako JSON")
+    parser.add_argument("--compare", help="porovnat s dřívějším JSON výsledkem")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerance zhoršení (0.2 = 20 %%)")
+    parser.add_argument("--repeats", type=int, help="počet opakování (přepíše profil)")
+    parser.add_argument("--url", default=None, help="DB pro CRUD případy (výchozí dočasná SQLite)")
+    parser.add_argument("--list", action="store_true", help="jen vypsat případy")
+    args = parser.parse_args(argv)
+    if args.list:
+        for name, fn in CASES.items():
+            print(f"{name:<30} {(fn.__doc__ or '').strip()}")
+        return 0
+
+    configure_offline(args.url)
+    profile_name = "quick" if args.quick else "full"
+    profile = PROFILES[profile_name] | ({"repeats": args.repeats} if args.repeats else {})
+    results = run(args.only, profile, report=lambda name, r: print(f"{name:<48} {_format(r)}"))
+    doc = {"environment": environment(profile_name), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(doc, f, indent=2, ensure_ascii=False)
+        print(f"Výsledky uloženy do {args.output}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    if baseline["environment"].get("profile") != profile_name:
+        print(f"Pozor: baseline je z profilu {baseline['environment'].get('profile')}, tento běh {profile_name}")
+    # Porovnávají se jen vybrané případy (--only), ostatní z baseline se nehlásí jako chybějící
+    base_results = {k: v for k, v in baseline["results"].items() if k in results or not args.only}
+    rows = compare(results, base_results, args.threshold)
+    print(f"\nPorovnání s {args.compare} (commit {baseline['environment'].get('commit')}, "
+          f"tolerance {args.threshold:.0%}):")
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row["change"] is not None else ""
+        print(f"  {STATUS_LABELS[row['status']]:<11} {row['id']:<48} {change}")
+    regressions = [row for row in rows if row["status"] == "regression"]
+    print(f"Regresí: {len(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
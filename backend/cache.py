@@ -0,0 +1,218 @@
+"""
+In-process cache stavu botů pro často dotazované routy (dashboard).
+
+- BotCache.get_bot / put_bot: detail bota podle id (TTL + LRU).
+- BotCache.get_list / put_list: stránky seznamu botů (podle filtrů a kurzoru)
+  včetně ETagu pro podmíněné GET.
+- Čtení si před dotazem do databáze poznamená `list_version` a předá ji do put_*;
+  pokud mezitím proběhla invalidace, výsledek (možná starší než commit) se neuloží.
+- Každá mutující routa po commitu volá invalidate(); volitelně se invalidace
+  rozešle ostatním workerům přes Postgres NOTIFY (odeslání je součástí
+  transakce, doručí se až po commitu) a PgNotifyListener ji přijme přes LISTEN.
+
+TTL omezuje zastaralost i v případě, že se notifikace ztratí (výpadek spojení).
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger("cache")
+logger.setLevel(logging.INFO)
+
+BOT_CACHE_TTL = float(os.getenv("BOT_CACHE_TTL", "5"))
+BOT_CACHE_SIZE = int(os.getenv("BOT_CACHE_SIZE", "1024"))
+BOT_CACHE_NOTIFY = os.getenv("BOT_CACHE_NOTIFY", "false").lower() in ("1", "true", "yes")
+BOT_CACHE_CHANNEL = "bot_cache"
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU cache s expirací položek (thread-safe)."""
+
+    def __init__(self, maxsize: int = BOT_CACHE_SIZE, ttl: float = BOT_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.stats["misses"] += 1
+                return default
+            expires, value = item
+            if expires <= self.clock():
+                del self._data[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def compute_etag(payload: Any) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Vyhodnocení hlavičky If-None-Match (seznam ETagů, slabé W/ i `*`)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+class BotCache:
+    def __init__(self, maxsize: int = BOT_CACHE_SIZE, ttl: float = BOT_CACHE_TTL, notify: bool = BOT_CACHE_NOTIFY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.entries = TTLCache(maxsize, ttl, clock)
+        self.notify = notify
+        # Identita workeru – vlastní notifikace se při příjmu ignorují
+        self.origin = uuid.uuid4().hex
+        # Stránky seznamu mají klíč s verzí – invalidace zneplatní všechny filtry a kurzory najednou
+        self.list_version = 0
+        self.stats = {"invalidations": 0, "remote_invalidations": 0}
+
+    # --- detail ---
+
+    def get_bot(self, bot_id: int):
+        return self.entries.get(("bot", bot_id))
+
+    def put_bot(self, bot_id: int, bot, version: Optional[int] = None):
+        """Uloží detail; s `version` (list_version před čtením z DB) jen pokud od té doby nebyla invalidace."""
+        if version is None or version == self.list_version:
+            self.entries.set(("bot", bot_id), bot)
+
+    # --- seznam ---
+
+    def get_list(self, params: Tuple = ()) -> Optional[Tuple[str, Any]]:
+        """(etag, obsah) stránky seznamu pro dané filtry, nebo None."""
+        return self.entries.get(("list", self.list_version, params))
+
+    def put_list(self, payload: Any, params: Tuple = (), version: Optional[int] = None) -> str:
+        """Uloží stránku pod verzí, při které se četla (zastaralou stránku už nikdo nenajde); vrací ETag."""
+        etag = compute_etag(payload)
+        version = self.list_version if version is None else version
+        if version == self.list_version:
+            self.entries.set(("list", version, params), (etag, payload))
+        return etag
+
+    # --- invalidace ---
+
+    def invalidate(self, bot_id: Optional[int] = None):
+        """Zahodí detail bota (None = všechny) a seznam."""
+        if bot_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(("bot", bot_id))
+        self.list_version += 1
+        self.stats["invalidations"] += 1
+
+    async def notify_in(self, db, bot_id: Optional[int] = None):
+        """Přidá NOTIFY do transakce session `db` (jen Postgres a BOT_CACHE_NOTIFY)."""
+        if not self.notify or db.bind.dialect.name != "postgresql":
+            return
+        payload = json.dumps({"origin": self.origin, "bot_id": bot_id})
+        await db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": BOT_CACHE_CHANNEL, "payload": payload})
+
+    def handle_notification(self, payload: str):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        if data.get("origin") == self.origin:
+            return
+        self.invalidate(data.get("bot_id"))
+        self.stats["remote_invalidations"] += 1
+
+    def info(self) -> dict:
+        return {"size": len(self.entries), **self.entries.stats, **self.stats}
+
+
+class PgNotifyListener:
+    """Dedikované asyncpg spojení s LISTEN na kanálu invalidací."""
+
+    def __init__(self, cache: BotCache, url: str, channel: str = BOT_CACHE_CHANNEL):
+        self.cache = cache
+        self.url = url
+        self.channel = channel
+        self._conn = None
+
+    async def start(self):
+        import asyncpg
+        from sqlalchemy.engine import make_url
+        dsn = make_url(self.url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._conn = await asyncpg.connect(dsn)
+        await self._conn.add_listener(self.channel, self._on_notify)
+        logger.info(f"LISTEN {self.channel} pro invalidaci cache botů")
+
+    def _on_notify(self, conn, pid, channel, payload):
+        self.cache.handle_notification(payload)
+
+    async def stop(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await conn.close()
+
+
+# Singleton instance
+bot_cache = BotCache()
+_listener: Optional[PgNotifyListener] = None
+
+
+async def start_cache_listener() -> Optional[PgNotifyListener]:
+    """Spustí LISTEN, pokud je zapnutý BOT_CACHE_NOTIFY a databáze je Postgres."""
+    global _listener
+    from backend.db import DATABASE_URL
+    if not bot_cache.notify or not DATABASE_URL.startswith("postgres") or _listener is not None:
+        return _listener
+    listener = PgNotifyListener(bot_cache, DATABASE_URL)
+    try:
+        await listener.start()
+    except Exception as e:
+        logger.warning(f"LISTEN pro cache botů se nepodařilo spustit ({e}), platí jen TTL")
+        return None
+    _listener = listener
+    return listener
+
+
+async def stop_cache_listener():
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        await listener.stop()
@@ -0,0 +1,203 @@
+"""
+Slučování a krátké cachování GET požadavků na Pionex API.
+
+API endpointy, scheduler i strategie se často během milisekund ptají na totéž
+(ticker, book ticker, poslední obchody pro stejný symbol) a každý dotaz by
+stál rate-limit budget. RequestCoalescer stojí před `_send` klienta:
+
+- stejné souběžné požadavky (metoda, endpoint, parametry) sdílí jediné volání
+  na burzu – další volající čekají na výsledek prvního,
+- výsledek se drží krátce v mikro-cache podle třídy endpointu (tržní data
+  PIONEX_CACHE_TTL_MARKET, účet PIONEX_CACHE_TTL_ACCOUNT; 0 = jen sdílení
+  rozpracovaných požadavků),
+- zápis (POST/DELETE) se nikdy necachuje a po dokončení zneplatní data účtu,
+  aby volající hned po objednávce neviděl starý zůstatek nebo otevřené objednávky.
+
+Chyby se necachují, dostanou je všichni čekající; zrušení jednoho volajícího
+sdílený požadavek neruší (běží ve vlastním tasku). Vrácené odpovědi jsou
+sdílené mezi volajícími – berou se jako jen pro čtení.
+"""
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+PIONEX_CACHE_TTL_MARKET = float(os.getenv("PIONEX_CACHE_TTL_MARKET", "0.5"))
+PIONEX_CACHE_TTL_ACCOUNT = float(os.getenv("PIONEX_CACHE_TTL_ACCOUNT", "1.0"))
+
+# třída -> maximální stáří odpovědi v sekundách
+DEFAULT_TTLS = {
+    "market": PIONEX_CACHE_TTL_MARKET,
+    "account": PIONEX_CACHE_TTL_ACCOUNT,
+    # Snapshot hloubky pro resync order booku musí být čerstvý – jen sdílení in-flight
+    "depth": 0.0,
+}
+
+# (prefix cesty, třída) – první shoda vyhrává
+DEFAULT_RULES = [
+    ("/api/v1/depth", "depth"),
+    ("/api/v1/trades", "market"),
+    ("/api/v1/ticker", "market"),
+    ("/api/v1/klines", "market"),
+    ("", "account"),
+]
+
+
+def request_key(method: str, endpoint: str, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+    """Klíč požadavku; None = neslučovat (zápisy, tělo požadavku)."""
+    if method != "GET" or kwargs.get("json") is not None:
+        return None
+    params = kwargs.get("params") or {}
+    return endpoint, tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+class RequestCoalescer:
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, rules: Optional[List[Tuple[str, str]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.rules = list(rules or DEFAULT_RULES)
+        self.clock = clock
+        self._lock = threading.Lock()
+        # klíč -> (třída, platnost do, odpověď)
+        self._cache: Dict[Hashable, Tuple[str, float, Any]] = {}
+        # klíč -> (generace třídy, future); sync a async zvlášť (asyncio future je vázaná na smyčku)
+        self._inflight: Dict[Hashable, Tuple[int, concurrent.futures.Future]] = {}
+        self._inflight_async: Dict[Hashable, Tuple[int, asyncio.Future]] = {}
+        # sdílený task -> počet volajících, kteří na něj čekají
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._generation: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def classify(self, endpoint: str) -> str:
+        for prefix, cls in self.rules:
+            if endpoint.startswith(prefix):
+                return cls
+        return "account"
+
+    def _count(self, cls: str, field: str):
+        counters = self.stats.setdefault(cls, {"requests": 0, "hits": 0, "coalesced": 0, "upstream": 0})
+        counters[field] += 1
+
+    def invalidate(self, cls: str = "account"):
+        """Zahodí cache třídy; rozpracované požadavky z dřívější generace už nové volající nedostanou."""
+        with self._lock:
+            self._generation[cls] = self._generation.get(cls, 0) + 1
+            for key in [k for k, (c, _, _) in self._cache.items() if c == cls]:
+                del self._cache[key]
+
+    def _lookup(self, key: Hashable, cls: str, inflight: Dict) -> Tuple[bool, Any, Optional[Any]]:
+        """Pod zámkem: (zásah v cache, odpověď, rozpracovaná future se shodnou generací)."""
+        self._count(cls, "requests")
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached[1] > self.clock():
+                self._count(cls, "hits")
+                return True, cached[2], None
+            del self._cache[key]
+        entry = inflight.get(key)
+        if entry is not None and entry[0] == self._generation.get(cls, 0):
+            self._count(cls, "coalesced")
+            return False, None, entry[1]
+        return False, None, None
+
+    def _store(self, key: Hashable, cls: str, generation: int, value: Any):
+        ttl = self.ttls.get(cls, 0.0)
+        if ttl > 0 and generation == self._generation.get(cls, 0):
+            self._cache[key] = (cls, self.clock() + ttl, value)
+
+    def call(self, method: str, endpoint: str, kwargs: Dict[str, Any], send: Callable[[], Any]) -> Any:
+        """Synchronní varianta (vlákna sdílí rozpracovaný požadavek přes concurrent.futures.Future)."""
+        key = request_key(method, endpoint, kwargs)
+        if key is None:
+            try:
+                return send()
+            finally:
+                self.invalidate("account")
+        cls = self.classify(endpoint)
+        with self._lock:
+            hit, value, waiting = self._lookup(key, cls, self._inflight)
+            if hit:
+                return value
+            if waiting is None:
+                generation = self._generation.get(cls, 0)
+                future = concurrent.futures.Future()
+                self._inflight[key] = (generation, future)
+                self._count(cls, "upstream")
+        if waiting is not None:
+            return waiting.result()
+        try:
+            value = send()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            with self._lock:
+                self._store(key, cls, generation, value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key, (None, None))[1] is future:
+                    del self._inflight[key]
+
+    async def _send_shared(self, key: Hashable, cls: str, generation: int,
+                           send: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await send()
+            with self._lock:
+                self._store(key, cls, generation, value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight_async.get(key, (None, None))[1] is asyncio.current_task():
+                    del self._inflight_async[key]
+
+    async def call_async(self, method: str, endpoint: str, kwargs: Dict[str, Any],
+                         send: Callable[[], Awaitable[Any]]) -> Any:
+        key = request_key(method, endpoint, kwargs)
+        if key is None:
+            try:
+                return await send()
+            finally:
+                self.invalidate("account")
+        cls = self.classify(endpoint)
+        with self._lock:
+            hit, value, shared = self._lookup(key, cls, self._inflight_async)
+            if hit:
+                return value
+            if shared is None:
+                # Požadavek běží ve vlastním tasku, nepatří žádnému z volajících
+                generation = self._generation.get(cls, 0)
+                shared = asyncio.ensure_future(self._send_shared(key, cls, generation, send))
+                self._inflight_async[key] = (generation, shared)
+                self._count(cls, "upstream")
+            self._waiters[shared] = self._waiters.get(shared, 0) + 1
+        try:
+            # shield: zrušení kteréhokoli volajícího (i toho, kdo požadavek spustil) ostatní nezasáhne
+            return await asyncio.shield(shared)
+        finally:
+            with self._lock:
+                left = self._waiters.pop(shared) - 1
+                if left:
+                    self._waiters[shared] = left
+            # Na výsledek už nikdo nečeká (všichni byli zrušeni) – požadavek se zruší
+            if not left and not shared.done():
+                shared.cancel()
+
+    def info(self) -> dict:
+        classes = {}
+        for cls, counters in self.stats.items():
+            saved = counters["hits"] + counters["coalesced"]
+            classes[cls] = {
+                **counters,
+                "saved": saved,
+                "hit_rate": saved / counters["requests"] if counters["requests"] else None,
+                "ttl": self.ttls.get(cls, 0.0),
+            }
+        with self._lock:
+            cached = len(self._cache)
+            inflight = len(self._inflight) + len(self._inflight_async)
+        return {"classes": classes, "cached": cached, "inflight": inflight,
+                "saved": sum(c["saved"] for c in classes.values())}
@@ -1,8 +1,10 @@
 import os
+import json
+import asyncio
 import logging
-from typing import Any, Dict, Optional
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from typing import Any, Dict, List, Optional
+import httpx
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
 logger = logging.getLogger("gemini")
 logger.setLevel(logging.INFO)
@@ -10,6 +12,11 @@ logger.setLevel(logging.INFO)
 class GeminiAPIError(Exception):
     pass
 
+def _is_retryable(exc: BaseException) -> bool:
+    # requests se importuje až se synchronním klientem (async cesta používá httpx)
+    import requests
+    return isinstance(exc, (requests.RequestException, GeminiAPIError))
+
 class GeminiClient:
     BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
 
@@ -27,9 +34,10 @@ class GeminiClient:
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((requests.RequestException, GeminiAPIError))
+        retry=retry_if_exception(_is_retryable)
     )
     def _post(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import requests
         url = f"{self.BASE_URL}/{endpoint}?key={self.api_key}"
         try:
             resp = requests.post(url, json=payload, headers=self._headers(), timeout=15)
@@ -53,4 +61,115 @@ class GeminiClient:
             "contents": [{"parts": [{"text": prompt}]}]
         }
         # Model pro generování hypotéz: "gemini-pro"
-        return self._post("gemini-pro:generateContent", payload)
\ No newline at end of file
+        return self._post("gemini-pro:generateContent", payload)
+
+
+SENTIMENT_PROMPT = (
+    "Ohodnoť sentiment každého z následujících textů vůči kryptoměnovému trhu. "
+    "Vrať pouze JSON pole objektů {\"i\": index, \"score\": číslo od -1 (velmi negativní) do 1 "
+    "(velmi pozitivní), \"label\": \"negative\"|\"neutral\"|\"positive\"} v pořadí indexů."
+)
+
+
+def label_of(score: float) -> str:
+    return "positive" if score > 0.15 else "negative" if score < -0.15 else "neutral"
+
+
+def parse_batch_response(resp: Dict[str, Any], n: int) -> List[Optional[Dict[str, Any]]]:
+    """Skóre z odpovědi generateContent (JSON pole v textu); chybějící položky = None."""
+    try:
+        text = "".join(p.get("text", "") for p in resp["candidates"][0]["content"]["parts"])
+        items = json.loads(text[text.index("["):text.rindex("]") + 1])
+    except (KeyError, IndexError, ValueError, TypeError) as e:
+        raise GeminiAPIError(f"Neplatná odpověď Gemini: {e}")
+    out: List[Optional[Dict[str, Any]]] = [None] * n
+    for item in items:
+        try:
+            i, score = int(item["i"]), max(-1.0, min(1.0, float(item["score"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= i < n:
+            out[i] = {"score": score, "label": item.get("label") or label_of(score)}
+    return out
+
+
+# Modely bez JSON režimu (responseMimeType vrací 400) – odpověď se parsuje jen z textu
+JSON_MODE_UNSUPPORTED = ("gemini-pro", "gemini-1.0-pro")
+
+class AsyncGeminiClient:
+    """
+    Asynchronní klient se sdíleným poolem spojení (httpx) pro dávkovou analýzu sentimentu.
+
+    Jeden generateContent požadavek nese víc textů jako samostatné části (parts);
+    retry je krátký a neblokuje vlákno (asyncio.sleep), celkový čas omezuje `timeout`.
+    V procesu se má používat jediná instance, viz get_async_gemini().
+    """
+    BASE_URL = os.getenv("GEMINI_BASE_URL", GeminiClient.BASE_URL)
+    MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    MAX_RETRIES = 3
+    MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "10"))
+
+    def __init__(self, api_key: Optional[str] = None, client: Optional[httpx.AsyncClient] = None,
+                 timeout: float = 15.0):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY není nastaven!")
+        self._client = client or httpx.AsyncClient(
+            base_url=self.BASE_URL,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS,
+                                max_keepalive_connections=self.MAX_CONNECTIONS),
+        )
+        self.calls = 0
+
+    async def _post(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        delay = 0.5
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                self.calls += 1
+                resp = await self._client.post(f"/{endpoint}", params={"key": self.api_key}, json=payload)
+                if resp.status_code == 200:
+                    return resp.json()
+                if resp.status_code != 429 and resp.status_code < 500:
+                    raise GeminiAPIError(f"Chyba Gemini API: {resp.status_code}")
+                error = GeminiAPIError(f"Chyba Gemini API: {resp.status_code}")
+            except httpx.HTTPError as e:
+                error = GeminiAPIError(f"Chyba komunikace s Gemini API: {e}")
+            if attempt < self.MAX_RETRIES - 1:
+                await asyncio.sleep(delay)
+                delay *= 2
+        raise error
+
+    async def analyze_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Sentiment dávky textů jedním požadavkem; položky, které model nevrátil, jsou None."""
+        parts = [{"text": SENTIMENT_PROMPT}] + [{"text": f"[{i}] {text}"} for i, text in enumerate(texts)]
+        config = {"temperature": 0}
+        if self.MODEL not in JSON_MODE_UNSUPPORTED:
+            config["responseMimeType"] = "application/json"
+        payload = {"contents": [{"parts": parts}], "generationConfig": config}
+        return parse_batch_response(await self._post(f"{self.MODEL}:generateContent", payload), len(texts))
+
+    async def generate_hypotheses(self, prompt: str) -> Dict[str, Any]:
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        return await self._post(f"{self.MODEL}:generateContent", payload)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# Sdílená instance pro celý proces (vytváří se líně při prvním použití)
+_async_gemini: Optional[AsyncGeminiClient] = None
+
+
+def get_async_gemini() -> AsyncGeminiClient:
+    global _async_gemini
+    if _async_gemini is None:
+        _async_gemini = AsyncGeminiClient()
+    return _async_gemini
+
+
+async def close_async_gemini():
+    global _async_gemini
+    if _async_gemini is not None:
+        client, _async_gemini = _async_gemini, None
+        await client.aclose()
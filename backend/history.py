@@ -0,0 +1,187 @@
+"""
+Historie obchodů a audit logu: filtry, keyset stránkování a NDJSON export.
+
+Stránkuje se podle indexovaného klíče (čas, id) místo OFFSET, takže cena
+dotazu nezávisí na tom, jak hluboko v historii stránka leží. Kurzor je
+neprůhledný base64 JSON s hodnotami klíče posledního řádku stránky.
+NDJSON export prochází stejné stránky postupně (paměť je omezená velikostí
+jedné dávky) a řádky rovnou streamuje klientovi.
+"""
+import json
+import base64
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, JSON, ForeignKey, Index, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
+
+from backend.db import Base, AsyncSessionLocal
+from backend.audit import AuditLog
+
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH = 1000
+
+
+# Tabulka trades z db/postgres/init.sql
+class TradeORM(Base):
+    __tablename__ = "trades"
+    id = Column(Integer, primary_key=True)
+    bot_id = Column(Integer, ForeignKey("bots.id", ondelete="CASCADE"), nullable=True)
+    symbol = Column(String(32), nullable=False)
+    side = Column(String(8), nullable=False)  # buy/sell
+    amount = Column(Numeric(18, 8), nullable=False)
+    price = Column(Numeric(18, 8), nullable=False)
+    status = Column(String(16), nullable=False)
+    opened_at = Column(DateTime, nullable=False)
+    closed_at = Column(DateTime, nullable=True)
+    profit = Column(Numeric(18, 8), nullable=True)
+    raw_data = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_trades_opened_at_id", "opened_at", "id"),
+        Index("ix_trades_bot_opened_at_id", "bot_id", "opened_at", "id"),
+        Index("ix_trades_symbol_opened_at_id", "symbol", "opened_at", "id"),
+    )
+
+
+TRADE_COLUMNS = ("id", "bot_id", "symbol", "side", "amount", "price", "status", "opened_at", "closed_at", "profit")
+AUDIT_COLUMNS = ("id", "user", "action", "detail", "status", "error", "created_at")
+
+
+# --- kurzory ---
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(values, types))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Neplatný kurzor")
+
+
+def keyset(stmt, key_columns: Sequence, cursor: Optional[Tuple], descending: bool = True):
+    """Přidá k dotazu podmínku za kurzorem a řazení podle klíče (čas, id)."""
+    key = tuple_(*key_columns)
+    if cursor is not None:
+        stmt = stmt.where(key < tuple_(*cursor) if descending else key > tuple_(*cursor))
+    return stmt.order_by(*[c.desc() if descending else c.asc() for c in key_columns])
+
+
+async def fetch_page(db, stmt, key_columns: Sequence, cursor: Optional[Tuple], limit: int,
+                     descending: bool = True) -> Tuple[List[Any], Optional[str]]:
+    """Jedna stránka ORM objektů a kurzor další stránky (None = konec)."""
+    rows = (await db.execute(keyset(stmt, key_columns, cursor, descending).limit(limit + 1))).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in key_columns])
+    return rows, next_cursor
+
+
+def row_dict(obj, columns: Sequence[str]) -> Dict[str, Any]:
+    return {c: getattr(obj, c) for c in columns}
+
+
+async def iter_rows(stmt, key_columns: Sequence, columns: Sequence[str], cursor: Optional[Tuple] = None,
+                    descending: bool = True, batch: int = EXPORT_BATCH) -> AsyncIterator[Dict[str, Any]]:
+    """Projde všechny řádky po dávkách keyset stránkování (vlastní session, nezávislá na requestu)."""
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows = (await db.execute(keyset(stmt, key_columns, cursor, descending).limit(batch))).scalars().all()
+            for obj in rows:
+                yield row_dict(obj, columns)
+            if len(rows) < batch:
+                return
+            cursor = tuple(getattr(rows[-1], c.key) for c in key_columns)
+            # Uvolnit načtené objekty z identity map – paměť zůstává omezená velikostí dávky
+            db.expunge_all()
+
+
+def ndjson_response(rows: AsyncIterator[Dict[str, Any]], filename: str) -> StreamingResponse:
+    async def body():
+        async for row in rows:
+            yield json.dumps(jsonable_encoder(row)) + "\n"
+    return StreamingResponse(body(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# --- routy ---
+
+router = APIRouter(prefix="/history", tags=["History"])
+
+
+async def _page_or_export(stmt, key_columns, columns, cursor, limit, format, filename):
+    if format == "ndjson":
+        return ndjson_response(iter_rows(stmt, key_columns, columns, cursor), filename)
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await fetch_page(db, stmt, key_columns, cursor, limit)
+    return {"items": [row_dict(r, columns) for r in rows], "next_cursor": next_cursor}
+
+
+@router.get("/trades")
+async def list_trades(
+    bot_id: Optional[int] = None,
+    symbol: Optional[str] = None,
+    side: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="opened_at od (včetně)"),
+    end: Optional[datetime] = Query(None, description="opened_at do (vyjma)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Obchody od nejnovějších; `format=ndjson` streamuje všechny řádky odpovídající filtrům."""
+    stmt = select(TradeORM)
+    if bot_id is not None:
+        stmt = stmt.where(TradeORM.bot_id == bot_id)
+    if symbol:
+        stmt = stmt.where(TradeORM.symbol == symbol)
+    if side:
+        stmt = stmt.where(TradeORM.side == side)
+    if status:
+        stmt = stmt.where(TradeORM.status == status)
+    if start:
+        stmt = stmt.where(TradeORM.opened_at >= start)
+    if end:
+        stmt = stmt.where(TradeORM.opened_at < end)
+    key_columns = (TradeORM.opened_at, TradeORM.id)
+    after = decode_cursor(cursor, (datetime, int)) if cursor else None
+    return await _page_or_export(stmt, key_columns, TRADE_COLUMNS, after, limit, format, "trades.ndjson")
+
+
+@router.get("/audit")
+async def list_audit_logs(
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="created_at od (včetně)"),
+    end: Optional[datetime] = Query(None, description="created_at do (vyjma)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Audit log od nejnovějších záznamů (klíč id – pořadí zápisu)."""
+    stmt = select(AuditLog)
+    if user:
+        stmt = stmt.where(AuditLog.user == user)
+    if action:
+        stmt = stmt.where(AuditLog.action == action)
+    if status:
+        stmt = stmt.where(AuditLog.status == status)
+    if start:
+        stmt = stmt.where(AuditLog.created_at >= start)
+    if end:
+        stmt = stmt.where(AuditLog.created_at < end)
+    key_columns = (AuditLog.id,)
+    after = decode_cursor(cursor, (int,)) if cursor else None
+    return await _page_or_export(stmt, key_columns, AUDIT_COLUMNS, after, limit, format, "audit_logs.ndjson")
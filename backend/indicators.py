@@ -0,0 +1,235 @@
+"""
+Inkrementální (streamovací) výpočet indikátorů po jednotlivých svíčkách.
+
+Každý indikátor drží jen běžný stav (EMA / Wilder průměry, kruhové buffery
+pevné délky), takže zpracování nové uzavírací ceny je O(1) bez ohledu na délku
+historie. Inicializace a pořadí operací odpovídá TA-Lib (produkční cesta
+`Strategy.compute_indicators`), takže výsledky sedí s dávkovým výpočtem.
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+NAN = float("nan")
+
+INDICATOR_COLUMNS = (
+    "rsi", "macd", "macdsignal", "macdhist",
+    "bb_upper", "bb_middle", "bb_lower", "ma",
+)
+
+
+class RSIState:
+    """RSI s Wilderovým vyhlazováním (seed = prostý průměr prvních N změn).
+
+    `count` je počet zpracovaných změn ceny (první cena změnu nemá).
+    """
+    __slots__ = ("period", "count", "prev", "avg_gain", "avg_loss")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close: float) -> float:
+        prev = self.prev
+        self.prev = close
+        if prev is None:
+            return NAN
+        self.count += 1
+        diff = close - prev
+        n = self.period
+        if self.count <= n:
+            # Sbíráme součty zisků/ztrát pro počáteční průměr
+            if diff < 0:
+                self.avg_loss -= diff
+            else:
+                self.avg_gain += diff
+            if self.count < n:
+                return NAN
+        else:
+            self.avg_loss *= (n - 1)
+            self.avg_gain *= (n - 1)
+            if diff < 0:
+                self.avg_loss -= diff
+            else:
+                self.avg_gain += diff
+        self.avg_loss /= n
+        self.avg_gain /= n
+        total = self.avg_gain + self.avg_loss
+        if -1e-8 < total < 1e-8:
+            return 0.0
+        return 100.0 * (self.avg_gain / total)
+
+
+class MACDState:
+    """
+    MACD (rychlá EMA - pomalá EMA) a signální EMA.
+
+    Stejně jako TA-Lib startují obě EMA až na indexu `slow - 1`: pomalá
+    z průměru prvních `slow` cen, rychlá z průměru posledních `fast` cen.
+    Všechny tři výstupy jsou NaN, dokud se nenaplní i signální EMA.
+    """
+    __slots__ = ("fast", "slow", "signal", "k_fast", "k_slow", "k_signal",
+                 "_seed", "_signal_seed", "fast_ema", "slow_ema", "signal_ema")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.k_fast = 2.0 / (fast + 1)
+        self.k_slow = 2.0 / (slow + 1)
+        self.k_signal = 2.0 / (signal + 1)
+        self._seed = deque(maxlen=slow)
+        self._signal_seed = []
+        self.fast_ema = None
+        self.slow_ema = None
+        self.signal_ema = None
+
+    def update(self, close: float):
+        if self.slow_ema is None:
+            self._seed.append(close)
+            if len(self._seed) < self.slow:
+                return NAN, NAN, NAN
+            total = 0.0
+            for value in self._seed:
+                total += value
+            self.slow_ema = total / self.slow
+            total = 0.0
+            for value in list(self._seed)[self.slow - self.fast:]:
+                total += value
+            self.fast_ema = total / self.fast
+            self._seed = None
+        else:
+            self.fast_ema = ((close - self.fast_ema) * self.k_fast) + self.fast_ema
+            self.slow_ema = ((close - self.slow_ema) * self.k_slow) + self.slow_ema
+        macd = self.fast_ema - self.slow_ema
+        if self.signal_ema is None:
+            self._signal_seed.append(macd)
+            if len(self._signal_seed) < self.signal:
+                return NAN, NAN, NAN
+            total = 0.0
+            for value in self._signal_seed:
+                total += value
+            self.signal_ema = total / self.signal
+            self._signal_seed = None
+        else:
+            self.signal_ema = ((macd - self.signal_ema) * self.k_signal) + self.signal_ema
+        return macd, self.signal_ema, macd - self.signal_ema
+
+
+class RollingWindowState:
+    """Klouzavé okno (kruhový buffer) s běžným součtem a součtem čtverců pro SMA a BB."""
+    __slots__ = ("period", "window", "total", "total_sq")
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, close: float):
+        """Vrací (průměr, populační směrodatná odchylka) nebo (NaN, NaN) při zahřívání."""
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+        if len(self.window) < self.period:
+            return NAN, NAN
+        mean = self.total / self.period
+        variance = self.total_sq / self.period
+        # Nejstarší hodnota vypadne z okna při dalším append (stejné pořadí jako TA-Lib)
+        oldest = self.window[0]
+        self.total -= oldest
+        self.total_sq -= oldest * oldest
+        variance -= mean * mean
+        return mean, (math.sqrt(variance) if variance >= 1e-8 else 0.0)
+
+
+class IndicatorState:
+    """Stav všech indikátorů `Strategy.compute_indicators` pro jeden symbol."""
+    __slots__ = ("rsi", "macd", "bands", "bb_dev", "ma", "last")
+
+    def __init__(self, rsi_period=14, fast=12, slow=26, signal=9, bb_period=20, bb_dev=2.0, ma_period=20):
+        self.rsi = RSIState(rsi_period)
+        self.macd = MACDState(fast, slow, signal)
+        self.bands = RollingWindowState(bb_period)
+        self.bb_dev = bb_dev
+        # Okno MA se sdílí s BB, pokud mají stejnou délku
+        self.ma = None if ma_period == bb_period else RollingWindowState(ma_period)
+        self.last = dict.fromkeys(INDICATOR_COLUMNS, NAN)
+
+    def update(self, close: float) -> Dict[str, float]:
+        close = float(close)
+        macd, macdsignal, macdhist = self.macd.update(close)
+        middle, std = self.bands.update(close)
+        ma = middle if self.ma is None else self.ma.update(close)[0]
+        self.last = {
+            "rsi": self.rsi.update(close),
+            "macd": macd,
+            "macdsignal": macdsignal,
+            "macdhist": macdhist,
+            "bb_upper": middle + std * self.bb_dev,
+            "bb_middle": middle,
+            "bb_lower": middle - std * self.bb_dev,
+            "ma": ma,
+        }
+        return self.last
+
+
+class IndicatorEngine:
+    """
+    Per-symbol registr inkrementálních indikátorů.
+
+    `update()` zpracuje jednu novou uzavírací cenu v O(1), `warmup()` načte
+    historii při studeném startu. Stav jednoho symbolu smí aktualizovat
+    vždy jen jeden volající (svíčky jednoho symbolu přicházejí sekvenčně).
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self._states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, symbol: str) -> IndicatorState:
+        state = self._states.get(symbol)
+        if state is None:
+            with self._lock:
+                state = self._states.get(symbol)
+                if state is None:
+                    state = IndicatorState(**self.params)
+                    self._states[symbol] = state
+        return state
+
+    def update(self, symbol: str, close: float) -> Dict[str, float]:
+        """Zpracuje novou uzavírací cenu a vrátí aktuální hodnoty indikátorů."""
+        return self._state(symbol).update(close)
+
+    def warmup(self, symbol: str, closes: Iterable[float]) -> Dict[str, float]:
+        """Založí stav symbolu znovu z historie uzavíracích cen."""
+        self.reset(symbol)
+        state = self._state(symbol)
+        for close in closes:
+            state.update(close)
+        return state.last
+
+    def latest(self, symbol: str) -> Optional[Dict[str, float]]:
+        state = self._states.get(symbol)
+        return state.last if state is not None else None
+
+    def reset(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop(symbol, None)
+
+    def symbols(self):
+        return list(self._states)
+
+
+# Singleton instance
+indicator_engine = IndicatorEngine()
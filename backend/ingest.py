@@ -0,0 +1,287 @@
+"""
+Příjem tržních dat z websocket feedu Pionexu a dávkový zápis do InfluxDB.
+
+    feed (TRADE/DEPTH) -> normalize_message() -> omezená fronta -> writer -> InfluxSink
+
+Fronta má pevnou kapacitu: při `overflow="block"` čtení z websocketu počká
+(backpressure až na TCP spojení), při `overflow="drop"` se zahodí nejstarší
+záznam a započítá se do `stats["dropped"]`. Writer skládá dávky podle
+`batch_size` / `flush_interval` a předává je batching write API InfluxDB.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger("ingest")
+logger.setLevel(logging.INFO)
+
+PIONEX_WS_URL = os.getenv("PIONEX_WS_URL", "wss://ws.pionex.com/wsPub")
+
+
+class TradeRecord(NamedTuple):
+    symbol: str
+    side: str
+    price: float
+    volume: float
+    ts_ms: int
+
+
+class DepthRecord(NamedTuple):
+    symbol: str
+    bid: float
+    bid_size: float
+    ask: float
+    ask_size: float
+    ts_ms: int
+
+
+def normalize_message(msg: dict) -> list:
+    """Převede zprávu feedu na seznam kompaktních záznamů (neznámé zprávy -> [])."""
+    topic = msg.get("topic")
+    data = msg.get("data")
+    if topic == "TRADE" and data:
+        return [
+            TradeRecord(t.get("symbol") or msg["symbol"], t.get("side", ""), float(t["price"]),
+                        float(t["size"]), int(t["timestamp"]))
+            for t in data
+        ]
+    if topic == "DEPTH" and data:
+        if str(msg.get("action", "")).upper() == "UPDATE":
+            return []  # diffy zpracovává jen lokální order book (backend.orderbook)
+        bids, asks = data.get("bids") or [], data.get("asks") or []
+        if not bids or not asks:
+            return []
+        return [DepthRecord(msg["symbol"], float(bids[0][0]), float(bids[0][1]),
+                            float(asks[0][0]), float(asks[0][1]),
+                            int(msg.get("timestamp") or time.time() * 1000))]
+    return []
+
+
+def _escape_tag(value: str) -> str:
+    return value.replace(",", r"\,").replace(" ", r"\ ").replace("=", r"\=")
+
+
+def to_line(record) -> str:
+    """Line protocol (přesnost ms) – levnější než stavět Point objekty."""
+    if isinstance(record, TradeRecord):
+        return (f"trades,symbol={_escape_tag(record.symbol)},side={_escape_tag(record.side or 'NA')} "
+                f"price={record.price!r},volume={record.volume!r} {record.ts_ms}")
+    return (f"depth,symbol={_escape_tag(record.symbol)} "
+            f"bid={record.bid!r},bid_size={record.bid_size!r},ask={record.ask!r},ask_size={record.ask_size!r} "
+            f"{record.ts_ms}")
+
+
+class InfluxSink:
+    """Zápis přes batching write API klienta z backend.db."""
+
+    def __init__(self, client=None, bucket: Optional[str] = None, org: Optional[str] = None,
+                 batch_size: int = 5000, flush_interval_ms: int = 1000):
+        from influxdb_client import WritePrecision
+        from influxdb_client.client.write_api import WriteOptions
+        from backend.db import get_influx_client, INFLUXDB_BUCKET, INFLUXDB_ORG
+        self.bucket = bucket or INFLUXDB_BUCKET
+        self.org = org or INFLUXDB_ORG
+        self._precision = WritePrecision.MS
+        self._write_api = (client or get_influx_client()).write_api(
+            write_options=WriteOptions(batch_size=batch_size, flush_interval=flush_interval_ms)
+        )
+
+    def write(self, lines: List[str]):
+        self._write_api.write(bucket=self.bucket, org=self.org, record=lines, write_precision=self._precision)
+
+    def close(self):
+        # close() batching API vyprázdní rozpracované dávky
+        self._write_api.close()
+
+
+class NullSink:
+    """Sink pro zátěžové testy – jen počítá zapsané řádky."""
+
+    def __init__(self):
+        self.lines = 0
+        self.batches = 0
+
+    def write(self, lines: List[str]):
+        self.lines += len(lines)
+        self.batches += 1
+
+    def close(self):
+        pass
+
+
+class MarketDataIngestor:
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        sink=None,
+        url: str = PIONEX_WS_URL,
+        topics: Sequence[str] = ("TRADE", "DEPTH"),
+        queue_size: int = 100_000,
+        batch_size: int = 5000,
+        flush_interval: float = 1.0,
+        overflow: str = "block",
+        on_record: Optional[Callable] = None,
+        on_depth: Optional[Callable[[dict], object]] = None,
+    ):
+        self.symbols = list(symbols)
+        self.sink = sink if sink is not None else InfluxSink(batch_size=batch_size,
+                                                            flush_interval_ms=int(flush_interval * 1000))
+        self.url = url
+        self.topics = list(topics)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        # Volitelný odběratel záznamů (např. realtime hub) – volá se synchronně v event loopu
+        self.on_record = on_record
+        # Volitelný příjemce celých DEPTH zpráv (lokální order book)
+        self.on_depth = on_depth
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {"received": 0, "written": 0, "dropped": 0, "reconnects": 0, "malformed": 0}
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        # Řádky, které writer vyzvedl z fronty, ale při zrušení je nestihl zapsat (dopíše _drain)
+        self._unflushed: List[str] = []
+
+    # --- vstup ---
+
+    async def _enqueue(self, record):
+        if self.on_record is not None:
+            self.on_record(record)
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            if self.overflow == "drop":
+                self.queue.get_nowait()
+                self.stats["dropped"] += 1
+                self.queue.put_nowait(record)
+            else:
+                await self.queue.put(record)
+
+    async def handle_raw(self, ws, raw):
+        try:
+            msg = json.loads(raw)
+            records = normalize_message(msg)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # Jedna vadná zpráva nesmí shodit spojení (reconnect a nový odběr všech symbolů)
+            self.stats["malformed"] += 1
+            logger.warning(f"Vadná zpráva feedu přeskočena ({e!r}): {str(raw)[:200]}")
+            return
+        if msg.get("op") == "PING":
+            await ws.send(json.dumps({"op": "PONG", "timestamp": msg.get("timestamp")}))
+            return
+        if self.on_depth is not None and msg.get("topic") == "DEPTH" and msg.get("data"):
+            self.on_depth(msg)
+        for record in records:
+            self.stats["received"] += 1
+            await self._enqueue(record)
+
+    async def _consume(self):
+        from websockets.asyncio.client import connect
+        delay = 1
+        while not self._stopping:
+            try:
+                async with connect(self.url, max_queue=1024) as ws:
+                    for symbol in self.symbols:
+                        for topic in self.topics:
+                            await ws.send(json.dumps({"op": "SUBSCRIBE", "topic": topic, "symbol": symbol}))
+                    delay = 1
+                    n = 0
+                    async for raw in ws:
+                        await self.handle_raw(ws, raw)
+                        n += 1
+                        if n % 256 == 0:
+                            # Buffrované zprávy se čtou bez suspendu – pustit ke slovu writer a ostatní tasky
+                            await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stopping:
+                    break
+                self.stats["reconnects"] += 1
+                logger.warning(f"Market data feed odpojen ({e}), nové připojení za {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    # --- výstup ---
+
+    async def _flush(self, batch: List[str]):
+        if batch:
+            # Zápis běží ve vlákně, aby případná blokace klienta nebrzdila event loop
+            await asyncio.to_thread(self.sink.write, batch)
+            self.stats["written"] += len(batch)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        batch: List[str] = []
+        deadline = loop.time() + self.flush_interval
+        try:
+            while True:
+                try:
+                    # asyncio.timeout_at (na rozdíl od wait_for v 3.11) neztratí zrušení tasku při stop()
+                    async with asyncio.timeout_at(deadline):
+                        record = await self.queue.get()
+                    batch.append(to_line(record))
+                    # Dobrat vše, co už ve frontě čeká, bez dalšího přepínání kontextu
+                    while len(batch) < self.batch_size and not self.queue.empty():
+                        batch.append(to_line(self.queue.get_nowait()))
+                except TimeoutError:
+                    pass
+                if len(batch) >= self.batch_size or loop.time() >= deadline:
+                    # Předaná dávka se zapíše i při zrušení (vlákno to_thread doběhne), proto se hned uvolní
+                    batch, pending = [], batch
+                    await self._flush(pending)
+                    deadline = loop.time() + self.flush_interval
+        finally:
+            self._unflushed.extend(batch)
+
+    async def _drain(self):
+        batch, self._unflushed = self._unflushed, []
+        while not self.queue.empty():
+            batch.append(to_line(self.queue.get_nowait()))
+        await self._flush(batch)
+
+    # --- řízení ---
+
+    def start(self):
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._consume()), asyncio.create_task(self._write_loop())]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._drain()
+        await asyncio.to_thread(self.sink.close)
+
+
+# Služba spouštěná při startu aplikace (pokud je nastaven MARKET_DATA_SYMBOLS)
+ingestor: Optional[MarketDataIngestor] = None
+
+
+def start_ingestion() -> Optional[MarketDataIngestor]:
+    global ingestor
+    symbols = [s.strip() for s in os.getenv("MARKET_DATA_SYMBOLS", "").split(",") if s.strip()]
+    if not symbols or ingestor is not None:
+        return ingestor
+    ingestor = MarketDataIngestor(
+        symbols,
+        batch_size=int(os.getenv("INGEST_BATCH_SIZE", "5000")),
+        flush_interval=float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0")),
+        queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "100000")),
+        overflow=os.getenv("INGEST_OVERFLOW", "block"),
+    )
+    ingestor.start()
+    logger.info(f"Spuštěn příjem tržních dat pro {symbols}")
+    return ingestor
+
+
+async def stop_ingestion():
+    global ingestor
+    if ingestor is not None:
+        service, ingestor = ingestor, None
+        await service.stop()
@@ -0,0 +1,284 @@
+"""
+Lokální úložiště OHLCV svíček (klínů) po symbolu a intervalu.
+
+Každý sloupec je samostatný append-only binární soubor
+(`{root}/{symbol}/{interval}/{generace}/{sloupec}.bin`), čtený přes np.memmap,
+takže řezy se strategiím, tréninku modelu i backtestu předávají bez kopírování.
+Merge zapíše všechny sloupce do nové generace a přepne na ni soubor CURRENT
+(os.replace), takže pád uprostřed nenechá sloupce různé délky. Řady bez CURRENT
+(starší formát) mají sloupce přímo v adresáři intervalu.
+Ukládají se jen uzavřené svíčky seřazené podle času. Z Pionexu se stahují
+pouze chybějící rozsahy (nové svíčky za koncem a díry uvnitř řady).
+"""
+import os
+import re
+import time
+import shutil
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.pionex import normalize_klines
+
+KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", "data/klines")
+MAX_PAGE = 500  # maximální limit jednoho volání get_klines
+
+COLUMNS = (("time", np.int64), ("open", np.float64), ("high", np.float64),
+           ("low", np.float64), ("close", np.float64), ("volume", np.float64))
+
+# Symbol je součástí cesty – stejné omezení jako v ModelRegistry
+_SYMBOL_RE = re.compile(r"[A-Za-z0-9_\-]+")
+_GENERATION_RE = re.compile(r"g(\d+)")
+
+_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000}
+
+
+def interval_ms(interval: str) -> int:
+    """'1m'/'1M' -> 60000, '4H' -> 14400000 (Pionex používá M pro minuty)."""
+    match = re.fullmatch(r"(\d+)([mMhHdD])", interval)
+    if not match:
+        raise ValueError(f"Nepodporovaný interval: {interval}")
+    return int(match.group(1)) * _UNITS_MS[match.group(2).lower()]
+
+
+class KlineSeries:
+    """Read-only pohled na sloupce (memmapy nebo jejich řezy)."""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["time"])
+
+    def __getattr__(self, name):
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, item) -> "KlineSeries":
+        return KlineSeries({name: col[item] for name, col in self.columns.items()})
+
+
+class KlineStore:
+    def __init__(self, root: str = KLINE_STORE_DIR):
+        self.root = root
+        self._maps: Dict[Tuple[str, str], Tuple[int, KlineSeries]] = {}
+        self._locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._guard = threading.Lock()
+        # Díry, které burza nevyplnila (výpadek obchodování) – znovu se nestahují
+        self._unfillable = set()
+
+    @staticmethod
+    def validate(symbol: str, interval: str):
+        """ValueError pro symbol nebo interval, ze kterého nelze sestavit cestu."""
+        if not _SYMBOL_RE.fullmatch(symbol or ""):
+            raise ValueError(f"Neplatný symbol: {symbol!r}")
+        interval_ms(interval)
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        self.validate(symbol, interval)
+        return os.path.join(self.root, symbol, interval)
+
+    def _data_dir(self, symbol: str, interval: str) -> str:
+        """Adresář aktuální generace sloupců."""
+        base = self._dir(symbol, interval)
+        try:
+            with open(os.path.join(base, "CURRENT")) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return base
+        if not _GENERATION_RE.fullmatch(name):
+            raise ValueError(f"Poškozený CURRENT v {base}: {name!r}")
+        return os.path.join(base, name)
+
+    def _path(self, symbol: str, interval: str, column: str, data_dir: Optional[str] = None) -> str:
+        return os.path.join(data_dir or self._data_dir(symbol, interval), f"{column}.bin")
+
+    def _lock(self, symbol: str, interval: str) -> threading.RLock:
+        with self._guard:
+            return self._locks.setdefault((symbol, interval), threading.RLock())
+
+    # --- čtení ---
+
+    def series(self, symbol: str, interval: str) -> KlineSeries:
+        """Celá uložená řada jako memmapy (znovu se mapuje jen po změně délky souboru)."""
+        path = self._path(symbol, interval, "time")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        cached = self._maps.get((symbol, interval))
+        if cached is not None and cached[0] == (path, size):
+            return cached[1]
+        with self._lock(symbol, interval):
+            return self._map(symbol, interval)
+
+    def _map(self, symbol: str, interval: str) -> KlineSeries:
+        # Volá se pod zámkem řady, aby se nenamapoval rozepsaný append
+        data_dir = self._data_dir(symbol, interval)
+        path = self._path(symbol, interval, "time", data_dir)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            series = KlineSeries({name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS})
+        else:
+            n = size // np.dtype(np.int64).itemsize
+            series = KlineSeries({
+                name: np.memmap(self._path(symbol, interval, name, data_dir), dtype=dtype, mode="r", shape=(n,))
+                for name, dtype in COLUMNS
+            })
+        self._maps[(symbol, interval)] = ((path, size), series)
+        return series
+
+    def get(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None,
+            last: Optional[int] = None) -> KlineSeries:
+        """Řez podle času otevření svíčky [start, end] v ms nebo posledních `last` svíček (bez kopie)."""
+        series = self.series(symbol, interval)
+        times = series.time
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+        if last is not None:
+            lo = max(lo, hi - last)
+        return series[lo:hi]
+
+    def last_time(self, symbol: str, interval: str) -> Optional[int]:
+        times = self.series(symbol, interval).time
+        return int(times[-1]) if len(times) else None
+
+    def gaps(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """Chybějící rozsahy uvnitř řady jako (první chybějící, poslední chybějící) čas."""
+        step = interval_ms(interval)
+        times = self.series(symbol, interval).time
+        if len(times) < 2:
+            return []
+        idx = np.flatnonzero(np.diff(times) > step)
+        return [(int(times[i]) + step, int(times[i + 1]) - step) for i in idx]
+
+    # --- zápis ---
+
+    @staticmethod
+    def _to_arrays(rows: List[dict]) -> Dict[str, np.ndarray]:
+        rows = sorted(rows, key=lambda k: int(k["time"]))
+        return {name: np.array([k.get(name, 0) for k in rows], dtype=dtype) for name, dtype in COLUMNS}
+
+    def append(self, symbol: str, interval: str, rows: List[dict]) -> int:
+        """Připojí svíčky novější než poslední uložená; vrací počet zapsaných."""
+        with self._lock(symbol, interval):
+            last = self.last_time(symbol, interval)
+            arrays = self._to_arrays([k for k in rows if last is None or int(k["time"]) > last])
+            _, unique = np.unique(arrays["time"], return_index=True)
+            if len(unique) == 0:
+                return 0
+            data_dir = self._data_dir(symbol, interval)
+            os.makedirs(data_dir, exist_ok=True)
+            self._truncate_to_time(data_dir)
+            # Sloupec time se zapisuje poslední – podle něj se určuje délka řady
+            for name, _ in reversed(COLUMNS):
+                with open(os.path.join(data_dir, f"{name}.bin"), "ab") as f:
+                    f.write(arrays[name][unique].tobytes())
+            return len(unique)
+
+    @staticmethod
+    def _truncate_to_time(data_dir: str):
+        """Odřízne případný nedopsaný konec ostatních sloupců (pád uprostřed append)."""
+        time_path = os.path.join(data_dir, "time.bin")
+        n = os.path.getsize(time_path) // 8 if os.path.exists(time_path) else 0
+        for name, dtype in COLUMNS[1:]:
+            path = os.path.join(data_dir, f"{name}.bin")
+            if os.path.exists(path) and os.path.getsize(path) > n * np.dtype(dtype).itemsize:
+                os.truncate(path, n * np.dtype(dtype).itemsize)
+
+    def merge(self, symbol: str, interval: str, rows: List[dict]) -> int:
+        """Vloží svíčky kamkoli do řady (opravy děr, backfill) – nová generace se atomicky přepne."""
+        with self._lock(symbol, interval):
+            current = self.series(symbol, interval)
+            new = self._to_arrays(rows)
+            times = np.concatenate([np.asarray(current.time), new["time"]])
+            _, unique = np.unique(times, return_index=True)  # při shodě času vyhrává uložená svíčka
+            added = len(unique) - len(current)
+            if added <= 0:
+                return 0
+            base = self._dir(symbol, interval)
+            old_dir = self._data_dir(symbol, interval)
+            match = _GENERATION_RE.fullmatch(os.path.basename(old_dir))
+            generation = f"g{int(match.group(1)) + 1 if match and old_dir != base else 1}"
+            new_dir = os.path.join(base, generation)
+            # Zbytek generace po pádu předchozího merge
+            shutil.rmtree(new_dir, ignore_errors=True)
+            os.makedirs(new_dir)
+            for name, _ in COLUMNS:
+                merged = np.concatenate([np.asarray(current.columns[name]), new[name]])[unique]
+                with open(os.path.join(new_dir, f"{name}.bin"), "wb") as f:
+                    f.write(merged.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            pointer = os.path.join(base, "CURRENT")
+            with open(pointer + ".tmp", "w") as f:
+                f.write(generation)
+            os.replace(pointer + ".tmp", pointer)
+            self._maps.pop((symbol, interval), None)
+            self._remove_generation(base, old_dir)
+            return added
+
+    @staticmethod
+    def _remove_generation(base: str, data_dir: str):
+        # Otevřené memmapy starých souborů zůstávají platné i po smazání (POSIX)
+        if data_dir != base:
+            shutil.rmtree(data_dir, ignore_errors=True)
+            return
+        for name, _ in COLUMNS:
+            try:
+                os.remove(os.path.join(base, f"{name}.bin"))
+            except FileNotFoundError:
+                pass
+
+    # --- synchronizace s burzou ---
+
+    async def update(self, api, symbol: str, interval: str, lookback: int = MAX_PAGE,
+                     repair: bool = True, now_ms: Optional[int] = None) -> int:
+        """
+        Stáhne jen chybějící uzavřené svíčky: nové za koncem řady (max. `lookback`
+        zpět), případně i díry uvnitř. `api` je AsyncPionexAPI. Vrací počet nových svíček.
+        """
+        step = interval_ms(interval)
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        # Poslední uzavřená svíčka
+        end = (now_ms // step) * step - step
+        last = self.last_time(symbol, interval)
+        start = end - (lookback - 1) * step
+        if last is not None:
+            start = max(start, last + step)
+        added = 0
+        if start <= end:
+            rows = await self._fetch_range(api, symbol, interval, start, end)
+            if last is None or all(int(k["time"]) > last for k in rows):
+                added += self.append(symbol, interval, rows)
+            else:
+                added += self.merge(symbol, interval, rows)
+        if repair:
+            for gap in self.gaps(symbol, interval):
+                key = (symbol, interval) + gap
+                if key in self._unfillable:
+                    continue
+                rows = await self._fetch_range(api, symbol, interval, *gap)
+                if not rows:
+                    self._unfillable.add(key)
+                added += self.merge(symbol, interval, rows)
+        return added
+
+    async def _fetch_range(self, api, symbol: str, interval: str, start: int, end: int) -> List[dict]:
+        """Stránkuje get_klines pozpátku přes endTime, dokud nepokryje [start, end]."""
+        step = interval_ms(interval)
+        rows: List[dict] = []
+        page_end = end
+        while page_end >= start:
+            limit = min(MAX_PAGE, (page_end - start) // step + 1)
+            page = normalize_klines(await api.get_klines(symbol, interval, limit=limit, end_time=page_end))
+            page = [k for k in page if start <= int(k["time"]) <= end]
+            if not page:
+                break
+            rows.extend(page)
+            page_end = min(int(k["time"]) for k in page) - step
+        return rows
+
+
+# Singleton instance
+kline_store = KlineStore()
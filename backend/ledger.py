@@ -0,0 +1,535 @@
+"""
+Ledger objednávek a fillů z Pionexu a průběžně udržované pozice botů.
+
+- record_order(): objednávka zadaná přes API (manual_trade, /pionex/order) se
+  uloží v transakci requestu i s bot_id – podle něj se pak fill přiřadí botovi.
+- reconcile(): periodicky stáhne z Pionexu po symbolech nové objednávky a fill
+  (get_all_orders / get_fills od kurzoru), hromadně je zapíše a každý nový fill
+  jednou započte do pozice (bot_id, symbol). Kurzor je čas posledního fillu;
+  dotaz jde s malým překryvem a duplicity odfiltruje unikátní fill_id. Plná
+  stránka fillů se dostránkuje (užší okna přes startTime/endTime), kurzor se
+  posune až po vyčerpání celého okna.
+- Pozice (množství, průměrná cena, realizované PnL, poplatky) se počítají
+  inkrementálně metodou průměrné ceny. Dashboardy a risk kontroly čtou tabulku
+  positions a na burzu se neptají.
+- flatten(): uzavře pozice (např. v panic režimu) jednou dávkou – zruší otevřené
+  objednávky a zadá výstupní MARKET objednávky souběžně v rámci rate limitu.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import Column, Integer, BigInteger, String, Numeric, DateTime, JSON, Index, func, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+
+from backend.db import Base
+from backend.history import MAX_PAGE_SIZE, decode_cursor, fetch_page, row_dict
+from backend.pionex import normalize_list
+
+logger = logging.getLogger("ledger")
+logger.setLevel(logging.INFO)
+
+LEDGER_SYMBOLS = [s.strip() for s in os.getenv("LEDGER_SYMBOLS", "").split(",") if s.strip()]
+LEDGER_RECONCILE_INTERVAL = int(os.getenv("LEDGER_RECONCILE_INTERVAL", "60"))
+# Překryv dotazu před kurzorem (ms) – zachytí fill se stejným nebo mírně opožděným časem
+LEDGER_OVERLAP_MS = int(os.getenv("LEDGER_OVERLAP_MS", "5000"))
+# Bez kurzoru (první běh pro symbol) se stahuje historie za tuto dobu (ms)
+LEDGER_INITIAL_LOOKBACK_MS = int(os.getenv("LEDGER_INITIAL_LOOKBACK_MS", str(24 * 3600 * 1000)))
+# Kolik fillů burza vrátí nejvýš v jedné odpovědi – plná stránka znamená, že okno se musí dostránkovat
+LEDGER_FILLS_PAGE_SIZE = int(os.getenv("LEDGER_FILLS_PAGE_SIZE", "100"))
+LEDGER_MAX_FILL_PAGES = 50
+
+# Pozice z fillů objednávek, které nezadal žádný bot (ruční obchody na burze, /pionex/order)
+UNASSIGNED_BOT = 0
+# Stavy objednávek, které ještě mohou dostat fill (Pionex OPEN, mock burza NEW/PARTIALLY_FILLED)
+OPEN_ORDER_STATUSES = ("NEW", "OPEN", "PARTIALLY_FILLED")
+_EPS = 1e-12
+
+_JSON = JSON().with_variant(JSONB(), "postgresql")
+
+
+# bot_id záměrně bez cizího klíče – smazání bota nesmí mazat historii obchodů
+class OrderORM(Base):
+    __tablename__ = "orders"
+    id = Column(Integer, primary_key=True)
+    order_id = Column(String(64), unique=True, nullable=False)  # ID objednávky na burze
+    client_order_id = Column(String(64), nullable=True)
+    bot_id = Column(Integer, nullable=True)
+    symbol = Column(String(32), nullable=False)
+    side = Column(String(8), nullable=False)  # BUY/SELL
+    type = Column(String(16), nullable=True)
+    price = Column(Numeric(18, 8), nullable=True)
+    quantity = Column(Numeric(18, 8), nullable=True)
+    filled_quantity = Column(Numeric(18, 8), nullable=True)
+    status = Column(String(16), nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    raw_data = Column(_JSON, nullable=True)
+
+    __table_args__ = (
+        Index("ix_orders_bot_id", "bot_id"),
+        Index("ix_orders_symbol_created_at", "symbol", "created_at"),
+    )
+
+
+class FillORM(Base):
+    __tablename__ = "fills"
+    id = Column(Integer, primary_key=True)
+    fill_id = Column(String(64), unique=True, nullable=False)  # ID fillu na burze
+    order_id = Column(String(64), nullable=True)
+    bot_id = Column(Integer, nullable=True)
+    symbol = Column(String(32), nullable=False)
+    side = Column(String(8), nullable=False)
+    price = Column(Numeric(18, 8), nullable=False)
+    quantity = Column(Numeric(18, 8), nullable=False)
+    fee = Column(Numeric(18, 8), nullable=True)
+    fee_asset = Column(String(16), nullable=True)
+    filled_at = Column(DateTime, nullable=False)
+    raw_data = Column(_JSON, nullable=True)
+
+    __table_args__ = (
+        Index("ix_fills_symbol_filled_at_id", "symbol", "filled_at", "id"),
+        Index("ix_fills_bot_filled_at_id", "bot_id", "filled_at", "id"),
+    )
+
+
+class PositionORM(Base):
+    __tablename__ = "positions"
+    bot_id = Column(Integer, primary_key=True)  # UNASSIGNED_BOT = bez bota
+    symbol = Column(String(32), primary_key=True)
+    quantity = Column(Numeric(18, 8), nullable=False, default=0)  # short = záporné
+    avg_price = Column(Numeric(18, 8), nullable=False, default=0)
+    realized_pnl = Column(Numeric(18, 8), nullable=False, default=0)
+    fees = Column(Numeric(18, 8), nullable=False, default=0)
+    fill_count = Column(Integer, nullable=False, default=0)
+    last_fill_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class LedgerCursorORM(Base):
+    __tablename__ = "ledger_cursors"
+    name = Column(String(64), primary_key=True)  # např. "fills:BTCUSDT"
+    last_ts = Column(BigInteger, nullable=False)  # ms
+    updated_at = Column(DateTime, nullable=True)
+
+
+POSITION_COLUMNS = ("bot_id", "symbol", "quantity", "avg_price", "realized_pnl", "fees", "fill_count",
+                    "last_fill_at", "updated_at")
+FILL_COLUMNS = ("id", "fill_id", "order_id", "bot_id", "symbol", "side", "price", "quantity", "fee", "fee_asset",
+                "filled_at")
+
+
+# --- převod odpovědí burzy ---
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _first(raw: Dict[str, Any], *keys, default=None):
+    for key in keys:
+        if raw.get(key) is not None:
+            return raw[key]
+    return default
+
+
+def ms_to_datetime(ms) -> datetime:
+    return datetime.fromtimestamp(int(ms) / 1000, timezone.utc).replace(tzinfo=None)
+
+
+def datetime_to_ms(dt: datetime) -> int:
+    return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def order_id_of(resp: Any) -> Optional[str]:
+    """ID objednávky z odpovědi place_order ({"orderId": ...} i obálka {"data": {...}})."""
+    if not isinstance(resp, dict):
+        return None
+    data = resp.get("data") if isinstance(resp.get("data"), dict) else resp
+    order_id = _first(data, "orderId", "order_id", "id")
+    return str(order_id) if order_id is not None else None
+
+
+def parse_order(raw: Dict[str, Any], symbol: Optional[str] = None) -> Dict[str, Any]:
+    created = _first(raw, "createTime", "time", "timestamp")
+    updated = _first(raw, "updateTime", "createTime", "time", "timestamp")
+    return {
+        "order_id": str(_first(raw, "orderId", "id")),
+        "client_order_id": _first(raw, "clientOrderId"),
+        "symbol": _first(raw, "symbol", default=symbol),
+        "side": str(_first(raw, "side", default="")).upper(),
+        "type": _first(raw, "type"),
+        "price": float(_first(raw, "price", default=0)),
+        "quantity": float(_first(raw, "size", "quantity", "origQty", default=0)),
+        "filled_quantity": float(_first(raw, "filledSize", "executedQty", "filledQuantity", default=0)),
+        "status": _first(raw, "status"),
+        "created_at": ms_to_datetime(created) if created is not None else None,
+        "updated_at": ms_to_datetime(updated) if updated is not None else _utcnow(),
+        "raw_data": raw,
+    }
+
+
+def parse_fill(raw: Dict[str, Any], symbol: Optional[str] = None) -> Dict[str, Any]:
+    order_id = _first(raw, "orderId")
+    return {
+        "fill_id": str(_first(raw, "id", "fillId", "tradeId")),
+        "order_id": str(order_id) if order_id is not None else None,
+        "symbol": _first(raw, "symbol", default=symbol),
+        "side": str(_first(raw, "side", default="")).upper(),
+        "price": float(_first(raw, "price")),
+        "quantity": float(_first(raw, "size", "quantity", "qty")),
+        "fee": float(_first(raw, "fee", default=0)),
+        "fee_asset": _first(raw, "feeCoin", "feeAsset"),
+        "filled_at": ms_to_datetime(_first(raw, "timestamp", "time", "createTime")),
+        "raw_data": raw,
+    }
+
+
+def apply_fill(quantity: float, avg_price: float, realized_pnl: float, side: str, qty: float,
+               price: float) -> Tuple[float, float, float]:
+    """Nový stav pozice (množství, průměrná cena, realizované PnL) po jednom fillu."""
+    signed = qty if side == "BUY" else -qty
+    new_quantity = round(quantity + signed, 12)
+    if abs(quantity) < _EPS or (quantity > 0) == (signed > 0):
+        # Otevření / navýšení: vážený průměr ceny
+        if abs(new_quantity) < _EPS:
+            return 0.0, 0.0, realized_pnl
+        return new_quantity, (abs(quantity) * avg_price + qty * price) / abs(new_quantity), realized_pnl
+    # Snížení: realizuje se PnL uzavřené části
+    closed = min(qty, abs(quantity))
+    realized_pnl += closed * (price - avg_price) * (1 if quantity > 0 else -1)
+    if abs(new_quantity) < _EPS:
+        return 0.0, 0.0, realized_pnl
+    if (new_quantity > 0) != (quantity > 0):
+        # Otočení pozice – zbytek se otevírá za cenu fillu
+        return new_quantity, price, realized_pnl
+    return new_quantity, avg_price, realized_pnl
+
+
+class TradeLedger:
+    def __init__(self, session_factory=None, symbols: Iterable[str] = LEDGER_SYMBOLS,
+                 overlap_ms: int = LEDGER_OVERLAP_MS, initial_lookback_ms: int = LEDGER_INITIAL_LOOKBACK_MS,
+                 fills_page_size: int = LEDGER_FILLS_PAGE_SIZE):
+        self._session_factory = session_factory
+        self.fills_page_size = fills_page_size
+        self.symbols = list(symbols)
+        self.overlap_ms = overlap_ms
+        self.initial_lookback_ms = initial_lookback_ms
+        self.stats = {"reconciles": 0, "orders": 0, "fills": 0, "errors": 0}
+        self.last_reconcile: Optional[datetime] = None
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from backend.db import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    # --- zápis ---
+
+    async def record_order(self, db, resp: Any, symbol: str, side: str, price: float, quantity: float,
+                           type_: str = "LIMIT", bot_id: Optional[int] = None,
+                           client_order_id: Optional[str] = None) -> Optional[OrderORM]:
+        """Přidá objednávku zadanou přes API do transakce `db` (commit dělá volající)."""
+        order_id = order_id_of(resp)
+        if order_id is None:
+            logger.warning(f"Odpověď place_order bez ID objednávky, do ledgeru se nezapíše: {resp}")
+            return None
+        order = (await db.execute(select(OrderORM).where(OrderORM.order_id == order_id))).scalar_one_or_none()
+        if order is not None:
+            # Reconcile byl rychlejší – doplní se jen vlastník
+            order.bot_id = order.bot_id or bot_id
+            order.client_order_id = order.client_order_id or client_order_id
+            return order
+        now = _utcnow()
+        order = OrderORM(order_id=order_id, client_order_id=client_order_id, bot_id=bot_id, symbol=symbol,
+                         side=side.upper(), type=type_, price=price, quantity=quantity, filled_quantity=0,
+                         status="NEW", created_at=now, updated_at=now, raw_data=resp)
+        db.add(order)
+        return order
+
+    async def upsert_orders(self, db, orders: List[Dict[str, Any]]) -> int:
+        """Hromadně vloží nové objednávky a aktualizuje stav známých; vrací počet nových."""
+        orders = list({o["order_id"]: o for o in orders}.values())
+        if not orders:
+            return 0
+        existing = {
+            o.order_id: o for o in (await db.execute(
+                select(OrderORM).where(OrderORM.order_id.in_([o["order_id"] for o in orders])))).scalars()
+        }
+        new_rows = []
+        for o in orders:
+            row = existing.get(o["order_id"])
+            if row is None:
+                new_rows.append(o)
+                continue
+            row.status = o["status"]
+            row.filled_quantity = o["filled_quantity"]
+            row.updated_at = o["updated_at"]
+            row.client_order_id = row.client_order_id or o["client_order_id"]
+            row.raw_data = o["raw_data"]
+        if new_rows:
+            await db.execute(insert(OrderORM.__table__), new_rows)
+        return len(new_rows)
+
+    async def ingest_fills(self, db, fills: List[Dict[str, Any]]) -> int:
+        """Zapíše dosud neznámé fill (podle fill_id) a započte je do pozic; vrací počet nových."""
+        fills = list({f["fill_id"]: f for f in fills}.values())
+        if not fills:
+            return 0
+        known = set((await db.execute(
+            select(FillORM.fill_id).where(FillORM.fill_id.in_([f["fill_id"] for f in fills])))).scalars())
+        new = sorted((f for f in fills if f["fill_id"] not in known), key=lambda f: (f["filled_at"], f["fill_id"]))
+        if not new:
+            return 0
+        # Vlastník fillu = bot, který zadal objednávku
+        order_ids = {f["order_id"] for f in new if f["order_id"]}
+        owners = dict((await db.execute(
+            select(OrderORM.order_id, OrderORM.bot_id).where(OrderORM.order_id.in_(order_ids)))).all()) if order_ids else {}
+        for f in new:
+            f["bot_id"] = owners.get(f["order_id"])
+        await db.execute(insert(FillORM.__table__), new)
+        await self._apply_to_positions(db, new)
+        return len(new)
+
+    async def _apply_to_positions(self, db, fills: List[Dict[str, Any]]):
+        bots = {f["bot_id"] or UNASSIGNED_BOT for f in fills}
+        symbols = {f["symbol"] for f in fills}
+        positions = {
+            (p.bot_id, p.symbol): p for p in (await db.execute(
+                select(PositionORM).where(PositionORM.bot_id.in_(bots), PositionORM.symbol.in_(symbols)))).scalars()
+        }
+        now = _utcnow()
+        for f in fills:
+            key = (f["bot_id"] or UNASSIGNED_BOT, f["symbol"])
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = PositionORM(bot_id=key[0], symbol=key[1], quantity=0, avg_price=0,
+                                                        realized_pnl=0, fees=0, fill_count=0)
+                db.add(position)
+            quantity, avg_price, realized = apply_fill(
+                float(position.quantity), float(position.avg_price), float(position.realized_pnl),
+                f["side"], f["quantity"], f["price"])
+            position.quantity, position.avg_price, position.realized_pnl = quantity, avg_price, realized
+            position.fees = float(position.fees) + f["fee"]
+            position.fill_count += 1
+            position.last_fill_at = f["filled_at"]
+            position.updated_at = now
+
+    # --- kurzory ---
+
+    async def get_cursor(self, db, name: str) -> Optional[int]:
+        cursor = await db.get(LedgerCursorORM, name)
+        return cursor.last_ts if cursor is not None else None
+
+    async def set_cursor(self, db, name: str, last_ts: int):
+        cursor = await db.get(LedgerCursorORM, name)
+        if cursor is None:
+            db.add(LedgerCursorORM(name=name, last_ts=last_ts, updated_at=_utcnow()))
+        elif last_ts > cursor.last_ts:
+            cursor.last_ts = last_ts
+            cursor.updated_at = _utcnow()
+
+    # --- reconcile ---
+
+    async def reconcile_symbol(self, api, symbol: str, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        """Stáhne objednávky a fill symbolu od kurzoru a zapíše je jednou transakcí."""
+        name = f"fills:{symbol}"
+        async with self.session_factory() as db:
+            last_ts = await self.get_cursor(db, name)
+            if last_ts is not None:
+                start = last_ts - self.overlap_ms
+            else:
+                start = (now_ms or datetime_to_ms(_utcnow())) - self.initial_lookback_ms
+            orders_resp, fills = await asyncio.gather(
+                api.get_all_orders(symbol, start_time=start),
+                self._fetch_fills(api, symbol, start),
+            )
+            orders = [parse_order(o, symbol) for o in normalize_list(orders_resp, "orders")]
+            new_orders = await self.upsert_orders(db, orders)
+            new_fills = await self.ingest_fills(db, fills)
+            if fills:
+                await self.set_cursor(db, name, max(datetime_to_ms(f["filled_at"]) for f in fills))
+            await db.commit()
+        self.stats["orders"] += new_orders
+        self.stats["fills"] += new_fills
+        return {"symbol": symbol, "orders": new_orders, "fills": new_fills, "start_time": start}
+
+    async def _fetch_fills(self, api, symbol: str, start: int) -> List[Dict[str, Any]]:
+        """
+        Všechny fill symbolu od `start`. Plná stránka nepokrývá celé okno a není jisté, ze kterého
+        konce ji burza uřízla – dotáhnou se obě zbývající části (hranice včetně, duplicity podle fill_id).
+        """
+        fills: Dict[str, Dict[str, Any]] = {}
+        windows: List[Tuple[int, Optional[int]]] = [(start, None)]
+        pages = 0
+        while windows:
+            lo, hi = windows.pop()
+            pages += 1
+            page = [parse_fill(f, symbol) for f in normalize_list(
+                await api.get_fills(symbol=symbol, start_time=lo, end_time=hi), "fills")]
+            new = [f for f in page if f["fill_id"] not in fills]
+            fills.update((f["fill_id"], f) for f in new)
+            if len(page) < self.fills_page_size or not new:
+                continue
+            if pages >= LEDGER_MAX_FILL_PAGES:
+                raise RuntimeError(f"Fill {symbol} od {start} se nevešly do {pages} stránek, kurzor se neposune")
+            times = [datetime_to_ms(f["filled_at"]) for f in page]
+            first, last = min(times), max(times)
+            if first > lo:
+                windows.append((lo, first))
+            if hi is None or last < hi:
+                windows.append((last, hi))
+        return list(fills.values())
+
+    async def known_symbols(self) -> List[str]:
+        """Symboly k reconcile: LEDGER_SYMBOLS a všechny symboly objednávek v ledgeru."""
+        async with self.session_factory() as db:
+            symbols = set((await db.execute(select(OrderORM.symbol).distinct())).scalars())
+        return sorted(symbols | set(self.symbols))
+
+    async def reconcile(self, api, symbols: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        symbols = list(symbols) if symbols is not None else await self.known_symbols()
+        results = await asyncio.gather(*(self.reconcile_symbol(api, s) for s in symbols), return_exceptions=True)
+        out = []
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                self.stats["errors"] += 1
+                logger.error(f"Reconcile ledgeru pro {symbol} selhal: {result}")
+                out.append({"symbol": symbol, "error": str(result)})
+            else:
+                out.append(result)
+        self.stats["reconciles"] += 1
+        self.last_reconcile = _utcnow()
+        return out
+
+    # --- uzavření pozic ---
+
+    async def flatten(self, api, bot_id: Optional[int] = None, symbol: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Zruší otevřené objednávky a uzavře otevřené pozice (bota / symbolu / všech) jednou dávkou.
+
+        Client order ID výstupu je odvozené ze stavu pozice (počet fillů), takže opakované
+        volání před dalším fillem objednávku nezdvojí.
+        """
+        async with self.session_factory() as db:
+            positions = [p for p in await self.positions(db, bot_id, open_only=True)
+                         if symbol is None or p["symbol"] == symbol]
+            symbols = sorted({p["symbol"] for p in positions} | ({symbol} if symbol else set()))
+            open_resps = await asyncio.gather(*(api.get_open_orders(s) for s in symbols))
+            cancels = [str(_first(o, "orderId", "id")) for resp in open_resps for o in normalize_list(resp, "orders")]
+            if bot_id is not None and cancels:
+                # Jen objednávky daného bota podle ledgeru
+                owned = set((await db.execute(select(OrderORM.order_id).where(
+                    OrderORM.order_id.in_(cancels), OrderORM.bot_id == bot_id))).scalars())
+                cancels = [order_id for order_id in cancels if order_id in owned]
+        orders = [{
+            "symbol": p["symbol"],
+            "side": "SELL" if p["quantity"] > 0 else "BUY",
+            "quantity": abs(float(p["quantity"])),
+            "type": "MARKET",
+            "exit": True,
+            "bot_id": p["bot_id"],
+            "client_order_id": f"flat-{p['bot_id']}-{p['symbol']}-{p['fill_count']}",
+        } for p in positions]
+        result = await api.submit_batch(cancels=cancels, orders=orders)
+        async with self.session_factory() as db:
+            for order, placed in zip(orders, result["orders"]):
+                if placed["ok"] and not placed.get("duplicate"):
+                    await self.record_order(db, placed["order"], order["symbol"], order["side"], None,
+                                            order["quantity"], "MARKET", bot_id=order["bot_id"] or None)
+            await db.commit()
+        return result
+
+    # --- čtení ---
+
+    async def positions(self, db, bot_id: Optional[int] = None, open_only: bool = False) -> List[Dict[str, Any]]:
+        stmt = select(PositionORM).order_by(PositionORM.bot_id, PositionORM.symbol)
+        if bot_id is not None:
+            stmt = stmt.where(PositionORM.bot_id == bot_id)
+        if open_only:
+            stmt = stmt.where(PositionORM.quantity != 0)
+        return [{c: getattr(p, c) for c in POSITION_COLUMNS} for p in (await db.execute(stmt)).scalars()]
+
+    async def open_position_count(self, db, bot_id: int) -> int:
+        """Počet otevřených pozic bota (pro Strategy.can_open_position)."""
+        return len(await self.positions(db, bot_id, open_only=True))
+
+    async def bot_exposure(self, db, bot_id: int, symbol: str) -> Dict[str, Any]:
+        """
+        Pozice bota v symbolu, počet jeho otevřených pozic a nevyřízené objednávky podle ledgeru
+        (pro rozhodnutí, zda živý signál zadat). Objednávka zůstává nevyřízená, dokud ji reconcile
+        neoznačí jako vyplněnou nebo zrušenou.
+        """
+        position = (await db.execute(select(PositionORM.quantity).where(
+            PositionORM.bot_id == bot_id, PositionORM.symbol == symbol))).scalar_one_or_none()
+        pending = (await db.execute(select(func.count()).select_from(OrderORM).where(
+            OrderORM.bot_id == bot_id, OrderORM.symbol == symbol,
+            OrderORM.status.in_(OPEN_ORDER_STATUSES)))).scalar_one()
+        return {"quantity": float(position or 0), "pending_orders": pending,
+                "open_positions": await self.open_position_count(db, bot_id)}
+
+    def info(self) -> dict:
+        return {**self.stats, "last_reconcile": self.last_reconcile, "symbols": self.symbols}
+
+
+# Singleton instance
+trade_ledger = TradeLedger()
+
+
+# --- routy ---
+
+router = APIRouter(prefix="/ledger", tags=["Ledger"])
+
+
+@router.get("/positions")
+async def list_positions(bot_id: Optional[int] = None, open_only: bool = False):
+    """Předpočítané pozice a PnL botů (bez dotazu na burzu)."""
+    async with trade_ledger.session_factory() as db:
+        return await trade_ledger.positions(db, bot_id, open_only)
+
+
+@router.get("/fills")
+async def list_fills(
+    bot_id: Optional[int] = None,
+    symbol: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Fill od nejnovějších (keyset stránkování jako /history)."""
+    stmt = select(FillORM)
+    if bot_id is not None:
+        stmt = stmt.where(FillORM.bot_id == bot_id)
+    if symbol:
+        stmt = stmt.where(FillORM.symbol == symbol)
+    after = decode_cursor(cursor, (datetime, int)) if cursor else None
+    async with trade_ledger.session_factory() as db:
+        rows, next_cursor = await fetch_page(db, stmt, (FillORM.filled_at, FillORM.id), after, limit)
+    return {"items": [row_dict(r, FILL_COLUMNS) for r in rows], "next_cursor": next_cursor}
+
+
+@router.post("/flatten")
+async def run_flatten(bot_id: Optional[int] = None, symbol: Optional[str] = None):
+    """Uzavře pozice a zruší otevřené objednávky (výsledek po objednávkách)."""
+    from backend.pionex import get_async_pionex
+    try:
+        api = get_async_pionex()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return await trade_ledger.flatten(api, bot_id, symbol)
+
+
+@router.post("/reconcile")
+async def run_reconcile(symbol: Optional[str] = None):
+    """Okamžitý reconcile (jinak běží periodicky v plánovači)."""
+    from backend.pionex import get_async_pionex
+    try:
+        api = get_async_pionex()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    results = await trade_ledger.reconcile(api, [symbol] if symbol else None)
+    return {"results": results, **trade_ledger.info()}
@@ -1,62 +1,153 @@
 from dotenv import load_dotenv
 load_dotenv()
-from fastapi import FastAPI, WebSocket
-from backend import api
-from backend.db import engine, influx_client
+import os
+import sys
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, Response
+from backend import api, history, ledger
 from backend.scheduler import start_scheduler
+from backend.pionex import close_async_pionex, get_async_pionex
+from backend.orderbook import order_books
+from backend.ingest import start_ingestion, stop_ingestion
+from backend.model import model_registry
+from backend.training import training_executor
+from backend.audit import audit_writer
+from backend.cache import start_cache_listener, stop_cache_listener
+from backend.runtime import bot_runtime
+from backend.sharding import start_sharding, stop_sharding
+from backend.sentiment import sentiment_pipeline
+from backend.gemini import close_async_gemini
+from backend.metrics import registry, MetricsMiddleware, CONTENT_TYPE
+from backend.realtime import hub, EMPTY_TICK, SYMBOL_RE
+
+logger = logging.getLogger("main")
+
+async def _preload_models():
+    try:
+        await asyncio.to_thread(model_registry.preload)
+    except Exception as e:
+        logger.error(f"Chyba při načítání modelů: {e}")
 
-app = FastAPI(title="miniBot Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import modulu nic nepřipojuje: DB engine, InfluxDB klient i plánovač vznikají až tady
+    # nebo při prvním použití, proces tak začne přijímat požadavky (a websockety) hned
+    start_scheduler()
+    # Načtení aktuálních verzí modelů na pozadí; predict do té doby načte model z disku sám
+    app.state.preload = asyncio.create_task(_preload_models())
+    # Invalidace cache botů mezi workery (LISTEN/NOTIFY, jen Postgres a BOT_CACHE_NOTIFY)
+    await start_cache_listener()
+    # Boti se stavem running po restartu pokračují (jeden asyncio task na bota);
+    # s BOT_SHARDING si je workery rozdělí přes lease v databázi
+    if bot_runtime.enabled and start_sharding(bot_runtime) is None:
+        await bot_runtime.load_running()
+    # Příjem tržních dat z websocket feedu (jen pokud je nastaven MARKET_DATA_SYMBOLS)
+    ingestor = start_ingestion()
+    if ingestor is not None:
+        # Ticky jdou do hubu přímo z feedu, polling InfluxDB není potřeba
+        ingestor.on_record = hub.publish_record
+        hub.fetch = None
+        # DEPTH zprávy udržují lokální order book; při mezeře v diffech resync z REST snapshotu
+        ingestor.on_depth = order_books.handle_depth
+        order_books.api_factory = get_async_pionex
+        hub.books = order_books
+    yield
+    # Dopsání rozpracovaných dávek a uzavření sdíleného poolu spojení na Pionex
+    await stop_sharding()
+    await bot_runtime.shutdown()
+    await stop_ingestion()
+    await hub.stop()
+    await close_async_pionex()
+    await sentiment_pipeline.stop()
+    await close_async_gemini()
+    await stop_cache_listener()
+    # Nedoběhlé načítání modelů se zruší a dočká, task nesmí přežít ukončení smyčky
+    app.state.preload.cancel()
+    await asyncio.gather(app.state.preload, return_exceptions=True)
+    training_executor.shutdown()
+    # Pool sweepů existuje, jen pokud už běžel backtest (modul se načítá líně)
+    backtest = sys.modules.get("backend.backtest")
+    if backtest is not None:
+        backtest.shutdown_pool()
+    # Dopsání audit záznamů čekajících ve frontě
+    await asyncio.to_thread(audit_writer.stop)
+
+app = FastAPI(title="miniBot Backend", lifespan=lifespan)
+# Doba a počet HTTP požadavků podle routy (čistý ASGI wrapper, bez BaseHTTPMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Registrace routeru pro správu botů
 app.include_router(api.router)
+app.include_router(history.router)
+app.include_router(ledger.router)
+
+# Metriky ve formátu Prometheus (scrape)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
 # Websocket endpoint pro real-time data
-import asyncio
-from backend.db import influx_client, INFLUXDB_ORG
-from influxdb_client.client.write_api import SYNCHRONOUS
+# Bez změn pošle endpoint po této době prázdný tick (heartbeat)
+WS_HEARTBEAT = float(os.getenv("WS_HEARTBEAT", "1.0"))
+
+def _parse_symbols(raw):
+    """Symboly z query nebo zprávy klienta; ValueError, pokud některý neodpovídá SYMBOL_RE."""
+    if not raw:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list):
+        raise ValueError("symbols musí být seznam nebo řetězec")
+    symbols = [str(s).strip().upper() for s in raw if str(s).strip()]
+    invalid = [s for s in symbols if not SYMBOL_RE.fullmatch(s)]
+    if invalid:
+        raise ValueError(f"Neplatné symboly: {invalid[:5]}")
+    return symbols
+
+async def _read_commands(websocket: WebSocket, sub):
+    """Zpracuje příkazy klienta: {"op": "subscribe", "symbols": [...]}."""
+    try:
+        while True:
+            msg = await websocket.receive_json()
+            if isinstance(msg, dict) and msg.get("op") == "subscribe":
+                try:
+                    hub.set_symbols(sub, _parse_symbols(msg.get("symbols")))
+                except ValueError as e:
+                    # Neplatná změna odběru se ignoruje, platí dosavadní symboly
+                    logger.warning(f"Websocket subscribe odmítnut: {e}")
+    except Exception:
+        pass
+    finally:
+        sub.closed = True
+        sub.event.set()
 
 @app.websocket("/ws/realtime")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, symbols: str = None):
+    try:
+        wanted = _parse_symbols(symbols)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
+    # Klient čte z vlastní omezené fronty hubu, dotazy do InfluxDB nezávisí na počtu klientů
+    sub = hub.subscribe(wanted)
+    reader = asyncio.create_task(_read_commands(websocket, sub))
     try:
-        for _ in range(10):
-            # Získání posledního ticku z InfluxDB
-            try:
-                query = f'''
-                  from(bucket: "minibot")
-                  |> range(start: -1m)
-                  |> filter(fn: (r) => r._measurement == "trades")
-                  |> last()
-                '''
-                tables = influx_client.query_api().query(query, org=INFLUXDB_ORG)
-                price, volume, timestamp = None, None, None
-                for table in tables:
-                    for record in table.records:
-                        if record.get_field() == "price":
-                            price = record.get_value()
-                            timestamp = record.get_time().timestamp()
-                        if record.get_field() == "volume":
-                            volume = record.get_value()
-                data = {
-                    "price": price,
-                    "volume": volume,
-                    "timestamp": timestamp
-                }
-            except Exception:
-                data = {
-                    "price": None,
-                    "volume": None,
-                    "timestamp": None
-                }
-            await websocket.send_json(data)
-            await asyncio.sleep(1)
+        while not sub.closed:
+            ticks = await sub.next(timeout=WS_HEARTBEAT)
+            if sub.closed:
+                break
+            for tick in ticks or [EMPTY_TICK]:
+                await websocket.send_json(tick)
+            hub.mark_sent(sub)
     except Exception:
         pass
     finally:
-        await websocket.close()
-
-# Inicializace plánovače úloh při startu aplikace
-@app.on_event("startup")
-async def startup_event():
-    # DB engine a influx_client jsou inicializovány importem
-    start_scheduler()
\ No newline at end of file
+        hub.unsubscribe(sub)
+        reader.cancel()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
@@ -0,0 +1,321 @@
+"""
+Metriky ve formátu Prometheus (text exposition 0.0.4) bez externí závislosti.
+
+Registr drží countery, gauge a histogramy; každá metrika s labely má
+potomka pro každou kombinaci hodnot (vytvoří se při prvním použití, pak
+se jen vyhledá v dictu – pro horké cesty si ho lze uložit předem):
+
+    PIONEX_SECONDS = registry.histogram("pionex_request_seconds", "...", ["method", "endpoint"])
+    PIONEX_SECONDS.labels(method="GET", endpoint="/api/v1/depth").observe(0.12)
+    with COMPUTE_SECONDS.time(op="predict"):
+        ...
+
+Zápis je pár aritmetických operací pod zámkem potomka; histogram drží
+počty v pevných bucketech (kumulují se až při renderu), takže pozorování
+nealokuje. Gauge může mít funkci, která se vyhodnotí až při čtení /metrics.
+"""
+import time
+import inspect
+import functools
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+NAMESPACE = "minibot"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Síťová volání a DB (sekundy)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Výpočty v procesu (indikátory, predikce) – mikrosekundy až desítky ms
+COMPUTE_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1)
+# Plánované úlohy (retrénink, reconcile) – sekundy až minuty
+JOB_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _fmt(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str, quotes: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Timer:
+    """Měří dobu bloku `with` (nebo každého volání dekorované funkce) do histogramu."""
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, fn):
+        child = self._child
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(child):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(child):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, metric):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counter nelze snížit.")
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str):
+        yield name, "", self.value
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock", "_fn")
+
+    def __init__(self, metric):
+        self.value = 0.0
+        self._lock = threading.Lock()
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, fn: Callable[[], float]):
+        """Hodnota se spočítá až při renderu (např. počet připojených klientů)."""
+        self._fn = fn
+
+    def samples(self, name: str):
+        value = self.value
+        if self._fn is not None:
+            try:
+                value = float(self._fn())
+            except Exception:
+                value = float("nan")
+        yield name, "", value
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "counts", "sum", "_lock")
+
+    def __init__(self, metric):
+        self._upper = metric.buckets
+        # Poslední přihrádka = nad nejvyšší hranicí (+Inf)
+        self.counts = [0] * (len(self._upper) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self._upper, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self, name: str):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for upper, n in zip(self._upper + (float("inf"),), counts):
+            cumulative += n
+            yield name + "_bucket", f'le="{_fmt(upper)}"', cumulative
+        yield name + "_sum", "", total
+        yield name + "_count", "", cumulative
+
+
+class _Metric:
+    kind = ""
+    child_class = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """Potomek pro danou kombinaci hodnot labelů (všechny labely jsou povinné)."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metrika {self.name} očekává labely {list(self.labelnames)}, dostala {sorted(labels)}")
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self.child_class(self))
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Metrika {self.name} má labely {list(self.labelnames)}, použijte labels().")
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation, quotes=False)}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            for name, extra, value in child.samples(self.name):
+                lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_fmt(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+    child_class = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set_function(self, fn: Callable[[], float]):
+        self._default().set_function(fn)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    child_class = _HistogramChild
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != float("inf")))
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self, **labels) -> _Timer:
+        """Context manager i dekorátor: `with h.time(op="x"):` / `@h.time(op="x")`."""
+        return _Timer(self.labels(**labels))
+
+
+class Registry:
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        full = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            existing = self._metrics.get(full)
+            if existing is not None:
+                # Opakovaný import modulu (testy) vrátí stejnou metriku
+                if type(existing) is not cls or existing.labelnames != tuple(labelnames):
+                    raise ValueError(f"Metrika {full} je už registrovaná s jiným typem nebo labely.")
+                return existing
+            metric = self._metrics[full] = cls(full, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name) or self._metrics.get(f"{self.namespace}_{name}")
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: doba a počet HTTP požadavků podle šablony routy
+    (/bots/{bot_id}, ne konkrétní ID) a status kódu. Websockety prochází beze změny.
+    """
+
+    def __init__(self, app, registry_: Optional[Registry] = None):
+        self.app = app
+        reg = registry_ or registry
+        self.seconds = reg.histogram("http_request_seconds", "Doba zpracování HTTP požadavku",
+                                     ["method", "route", "status"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Router doplní "route" do scope až při shodě; nenalezené cesty sdílí jeden label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.seconds.labels(method=scope["method"], route=route, status=status).observe(
+                time.perf_counter() - started)
+
+
+# Singleton instance
+registry = Registry()
@@ -1,36 +1,246 @@
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-import joblib
 import os
+import re
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from backend.metrics import registry, COMPUTE_BUCKETS
 
+PREDICT_SECONDS = registry.histogram("predict_seconds", "Doba predikce modelu", ["model"], buckets=COMPUTE_BUCKETS)
+
+# Původní jediný artefakt – čte se jen jako fallback, dokud registr nemá žádnou verzi
 MODEL_PATH = "backend/model.pkl"
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "backend/models")
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "5"))
+# Artefakty větší než tento limit (bajty) se načítají jako memory-mapped (joblib mmap_mode="r")
+MODEL_MMAP_BYTES = int(os.getenv("MODEL_MMAP_BYTES", str(1 << 20)))
+DEFAULT_SYMBOL = os.getenv("MODEL_DEFAULT_SYMBOL", "BTCUSDT")
+# Po této době (s) se živý model ověří proti CURRENT na disku (rollback/publish z jiného workeru)
+MODEL_CURRENT_TTL = float(os.getenv("MODEL_CURRENT_TTL", "2.0"))
+
+_VERSION_RE = re.compile(r"v(\d+)\.pkl")
+_SYMBOL_RE = re.compile(r"[A-Za-z0-9_\-]+")
+
+
+class ModelRegistryError(Exception):
+    pass
+
+
+def linear_regression():
+    """Výchozí model registru; scikit-learn se načítá až při prvním tréninku (rychlý start)."""
+    from sklearn.linear_model import LinearRegression
+    return LinearRegression()
+
+
+class ModelRegistry:
+    """
+    Verzované modely po symbolech: `{root}/{symbol}/v{n}.pkl` + ukazatel `CURRENT`.
+
+    Trénink probíhá mimo zámek do nového artefaktu; živý model se pak vymění
+    jediným přiřazením reference, takže predict nikdy nečeká na trénink ani
+    na zápis na disk. Drží se posledních `keep` verzí pro rollback.
+
+    Ostatní procesy (uvicorn workery) se o změně `CURRENT` dozví nejpozději
+    za `current_ttl` sekund: živý model se pak znovu načte z disku.
+    """
+
+    def __init__(self, root: str = MODEL_REGISTRY_DIR, keep: int = MODEL_KEEP_VERSIONS,
+                 mmap_bytes: int = MODEL_MMAP_BYTES, factory: Callable = linear_regression,
+                 legacy_path: Optional[str] = None, current_ttl: float = MODEL_CURRENT_TTL):
+        self.root = root
+        self.legacy_path = legacy_path
+        self.keep = max(1, keep)
+        self.mmap_bytes = mmap_bytes
+        self.factory = factory
+        self.current_ttl = current_ttl
+        # symbol -> (verze, model); čtení bez zámku, zápis jen výměnou celé dvojice
+        self._live: Dict[str, Tuple[int, object]] = {}
+        # symbol -> čas (monotonic) posledního ověření živé verze proti CURRENT
+        self._checked: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _dir(self, symbol: str) -> str:
+        if not _SYMBOL_RE.fullmatch(symbol or ""):
+            raise ModelRegistryError(f"Neplatný symbol modelu: {symbol!r}")
+        return os.path.join(self.root, symbol)
+
+    def _path(self, symbol: str, version: int) -> str:
+        return os.path.join(self._dir(symbol), f"v{version}.pkl")
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    # --- verze na disku ---
+
+    def versions(self, symbol: str) -> List[int]:
+        try:
+            names = os.listdir(self._dir(symbol))
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_VERSION_RE.fullmatch, names) if m)
+
+    def current_version(self, symbol: str) -> Optional[int]:
+        live = self._live_entry(symbol)
+        if live is not None:
+            return live[0]
+        return self._read_current(symbol)
+
+    def _read_current(self, symbol: str) -> Optional[int]:
+        try:
+            with open(os.path.join(self._dir(symbol), "CURRENT")) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            versions = self.versions(symbol)
+            return versions[-1] if versions else None
+
+    def _set_live(self, symbol: str, version: int, model):
+        self._live[symbol] = (version, model)
+        self._checked[symbol] = time.monotonic()
+
+    def _live_entry(self, symbol: str) -> Optional[Tuple[int, object]]:
+        """Živá dvojice (verze, model), pokud se CURRENT na disku mezitím nezměnil."""
+        live = self._live.get(symbol)
+        if live is None:
+            return None
+        now = time.monotonic()
+        if now - self._checked.get(symbol, 0.0) < self.current_ttl:
+            return live
+        self._checked[symbol] = now
+        version = self._read_current(symbol)
+        if version is None or version == live[0]:
+            return live
+        # Verzi přepnul jiný proces: model se znovu načte z disku
+        if self._live.get(symbol) is live:
+            self._live.pop(symbol, None)
+        return None
+
+    def _write_current(self, symbol: str, version: int):
+        path = os.path.join(self._dir(symbol), "CURRENT")
+        with open(path + ".tmp", "w") as f:
+            f.write(str(version))
+        os.replace(path + ".tmp", path)
+
+    def _load_file(self, path: str):
+        import joblib
+        mmap_mode = "r" if os.path.getsize(path) >= self.mmap_bytes else None
+        return joblib.load(path, mmap_mode=mmap_mode)
+
+    # --- trénink a publikace ---
+
+    def train(self, symbol: str, X, y) -> int:
+        """Natrénuje nový model a publikuje ho jako další verzi; vrací číslo verze."""
+        model = self.factory()
+        model.fit(X, y)
+        return self.publish(symbol, model)
+
+    def publish(self, symbol: str, model) -> int:
+        import joblib
+        with self._lock(symbol):
+            os.makedirs(self._dir(symbol), exist_ok=True)
+            versions = self.versions(symbol)
+            version = versions[-1] + 1 if versions else 1
+            path = self._path(symbol, version)
+            # Zápis do dočasného souboru a os.replace – čtenář nikdy neuvidí poloviční artefakt
+            joblib.dump(model, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            self._write_current(symbol, version)
+            self._set_live(symbol, version, model)
+            self._prune(symbol, versions + [version])
+            return version
+
+    def _prune(self, symbol: str, versions: List[int]):
+        for version in versions[:-self.keep]:
+            try:
+                os.remove(self._path(symbol, version))
+            except FileNotFoundError:
+                pass
+
+    def activate(self, symbol: str, version: int):
+        """Přepne živý model na uloženou verzi."""
+        with self._lock(symbol):
+            path = self._path(symbol, version)
+            if not os.path.exists(path):
+                raise ModelRegistryError(f"Model {symbol} v{version} neexistuje")
+            model = self._load_file(path)
+            self._write_current(symbol, version)
+            self._set_live(symbol, version, model)
+
+    def rollback(self, symbol: str, version: Optional[int] = None) -> int:
+        """Vrátí se na zadanou, jinak předchozí uloženou verzi; vrací aktivní verzi."""
+        if version is None:
+            current = self.current_version(symbol)
+            older = [v for v in self.versions(symbol) if current is None or v < current]
+            if not older:
+                raise ModelRegistryError(f"Pro {symbol} není starší verze modelu")
+            version = older[-1]
+        self.activate(symbol, version)
+        return version
+
+    # --- inference ---
+
+    def get(self, symbol: str):
+        """Živý model symbolu (načte se při prvním přístupu nebo po změně CURRENT, jinak z paměti)."""
+        live = self._live_entry(symbol)
+        if live is not None:
+            return live[1]
+        with self._lock(symbol):
+            live = self._live.get(symbol)
+            if live is not None:
+                return live[1]
+            version = self._read_current(symbol)
+            if version is not None and os.path.exists(self._path(symbol, version)):
+                self._set_live(symbol, version, self._load_file(self._path(symbol, version)))
+                return self._live[symbol][1]
+            if symbol == DEFAULT_SYMBOL and self.legacy_path and os.path.exists(self.legacy_path):
+                import joblib
+                self._set_live(symbol, 0, joblib.load(self.legacy_path))
+                return self._live[symbol][1]
+            return None
+
+    def preload(self, symbols: Optional[List[str]] = None):
+        """Načte aktuální verze předem (při startu), aby první predict nečetl z disku."""
+        if symbols is None:
+            symbols = os.listdir(self.root) if os.path.isdir(self.root) else []
+        for symbol in symbols:
+            self.get(symbol)
+
+    @PREDICT_SECONDS.time(model="registry")
+    def predict(self, symbol: str, X):
+        model = self.get(symbol)
+        if model is not None:
+            return model.predict(X)
+        return np.zeros(len(X))
+
+    def info(self, symbol: str) -> dict:
+        return {"symbol": symbol, "current": self.current_version(symbol), "versions": self.versions(symbol)}
+
 
 class TimeSeriesModel:
-    def __init__(self):
-        self.model = None
+    """Zpětně kompatibilní fasáda nad registrem pro jeden symbol."""
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, symbol: str = DEFAULT_SYMBOL):
+        self.registry = registry or model_registry
+        self.symbol = symbol
+
+    @property
+    def model(self):
+        return self.registry.get(self.symbol)
 
     def fit(self, X, y):
-        self.model = LinearRegression()
-        self.model.fit(X, y)
-        self.save()
+        self.registry.train(self.symbol, X, y)
 
     def predict(self, X):
-        if self.model is None:
-            self.load()
-        if self.model is not None:
-            return self.model.predict(X)
-        return np.zeros(len(X))
+        return self.registry.predict(self.symbol, X)
 
     def save(self):
-        if self.model is not None:
-            joblib.dump(self.model, MODEL_PATH)
+        # Každý fit se ukládá jako nová verze při publikaci
+        pass
 
     def load(self):
-        if os.path.exists(MODEL_PATH):
-            self.model = joblib.load(MODEL_PATH)
-        else:
-            self.model = None
+        self.registry.get(self.symbol)
 
 # Singleton instance
-ts_model = TimeSeriesModel()
\ No newline at end of file
+model_registry = ModelRegistry(legacy_path=MODEL_PATH)
+ts_model = TimeSeriesModel(model_registry)
@@ -0,0 +1,297 @@
+"""
+Lokální order book pro každý symbol, udržovaný z DEPTH zpráv websocket feedu.
+
+Každá strana knihy je seřazené pole cen (bisect) a slovník cena -> množství.
+Pole je seřazené tak, že nejlepší cena je na konci (bidy vzestupně, asky
+přes zápornou cenu), takže:
+- nejlepší bid/ask je O(1) (poslední prvek pole),
+- změna množství existující úrovně je O(1) (jen slovník),
+- nová / zrušená úroveň je O(log n) hledání + posun jen úrovní za ní – změny
+  jsou převážně u vrcholu knihy, tedy na konci pole.
+
+Zprávy bez `action` jsou snapshoty (Pionex posílá v DEPTH horních N úrovní)
+a knihu nahradí. Zprávy s `"action": "UPDATE"` jsou diffy (množství 0 =
+zrušená úroveň); nesou-li `seq` / `prevSeq`, mezera v číslování knihu označí
+jako neplatnou a resync() ji obnoví z REST snapshotu (get_market_depth).
+"""
+import os
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("orderbook")
+logger.setLevel(logging.INFO)
+
+ORDERBOOK_MAX_LEVELS = int(os.getenv("ORDERBOOK_MAX_LEVELS", "1000"))
+# Kniha bez aktualizace déle než tato doba (ms) se nepovažuje za aktuální
+ORDERBOOK_MAX_AGE_MS = int(os.getenv("ORDERBOOK_MAX_AGE_MS", "5000"))
+ORDERBOOK_SNAPSHOT_LIMIT = int(os.getenv("ORDERBOOK_SNAPSHOT_LIMIT", "100"))
+# Diffy přijaté během resyncu se drží a po snapshotu přehrají (nejvýše tolik)
+ORDERBOOK_PENDING_DIFFS = 1000
+
+Level = Tuple[float, float]
+
+
+class BookSide:
+    """Jedna strana knihy; `_keys` je seřazené vzestupně a nejlepší cena je poslední."""
+
+    __slots__ = ("is_bid", "_keys", "sizes", "max_levels")
+
+    def __init__(self, is_bid: bool, max_levels: int = ORDERBOOK_MAX_LEVELS):
+        self.is_bid = is_bid
+        self._keys: List[float] = []
+        self.sizes: Dict[float, float] = {}
+        self.max_levels = max_levels
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _key(self, price: float) -> float:
+        return price if self.is_bid else -price
+
+    def update(self, price: float, size: float):
+        sizes = self.sizes
+        if size > 0:
+            if price in sizes:
+                sizes[price] = size
+                return
+            sizes[price] = size
+            keys = self._keys
+            key = price if self.is_bid else -price
+            if not keys or key > keys[-1]:
+                keys.append(key)  # nový vrchol knihy
+            else:
+                keys.insert(bisect_left(keys, key), key)
+            if len(keys) > self.max_levels:
+                # Ořez nejvzdálenějších úrovní (začátek pole)
+                excess = len(keys) - self.max_levels
+                for k in keys[:excess]:
+                    del sizes[k if self.is_bid else -k]
+                del keys[:excess]
+        elif price in sizes:
+            del sizes[price]
+            keys = self._keys
+            key = price if self.is_bid else -price
+            if keys[-1] == key:
+                keys.pop()
+            else:
+                del keys[bisect_left(keys, key)]
+
+    def replace(self, levels: Iterable[Level]):
+        self.sizes = {p: s for p, s in levels if s > 0}
+        self._keys = sorted(self._key(p) for p in self.sizes)[-self.max_levels:]
+        if len(self._keys) < len(self.sizes):
+            kept = {self._key(k) for k in self._keys}
+            self.sizes = {p: s for p, s in self.sizes.items() if p in kept}
+
+    def best(self) -> Optional[Level]:
+        if not self._keys:
+            return None
+        price = self._key(self._keys[-1])
+        return price, self.sizes[price]
+
+    def levels(self, depth: int) -> List[Level]:
+        """Nejlepších `depth` úrovní od vrcholu knihy."""
+        keys = self._keys[:-depth - 1:-1] if depth > 0 else []
+        return [(p, self.sizes[p]) for p in (self._key(k) for k in keys)]
+
+    def volume(self, depth: int) -> float:
+        return sum(self.sizes[self._key(k)] for k in self._keys[:-depth - 1:-1])
+
+
+class OrderBook:
+    def __init__(self, symbol: str, max_levels: int = ORDERBOOK_MAX_LEVELS):
+        self.symbol = symbol
+        self.bids = BookSide(True, max_levels)
+        self.asks = BookSide(False, max_levels)
+        self.seq: Optional[int] = None
+        self.ts_ms: Optional[int] = None
+        self.synced = False
+        self.pending: List[tuple] = []
+        self.stats = {"snapshots": 0, "updates": 0, "gaps": 0}
+
+    # --- zápis ---
+
+    def apply_snapshot(self, bids: Iterable[Level], asks: Iterable[Level], ts_ms: Optional[int] = None,
+                       seq: Optional[int] = None):
+        self.bids.replace(bids)
+        self.asks.replace(asks)
+        self.seq = seq
+        self.ts_ms = ts_ms if ts_ms is not None else int(time.time() * 1000)
+        self.synced = True
+        self.stats["snapshots"] += 1
+        pending, self.pending = self.pending, []
+        if seq is not None:
+            # Diffy novější než snapshot navážou (starší apply_diff přeskočí)
+            for diff in pending:
+                if not self.apply_diff(*diff):
+                    break
+
+    def apply_diff(self, bids: Iterable[Level], asks: Iterable[Level], ts_ms: Optional[int] = None,
+                   seq: Optional[int] = None, prev_seq: Optional[int] = None) -> bool:
+        """Aplikuje diff; při mezeře v sekvenci vrátí False a kniha čeká na resync."""
+        if not self.synced:
+            if seq is not None and len(self.pending) < ORDERBOOK_PENDING_DIFFS:
+                self.pending.append((list(bids), list(asks), ts_ms, seq, prev_seq))
+            return False
+        if seq is not None and self.seq is not None:
+            if seq <= self.seq:
+                return True  # starý diff (již obsažený ve snapshotu)
+            if prev_seq is not None and prev_seq != self.seq:
+                self.synced = False
+                self.pending = [(list(bids), list(asks), ts_ms, seq, prev_seq)]
+                self.stats["gaps"] += 1
+                logger.warning(f"Mezera v DEPTH diffech {self.symbol} ({self.seq} -> {prev_seq}), čeká na resync")
+                return False
+        for price, size in bids:
+            self.bids.update(price, size)
+        for price, size in asks:
+            self.asks.update(price, size)
+        if seq is not None:
+            self.seq = seq
+        self.ts_ms = ts_ms if ts_ms is not None else int(time.time() * 1000)
+        self.stats["updates"] += 1
+        return True
+
+    # --- čtení ---
+
+    def best_bid(self) -> Optional[Level]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Level]:
+        return self.asks.best()
+
+    def spread(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        return ask[0] - bid[0] if bid and ask else None
+
+    def mid(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        return (ask[0] + bid[0]) / 2 if bid and ask else None
+
+    def imbalance(self, depth: int = 5) -> Optional[float]:
+        """(objem bidů - objem asků) / součet přes horních `depth` úrovní, v rozsahu <-1, 1>."""
+        bid_volume, ask_volume = self.bids.volume(depth), self.asks.volume(depth)
+        total = bid_volume + ask_volume
+        return (bid_volume - ask_volume) / total if total else None
+
+    def is_fresh(self, max_age_ms: int = ORDERBOOK_MAX_AGE_MS, now_ms: Optional[int] = None) -> bool:
+        if not self.synced or self.ts_ms is None:
+            return False
+        return (now_ms if now_ms is not None else time.time() * 1000) - self.ts_ms <= max_age_ms
+
+    def top(self, depth: int = 5) -> dict:
+        bid, ask = self.bids.best(), self.asks.best()
+        spread = ask[0] - bid[0] if bid and ask else None
+        return {
+            "symbol": self.symbol,
+            "bid": bid[0] if bid else None,
+            "bid_size": bid[1] if bid else None,
+            "ask": ask[0] if ask else None,
+            "ask_size": ask[1] if ask else None,
+            "spread": spread,
+            "spread_pct": spread / ((ask[0] + bid[0]) / 2) * 100 if spread is not None else None,
+            "imbalance": self.imbalance(depth),
+            "timestamp": self.ts_ms,
+            "synced": self.synced,
+        }
+
+    def depth(self, limit: int = 20) -> dict:
+        """Hloubka ve tvaru odpovědi REST get_market_depth."""
+        return {"symbol": self.symbol, "bids": self.bids.levels(limit), "asks": self.asks.levels(limit),
+                "timestamp": self.ts_ms}
+
+
+def is_diff(msg: dict) -> bool:
+    return str(msg.get("action", "")).upper() == "UPDATE"
+
+
+def _levels(raw: Optional[Sequence]) -> List[Level]:
+    return [(float(level[0]), float(level[1])) for level in raw or []]
+
+
+class OrderBookManager:
+    """Knihy všech symbolů; vstup z DEPTH zpráv feedu a REST snapshotů."""
+
+    def __init__(self, max_levels: int = ORDERBOOK_MAX_LEVELS, api_factory: Optional[Callable] = None):
+        self.max_levels = max_levels
+        self.books: Dict[str, OrderBook] = {}
+        # Zdroj REST snapshotů pro automatický resync (např. get_async_pionex); None = jen ruční resync
+        self.api_factory = api_factory
+        self._resync_tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        return self.books.get(symbol)
+
+    def book(self, symbol: str) -> OrderBook:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol, self.max_levels)
+        return book
+
+    def fresh(self, symbol: str, max_age_ms: int = ORDERBOOK_MAX_AGE_MS) -> Optional[OrderBook]:
+        book = self.books.get(symbol)
+        return book if book is not None and book.is_fresh(max_age_ms) else None
+
+    def handle_depth(self, msg: dict) -> bool:
+        """Zpracuje DEPTH zprávu feedu (snapshot nebo diff); False = kniha potřebuje resync."""
+        data = msg.get("data") or {}
+        book = self.book(msg["symbol"])
+        ts_ms = msg.get("timestamp")
+        bids, asks = _levels(data.get("bids")), _levels(data.get("asks"))
+        if is_diff(msg):
+            if book.apply_diff(bids, asks, ts_ms, msg.get("seq"), msg.get("prevSeq")):
+                return True
+            self.schedule_resync(book.symbol)
+            return False
+        book.apply_snapshot(bids, asks, ts_ms, msg.get("seq"))
+        return True
+
+    def schedule_resync(self, symbol: str):
+        """Spustí resync na pozadí (nejvýše jeden na symbol)."""
+        if self.api_factory is None or symbol in self._resync_tasks:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._resync_tasks[symbol] = loop.create_task(self._resync_task(symbol))
+
+    async def _resync_task(self, symbol: str):
+        try:
+            await self.resync(self.api_factory(), symbol)
+            logger.info(f"Kniha {symbol} obnovena z REST snapshotu")
+        except Exception as e:
+            logger.warning(f"Resync knihy {symbol} selhal: {e}")
+        finally:
+            self._resync_tasks.pop(symbol, None)
+
+    def apply_rest_snapshot(self, symbol: str, resp) -> OrderBook:
+        data = resp.get("data", resp) if isinstance(resp, dict) else {}
+        book = self.book(symbol)
+        book.apply_snapshot(_levels(data.get("bids")), _levels(data.get("asks")),
+                            data.get("updateTime") or data.get("timestamp"), data.get("seq"))
+        return book
+
+    async def resync(self, api, symbol: str, limit: int = ORDERBOOK_SNAPSHOT_LIMIT) -> OrderBook:
+        """Obnoví knihu z REST snapshotu (AsyncPionexAPI.get_market_depth)."""
+        return self.apply_rest_snapshot(symbol, await api.get_market_depth(symbol, limit))
+
+    async def resync_stale(self, api, limit: int = ORDERBOOK_SNAPSHOT_LIMIT) -> List[str]:
+        stale = [s for s, book in self.books.items() if not book.synced]
+        for symbol in stale:
+            try:
+                await self.resync(api, symbol, limit)
+            except Exception as e:
+                logger.warning(f"Resync knihy {symbol} selhal: {e}")
+        return stale
+
+    def info(self) -> dict:
+        return {s: {**b.stats, "synced": b.synced, "bids": len(b.bids), "asks": len(b.asks), "timestamp": b.ts_ms}
+                for s, b in self.books.items()}
+
+
+# Singleton instance
+order_books = OrderBookManager()
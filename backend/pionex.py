@@ -1,10 +1,14 @@
 import os
+import re
 import time
-import threading
-from collections import deque
-import requests
-from typing import Any, Dict, Optional, List, Callable
-from requests.exceptions import RequestException, HTTPError
+import uuid
+import asyncio
+import httpx
+from collections import OrderedDict
+from typing import Any, Dict, Optional, List, Iterable
+from backend.ratelimit import RateLimiter, get_rate_limiter
+from backend.coalesce import RequestCoalescer
+from backend.metrics import registry
 
 class PionexAPIError(Exception):
     pass
@@ -12,22 +16,64 @@ class PionexAPIError(Exception):
 class PionexRateLimitError(PionexAPIError):
     pass
 
+REQUEST_SECONDS = registry.histogram("pionex_request_seconds", "Latence jednoho HTTP pokusu na Pionex API",
+                                     ["method", "endpoint"])
+RETRIES = registry.counter("pionex_retries_total", "Opakované pokusy volání Pionex API (429 / chyba)",
+                           ["endpoint", "reason"])
+RATE_LIMITED = registry.counter("pionex_rate_limited_total", "Odpovědi 429 z Pionex API", ["endpoint"])
+FAILURES = registry.counter("pionex_failures_total", "Volání Pionex API neúspěšná i po opakování", ["endpoint"])
+
+# ID objednávek v cestě by labelům dávala neomezenou kardinalitu
+_ORDER_ID_PATH = re.compile(r"^(/api/v1/orders/(?:client-order-id/)?)[^/]+$")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Cesta endpointu pro label metrik (/api/v1/orders/123 -> /api/v1/orders/{id})."""
+    return _ORDER_ID_PATH.sub(r"\1{id}", endpoint)
+
+
+def _record_retry(endpoint: str, rate_limited: bool):
+    if rate_limited:
+        RATE_LIMITED.labels(endpoint=endpoint).inc()
+    RETRIES.labels(endpoint=endpoint, reason="429" if rate_limited else "error").inc()
+
+
+def normalize_list(resp: Any, key: str) -> List[Dict[str, Any]]:
+    """Seznam položek z odpovědi (holý seznam i obálka {"data": {key: [...]}}), např. orders / fills."""
+    if isinstance(resp, dict):
+        data = resp.get("data", resp)
+        resp = data.get(key, []) if isinstance(data, dict) else data
+    return list(resp or [])
+
+def new_client_order_id(prefix: str = "pb") -> str:
+    """Unikátní client order ID (Pionex přijímá max. 64 znaků)."""
+    return f"{prefix}-{uuid.uuid4().hex}"
+
+# Pořadí v dávce objednávek: nejdřív rušení, pak výstupy z pozic, nakonec nové vstupy
+PRIORITY_CANCEL, PRIORITY_EXIT, PRIORITY_ENTRY = 0, 1, 2
+
+def normalize_klines(resp: Any) -> List[Dict[str, Any]]:
+    """Vrátí seznam svíček z odpovědi get_klines (holý seznam i obálka {"data": {"klines": [...]}})."""
+    return normalize_list(resp, "klines")
+
 class PionexAPI:
-    BASE_URL = "https://api.pionex.com"
+    # Přepsatelné např. na lokální falešnou burzu (backend/bench/mock_exchange.py)
+    BASE_URL = os.getenv("PIONEX_BASE_URL", "https://api.pionex.com")
     MAX_RETRIES = 5
     BACKOFF_FACTOR = 2
 
-    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 rate_limiter: Optional[RateLimiter] = None, coalescer: Optional[RequestCoalescer] = None):
         self.api_key = api_key or os.getenv("PIONEX_API_KEY")
         self.api_secret = api_secret or os.getenv("PIONEX_API_SECRET")
         if not self.api_key or not self.api_secret:
             raise ValueError("Pionex API klíče nejsou nastaveny.")
-        # Rate limiting: max 10 requests per second, else wait 10s
-        self._rate_lock = threading.Lock()
-        self._rate_timestamps = deque()
-        self._rate_limit = 10
-        self._rate_window = 1  # vteřina
-        self._rate_wait = 10   # sekund
+        # Rate limiting: sdílený GCRA limiter s oddělenými buckety pro objednávky, účet a tržní data
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        # Stejné souběžné GET požadavky sdílí jedno volání, odpovědi krátce cachované podle třídy endpointu
+        self.coalescer = coalescer or RequestCoalescer()
+        # Session drží keep-alive spojení mezi voláními (vytvoří se při prvním požadavku)
+        self._session = None
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -36,41 +82,43 @@ class PionexAPI:
         }
 
     def _request(self, method: str, endpoint: str, **kwargs) -> Any:
-        # Rate limiting
-        with self._rate_lock:
-            now = time.time()
-            # Odstraň staré záznamy mimo okno
-            while self._rate_timestamps and now - self._rate_timestamps[0] > self._rate_window:
-                self._rate_timestamps.popleft()
-            if len(self._rate_timestamps) >= self._rate_limit:
-                # Pokud je limit dosažen, čekej 10 sekund
-                time.sleep(self._rate_wait)
-                # Po čekání znovu zkontroluj a vyčisti frontu
-                now = time.time()
-                while self._rate_timestamps and now - self._rate_timestamps[0] > self._rate_window:
-                    self._rate_timestamps.popleft()
-            self._rate_timestamps.append(time.time())
+        return self.coalescer.call(method, endpoint, kwargs, lambda: self._send(method, endpoint, **kwargs))
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> Any:
+        import requests
+        from requests.exceptions import RequestException, HTTPError
+        if self._session is None:
+            self._session = requests.Session()
+        # Rate limiting (čeká jen do uvolnění slotu, bez držení zámku)
+        self.rate_limiter.acquire(method, endpoint)
 
         url = f"{self.BASE_URL}{endpoint}"
+        label = endpoint_label(endpoint)
+        timer = REQUEST_SECONDS.labels(method=method, endpoint=label)
         retries = 0
         delay = 1
         while retries < self.MAX_RETRIES:
             try:
-                resp = requests.request(method, url, headers=self._headers(), timeout=10, **kwargs)
+                with timer.time():
+                    resp = self._session.request(method, url, headers=self._headers(), timeout=10, **kwargs)
                 if resp.status_code == 429:
                     raise PionexRateLimitError("Rate limit exceeded")
                 resp.raise_for_status()
                 return resp.json()
             except PionexRateLimitError:
+                _record_retry(label, rate_limited=True)
                 time.sleep(delay)
                 delay *= self.BACKOFF_FACTOR
                 retries += 1
             except (RequestException, HTTPError) as e:
                 if retries >= self.MAX_RETRIES - 1:
+                    FAILURES.labels(endpoint=label).inc()
                     raise PionexAPIError(f"Chyba komunikace s Pionex API: {e}")
+                _record_retry(label, rate_limited=False)
                 time.sleep(delay)
                 delay *= self.BACKOFF_FACTOR
                 retries += 1
+        FAILURES.labels(endpoint=label).inc()
         raise PionexAPIError("Maximální počet pokusů o komunikaci s Pionex API byl vyčerpán.")
 
     # --- Veřejné metody pro obchodní logiku ---
@@ -84,8 +132,9 @@ class PionexAPI:
         params = {"symbol": symbol} if symbol else {}
         return self._request("GET", "/api/v1/orders", params=params)
 
-    def place_order(self, symbol: str, side: str, price: float, quantity: float, type_: str = "LIMIT") -> Dict[str, Any]:
-        """Vytvoří novou objednávku."""
+    def place_order(self, symbol: str, side: str, price: Optional[float], quantity: float, type_: str = "LIMIT",
+                    client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        """Vytvoří novou objednávku (MARKET bez ceny; client_order_id burza použije pro deduplikaci)."""
         data = {
             "symbol": symbol,
             "side": side,
@@ -93,6 +142,10 @@ class PionexAPI:
             "quantity": quantity,
             "type": type_
         }
+        if price is None:
+            del data["price"]
+        if client_order_id:
+            data["clientOrderId"] = client_order_id
         return self._request("POST", "/api/v1/orders", json=data)
 
     def cancel_order(self, order_id: str) -> Dict[str, Any]:
@@ -116,14 +169,26 @@ class PionexAPI:
         params = {"symbol": symbol} if symbol else {}
         return self._request("GET", "/api/v1/openOrders", params=params)
 
-    def get_all_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Získá všechny objednávky (volitelně pro symbol)."""
+    def get_all_orders(self, symbol: Optional[str] = None, start_time: Optional[int] = None,
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Získá všechny objednávky (volitelně pro symbol, od start_time v ms)."""
         params = {"symbol": symbol} if symbol else {}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if limit is not None:
+            params["limit"] = limit
         return self._request("GET", "/api/v1/allOrders", params=params)
 
-    def get_fills(self, order_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Získá fill (provedené obchody) pro objednávku nebo všechny."""
+    def get_fills(self, order_id: Optional[str] = None, symbol: Optional[str] = None,
+                  start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Získá fill (provedené obchody) pro objednávku nebo všechny (volitelně pro symbol a časové okno v ms)."""
         params = {"orderId": order_id} if order_id else {}
+        if symbol:
+            params["symbol"] = symbol
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
         return self._request("GET", "/api/v1/fills", params=params)
 
     def cancel_all_orders(self, symbol: Optional[str] = None) -> Dict[str, Any]:
@@ -151,7 +216,188 @@ class PionexAPI:
         params = {"symbol": symbol}
         return self._request("GET", "/api/v1/ticker/bookTicker", params=params)
 
-    def get_klines(self, symbol: str, interval: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Získá historická OHLCV data (klíny) pro symbol."""
+    def get_klines(self, symbol: str, interval: str, limit: int = 100, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Získá historická OHLCV data (klíny) pro symbol (volitelně končící v end_time, ms)."""
         params = {"symbol": symbol, "interval": interval, "limit": limit}
-        return self._request("GET", "/api/v1/klines", params=params)
\ No newline at end of file
+        if end_time is not None:
+            params["endTime"] = end_time
+        return self._request("GET", "/api/v1/klines", params=params)
+
+class AsyncPionexAPI(PionexAPI):
+    """
+    Asyncio varianta PionexAPI se sdíleným keep-alive poolem spojení (httpx).
+
+    Veřejné metody jsou zděděné z PionexAPI beze změny – protože `_request`
+    je zde korutina, každá z nich vrací awaitable:
+        order = await api.place_order("BTCUSDT", "BUY", 100.0, 0.1)
+    V rámci procesu se má používat jediná instance, viz get_async_pionex().
+    """
+    MAX_CONNECTIONS = int(os.getenv("PIONEX_MAX_CONNECTIONS", "20"))
+
+    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 client: Optional[httpx.AsyncClient] = None, rate_limiter: Optional[RateLimiter] = None,
+                 coalescer: Optional[RequestCoalescer] = None):
+        super().__init__(api_key, api_secret, rate_limiter, coalescer)
+        self._session = None
+        # client order ID -> výsledek úspěšně zadané objednávky (idempotence dávek)
+        self._placed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Hlavičky jdou s každým požadavkem – injektovaný klient (testy, mock burza) je nemá ve výchozích
+        self._auth_headers = self._headers()
+        self._client = client or httpx.AsyncClient(
+            base_url=self.BASE_URL,
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=self.MAX_CONNECTIONS,
+                max_keepalive_connections=self.MAX_CONNECTIONS,
+            ),
+        )
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> Any:
+        return await self.coalescer.call_async(method, endpoint, kwargs, lambda: self._send(method, endpoint, **kwargs))
+
+    async def _send(self, method: str, endpoint: str, **kwargs) -> Any:
+        # Rate limiting (stejný sdílený limiter jako synchronní klient, čeká bez blokování event loopu)
+        await self.rate_limiter.acquire_async(method, endpoint)
+
+        label = endpoint_label(endpoint)
+        timer = REQUEST_SECONDS.labels(method=method, endpoint=label)
+        retries = 0
+        delay = 1
+        while retries < self.MAX_RETRIES:
+            try:
+                with timer.time():
+                    resp = await self._client.request(method, endpoint, headers=self._auth_headers, **kwargs)
+                if resp.status_code == 429:
+                    raise PionexRateLimitError("Rate limit exceeded")
+                resp.raise_for_status()
+                return resp.json()
+            except PionexRateLimitError:
+                _record_retry(label, rate_limited=True)
+                await asyncio.sleep(delay)
+                delay *= self.BACKOFF_FACTOR
+                retries += 1
+            except httpx.HTTPError as e:
+                if retries >= self.MAX_RETRIES - 1:
+                    FAILURES.labels(endpoint=label).inc()
+                    raise PionexAPIError(f"Chyba komunikace s Pionex API: {e}")
+                _record_retry(label, rate_limited=False)
+                await asyncio.sleep(delay)
+                delay *= self.BACKOFF_FACTOR
+                retries += 1
+        FAILURES.labels(endpoint=label).inc()
+        raise PionexAPIError("Maximální počet pokusů o komunikaci s Pionex API byl vyčerpán.")
+
+    # --- Dávkové objednávky ---
+
+    BATCH_CONCURRENCY = int(os.getenv("PIONEX_BATCH_CONCURRENCY", "10"))
+    # Kolik posledních client order ID si klient pamatuje pro opakované odeslání stejné dávky
+    PLACED_MEMORY = 10_000
+
+    async def submit_batch(self, cancels: Iterable[str] = (), orders: Iterable[Dict[str, Any]] = (),
+                           max_concurrent: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Zruší objednávky a zadá nové souběžně v rámci rate limitu.
+
+        Objednávka je dict s klíči symbol, side, quantity, volitelně price (bez ceny MARKET),
+        type, client_order_id a exit (výstup z pozice). Požadavky se odbavují v pořadí
+        rušení -> výstupy -> vstupy; protože slot v limiteru si každý rezervuje při odeslání,
+        dostanou rušení a výstupy budget jako první. Souběžně běží max. `max_concurrent`.
+
+        Výsledky jsou ve stejném pořadí jako vstup: {"ok", "order"/"error", ...}. Objednávky
+        bez client_order_id ho dostanou vygenerované; stejné ID v dávce se odešle jen jednou
+        a po chybě se ověří na burze (get_order_by_client_id), takže opakované odeslání
+        dávky se stejnými ID nezdvojí objednávky.
+        """
+        cancels, orders = list(cancels), [dict(o) for o in orders]
+        for order in orders:
+            order["client_order_id"] = order.get("client_order_id") or new_client_order_id()
+        jobs = [(PRIORITY_CANCEL, i, "cancel", order_id) for i, order_id in enumerate(cancels)]
+        jobs += [(PRIORITY_EXIT if o.get("exit") else PRIORITY_ENTRY, i, "order", o) for i, o in enumerate(orders)]
+        jobs.sort(key=lambda job: job[:2])
+
+        results = {"cancels": [None] * len(cancels), "orders": [None] * len(orders)}
+        placing: Dict[str, asyncio.Future] = {}
+        queue = iter(jobs)
+
+        async def worker():
+            for _, i, kind, item in queue:
+                if kind == "cancel":
+                    results["cancels"][i] = await self._cancel_one(item)
+                    continue
+                cid = item["client_order_id"]
+                if cid in placing:
+                    results["orders"][i] = await asyncio.shield(placing[cid])
+                    continue
+                placing[cid] = asyncio.get_running_loop().create_future()
+                result = await self._place_one(item)
+                placing[cid].set_result(result)
+                results["orders"][i] = result
+
+        workers = min(max_concurrent or self.BATCH_CONCURRENCY, len(jobs))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def place_orders(self, orders: Iterable[Dict[str, Any]], max_concurrent: Optional[int] = None):
+        """Dávkové zadání objednávek (výstupy před vstupy), viz submit_batch."""
+        return (await self.submit_batch(orders=orders, max_concurrent=max_concurrent))["orders"]
+
+    async def cancel_orders(self, order_ids: Iterable[str], max_concurrent: Optional[int] = None):
+        """Dávkové zrušení objednávek, viz submit_batch."""
+        return (await self.submit_batch(cancels=order_ids, max_concurrent=max_concurrent))["cancels"]
+
+    async def _cancel_one(self, order_id: str) -> Dict[str, Any]:
+        try:
+            return {"order_id": order_id, "ok": True, "response": await self.cancel_order(order_id)}
+        except Exception as e:
+            return {"order_id": order_id, "ok": False, "error": str(e)}
+
+    async def _place_one(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        cid = order["client_order_id"]
+        placed = self._placed.get(cid)
+        if placed is not None:
+            return placed | {"duplicate": True}
+        base = {"client_order_id": cid, "symbol": order["symbol"], "side": order["side"],
+                "quantity": order["quantity"], "exit": bool(order.get("exit"))}
+        price = order.get("price")
+        type_ = order.get("type") or ("LIMIT" if price is not None else "MARKET")
+        try:
+            result = base | {"ok": True, "order": await self.place_order(
+                order["symbol"], order["side"], price, order["quantity"], type_, client_order_id=cid)}
+        except Exception as e:
+            # Objednávka mohla na burzu dorazit (timeout, duplicitní ID při opakování) – ověřit podle ID
+            try:
+                existing = await self.get_order_by_client_id(cid)
+            except Exception:
+                existing = None
+            data = existing.get("data") if isinstance(existing, dict) and "data" in existing else existing
+            if not isinstance(data, dict) or not (data.get("orderId") or data.get("id")):
+                return base | {"ok": False, "error": str(e)}
+            result = base | {"ok": True, "order": existing, "recovered": True}
+        self._placed[cid] = result
+        while len(self._placed) > self.PLACED_MEMORY:
+            self._placed.popitem(last=False)
+        return result
+
+    async def aclose(self):
+        """Uzavře pool spojení."""
+        await self._client.aclose()
+
+
+# Sdílená instance pro celý proces (vytváří se líně při prvním použití)
+_async_api: Optional[AsyncPionexAPI] = None
+
+
+def get_async_pionex() -> AsyncPionexAPI:
+    """Vrátí sdíleného asynchronního klienta; použitelné i jako FastAPI dependency."""
+    global _async_api
+    if _async_api is None:
+        _async_api = AsyncPionexAPI()
+    return _async_api
+
+
+async def close_async_pionex():
+    """Uzavře sdíleného klienta (volá se při vypnutí aplikace)."""
+    global _async_api
+    if _async_api is not None:
+        api, _async_api = _async_api, None
+        await api.aclose()
@@ -0,0 +1,178 @@
+"""
+Dávkové predikce ceny pro více symbolů a horizontů najednou.
+
+Příznaky v čase t se staví vektorově přes sliding_window_view (bez kopií oken):
+
+    lag_1..lag_L   poslední L log-výnosů (lag_1 = nejnovější)
+    ret_mean       průměrný log-výnos za `window`
+    ret_vol        směrodatná odchylka log-výnosů za `window`
+    up_ratio       podíl rostoucích svíček za `window`
+    zscore         (close - SMA) / std zavíracích cen za `window`
+
+Cílem je log-výnos za každý horizont h (close[t+h] / close[t]); jeden
+LinearRegression s více výstupy předpovídá všechny horizonty zároveň.
+Predikce pro S symbolů potřebuje jen konce řad (latest_features) a počítá
+se jedním einsum nad naskládanými koeficienty.
+"""
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backend.model import ModelRegistry, ModelRegistryError, PREDICT_SECONDS, linear_regression
+
+FORECAST_REGISTRY_DIR = os.getenv("FORECAST_REGISTRY_DIR", "backend/forecast_models")
+FORECAST_LAGS = int(os.getenv("FORECAST_LAGS", "10"))
+FORECAST_WINDOW = int(os.getenv("FORECAST_WINDOW", "20"))
+FORECAST_HORIZONS = tuple(int(h) for h in os.getenv("FORECAST_HORIZONS", "1,5,15").split(","))
+# Model trénovaný nad všemi symboly, použije se pro symboly bez vlastního modelu
+POOLED_KEY = "ALL"
+
+
+def n_features(lags: int) -> int:
+    return lags + 4
+
+
+def build_features(close, lags: int = FORECAST_LAGS, window: int = FORECAST_WINDOW) -> np.ndarray:
+    """Matice příznaků pro t = max(lags, window) .. len(close)-1 (jeden řádek na svíčku)."""
+    close = np.asarray(close, dtype=float)
+    first = max(lags, window)
+    n = len(close)
+    if n <= first:
+        return np.empty((0, n_features(lags)))
+    returns = np.diff(np.log(close))  # returns[i] = výnos do svíčky i+1
+    # Řádek j okna délky k končí na returns[j+k-1], tj. na svíčce t = j+k
+    lagged = sliding_window_view(returns, lags)[first - lags:, ::-1]
+    ret_win = sliding_window_view(returns, window)[first - window:]
+    close_win = sliding_window_view(close, window)[first - window + 1:]
+    zscore = (close[first:] - close_win.mean(axis=1)) / (close_win.std(axis=1) + 1e-12)
+    return np.column_stack([lagged, ret_win.mean(axis=1), ret_win.std(axis=1), (ret_win > 0).mean(axis=1), zscore])
+
+
+def latest_features(tails, lags: int = FORECAST_LAGS, window: int = FORECAST_WINDOW) -> np.ndarray:
+    """Poslední řádek build_features pro S řad najednou; tails má tvar (S, max(lags, window) + 1)."""
+    tails = np.asarray(tails, dtype=float)
+    returns = np.diff(np.log(tails), axis=1)
+    ret_win = returns[:, -window:]
+    close_win = tails[:, -window:]
+    zscore = (tails[:, -1] - close_win.mean(axis=1)) / (close_win.std(axis=1) + 1e-12)
+    return np.column_stack([returns[:, :-lags - 1:-1], ret_win.mean(axis=1), ret_win.std(axis=1),
+                            (ret_win > 0).mean(axis=1), zscore])
+
+
+def build_targets(close, horizons: Sequence[int], first: int) -> np.ndarray:
+    """Log-výnosy close[t+h]/close[t] pro t = first .. len(close)-1-max(horizons)."""
+    log_close = np.log(np.asarray(close, dtype=float))
+    end = len(log_close) - max(horizons)
+    return np.column_stack([log_close[first + h:end + h] - log_close[first:end] for h in horizons])
+
+
+class ForecastModel:
+    """Lineární model log-výnosů pro všechny horizonty (artefakt registru)."""
+
+    def __init__(self, lags: int = FORECAST_LAGS, window: int = FORECAST_WINDOW,
+                 horizons: Sequence[int] = FORECAST_HORIZONS):
+        self.lags = lags
+        self.window = window
+        self.horizons = tuple(horizons)
+        self.coef_: Optional[np.ndarray] = None       # (H, F)
+        self.intercept_: Optional[np.ndarray] = None  # (H,)
+
+    @property
+    def first(self) -> int:
+        return max(self.lags, self.window)
+
+    @property
+    def config(self) -> Tuple:
+        return self.lags, self.window, self.horizons
+
+    def training_set(self, close) -> Tuple[np.ndarray, np.ndarray]:
+        y = build_targets(close, self.horizons, self.first)
+        X = build_features(close, self.lags, self.window)[:len(y)]
+        return X, y
+
+    def fit(self, closes) -> "ForecastModel":
+        """Fit nad jednou řadou, nebo seznamem řad (sdílený model více symbolů)."""
+        series = [closes] if np.ndim(closes[0]) == 0 else closes
+        sets = [self.training_set(c) for c in series if len(c) > self.first + max(self.horizons)]
+        if not sets:
+            raise ValueError(f"Málo dat pro trénink (potřeba > {self.first + max(self.horizons)} svíček)")
+        reg = linear_regression().fit(np.vstack([X for X, _ in sets]), np.vstack([y for _, y in sets]))
+        self.coef_ = np.atleast_2d(reg.coef_)
+        self.intercept_ = np.atleast_1d(reg.intercept_)
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        """Log-výnosy (řádky X x horizonty)."""
+        return np.asarray(X) @ self.coef_.T + self.intercept_
+
+
+class PredictionService:
+    def __init__(self, registry: Optional[ModelRegistry] = None, lags: int = FORECAST_LAGS,
+                 window: int = FORECAST_WINDOW, horizons: Sequence[int] = FORECAST_HORIZONS):
+        self.registry = registry or ModelRegistry(FORECAST_REGISTRY_DIR)
+        self.lags = lags
+        self.window = window
+        self.horizons = tuple(horizons)
+
+    def new_model(self) -> ForecastModel:
+        return ForecastModel(self.lags, self.window, self.horizons)
+
+    # --- trénink ---
+
+    def fit(self, symbol: str, close) -> int:
+        return self.registry.publish(symbol, self.new_model().fit(close))
+
+    def fit_many(self, closes: Dict[str, np.ndarray], pooled: bool = True) -> Dict[str, int]:
+        """Model pro každý symbol a volitelně sdílený model POOLED_KEY."""
+        versions = {symbol: self.fit(symbol, close) for symbol, close in closes.items()}
+        if pooled and closes:
+            versions[POOLED_KEY] = self.registry.publish(POOLED_KEY, self.new_model().fit(list(closes.values())))
+        return versions
+
+    # --- predikce ---
+
+    def _model_for(self, symbol: str) -> Optional[ForecastModel]:
+        try:
+            return self.registry.get(symbol) or self.registry.get(POOLED_KEY)
+        except ModelRegistryError:
+            return None
+
+    @PREDICT_SECONDS.time(model="forecast")
+    def predict_batch(self, closes: Dict[str, np.ndarray],
+                      horizons: Optional[Sequence[int]] = None) -> Dict[str, object]:
+        """
+        Předpověď ceny pro každý symbol a horizont z posledních svíček.
+        Vrací {"predictions": {symbol: {h: cena}}, "missing": [symboly bez modelu nebo dat]}.
+        """
+        groups: Dict[Tuple, List] = {}
+        missing = []
+        for symbol, close in closes.items():
+            model = self._model_for(symbol)
+            close = np.asarray(close, dtype=float)
+            if model is None or model.coef_ is None or len(close) <= model.first:
+                missing.append(symbol)
+                continue
+            # Stačí konec řady – jeden řádek příznaků na symbol
+            groups.setdefault(model.config, []).append((symbol, model, close[-(model.first + 1):]))
+
+        predictions: Dict[str, Dict[int, float]] = {}
+        for (lags, window, model_horizons), items in groups.items():
+            wanted = model_horizons if horizons is None else tuple(horizons)
+            unknown = set(wanted) - set(model_horizons)
+            if unknown:
+                raise ValueError(f"Nepodporované horizonty {sorted(unknown)}, dostupné {list(model_horizons)}")
+            cols = [model_horizons.index(h) for h in wanted]
+            tails = np.stack([tail for _, _, tail in items])
+            X = latest_features(tails, lags, window)                       # (S, F)
+            W = np.stack([model.coef_[cols] for _, model, _ in items])     # (S, H, F)
+            b = np.stack([model.intercept_[cols] for _, model, _ in items])  # (S, H)
+            prices = tails[:, -1:] * np.exp(np.einsum("sf,shf->sh", X, W) + b)
+            for (symbol, _, _), row in zip(items, prices.tolist()):
+                predictions[symbol] = dict(zip(wanted, row))
+        return {"predictions": predictions, "missing": missing}
+
+
+# Singleton instance
+prediction_service = PredictionService()
@@ -0,0 +1,186 @@
+"""
+Rate limiter pro Pionex API (GCRA – Generic Cell Rate Algorithm).
+
+Každý bucket drží jen jednu hodnotu: teoretický čas příchodu (TAT). Žádost
+o `weight` jednotek si atomicky zarezervuje slot a dostane zpět, jak dlouho
+má počkat. Zámek (nebo souborový lock) se drží jen po dobu výpočtu, nikdy
+během čekání, takže ostatní vlákna/korutiny nejsou blokovány.
+
+Endpointy se mapují na buckety pravidly (metoda, prefix cesty) -> (bucket,
+váha), takže zadávání objednávek má vlastní budget oddělený od tržních dat.
+S `FileStore` sdílí všechny procesy (uvicorn workery) na stroji jeden budget.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows – sdílený store není k dispozici
+    fcntl = None
+
+
+class MemoryStore:
+    """Stav bucketů v paměti procesu."""
+
+    def __init__(self):
+        self._state: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def transact(self, fn: Callable[[Dict[str, float]], float]) -> float:
+        with self._lock:
+            return fn(self._state)
+
+
+class FileStore:
+    """
+    Stav bucketů v lokálním souboru chráněném `flock`, sdílený mezi procesy.
+    Hodiny limiteru musí být společné všem procesům (výchozí time.time).
+    """
+
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError("FileStore vyžaduje fcntl (POSIX).")
+        self.path = path
+        self._lock = threading.Lock()
+
+    def transact(self, fn: Callable[[Dict[str, float]], float]) -> float:
+        with self._lock, open(self.path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw) if raw else {}
+            except ValueError:
+                state = {}
+            result = fn(state)
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state).encode())
+            return result
+
+
+class SimulatedClock:
+    """Simulované hodiny pro testy: sleep jen posouvá čas."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.sleeps: List[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float):
+        # Souběžně spící korutiny se probouzejí podle vlastního cílového času
+        target = self.now + seconds
+        self.sleeps.append(seconds)
+        await asyncio.sleep(0)
+        self.now = max(self.now, target)
+
+
+WAIT_SECONDS = registry.histogram("ratelimit_wait_seconds", "Čekání na slot v rate limiteru (i nulové)", ["bucket"])
+
+
+# bucket -> (rychlost v jednotkách za sekundu, burst)
+DEFAULT_BUCKETS = {
+    "market": (float(os.getenv("PIONEX_RATE_MARKET", "10")), 10),
+    "account": (float(os.getenv("PIONEX_RATE_ACCOUNT", "10")), 10),
+    "orders": (float(os.getenv("PIONEX_RATE_ORDERS", "10")), 10),
+}
+
+# (metoda nebo "*", prefix cesty, bucket, váha) – první shoda vyhrává
+DEFAULT_RULES = [
+    ("POST", "/api/v1/orders", "orders", 1),
+    ("DELETE", "/api/v1/orders", "orders", 1),
+    ("*", "/api/v1/trades", "market", 1),
+    ("*", "/api/v1/depth", "market", 1),
+    ("*", "/api/v1/ticker", "market", 1),
+    ("*", "/api/v1/klines", "market", 1),
+    ("*", "/api/v1/allOrders", "account", 5),
+    ("*", "/api/v1/fills", "account", 5),
+    ("*", "", "account", 1),
+]
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        buckets: Optional[Dict[str, Tuple[float, float]]] = None,
+        rules: Optional[List[Tuple[str, str, str, float]]] = None,
+        store=None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        async_sleep=asyncio.sleep,
+    ):
+        self.buckets = dict(buckets or DEFAULT_BUCKETS)
+        self.rules = list(rules or DEFAULT_RULES)
+        self.store = store or MemoryStore()
+        self.clock = clock
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+
+    def classify(self, method: str, endpoint: str) -> Tuple[str, float]:
+        """Vrátí (bucket, váha) pro daný endpoint."""
+        for rule_method, prefix, bucket, weight in self.rules:
+            if rule_method in ("*", method) and endpoint.startswith(prefix):
+                return bucket, weight
+        raise KeyError(f"Žádné rate-limit pravidlo pro {method} {endpoint}")
+
+    def reserve_bucket(self, bucket: str, weight: float = 1) -> float:
+        """Zarezervuje `weight` jednotek v bucketu a vrátí dobu čekání v sekundách."""
+        rate, burst = self.buckets[bucket]
+        interval = 1.0 / rate
+        now = self.clock()
+
+        def gcra(state):
+            tat = max(state.get(bucket, now), now)
+            new_tat = tat + interval * weight
+            state[bucket] = new_tat
+            return max(0.0, new_tat - burst * interval - now)
+
+        return self.store.transact(gcra)
+
+    def reserve(self, method: str, endpoint: str) -> float:
+        bucket, weight = self.classify(method, endpoint)
+        return self.reserve_bucket(bucket, weight)
+
+    def _reserve_observed(self, method: str, endpoint: str) -> float:
+        bucket, weight = self.classify(method, endpoint)
+        wait = self.reserve_bucket(bucket, weight)
+        WAIT_SECONDS.labels(bucket=bucket).observe(wait)
+        return wait
+
+    def acquire(self, method: str, endpoint: str) -> float:
+        """Synchronní čekání na slot; vrací dobu čekání."""
+        wait = self._reserve_observed(method, endpoint)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    async def acquire_async(self, method: str, endpoint: str) -> float:
+        """Asynchronní čekání na slot; během čekání se nedrží žádný zámek."""
+        wait = self._reserve_observed(method, endpoint)
+        if wait > 0:
+            await self.async_sleep(wait)
+        return wait
+
+
+# Sdílený limiter procesu (s PIONEX_RATE_LIMIT_STORE i napříč procesy)
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        path = os.getenv("PIONEX_RATE_LIMIT_STORE")
+        _rate_limiter = RateLimiter(store=FileStore(path) if path else MemoryStore())
+    return _rate_limiter
@@ -0,0 +1,228 @@
+"""
+Broadcast hub pro /ws/realtime.
+
+Jeden producent (polling InfluxDB jedním dotazem pro všechny symboly, nebo
+přímo záznamy z backend.ingest) publikuje poslední tick každého symbolu.
+Odběratelé dostávají jen změny (delta) pro své symboly. Fronta klienta je
+omezená – drží nejvýše jeden čekající tick na symbol, novější tick starší
+nahradí (coalescing). Klient, který nestihne číst déle než `max_lag` sekund,
+je odpojen.
+"""
+import re
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from backend.metrics import registry
+
+logger = logging.getLogger("realtime")
+logger.setLevel(logging.INFO)
+
+CLIENTS = registry.gauge("ws_clients", "Připojení odběratelé /ws/realtime")
+SEND_LAG = registry.histogram("ws_send_lag_seconds", "Zpoždění od zařazení ticku do fronty klienta po jeho odeslání")
+DROPPED_CLIENTS = registry.counter("ws_dropped_clients_total", "Klienti odpojení kvůli pomalému čtení")
+
+# Symboly od klientů končí ve Flux dotazu – povolena jen velká písmena, číslice a podtržítko
+SYMBOL_RE = re.compile(r"[A-Z0-9_]{1,32}")
+
+EMPTY_TICK = {"symbol": None, "price": None, "volume": None, "timestamp": None}
+
+
+class Subscription:
+    def __init__(self, symbols: Optional[Iterable[str]] = None):
+        # None = všechny symboly
+        self.symbols: Optional[Set[str]] = set(symbols) if symbols else None
+        self.pending: Dict[str, dict] = {}
+        self.pending_since: Optional[float] = None
+        # Kdy čekal nejstarší tick poslední dávky vrácené z next() (pro měření zpoždění odeslání)
+        self.batch_since: Optional[float] = None
+        self.event = asyncio.Event()
+        self.closed = False
+        self.coalesced = 0
+
+    def wants(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
+    def offer(self, symbol: str, tick: dict, now: float):
+        if symbol in self.pending:
+            self.coalesced += 1
+        elif not self.pending:
+            self.pending_since = now
+        self.pending[symbol] = tick
+        self.event.set()
+
+    async def next(self, timeout: float) -> list:
+        """Vrátí čekající ticky (nejvýše jeden na symbol), nebo [] po uplynutí timeoutu."""
+        if not self.pending and not self.closed:
+            try:
+                async with asyncio.timeout(timeout):
+                    await self.event.wait()
+            except TimeoutError:
+                pass
+        self.event.clear()
+        ticks = list(self.pending.values())
+        self.pending.clear()
+        self.batch_since, self.pending_since = self.pending_since, None
+        return ticks
+
+
+class RealtimeHub:
+    def __init__(self, fetch: Optional[Callable[[Optional[Set[str]]], Dict[str, dict]]] = None,
+                 interval: float = 1.0, max_lag: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.fetch = fetch
+        self.interval = interval
+        self.max_lag = max_lag
+        self.clock = clock
+        self.latest: Dict[str, dict] = {}
+        # Volitelně lokální order book (backend.orderbook) – ticky obchodů doplní o bid/ask
+        self.books = None
+        self.subscribers: Set[Subscription] = set()
+        self.stats = {"queries": 0, "published": 0, "dropped_clients": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+    # --- odběratelé ---
+
+    def subscribe(self, symbols: Optional[Iterable[str]] = None) -> Subscription:
+        sub = Subscription(symbols)
+        self.subscribers.add(sub)
+        self.ensure_started()
+        # Úvodní snapshot, aby klient nemusel čekat na první změnu
+        now = self.clock()
+        for symbol, tick in self.latest.items():
+            if sub.wants(symbol):
+                sub.offer(symbol, tick, now)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self.subscribers.discard(sub)
+
+    def mark_sent(self, sub: Subscription):
+        """Dávka z sub.next() byla odeslána – zaznamená zpoždění nejstaršího ticku."""
+        if sub.batch_since is not None:
+            SEND_LAG.observe(self.clock() - sub.batch_since)
+            sub.batch_since = None
+
+    def set_symbols(self, sub: Subscription, symbols: Optional[Iterable[str]]):
+        sub.symbols = set(symbols) if symbols else None
+        now = self.clock()
+        for symbol, tick in self.latest.items():
+            if sub.wants(symbol) and symbol not in sub.pending:
+                sub.offer(symbol, tick, now)
+
+    def wanted_symbols(self) -> Optional[Set[str]]:
+        """Sjednocení symbolů všech odběratelů (None = někdo chce všechny)."""
+        wanted: Set[str] = set()
+        for sub in self.subscribers:
+            if sub.symbols is None:
+                return None
+            wanted |= sub.symbols
+        return wanted
+
+    # --- producent ---
+
+    def publish(self, symbol: str, tick: dict):
+        """Rozešle tick odběratelům, pokud se oproti poslednímu změnil."""
+        if self.latest.get(symbol) == tick:
+            return
+        self.latest[symbol] = tick
+        self.stats["published"] += 1
+        now = self.clock()
+        for sub in list(self.subscribers):
+            if not sub.wants(symbol):
+                continue
+            if sub.pending_since is not None and now - sub.pending_since > self.max_lag:
+                # Pomalý klient – odpojit místo hromadění dat
+                sub.closed = True
+                sub.event.set()
+                self.subscribers.discard(sub)
+                self.stats["dropped_clients"] += 1
+                DROPPED_CLIENTS.inc()
+                continue
+            sub.offer(symbol, tick, now)
+
+    def publish_record(self, record):
+        """Adaptér pro MarketDataIngestor.on_record (publikuje jen obchody)."""
+        price = getattr(record, "price", None)
+        if price is None:
+            return
+        tick = {"symbol": record.symbol, "price": price, "volume": record.volume, "timestamp": record.ts_ms / 1000}
+        book = self.books.fresh(record.symbol) if self.books is not None else None
+        if book is not None:
+            top = book.top()
+            tick.update(bid=top["bid"], ask=top["ask"], spread=top["spread"], imbalance=top["imbalance"])
+        self.publish(record.symbol, tick)
+
+    async def poll_once(self):
+        if self.fetch is None or not self.subscribers:
+            return
+        self.stats["queries"] += 1
+        try:
+            ticks = await asyncio.to_thread(self.fetch, self.wanted_symbols())
+        except Exception as e:
+            logger.warning(f"Načtení posledních ticků selhalo: {e}")
+            return
+        for symbol, tick in ticks.items():
+            self.publish(symbol, tick)
+
+    async def _poll_loop(self):
+        while True:
+            await self.poll_once()
+            await asyncio.sleep(self.interval)
+
+    def ensure_started(self):
+        """Spustí polling v aktuálním event loopu (idempotentní)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._task = loop.create_task(self._poll_loop()) if self.fetch is not None else None
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for sub in list(self.subscribers):
+            sub.closed = True
+            sub.event.set()
+        self.subscribers.clear()
+
+
+def _flux_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def fetch_latest_ticks(symbols: Optional[Set[str]] = None) -> Dict[str, dict]:
+    """Jeden Flux dotaz na poslední cenu a objem všech (vybraných) symbolů."""
+    from backend.db import get_influx_client, INFLUXDB_ORG, INFLUXDB_BUCKET
+    symbol_filter = ""
+    if symbols:
+        cond = " or ".join(f"r.symbol == {_flux_string(s)}" for s in sorted(symbols))
+        symbol_filter = f"|> filter(fn: (r) => {cond})"
+    query = f'''
+      from(bucket: "{INFLUXDB_BUCKET}")
+      |> range(start: -1m)
+      |> filter(fn: (r) => r._measurement == "trades")
+      {symbol_filter}
+      |> filter(fn: (r) => r._field == "price" or r._field == "volume")
+      |> group(columns: ["symbol", "_field"])
+      |> last()
+    '''
+    ticks: Dict[str, dict] = {}
+    for table in get_influx_client().query_api().query(query, org=INFLUXDB_ORG):
+        for record in table.records:
+            symbol = record.values.get("symbol") or "*"
+            tick = ticks.setdefault(symbol, {"symbol": symbol, "price": None, "volume": None, "timestamp": None})
+            if record.get_field() == "price":
+                tick["price"] = record.get_value()
+                tick["timestamp"] = record.get_time().timestamp()
+            elif record.get_field() == "volume":
+                tick["volume"] = record.get_value()
+    return ticks
+
+
+# Singleton instance
+hub = RealtimeHub(fetch=fetch_latest_ticks)
+CLIENTS.set_function(lambda: len(hub.subscribers))
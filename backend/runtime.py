@@ -0,0 +1,361 @@
+"""
+Běhové prostředí botů: každý bot ve stavu `running` je jeden asyncio task.
+
+- Tick bota běží v pevném rytmu `tick_interval` (deadline se nepřičítá ke
+  konci předchozího ticku, takže se rytmus neposouvá). Start má náhodnou fázi
+  a každý tick jitter, aby se boti se stejným intervalem nesešli v jednom okamžiku.
+  Zmeškané deadliny se nedohání dávkou, jen se započítají do `missed`.
+- Souběžně běží nejvýše `max_concurrent` ticků (asyncio.Semaphore budí čekající
+  v pořadí FIFO – férové pořadí), jeden tick je omezen `tick_timeout`.
+- Tržní data jsou sdílená: svíčky jednoho symbolu stahuje z Pionexu jediný
+  refresh pro všechny boty (MarketDataCache nad kline_store), klient Pionexu
+  je sdílený get_async_pionex().
+- Po restartu load_running() znovu spustí všechny boty se stavem `running`
+  z databáze; pause/delete task zruší a počká na jeho ukončení. Při více
+  workerech boty rozděluje backend.sharding (lease v databázi).
+- Živé objednávky jen při BOT_LIVE_TRADING=true, jinak se signály pouze
+  zapisují do audit logu (paper režim). Živý signál se zadá jen podle pozice
+  bota v ledgeru: BUY bez otevřené pozice v symbolu a v limitu
+  Strategy.max_positions, SELL jen do velikosti držené pozice, a nikdy,
+  dokud má bot v symbolu nevyřízenou objednávku.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from backend.audit import log_audit
+from backend.klines import kline_store
+
+logger = logging.getLogger("runtime")
+logger.setLevel(logging.INFO)
+
+BOT_RUNTIME_ENABLED = os.getenv("BOT_RUNTIME_ENABLED", "true").lower() in ("1", "true", "yes")
+BOT_MAX_CONCURRENT_TICKS = int(os.getenv("BOT_MAX_CONCURRENT_TICKS", "32"))
+BOT_TICK_TIMEOUT = float(os.getenv("BOT_TICK_TIMEOUT", "30"))
+# Jitter ticku jako podíl tick_interval (0.1 = ±10 %)
+BOT_TICK_JITTER = float(os.getenv("BOT_TICK_JITTER", "0.1"))
+BOT_DEFAULT_TICK_INTERVAL = float(os.getenv("BOT_DEFAULT_TICK_INTERVAL", "60"))
+BOT_WARMUP_BARS = int(os.getenv("BOT_WARMUP_BARS", "200"))
+BOT_LIVE_TRADING = os.getenv("BOT_LIVE_TRADING", "false").lower() in ("1", "true", "yes")
+
+
+class BotSpec(NamedTuple):
+    id: int
+    name: str
+    symbol: Optional[str]
+    interval: str
+    tick_interval: float
+    quantity: Optional[float]
+
+
+def spec_of(bot) -> BotSpec:
+    """Konfigurace bota z BotORM (nebo schématu Bot)."""
+    return BotSpec(bot.id, bot.name, bot.symbol, bot.interval or "1m",
+                   float(bot.tick_interval or BOT_DEFAULT_TICK_INTERVAL),
+                   float(bot.quantity) if bot.quantity else None)
+
+
+class MarketDataCache:
+    """Sdílený refresh svíček: jeden dotaz na burzu na (symbol, interval) za `min_refresh` s."""
+
+    def __init__(self, store=kline_store, api_factory: Optional[Callable] = None, min_refresh: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.store = store
+        self.api_factory = api_factory
+        self.min_refresh = min_refresh
+        self.clock = clock
+        self._last: Dict[tuple, float] = {}
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+        self.stats = {"refreshes": 0, "shared": 0, "errors": 0}
+
+    async def refresh(self, symbol: str, interval: str, lookback: int = BOT_WARMUP_BARS):
+        if self.api_factory is None:
+            return
+        key = (symbol, interval)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Čekající boti dostanou výsledek refreshu, na který čekali
+            if self.clock() - self._last.get(key, float("-inf")) < self.min_refresh:
+                self.stats["shared"] += 1
+                return
+            try:
+                await self.store.update(self.api_factory(), symbol, interval, lookback=lookback, repair=False)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Refresh svíček {symbol} {interval} selhal: {e}")
+            self._last[key] = self.clock()
+            self.stats["refreshes"] += 1
+
+    def closes(self, symbol: str, interval: str, after: Optional[int] = None, last: Optional[int] = None):
+        series = self.store.get(symbol, interval, start=after + 1 if after is not None else None, last=last)
+        return series.time, series.close
+
+
+class BotState:
+    def __init__(self, spec: BotSpec, strategy):
+        self.spec = spec
+        self.strategy = strategy
+        self.last_time: Optional[int] = None  # čas poslední zpracované svíčky (ms)
+        self.ticks = 0
+        self.missed = 0
+        self.errors = 0
+        self.signals = 0
+        self.last_tick: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def info(self) -> dict:
+        return {"symbol": self.spec.symbol, "interval": self.spec.interval, "tick_interval": self.spec.tick_interval,
+                "ticks": self.ticks, "missed": self.missed, "errors": self.errors, "signals": self.signals,
+                "last_tick": self.last_tick, "last_error": self.last_error}
+
+
+def _default_strategy():
+    # Vlastní IndicatorEngine na bota – stav indikátorů nesdílí boti se stejným symbolem
+    from backend.strategy import Strategy
+    from backend.indicators import IndicatorEngine
+    return Strategy(engine=IndicatorEngine())
+
+
+class BotRuntime:
+    def __init__(self, session_factory=None, market: Optional[MarketDataCache] = None,
+                 strategy_factory: Callable = _default_strategy, api_factory: Optional[Callable] = None,
+                 max_concurrent: int = BOT_MAX_CONCURRENT_TICKS, tick_timeout: float = BOT_TICK_TIMEOUT,
+                 jitter: float = BOT_TICK_JITTER, live_trading: bool = BOT_LIVE_TRADING,
+                 enabled: bool = BOT_RUNTIME_ENABLED, audit: Callable = log_audit):
+        self._session_factory = session_factory
+        self.market = market or MarketDataCache()
+        self.strategy_factory = strategy_factory
+        self.api_factory = api_factory
+        self.max_concurrent = max_concurrent
+        self.tick_timeout = tick_timeout
+        self.jitter = jitter
+        self.live_trading = live_trading
+        # False = boty spouští jiný proces (API jen mění stav v databázi)
+        self.enabled = enabled
+        self.audit = audit
+        # ShardCoordinator (backend.sharding) – bota spustí jen worker, který drží jeho lease
+        self.shard = None
+        self.bots: Dict[int, BotState] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"ticks": 0, "missed": 0, "errors": 0, "timeouts": 0, "signals": 0, "orders": 0,
+                      "skipped": 0}
+        self.lag = []  # zpoždění startu ticku za deadlinem (s), posledních 1000
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from backend.db import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    # --- řízení ---
+
+    async def start_bot(self, bot) -> bool:
+        """Spustí (nebo s novou konfigurací restartuje) task bota; bez symbolu nic nespouští."""
+        if not self.enabled:
+            return False
+        spec = bot if isinstance(bot, BotSpec) else spec_of(bot)
+        if self.shard is not None and not self.shard.owns(spec.id):
+            # Lease přidělí koordinátor; bot se spustí u vlastníka při nejbližší synchronizaci
+            self.shard.wake()
+            return False
+        current = self.bots.get(spec.id)
+        if current is not None:
+            if current.spec == spec and current.task is not None and not current.task.done():
+                return True
+            await self.stop_bot(spec.id)
+        if not spec.symbol:
+            logger.warning(f"Bot {spec.id} ({spec.name}) nemá nastavený symbol, runtime ho nespustí")
+            return False
+        state = BotState(spec, self.strategy_factory())
+        state.task = asyncio.create_task(self._run(state), name=f"bot-{spec.id}")
+        self.bots[spec.id] = state
+        return True
+
+    async def stop_bot(self, bot_id: int, timeout: float = 5.0) -> bool:
+        state = self.bots.pop(bot_id, None)
+        if state is None or state.task is None:
+            return False
+        state.task.cancel()
+        try:
+            async with asyncio.timeout(timeout):
+                await asyncio.gather(state.task, return_exceptions=True)
+        except TimeoutError:
+            logger.warning(f"Task bota {bot_id} se neukončil do {timeout}s")
+        return True
+
+    async def load_running(self) -> int:
+        """Spustí všechny boty se stavem `running` (po restartu procesu)."""
+        from backend.api import BotORM
+        async with self.session_factory() as db:
+            bots = (await db.execute(select(BotORM).where(BotORM.status == "running"))).scalars().all()
+        started = 0
+        for bot in bots:
+            started += await self.start_bot(bot)
+        logger.info(f"Runtime spustil {started} z {len(bots)} běžících botů")
+        return started
+
+    async def shutdown(self):
+        await asyncio.gather(*(self.stop_bot(bot_id) for bot_id in list(self.bots)))
+
+    # --- smyčka bota ---
+
+    def _jitter(self, interval: float) -> float:
+        return random.uniform(-self.jitter, self.jitter) * interval
+
+    async def _run(self, state: BotState):
+        loop = asyncio.get_running_loop()
+        interval = state.spec.tick_interval
+        # Náhodná fáze – boti spuštění naráz (load_running) se rozprostřou v rámci intervalu
+        deadline = loop.time() + random.uniform(0, interval)
+        while True:
+            target = deadline + self._jitter(interval)
+            await asyncio.sleep(max(0.0, target - loop.time()))
+            async with self.semaphore:
+                started = loop.time()
+                self._record_lag(max(0.0, started - target))
+                try:
+                    async with asyncio.timeout(self.tick_timeout):
+                        await self.tick(state)
+                except TimeoutError:
+                    state.errors += 1
+                    self.stats["timeouts"] += 1
+                    state.last_error = f"tick přesáhl {self.tick_timeout}s"
+                except Exception as e:
+                    state.errors += 1
+                    self.stats["errors"] += 1
+                    state.last_error = str(e)
+                    logger.error(f"Tick bota {state.spec.id} selhal: {e}")
+                state.ticks += 1
+                state.last_tick = time.time()
+                self.stats["ticks"] += 1
+            deadline += interval
+            now = loop.time()
+            if now > deadline:
+                missed = int((now - deadline) // interval) + 1
+                state.missed += missed
+                self.stats["missed"] += missed
+                deadline += missed * interval
+
+    def _record_lag(self, lag: float):
+        self.lag.append(lag)
+        if len(self.lag) > 1000:
+            del self.lag[:-1000]
+
+    async def tick(self, state: BotState):
+        """Jeden krok strategie: nové uzavřené svíčky -> indikátory -> signál."""
+        spec, strategy = state.spec, state.strategy
+        await self.market.refresh(spec.symbol, spec.interval)
+        if state.last_time is None:
+            times, closes = self.market.closes(spec.symbol, spec.interval, last=BOT_WARMUP_BARS)
+            if not len(times):
+                return
+            ind = strategy.warmup_indicators(spec.symbol, closes)
+        else:
+            times, closes = self.market.closes(spec.symbol, spec.interval, after=state.last_time)
+            if not len(times):
+                return
+            for close in closes:
+                ind = strategy.update_indicators(spec.symbol, float(close))
+        state.last_time = int(times[-1])
+        close = float(closes[-1])
+        entries, exits = strategy.generate_signals(close, ind)
+        if entries:
+            await self.on_signal(state, "BUY", close)
+        elif exits:
+            await self.on_signal(state, "SELL", close)
+
+    async def on_signal(self, state: BotState, side: str, close: float):
+        spec = state.spec
+        state.signals += 1
+        self.stats["signals"] += 1
+        if not self.live_trading or not spec.quantity or self.api_factory is None:
+            self.audit(user=f"bot:{spec.id}", action="bot_signal", detail=f"{side} {spec.symbol} @ {close} (paper)")
+            return
+        quantity, reason = await self._order_quantity(state, side)
+        if not quantity:
+            self.stats["skipped"] += 1
+            self.audit(user=f"bot:{spec.id}", action="bot_signal",
+                       detail=f"{side} {spec.symbol} @ {close} (nezadáno: {reason})")
+            return
+        # Limitní cena z lokální knihy, jinak poslední close (i při jednostranné knize)
+        book = state.strategy.market_snapshot(spec.symbol)
+        price = book.get("ask" if side == "BUY" else "bid") if book else None
+        if price is None:
+            price = close
+        # Zadání objednávky se při pause/timeoutu nepřeruší uprostřed (stav na burze by byl neznámý)
+        await asyncio.shield(self._place_order(state, side, price, quantity))
+
+    async def _order_quantity(self, state: BotState, side: str):
+        """Množství živé objednávky podle pozice bota v ledgeru; (None, důvod), pokud se signál nezadá."""
+        from backend.ledger import trade_ledger
+        spec = state.spec
+        async with self.session_factory() as db:
+            exposure = await trade_ledger.bot_exposure(db, spec.id, spec.symbol)
+        if exposure["pending_orders"]:
+            return None, "nevyřízená objednávka"
+        if side == "BUY":
+            if exposure["quantity"] > 0:
+                return None, "pozice už je otevřená"
+            if not state.strategy.can_open_position(exposure["open_positions"]):
+                return None, "limit otevřených pozic"
+            return spec.quantity, None
+        if exposure["quantity"] <= 0:
+            return None, "žádná pozice k uzavření"
+        return min(spec.quantity, exposure["quantity"]), None
+
+    async def _place_order(self, state: BotState, side: str, price: float, quantity: float):
+        from backend.ledger import trade_ledger
+        from backend.pionex import PionexAPIError
+        spec = state.spec
+        # Deterministické ID (bot, svíčka, strana): opakovaný POST po ztracené odpovědi burza
+        # deduplikuje a place_orders objednávku po chybě dohledá podle ID
+        client_order_id = f"bot-{spec.id}-{state.last_time}-{side}"
+        api = self.api_factory()
+        [result] = await api.place_orders([{
+            "symbol": spec.symbol, "side": side, "price": price, "quantity": quantity,
+            "client_order_id": client_order_id, "exit": side == "SELL",
+        }])
+        if not result["ok"]:
+            raise PionexAPIError(result["error"])
+        async with self.session_factory() as db:
+            await trade_ledger.record_order(db, result["order"], spec.symbol, side, price, quantity, bot_id=spec.id,
+                                            client_order_id=client_order_id)
+            await db.commit()
+        self.stats["orders"] += 1
+        self.audit(user=f"bot:{spec.id}", action="bot_order", detail=f"{side} {quantity} {spec.symbol} @ {price}")
+
+    # --- stav ---
+
+    def info(self) -> dict:
+        lag = sorted(self.lag)
+        return {
+            **self.stats,
+            "running": len(self.bots),
+            "live_trading": self.live_trading,
+            "lag_p50_ms": lag[len(lag) // 2] * 1e3 if lag else None,
+            "lag_p99_ms": lag[int(len(lag) * 0.99)] * 1e3 if lag else None,
+            "market": self.market.stats,
+            "bots": {bot_id: state.info() for bot_id, state in self.bots.items()},
+        }
+
+
+def _pionex():
+    from backend.pionex import get_async_pionex
+    return get_async_pionex()
+
+
+# Singleton instance
+bot_runtime = BotRuntime(market=MarketDataCache(api_factory=_pionex), api_factory=_pionex)
@@ -1,34 +1,86 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from backend.model import ts_model
-import numpy as np
-import pandas as pd
-from backend.db import SessionLocal
-from backend.api import log_audit
+import logging
+import functools
+from backend.metrics import registry, JOB_BUCKETS
+from backend.training import training_executor, TRAINING_SYMBOLS
+from backend.ledger import trade_ledger, LEDGER_RECONCILE_INTERVAL
+from backend.pionex import get_async_pionex
+from backend.sentiment import sentiment_pipeline
 
-scheduler = AsyncIOScheduler()
+logger = logging.getLogger("scheduler")
+logger.setLevel(logging.INFO)
 
-def retrain_model():
-    db = SessionLocal()
+# Vytvoří se až ve start_scheduler (APScheduler se při importu nenačítá)
+scheduler = None
+
+JOB_SECONDS = registry.histogram("scheduler_job_seconds", "Doba běhu plánované úlohy", ["job"], buckets=JOB_BUCKETS)
+JOB_FAILURES = registry.counter("scheduler_job_failures_total", "Plánované úlohy ukončené výjimkou", ["job"])
+RETRAIN_TOTAL = registry.counter("model_retrain_total", "Retrénink modelu podle výsledku", ["symbol", "status"])
+RETRAIN_SECONDS = registry.histogram("model_retrain_seconds", "Fáze retréninku modelu (stažení dat, fit, celkem)",
+                                     ["symbol", "phase"], buckets=JOB_BUCKETS)
+
+def timed_job(job_id):
+    """Měří dobu běhu úlohy a počítá výjimky (výjimku dál předá APScheduleru)."""
+    def decorator(fn):
+        seconds, failures = JOB_SECONDS.labels(job=job_id), JOB_FAILURES.labels(job=job_id)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with seconds.time():
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    failures.inc()
+                    raise
+        return wrapper
+    return decorator
+
+@timed_job("ml_retrain")
+async def retrain_model():
+    # Data se stahují asynchronně, fit běží v procesu poolu, event loop zůstává volný
+    results = await training_executor.retrain_all(TRAINING_SYMBOLS)
+    for r in results:
+        RETRAIN_TOTAL.labels(symbol=r["symbol"], status=r["status"]).inc()
+        if r["status"] == "success":
+            for phase in ("fetch", "fit", "total"):
+                RETRAIN_SECONDS.labels(symbol=r["symbol"], phase=phase).observe(r[f"{phase}_s"])
+            logger.info(f"ML model {r['symbol']} retrénován (v{r['version']}, {r['total_s']}s).")
+        else:
+            logger.error(f"Chyba při retrénování ML modelu {r['symbol']}: {r['error']}")
+
+@timed_job("ledger_reconcile")
+async def reconcile_ledger():
+    # Nové objednávky a fill z Pionexu od kurzoru, pozice se posunou jen o nové fill
     try:
-        # Fetch real market data from Pionex for retraining
-        from backend.pionex import PionexAPI
-        api = PionexAPI()
-        klines = api.get_klines(symbol="BTCUSDT", interval="1m", limit=100)
-        df = pd.DataFrame(klines)
-        # Example: use close prices as y, time index as X
-        X = np.arange(len(df)).reshape(-1, 1)
-        y = df["close"].astype(float).values
-        ts_model.fit(X, y)
-        log_audit(db, user="system", action="ml_retrain", detail="Model retrained successfully", status="success")
-        print("ML model retrénován s reálnými daty z Pionex.")
-    except Exception as e:
-        log_audit(db, user="system", action="ml_retrain", detail="Model retraining failed", status="error", error=str(e))
-        print(f"Chyba při retrénování ML modelu: {e}")
-    finally:
-        db.close()
+        api = get_async_pionex()
+    except ValueError:
+        return  # bez API klíčů není co reconcilovat
+    for r in await trade_ledger.reconcile(api):
+        if "error" in r:
+            logger.error(f"Chyba při reconcile ledgeru {r['symbol']}: {r['error']}")
+
+@timed_job("sentiment_purge")
+async def purge_sentiment_cache():
+    # Expirované záznamy cache sentimentu (čtení je stejně ignoruje, jen úklid tabulky);
+    # výjimku započte timed_job do scheduler_job_failures_total a zaloguje APScheduler
+    removed = await sentiment_pipeline.purge_expired()
+    logger.info(f"Úklid cache sentimentu: smazáno {removed} záznamů")
+
+def get_scheduler():
+    global scheduler
+    if scheduler is None:
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        scheduler = AsyncIOScheduler()
+    return scheduler
 
 def start_scheduler():
+    scheduler = get_scheduler()
     if not scheduler.running:
-        # Spustí retrénink každých 10 minut
-        scheduler.add_job(retrain_model, "interval", minutes=10, id="ml_retrain", replace_existing=True)
-        scheduler.start()
\ No newline at end of file
+        # Spustí retrénink každých 10 minut; překrývající se běhy se nespouští (max_instances, coalesce)
+        scheduler.add_job(retrain_model, "interval", minutes=10, id="ml_retrain", replace_existing=True,
+                          max_instances=1, coalesce=True)
+        if LEDGER_RECONCILE_INTERVAL > 0:
+            scheduler.add_job(reconcile_ledger, "interval", seconds=LEDGER_RECONCILE_INTERVAL, id="ledger_reconcile",
+                              replace_existing=True, max_instances=1, coalesce=True)
+        scheduler.add_job(purge_sentiment_cache, "interval", hours=1, id="sentiment_purge", replace_existing=True,
+                          max_instances=1, coalesce=True)
+        scheduler.start()
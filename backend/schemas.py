@@ -1,9 +1,23 @@
-from pydantic import BaseModel
-from typing import Optional
+import math
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Dict, List, Optional
+
+# Limity požadavků, které stahují svíčky z Pionexu nebo spouštějí výpočet
+MAX_REQUEST_SYMBOLS = 20
+MAX_BACKTEST_LIMIT = 5000
+MAX_SWEEP_VALUES = 20
+MAX_SWEEP_COMBINATIONS = 1000
+MAX_PREDICT_LIMIT = 1000
+MAX_PREDICT_HORIZONS = 20
 
 class BotBase(BaseModel):
     name: str
     description: Optional[str] = None
+    # Konfigurace pro runtime (backend.runtime); bez symbolu se bot nespouští
+    symbol: Optional[str] = None
+    interval: Optional[str] = "1m"
+    tick_interval: Optional[float] = None
+    quantity: Optional[float] = None
 
 class BotCreate(BotBase):
     pass
@@ -13,6 +27,7 @@ class Bot(BotBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
 class UserBase(BaseModel):
     username: str
     email: Optional[str] = None
@@ -25,6 +40,7 @@ class User(UserBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
 
 class TradeBase(BaseModel):
     user_id: int
@@ -42,6 +58,7 @@ class Trade(TradeBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
 
 class LogBase(BaseModel):
     user_id: Optional[int] = None
@@ -57,9 +74,45 @@ class Log(LogBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
 
 class InfluxDBData(BaseModel):
     measurement: str
     time: str
     fields: dict
-    tags: Optional[dict] = None
\ No newline at end of file
+    tags: Optional[dict] = None
+
+class BacktestRequest(BaseModel):
+    # Uzavírací ceny podle symbolu; pokud chybí, stáhnou se klíny z Pionexu pro `symbols`
+    closes: Optional[Dict[str, List[float]]] = None
+    symbols: Optional[List[str]] = Field(None, max_length=MAX_REQUEST_SYMBOLS)
+    interval: str = "1m"
+    limit: int = Field(500, ge=2, le=MAX_BACKTEST_LIMIT)
+    stop_loss_pct: float = 0.03
+    max_positions: int = 3
+    panic_volatility: float = 0.08
+    include_fills: bool = True
+    # Volitelný sweep, např. {"stop_loss_pct": [0.01, 0.03], "max_positions": [1, 3]}
+    sweep: Optional[Dict[str, Annotated[List[float], Field(min_length=1, max_length=MAX_SWEEP_VALUES)]]] = None
+
+    @field_validator("sweep")
+    @classmethod
+    def _limit_combinations(cls, sweep):
+        if sweep and math.prod(len(values) for values in sweep.values()) > MAX_SWEEP_COMBINATIONS:
+            raise ValueError(f"Sweep smí mít nejvýše {MAX_SWEEP_COMBINATIONS} kombinací")
+        return sweep
+
+class PredictBatchRequest(BaseModel):
+    symbols: List[str] = Field(..., max_length=MAX_REQUEST_SYMBOLS)
+    # Horizonty v počtu svíček; None = všechny, na které byl model natrénován
+    horizons: Optional[List[int]] = Field(None, max_length=MAX_PREDICT_HORIZONS)
+    # Uzavírací ceny podle symbolu; pokud chybí, čtou se z lokálního úložiště svíček
+    closes: Optional[Dict[str, List[float]]] = None
+    interval: str = "1m"
+    limit: int = Field(100, ge=1, le=MAX_PREDICT_LIMIT)
+
+class SentimentItem(BaseModel):
+    text: str
+    symbol: Optional[str] = None
+    # Čas textu (unix s); výchozí je čas přijetí
+    ts: Optional[float] = None
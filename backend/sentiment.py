@@ -0,0 +1,335 @@
+"""
+Sentiment textů (zprávy, tweety) přes Gemini s cache a dávkováním.
+
+- Text se identifikuje hashem normalizovaného obsahu (sha256). Výsledek se drží
+  v paměti procesu a v tabulce `sentiment_cache` s TTL (SENTIMENT_CACHE_TTL),
+  takže stejný text se modelu posílá jednou za TTL napříč workery i restarty.
+- Stejné texty rozpracované současně sdílí jeden výsledek (future podle hashe).
+- Texty, které v cache nejsou, čekají ve frontě; dávkovač je po
+  SENTIMENT_BATCH_SIZE kusech nebo po SENTIMENT_BATCH_WAIT s pošle jedním
+  požadavkem (AsyncGeminiClient.analyze_batch), souběžně nejvýše
+  SENTIMENT_MAX_CONCURRENT dávek.
+- Skóre s uvedeným symbolem se průběžně agregují do časové řady po bucketech
+  (SentimentSeries); strategie čtou hotový průměr (Strategy.sentiment_score),
+  na model ani databázi nečekají.
+"""
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, String, Float, DateTime, delete, select
+
+from backend.db import Base
+from backend.gemini import AsyncGeminiClient, GeminiAPIError
+
+logger = logging.getLogger("sentiment")
+logger.setLevel(logging.INFO)
+
+SENTIMENT_CACHE_TTL = int(os.getenv("SENTIMENT_CACHE_TTL", str(24 * 3600)))
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "20"))
+SENTIMENT_BATCH_WAIT = float(os.getenv("SENTIMENT_BATCH_WAIT", "0.2"))
+SENTIMENT_MAX_CONCURRENT = int(os.getenv("SENTIMENT_MAX_CONCURRENT", "4"))
+SENTIMENT_BUCKET_SECONDS = int(os.getenv("SENTIMENT_BUCKET_SECONDS", "300"))
+SENTIMENT_MAX_BUCKETS = int(os.getenv("SENTIMENT_MAX_BUCKETS", "288"))  # 24 h po 5 min
+MEMORY_CACHE_SIZE = 10_000
+
+
+class SentimentCacheORM(Base):
+    __tablename__ = "sentiment_cache"
+    text_hash = Column(String(64), primary_key=True)  # sha256 normalizovaného textu
+    score = Column(Float, nullable=False)  # -1 .. 1
+    label = Column(String(16), nullable=True)
+    model = Column(String(64), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def text_hash(text: str) -> str:
+    """Hash obsahu; texty lišící se jen bílými znaky a velikostí písmen jsou stejné."""
+    return hashlib.sha256(_WHITESPACE.sub(" ", text.strip().lower()).encode()).hexdigest()
+
+
+def _upsert(db, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (text_hash) DO UPDATE (Postgres i SQLite)."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(SentimentCacheORM.__table__).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["text_hash"],
+        set_={c: stmt.excluded[c] for c in ("score", "label", "model", "created_at", "expires_at")},
+    )
+
+
+class SentimentSeries:
+    """Průměrné skóre po časových bucketech pro každý symbol (posledních `max_buckets`)."""
+
+    def __init__(self, bucket_seconds: int = SENTIMENT_BUCKET_SECONDS, max_buckets: int = SENTIMENT_MAX_BUCKETS):
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        # symbol -> začátek bucketu (s) -> [součet skóre, počet]
+        self._buckets: Dict[str, "OrderedDict[int, List[float]]"] = {}
+
+    def add(self, symbol: str, ts: float, score: float):
+        start = int(ts) // self.bucket_seconds * self.bucket_seconds
+        buckets = self._buckets.setdefault(symbol, OrderedDict())
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = [0.0, 0]
+            if len(buckets) > 1 and start < next(reversed(buckets)):
+                # Opožděný záznam – udržet buckety seřazené
+                self._buckets[symbol] = buckets = OrderedDict(sorted(buckets.items()))
+            while len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+        bucket[0] += score
+        bucket[1] += 1
+
+    def series(self, symbol: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        return [{"time": start, "score": total / count, "count": count}
+                for start, (total, count) in self._buckets.get(symbol, {}).items()
+                if since is None or start + self.bucket_seconds > since]
+
+    def latest(self, symbol: str, window: float = 3600, now: Optional[float] = None) -> Optional[float]:
+        """Průměr skóre za posledních `window` s (vážený počtem textů); None = žádná data."""
+        since = (now if now is not None else time.time()) - window
+        total = count = 0.0
+        for start, (s, c) in reversed(self._buckets.get(symbol, {}).items()):
+            if start + self.bucket_seconds <= since:
+                break
+            total += s
+            count += c
+        return total / count if count else None
+
+    def symbols(self) -> List[str]:
+        return sorted(self._buckets)
+
+
+class SentimentPipeline:
+    def __init__(self, session_factory=None, client_factory: Optional[Callable] = None,
+                 series: Optional[SentimentSeries] = None, ttl: int = SENTIMENT_CACHE_TTL,
+                 batch_size: int = SENTIMENT_BATCH_SIZE, batch_wait: float = SENTIMENT_BATCH_WAIT,
+                 max_concurrent: int = SENTIMENT_MAX_CONCURRENT, clock: Callable[[], float] = time.time):
+        self._session_factory = session_factory
+        self.client_factory = client_factory or _gemini
+        self.series = series or SentimentSeries()
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_concurrent = max_concurrent
+        self.clock = clock
+        # hash -> (platnost do, výsledek)
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"requests": 0, "memory_hits": 0, "cache_hits": 0, "deduplicated": 0, "analyzed": 0,
+                      "batches": 0, "api_calls": 0, "errors": 0}
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from backend.db import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    # --- vstup ---
+
+    async def analyze(self, text: str, symbol: Optional[str] = None, ts: Optional[float] = None) -> Dict[str, Any]:
+        """Skóre textu ({"score", "label", "source"}); se symbolem se započte do jeho časové řady."""
+        self.stats["requests"] += 1
+        key = text_hash(text)
+        result = self._remembered(key)
+        if result is not None:
+            self.stats["memory_hits"] += 1
+            result = result | {"source": "memory"}
+        else:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._enqueue(key, text)
+            else:
+                self.stats["deduplicated"] += 1
+            result = await asyncio.shield(future)
+        if symbol:
+            self.series.add(symbol, ts if ts is not None else self.clock(), result["score"])
+        return result
+
+    async def analyze_many(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Dávka {"text", "symbol"?, "ts"?}; chyba jedné položky nezastaví ostatní."""
+        items = list(items)
+        results = await asyncio.gather(*(self.analyze(i["text"], i.get("symbol"), i.get("ts")) for i in items),
+                                       return_exceptions=True)
+        out = []
+        for result in results:
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                out.append({"error": str(result)})
+            else:
+                out.append(result)
+        return out
+
+    def _remembered(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry[1]
+
+    def _remember(self, key: str, result: Dict[str, Any], expires: float):
+        self._memory[key] = (expires, {"score": result["score"], "label": result["label"]})
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_CACHE_SIZE:
+            self._memory.popitem(last=False)
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._batcher is None or self._batcher.done():
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._batcher = loop.create_task(self._run_batcher(), name="sentiment-batcher")
+        future = loop.create_future()
+        # Výjimku si vyzvednou čekající; bez nich by asyncio hlásilo nevyzvednutou výjimku
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending[key] = future
+        self._queue.put_nowait((key, text))
+        return future
+
+    # --- dávkování ---
+
+    async def _run_batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        batch.append(await self._queue.get())
+                except TimeoutError:
+                    break
+            await self._semaphore.acquire()
+            task = loop.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, str]]):
+        try:
+            self.stats["batches"] += 1
+            keys = [key for key, _ in batch]
+            cached = await self._load(keys)
+            self.stats["cache_hits"] += len(cached)
+            misses = [(key, text) for key, text in batch if key not in cached]
+            fresh: Dict[str, Dict[str, Any]] = {}
+            if misses:
+                self.stats["api_calls"] += 1
+                scores = await self.client_factory().analyze_batch([text for _, text in misses])
+                fresh = {key: score for (key, _), score in zip(misses, scores) if score is not None}
+                self.stats["analyzed"] += len(fresh)
+                await self._store(fresh)
+            expires = self.clock() + self.ttl
+            for key in keys:
+                future = self._pending.pop(key, None)
+                result = cached.get(key) or fresh.get(key)
+                if result is None:
+                    self.stats["errors"] += 1
+                    if future is not None and not future.done():
+                        future.set_exception(GeminiAPIError("Model pro text nevrátil skóre"))
+                    continue
+                source = "cache" if key in cached else "model"
+                self._remember(key, result, result.pop("expires", expires))
+                if future is not None and not future.done():
+                    future.set_result({"score": result["score"], "label": result["label"], "source": source})
+        except Exception as e:
+            logger.error(f"Analýza sentimentu dávky selhala: {e}")
+            self.stats["errors"] += len(batch)
+            for key, _ in batch:
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+        finally:
+            self._semaphore.release()
+
+    # --- perzistentní cache ---
+
+    async def _load(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        try:
+            async with self.session_factory() as db:
+                rows = (await db.execute(select(SentimentCacheORM).where(
+                    SentimentCacheORM.text_hash.in_(keys), SentimentCacheORM.expires_at > _utcnow()))).scalars()
+                now_dt, now = _utcnow(), self.clock()
+                return {r.text_hash: {"score": r.score, "label": r.label,
+                                      "expires": now + (r.expires_at - now_dt).total_seconds()} for r in rows}
+        except Exception as e:
+            # Bez databáze se jen analyzuje znovu
+            logger.warning(f"Čtení cache sentimentu selhalo: {e}")
+            return {}
+
+    async def _store(self, results: Dict[str, Dict[str, Any]]):
+        if not results:
+            return
+        now = _utcnow()
+        rows = [{"text_hash": key, "score": r["score"], "label": r["label"], "model": AsyncGeminiClient.MODEL,
+                 "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)} for key, r in results.items()]
+        try:
+            async with self.session_factory() as db:
+                await db.execute(_upsert(db, rows))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Zápis cache sentimentu selhal: {e}")
+
+    async def purge_expired(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(delete(SentimentCacheORM).where(SentimentCacheORM.expires_at <= _utcnow()))
+            await db.commit()
+        return result.rowcount or 0
+
+    # --- řízení ---
+
+    async def stop(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        # Texty ve frontě nebo v nedokončené dávce batcheru už nikdo nezpracuje – čekající nesmí viset
+        pending, self._pending = self._pending, {}
+        self._queue = None
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(GeminiAPIError("Analýza sentimentu byla zastavena"))
+
+    def info(self) -> dict:
+        requests = self.stats["requests"]
+        saved = self.stats["memory_hits"] + self.stats["cache_hits"] + self.stats["deduplicated"]
+        return {**self.stats, "hit_rate": saved / requests if requests else None, "memory": len(self._memory),
+                "pending": len(self._pending), "symbols": self.series.symbols()}
+
+
+def _gemini():
+    from backend.gemini import get_async_gemini
+    return get_async_gemini()
+
+
+# Singleton instance
+sentiment_pipeline = SentimentPipeline()
+sentiment_series = sentiment_pipeline.series
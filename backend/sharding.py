@@ -0,0 +1,289 @@
+"""
+Rozdělení běžících botů mezi více worker procesů (např. `uvicorn --workers N`).
+
+Každý worker (ShardCoordinator) v intervalu BOT_HEARTBEAT_INTERVAL:
+1. zapíše heartbeat do `bot_workers`,
+2. z živých workerů (heartbeat mladší než BOT_LEASE_TTL) postaví konzistentní
+   hash ring a určí boty se stavem `running`, kteří na něj připadají,
+3. uvolní lease botů, které mu už nepatří, prodlouží vlastní a převezme
+   volné nebo expirované (`bot_leases`, podmíněný UPDATE / INSERT bez konfliktu),
+4. v lokálním BotRuntime spustí boty, jejichž lease drží, a zastaví ostatní.
+
+Bot běží jen u workeru s platnou lease. Nový worker převezme svou část botů
+až po uvolnění předchozím vlastníkem (jeho další heartbeat) a spadlému workeru
+lease vyprší po BOT_LEASE_TTL – jeho boti se přesunou na ostatní. Worker, který
+lease nestihne prodloužit (databáze nedostupná, synchronizace zaseknutá déle než
+BOT_SYNC_TIMEOUT), zastaví své boty sám podle lokálních hodin už BOT_LEASE_MARGIN
+před jejím vypršením – dřív, než ji může převzít jiný worker.
+Hodiny workerů se předpokládají synchronizované (NTP) s rezervou výrazně pod BOT_LEASE_MARGIN.
+"""
+import os
+import bisect
+import socket
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Column, Integer, String, DateTime, delete, or_, select, update
+
+from backend.db import Base
+
+logger = logging.getLogger("sharding")
+logger.setLevel(logging.INFO)
+
+BOT_SHARDING = os.getenv("BOT_SHARDING", "false").lower() in ("1", "true", "yes")
+BOT_WORKER_ID = os.getenv("BOT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+BOT_LEASE_TTL = float(os.getenv("BOT_LEASE_TTL", "15"))
+BOT_HEARTBEAT_INTERVAL = float(os.getenv("BOT_HEARTBEAT_INTERVAL", "5"))
+BOT_HASH_VNODES = int(os.getenv("BOT_HASH_VNODES", "64"))
+BOT_LEASE_MARGIN = float(os.getenv("BOT_LEASE_MARGIN", "5"))
+BOT_SYNC_TIMEOUT = float(os.getenv("BOT_SYNC_TIMEOUT", "5"))
+
+
+class WorkerORM(Base):
+    __tablename__ = "bot_workers"
+    worker_id = Column(String(128), primary_key=True)
+    heartbeat_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+
+
+class LeaseORM(Base):
+    __tablename__ = "bot_leases"
+    bot_id = Column(Integer, primary_key=True)
+    worker_id = Column(String(128), nullable=False, index=True)
+    lease_until = Column(DateTime, nullable=False)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Konzistentní hashování s virtuálními uzly; přidání workeru přesune jen ~1/N klíčů."""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = BOT_HASH_VNODES):
+        self.vnodes = vnodes
+        self.nodes = sorted(set(nodes))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._points = [p for p, _ in points]
+        self._owners = [n for _, n in points]
+
+    def node_for(self, key) -> Optional[str]:
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, _hash(str(key)))
+        return self._owners[i % len(self._owners)]
+
+    def assign(self, keys: Iterable) -> Dict[str, List]:
+        out: Dict[str, List] = {node: [] for node in self.nodes}
+        for key in keys:
+            out[self.node_for(key)].append(key)
+        return out
+
+
+def _insert_ignore(db, table):
+    """INSERT ... ON CONFLICT DO NOTHING (Postgres i SQLite)."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).on_conflict_do_nothing()
+
+
+class ShardCoordinator:
+    def __init__(self, runtime, worker_id: str = BOT_WORKER_ID, session_factory=None,
+                 lease_ttl: float = BOT_LEASE_TTL, heartbeat_interval: float = BOT_HEARTBEAT_INTERVAL,
+                 vnodes: int = BOT_HASH_VNODES, clock: Callable[[], datetime] = _utcnow,
+                 lease_margin: float = BOT_LEASE_MARGIN, sync_timeout: float = BOT_SYNC_TIMEOUT):
+        self.runtime = runtime
+        self.worker_id = worker_id
+        self._session_factory = session_factory
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.vnodes = vnodes
+        self.clock = clock
+        self.lease_margin = lease_margin
+        self.sync_timeout = sync_timeout
+        self.ring = HashRing([worker_id], vnodes)
+        self.owned: Set[int] = set()
+        self.last_sync: Optional[datetime] = None
+        # Do kdy platí lease vlastněných botů (čas začátku poslední úspěšné synchronizace + TTL)
+        self.lease_until: Optional[datetime] = None
+        self.stats = {"syncs": 0, "acquired": 0, "released": 0, "errors": 0, "fenced": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from backend.db import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    def owns(self, bot_id: int) -> bool:
+        return bot_id in self.owned
+
+    def wake(self):
+        """Synchronizace hned (např. po startu bota přes API), ne až po heartbeat intervalu."""
+        if self._wake is not None:
+            self._wake.set()
+
+    # --- synchronizace ---
+
+    async def sync(self) -> Set[int]:
+        from backend.api import BotORM
+        from backend.runtime import spec_of
+        now = self.clock()
+        ttl = timedelta(seconds=self.lease_ttl)
+        me = self.worker_id
+        async with self.session_factory() as db:
+            worker = await db.get(WorkerORM, me)
+            if worker is None:
+                db.add(WorkerORM(worker_id=me, heartbeat_at=now, started_at=now))
+            else:
+                worker.heartbeat_at = now
+            await db.flush()
+            live = (await db.execute(select(WorkerORM.worker_id).where(WorkerORM.heartbeat_at > now - ttl))).scalars()
+            self.ring = HashRing(set(live) | {me}, self.vnodes)
+
+            # Konfigurace jako BotSpec – ORM objekty po commitu expirují (expire_on_commit)
+            bots = {b.id: spec_of(b) for b in
+                    (await db.execute(select(BotORM).where(BotORM.status == "running"))).scalars()}
+            desired = {bot_id for bot_id in bots if self.ring.node_for(bot_id) == me}
+
+            # Uvolnit, co už nepatří (rebalance na jiný worker, pozastavení bota)
+            await db.execute(delete(LeaseORM).where(LeaseORM.worker_id == me, LeaseORM.bot_id.not_in(desired)))
+            if desired:
+                # Prodloužit vlastní a převzít expirované
+                await db.execute(
+                    update(LeaseORM)
+                    .where(LeaseORM.bot_id.in_(desired), or_(LeaseORM.worker_id == me, LeaseORM.lease_until < now))
+                    .values(worker_id=me, lease_until=now + ttl)
+                )
+                existing = set((await db.execute(
+                    select(LeaseORM.bot_id).where(LeaseORM.bot_id.in_(desired)))).scalars())
+                missing = desired - existing
+                if missing:
+                    await db.execute(_insert_ignore(db, LeaseORM.__table__),
+                                     [{"bot_id": b, "worker_id": me, "lease_until": now + ttl} for b in missing])
+            owned = set((await db.execute(select(LeaseORM.bot_id).where(
+                LeaseORM.worker_id == me, LeaseORM.lease_until > now))).scalars())
+            # Záznamy dávno mrtvých workerů
+            await db.execute(delete(WorkerORM).where(WorkerORM.heartbeat_at < now - 10 * ttl))
+            await db.commit()
+
+        self.stats["acquired"] += len(owned - self.owned)
+        self.stats["released"] += len(self.owned - owned)
+        self.owned = owned
+        self.last_sync = now
+        self.lease_until = now + ttl
+        self.stats["syncs"] += 1
+        await self._apply(bots)
+        return owned
+
+    async def _apply(self, bots: Dict[int, object]):
+        for bot_id in list(self.runtime.bots):
+            if bot_id not in self.owned:
+                await self.runtime.stop_bot(bot_id)
+        for bot_id in self.owned:
+            if bot_id in bots:
+                # Beze změny konfigurace je start_bot no-op, jinak task restartuje
+                await self.runtime.start_bot(bots[bot_id])
+
+    def _fence_in(self) -> float:
+        """Sekundy do okamžiku, kdy je nutné zastavit boty (lease_until - rezerva); <= 0 = hned."""
+        if self.lease_until is None:
+            return 0.0
+        deadline = self.lease_until - timedelta(seconds=self.lease_margin)
+        return (deadline - self.clock()).total_seconds()
+
+    async def _fence(self):
+        """Lease se nepodařilo včas prodloužit a brzy ji může převzít jiný worker – zastavit vše."""
+        if self.owned or self.runtime.bots:
+            logger.warning(f"Worker {self.worker_id} neprodloužil lease (platí do {self.lease_until}), "
+                           f"zastavuje boty")
+            self.stats["fenced"] += 1
+        self.owned = set()
+        await self.runtime.shutdown()
+
+    async def _check_lease(self):
+        if (self.owned or self.runtime.bots) and self._fence_in() <= 0:
+            await self._fence()
+
+    async def run(self):
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                # Zaseknuté spojení se počítá jako chyba, jinak by se k zastavení botů nedošlo
+                async with asyncio.timeout(self.sync_timeout):
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Synchronizace shardů selhala: {e!r}")
+            # Podle lokálních hodin, bez ohledu na výsledek synchronizace
+            await self._check_lease()
+            self._wake.clear()
+            try:
+                # Probudit se nejpozději v okamžiku, kdy by bylo nutné boty zastavit
+                wait = self.heartbeat_interval
+                if self.owned or self.runtime.bots:
+                    wait = max(0.0, min(wait, self._fence_in()))
+                async with asyncio.timeout(wait):
+                    await self._wake.wait()
+            except TimeoutError:
+                pass
+            await self._check_lease()
+
+    # --- řízení ---
+
+    def start(self):
+        self._task = asyncio.create_task(self.run(), name=f"shard-{self.worker_id}")
+
+    async def stop(self, release: bool = True):
+        """Ukončí synchronizaci; s `release` uvolní lease hned (boti se přesunou bez čekání na TTL)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.runtime.shutdown()
+        self.owned = set()
+        if release:
+            async with self.session_factory() as db:
+                await db.execute(delete(LeaseORM).where(LeaseORM.worker_id == self.worker_id))
+                await db.execute(delete(WorkerORM).where(WorkerORM.worker_id == self.worker_id))
+                await db.commit()
+
+    def info(self) -> dict:
+        return {"worker_id": self.worker_id, "workers": self.ring.nodes, "owned": sorted(self.owned),
+                "last_sync": self.last_sync, **self.stats}
+
+
+# Služba spouštěná při startu aplikace (pokud je zapnuté BOT_SHARDING)
+shard_coordinator: Optional[ShardCoordinator] = None
+
+
+def start_sharding(runtime) -> Optional[ShardCoordinator]:
+    global shard_coordinator
+    if not BOT_SHARDING or shard_coordinator is not None:
+        return shard_coordinator
+    shard_coordinator = ShardCoordinator(runtime)
+    runtime.shard = shard_coordinator
+    shard_coordinator.start()
+    logger.info(f"Sharding botů zapnut, worker {shard_coordinator.worker_id}")
+    return shard_coordinator
+
+
+async def stop_sharding():
+    global shard_coordinator
+    if shard_coordinator is not None:
+        coordinator, shard_coordinator = shard_coordinator, None
+        coordinator.runtime.shard = None
+        await coordinator.stop()
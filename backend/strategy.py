@@ -1,38 +1,88 @@
-# Conditional import for TA-Lib (production) and pandas-ta (testing)
-try:
-    import talib
-    TA_LIB_AVAILABLE = True
-except ImportError:
-    import numpy as np
-    np.NaN = np.nan  # Patch for pandas-ta compatibility with numpy >= 1.24
-    import pandas_ta as ta
-    TA_LIB_AVAILABLE = False
+import importlib.util
 import numpy as np
-import pandas as pd
-# Import talib only if available; otherwise use pandas-ta via TA_LIB_AVAILABLE
 
-from backend.model import ts_model
+# TA-Lib (production) or pandas-ta (testing); the module itself is imported on first
+# compute_indicators – both take hundreds of ms and most processes never need them
+TA_LIB_AVAILABLE = importlib.util.find_spec("talib") is not None
+talib = None
+ta = None
+
+
+def _load_ta():
+    global talib, ta, TA_LIB_AVAILABLE
+    if TA_LIB_AVAILABLE and talib is None:
+        try:
+            import talib as module
+            talib = module
+        except ImportError:
+            TA_LIB_AVAILABLE = False
+    if not TA_LIB_AVAILABLE and ta is None:
+        np.NaN = np.nan  # Patch for pandas-ta compatibility with numpy >= 1.24
+        import pandas_ta as module
+        ta = module
+
+from backend.model import ts_model, model_registry
+from backend.indicators import indicator_engine
+from backend.prediction import prediction_service
+from backend.orderbook import order_books
+from backend.metrics import registry, COMPUTE_BUCKETS
+
+INDICATOR_SECONDS = registry.histogram("indicator_seconds", "Výpočet indikátorů strategie", ["op"],
+                                       buckets=COMPUTE_BUCKETS)
 
 class Strategy:
-    def __init__(self, stop_loss_pct=0.03, max_positions=3, panic_volatility=0.08):
+    RSI_OVERSOLD = 30
+    RSI_OVERBOUGHT = 70
+    PANIC_WINDOW = 10
+
+    def __init__(self, stop_loss_pct=0.03, max_positions=3, panic_volatility=0.08, engine=None, books=None,
+                 sentiment=None):
         self.stop_loss_pct = stop_loss_pct
         self.max_positions = max_positions
         self.panic_volatility = panic_volatility
         self.panic_mode = False
+        self.engine = engine or indicator_engine
+        self.books = books or order_books
+        # Předpočítaná řada sentimentu (backend.sentiment); načte se líně, strategie bez ní DB nepotřebuje
+        self._sentiment = sentiment
+
+    def market_snapshot(self, symbol, depth=5):
+        """Bid/ask, spread a imbalance z lokálního order booku (None, pokud kniha není aktuální)."""
+        book = self.books.fresh(symbol)
+        return book.top(depth) if book is not None else None
+
+    @property
+    def sentiment(self):
+        if self._sentiment is None:
+            from backend.sentiment import sentiment_series
+            self._sentiment = sentiment_series
+        return self._sentiment
+
+    def sentiment_score(self, symbol, window=3600):
+        """Průměrný sentiment symbolu za posledních `window` s (-1..1), None = bez dat."""
+        return self.sentiment.latest(symbol, window)
 
-    def predict_next_price(self, df):
+    def predict_next_price(self, df, symbol=None):
         """
-        Skeleton: Využije ML model pro predikci další ceny.
+        Skeleton: Využije ML model pro predikci další ceny
+        (model daného symbolu z registru, bez symbolu výchozí ts_model).
         """
         # Příklad: použij posledních N hodnot pro predikci
         if len(df) < 1:
             return None
         X = df['close'].values[-1:].reshape(-1, 1)
-        pred = ts_model.predict(X)
+        if symbol:
+            # Model nad lagy/výnosy/indikátory, pokud pro symbol existuje
+            forecast = prediction_service.predict_batch({symbol: df['close'].values})["predictions"].get(symbol)
+            if forecast:
+                return forecast[min(forecast)]
+        pred = model_registry.predict(symbol, X) if symbol else ts_model.predict(X)
         return float(pred[0]) if len(pred) > 0 else None
 
+    @INDICATOR_SECONDS.time(op="compute_indicators")
     def compute_indicators(self, df):
         """Přidá do df sloupce s RSI, MACD, BB, MA."""
+        _load_ta()
         if TA_LIB_AVAILABLE:
             df['rsi'] = talib.RSI(df['close'], timeperiod=14)
             macd, macdsignal, macdhist = talib.MACD(df['close'], fastperiod=12, slowperiod=26, signalperiod=9)
@@ -57,6 +107,29 @@ class Strategy:
             df['ma'] = ta.sma(df['close'], length=20)
         return df
 
+    @INDICATOR_SECONDS.time(op="update_indicators")
+    def update_indicators(self, symbol, close):
+        """
+        Inkrementální varianta compute_indicators pro jednu novou svíčku.
+        Vrací dict se stejnými klíči jako sloupce z compute_indicators.
+        """
+        return self.engine.update(symbol, close)
+
+    def warmup_indicators(self, symbol, closes):
+        """Naplní inkrementální stav symbolu z historie (např. po restartu)."""
+        return self.engine.warmup(symbol, closes)
+
+    def generate_signals(self, close, ind):
+        """
+        Vstupní a výstupní signály z indikátorů (mean reversion na BB + RSI).
+        Pracuje element-wise, takže funguje pro skaláry, sloupce df i 2D pole (bar x symbol).
+        """
+        close = np.asarray(close, dtype=float)
+        rsi = np.asarray(ind['rsi'], dtype=float)
+        entries = (rsi < self.RSI_OVERSOLD) & (close <= np.asarray(ind['bb_lower'], dtype=float))
+        exits = (rsi > self.RSI_OVERBOUGHT) | (close >= np.asarray(ind['bb_upper'], dtype=float))
+        return entries, exits
+
     def check_stop_loss(self, entry_price, current_price):
         """Vrací True, pokud je dosažen stop-loss."""
         return current_price <= entry_price * (1 - self.stop_loss_pct)
@@ -68,7 +141,7 @@ class Strategy:
     def check_panic_mode(self, df):
         """Aktivuje panic režim při extrémní volatilitě."""
         returns = df['close'].pct_change().dropna()
-        volatility = returns.rolling(window=10).std().iloc[-1]
+        volatility = returns.rolling(window=self.PANIC_WINDOW).std().iloc[-1]
         if volatility is not None and volatility > self.panic_volatility:
             self.panic_mode = True
         else:
@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import threading
+import pytest
+from sqlalchemy import create_engine, event, select, func
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.audit import AuditLog, AuditWriter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    AuditLog.__table__.create(engine)
+    return engine
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(AuditLog.__table__)).scalar()
+
+
+def test_batches_use_multi_row_insert(engine, tmp_path):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    writer = AuditWriter(engine, batch_size=100, flush_interval=5, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(250):
+        writer.log("system", "list_bots", detail=str(i))
+    writer.stop()
+    assert _count(engine) == 250
+    inserts = [s for s in statements if s.startswith("INSERT")]
+    assert len(inserts) == 3 and writer.stats["batches"] == 3
+
+
+def test_spill_when_db_down_and_replay(engine, tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    down = threading.Event()
+    down.set()
+    writer = AuditWriter(engine, flush_interval=0.05, queue_size=5, spill_path=str(spill), retry_interval=60)
+    original = writer._insert
+
+    def insert(rows):
+        if down.is_set():
+            raise RuntimeError("postgres unavailable")
+        original(rows)
+
+    writer._insert = insert
+    for i in range(20):
+        writer.log("system", "create_bot", detail=str(i))
+    assert writer.flush()
+    # Omezená fronta: přetečení i neúspěšné dávky skončí ve spill souboru
+    lines = [json.loads(line) for line in spill.read_text().splitlines()]
+    assert len(lines) == 20 and _count(engine) == 0
+    down.clear()
+    writer.stop()
+    assert _count(engine) == 20 and writer.stats["replayed"] == 20
+    assert not spill.exists()
+
+
+def test_overflow_is_spilled_off_the_caller_thread(engine, tmp_path, monkeypatch):
+    spill = tmp_path / "spill.jsonl"
+    entered, release = threading.Event(), threading.Event()
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(threading.current_thread().name), real_fsync(fd)))
+    writer = AuditWriter(engine, batch_size=2, flush_interval=0.01, queue_size=2, overflow_size=3,
+                         spill_path=str(spill))
+    original = writer._insert
+    writer._insert = lambda rows: (entered.set(), release.wait(5), original(rows))
+    writer.log("system", "list_bots", detail="0")
+    assert entered.wait(5)
+    for i in range(1, 10):
+        writer.log("system", "list_bots", detail=str(i))
+    # Volající na disk nesahá; co se nevejde ani do přetečení, se započítá
+    assert fsyncs == [] and writer.stats["dropped"] == 4
+    # Writer visí na DB a fronta je plná: stop nesmí blokovat
+    writer.stop(timeout=0.1)
+    release.set()
+    writer.stop()
+    assert set(fsyncs) == {"audit-writer"}
+    assert _count(engine) + writer.stats["dropped"] == 10 and writer.stats["replayed"] == 3
@@ -0,0 +1,82 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.backtest import Market, Prepared, rolling_volatility, simulate, sweep
+from backend.strategy import Strategy
+
+
+def _market(n_symbols=4, n_bars=400, seed=3):
+    rng = np.random.default_rng(seed)
+    return Market.from_closes({
+        f"S{j}": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars))) for j in range(n_symbols)
+    })
+
+
+def test_volatility_matches_check_panic_mode():
+    market = _market(1, 60)
+    vol = rolling_volatility(market.close, Strategy.PANIC_WINDOW)
+    for t in (15, 40, 59):
+        strat = Strategy(panic_volatility=vol[t, 0] - 1e-12)
+        assert strat.check_panic_mode(pd.DataFrame({"close": market.close[:t + 1, 0]}))
+        strat = Strategy(panic_volatility=vol[t, 0] + 1e-12)
+        assert not strat.check_panic_mode(pd.DataFrame({"close": market.close[:t + 1, 0]}))
+
+
+def test_rules_respected():
+    prep = Prepared(_market())
+    result = simulate(prep, stop_loss_pct=0.02, max_positions=2, panic_volatility=1.0)
+    open_count = 0
+    entries = {}
+    for fill in result["fills"]:
+        if fill["side"] == "BUY":
+            open_count += 1
+            entries[fill["symbol"]] = fill["price"]
+        else:
+            open_count -= 1
+            if fill["reason"] == "stop_loss":
+                assert fill["price"] <= entries[fill["symbol"]] * 0.98
+        assert open_count <= 2
+    assert result["trades"] == sum(f["side"] == "SELL" for f in result["fills"])
+    assert 0 <= result["max_drawdown_pct"] <= 100
+
+
+def test_sweep_process_pool_matches_sequential():
+    market = _market()
+    grid = {"stop_loss_pct": [0.01, 0.05], "max_positions": [1, 3], "panic_volatility": [0.03, 1.0]}
+    parallel = sweep(market, grid, processes=2, chunk_size=2)
+    sequential = sweep(market, grid, processes=1)
+    assert len(parallel) == 8
+    assert [r["pnl"] for r in parallel] == [r["pnl"] for r in sequential]
+
+
+def test_sweep_uses_shared_spawn_pool(monkeypatch):
+    from backend import backtest
+    monkeypatch.setattr(backtest, "BACKTEST_WORKERS", 2)
+    grid = {"stop_loss_pct": [0.01, 0.05], "max_positions": [1, 3]}
+    try:
+        first = sweep(_market(), grid, chunk_size=1)
+        pool = backtest._pool
+        assert pool is not None and pool._mp_context.get_start_method() == "spawn"
+        # Druhý sweep použije tentýž pool
+        assert [r["pnl"] for r in sweep(_market(), grid, chunk_size=1)] == [r["pnl"] for r in first]
+        assert backtest._pool is pool
+    finally:
+        backtest.shutdown_pool()
+    assert backtest._pool is None
+
+
+def test_backtest_request_is_bounded():
+    import pytest
+    from pydantic import ValidationError
+    from backend.schemas import BacktestRequest
+    BacktestRequest(symbols=["BTCUSDT"], sweep={"stop_loss_pct": [0.01, 0.02], "max_positions": [1, 2]})
+    with pytest.raises(ValidationError):
+        BacktestRequest(symbols=["BTCUSDT"], limit=10 ** 7)
+    with pytest.raises(ValidationError):
+        BacktestRequest(closes={"A": [1.0, 2.0]}, sweep={"stop_loss_pct": [0.01] * 1000})
+    values = [0.01 * i for i in range(1, 11)]
+    with pytest.raises(ValidationError):
+        BacktestRequest(closes={"A": [1.0, 2.0]},
+                        sweep={"stop_loss_pct": values, "max_positions": values, "panic_volatility": values + [1.0]})
@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import strategy
+from backend.bench import suite
+
+TINY = {"sizes": [200], "repeats": 1, "fit_rows": [200], "bots": 5, "ws_clients": [3], "ws_ticks": 5}
+
+
+def test_run_selected_cases(monkeypatch):
+    monkeypatch.setattr(suite, "MIN_REPEAT_TIME", 0.0)
+    talib_before = strategy.TA_LIB_AVAILABLE
+    results = suite.run(["strategy.*", "model.*", "ws.*"], TINY)
+    assert "api.bots_crud.create" not in results
+    assert not [r for r in results.values() if "error" in r]
+    assert results["strategy.check_panic_mode[n=200]"]["unit"] == "ms"
+    assert results["model.ts_model.predict[rows=1]"]["value"] > 0
+    fanout = results["ws.realtime_fanout[clients=3]"]
+    assert fanout["better"] == "higher" and fanout["delivered"] > 0
+    # Přepnutí TA backendu se po případu vrátí
+    assert strategy.TA_LIB_AVAILABLE == talib_before
+
+
+def test_compare_respects_direction():
+    baseline = {"a": {"value": 10.0, "better": "lower"}, "b": {"value": 100.0, "better": "higher"},
+                "c": {"value": 1.0, "better": "lower"}, "gone": {"value": 1.0}}
+    current = {"a": {"value": 13.0, "better": "lower"}, "b": {"value": 130.0, "better": "higher"},
+               "c": {"value": 1.05, "better": "lower"}, "new": {"value": 1.0}, "skip": {"skipped": "x"}}
+    status = {row["id"]: row["status"] for row in suite.compare(current, baseline, threshold=0.2)}
+    assert status == {"a": "regression", "b": "improved", "c": "same", "gone": "missing", "new": "new",
+                      "skip": "skipped"}
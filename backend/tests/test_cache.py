@@ -0,0 +1,90 @@
+import sys
+import os
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import api
+from backend.cache import TTLCache, BotCache, bot_cache, etag_matches
+
+
+def test_ttl_and_lru():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # vytlačí nejdéle nepoužité "b"
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.stats["evictions"] == 1
+    now[0] = 11
+    assert cache.get("a") is None and cache.stats["expired"] == 1
+
+
+def test_remote_invalidation_ignores_own_origin():
+    cache = BotCache()
+    cache.put_bot(1, "bot")
+    cache.handle_notification('{"origin": "%s", "bot_id": 1}' % cache.origin)
+    assert cache.get_bot(1) == "bot"
+    cache.handle_notification('{"origin": "other", "bot_id": 1}')
+    assert cache.get_bot(1) is None and cache.stats["remote_invalidations"] == 1
+    assert etag_matches('W/"x", "y"', '"x"') and not etag_matches(None, '"x"')
+
+
+def test_read_racing_invalidation_is_not_cached():
+    cache = BotCache()
+    version = cache.list_version          # čtení začíná
+    cache.invalidate(1)                   # souběžný update commitne a invaliduje
+    cache.put_bot(1, "starý", version)    # čtení dokončí se staršími daty
+    cache.put_list(["starý"], ("p",), version)
+    assert cache.get_bot(1) is None and cache.get_list(("p",)) is None
+    cache.put_bot(1, "nový", cache.list_version)
+    assert cache.get_bot(1) == "nový"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bots.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: api.BotORM.__table__.create(c))
+    asyncio.run(create())
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    monkeypatch.setattr(api, "log_audit", lambda *args, **kwargs: None)
+    bot_cache.invalidate()
+    app = FastAPI()
+    app.include_router(api.router)
+    app.dependency_overrides[api.get_async_db] = get_db
+    with TestClient(app) as c:
+        yield c
+    bot_cache.invalidate()
+
+
+def test_list_etag_and_invalidation(client):
+    bot_id = client.post("/bots/", json={"name": "A"}).json()["id"]
+    first = client.get("/bots/")
+    etag = first.headers["etag"]
+    assert [b["name"] for b in first.json()] == ["A"]
+    assert client.get("/bots/", headers={"If-None-Match": etag}).status_code == 304
+
+    # Detail se podruhé čte z cache
+    assert client.get(f"/bots/{bot_id}").json()["name"] == "A"
+    assert client.get(f"/bots/{bot_id}").json()["name"] == "A"
+    assert api.bot_cache.entries.stats["hits"] >= 2
+
+    client.put(f"/bots/{bot_id}", json={"name": "B"})
+    assert client.get(f"/bots/{bot_id}").json()["name"] == "B"
+    changed = client.get("/bots/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()[0]["name"] == "B"
+
+    client.delete(f"/bots/{bot_id}")
+    assert client.get(f"/bots/{bot_id}").status_code == 404
+    assert client.get("/bots/").json() == []
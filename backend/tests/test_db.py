@@ -0,0 +1,42 @@
+import sys
+import os
+import asyncio
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.db import async_database_url, InstrumentedQueuePool, InstrumentedAsyncPool, pool_metrics
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+    assert async_database_url("sqlite:////tmp/x.db") == "sqlite+aiosqlite:////tmp/x.db"
+
+
+def test_pool_metrics_count_overflow(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'a.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=2)
+    conns = [engine.connect() for _ in range(3)]
+    metrics = pool_metrics(engine)
+    assert metrics["checked_out"] == 3 and metrics["overflow"] == 2
+    assert metrics["checkouts"] == 3 and metrics["overflow_events"] == 2
+    for conn in conns:
+        conn.close()
+    assert pool_metrics(engine)["checked_out"] == 0
+
+
+def test_async_pool_metrics(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'b.db'}", poolclass=InstrumentedAsyncPool,
+                                 pool_size=2, max_overflow=0)
+
+    async def run():
+        async def query():
+            async with engine.connect() as conn:
+                await conn.execute(text("select 1"))
+        await asyncio.gather(*(query() for _ in range(10)))
+        try:
+            return pool_metrics(engine)
+        finally:
+            await engine.dispose()
+
+    metrics = asyncio.run(run())
+    assert metrics["checkouts"] == 10 and metrics["overflow_events"] == 0 and metrics["wait_max_ms"] > 0
@@ -0,0 +1,90 @@
+import sys
+import os
+import json
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import api, history
+from backend.audit import AuditLog
+from backend.cache import bot_cache
+
+T0 = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+    tables = [api.BotORM.__table__, history.TradeORM.__table__, AuditLog.__table__]
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: api.Base.metadata.create_all(c, tables=tables))
+            await conn.execute(api.BotORM.__table__.insert(), [
+                {"name": f"bot{i}", "status": "running" if i % 2 else "paused"} for i in range(7)
+            ])
+            await conn.execute(history.TradeORM.__table__.insert(), [
+                {"bot_id": 1 + i % 3, "symbol": "BTCUSDT" if i % 2 else "ETHUSDT", "side": "buy" if i % 4 < 2 else "sell",
+                 "amount": 1, "price": 100 + i, "status": "filled", "opened_at": T0 + timedelta(minutes=i // 2)}
+                for i in range(50)
+            ])
+            await conn.execute(AuditLog.__table__.insert(), [
+                {"user": "system", "action": "list_bots" if i % 2 else "create_bot", "status": "success",
+                 "created_at": T0 + timedelta(seconds=i)} for i in range(30)
+            ])
+    asyncio.run(setup())
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    monkeypatch.setattr(history, "AsyncSessionLocal", sessions)
+    monkeypatch.setattr(api, "log_audit", lambda *args, **kwargs: None)
+    bot_cache.invalidate()
+    app = FastAPI()
+    app.include_router(api.router)
+    app.include_router(history.router)
+    app.dependency_overrides[api.get_async_db] = get_db
+    with TestClient(app) as c:
+        yield c
+    bot_cache.invalidate()
+
+
+def _walk(client, url, **params):
+    items, cursor = [], None
+    while True:
+        page = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return items
+
+
+def test_trade_pages_cover_filtered_rows_once(client):
+    trades = _walk(client, "/history/trades", symbol="BTCUSDT", limit=4)
+    assert len(trades) == 25 and len({t["id"] for t in trades}) == 25
+    keys = [(t["opened_at"], t["id"]) for t in trades]
+    assert keys == sorted(keys, reverse=True)
+    window = _walk(client, "/history/trades", side="sell", start=(T0 + timedelta(minutes=5)).isoformat(),
+                   end=(T0 + timedelta(minutes=10)).isoformat(), limit=3)
+    assert window and all(t["side"] == "sell" and "00:05:00" <= t["opened_at"][11:] < "00:10:00" for t in window)
+    assert client.get("/history/trades", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_ndjson_export_streams_all_rows(client, monkeypatch):
+    monkeypatch.setattr(history, "EXPORT_BATCH", 7)
+    resp = client.get("/history/audit", params={"format": "ndjson", "action": "list_bots"})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(rows) == 15 and [r["id"] for r in rows] == sorted((r["id"] for r in rows), reverse=True)
+
+
+def test_list_bots_keyset_header(client):
+    first = client.get("/bots/", params={"limit": 2, "status": "running"})
+    assert [b["name"] for b in first.json()] == ["bot1", "bot3"]
+    second = client.get("/bots/", params={"limit": 2, "status": "running", "cursor": first.headers["x-next-cursor"]})
+    assert [b["name"] for b in second.json()] == ["bot5"] and "x-next-cursor" not in second.headers
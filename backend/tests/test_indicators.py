@@ -0,0 +1,45 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.indicators import IndicatorEngine, INDICATOR_COLUMNS
+from backend.strategy import Strategy, TA_LIB_AVAILABLE
+
+
+def _closes(n=600, seed=1):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(0, 1, n))
+
+
+@pytest.mark.skipif(not TA_LIB_AVAILABLE, reason="inkrementální engine kopíruje inicializaci TA-Lib")
+def test_incremental_matches_batch():
+    closes = _closes()
+    batch = Strategy().compute_indicators(pd.DataFrame({"close": closes}))
+    engine = IndicatorEngine()
+    rows = [engine.update("BTCUSDT", c) for c in closes]
+    for col in INDICATOR_COLUMNS:
+        inc = np.array([r[col] for r in rows])
+        ref = batch[col].to_numpy(dtype=float)
+        assert np.array_equal(np.isnan(inc), np.isnan(ref)), col
+        assert np.allclose(inc, ref, rtol=1e-9, atol=1e-8, equal_nan=True), col
+
+
+def test_symbols_are_independent_and_warmup_resets():
+    closes = _closes(200)
+    engine = IndicatorEngine()
+    for c in closes:
+        engine.update("A", c)
+    engine.update("B", closes[0])
+    assert np.isnan(engine.latest("B")["rsi"])
+    last = engine.warmup("B", closes)
+    assert last == pytest.approx(engine.latest("A"), nan_ok=True)
+
+
+def test_flat_prices():
+    engine = IndicatorEngine()
+    for _ in range(50):
+        last = engine.update("X", 10.0)
+    assert last["rsi"] == 0.0
+    assert last["bb_upper"] == last["bb_middle"] == last["bb_lower"] == 10.0
@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.ingest import MarketDataIngestor, NullSink, TradeRecord, normalize_message, to_line
+from backend.bench.fake_feed import trade_message, depth_message
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, raw):
+        self.sent.append(json.loads(raw))
+
+
+def test_normalize_and_line_protocol():
+    records = normalize_message(json.loads(trade_message("BTC_USDT", 2, 0, 100.0)))
+    assert [type(r) for r in records] == [TradeRecord, TradeRecord]
+    line = to_line(records[0])
+    assert line.startswith("trades,symbol=BTC_USDT,side=SELL price=100.0,volume=0.01 ")
+    depth = normalize_message(json.loads(depth_message("BTC_USDT", 100.0)))[0]
+    assert (depth.bid, depth.ask) == (99.5, 100.5)
+    assert normalize_message({"op": "SUBSCRIBE"}) == []
+
+
+def test_pipeline_batches_and_answers_ping():
+    async def run():
+        sink = NullSink()
+        ingestor = MarketDataIngestor(["BTC_USDT"], sink=sink, batch_size=100, flush_interval=0.05)
+        ingestor._tasks = [asyncio.create_task(ingestor._write_loop())]
+        ws = FakeWS()
+        await ingestor.handle_raw(ws, json.dumps({"op": "PING", "timestamp": 1}))
+        for i in range(25):
+            await ingestor.handle_raw(ws, trade_message("BTC_USDT", 10, i * 10, 100.0))
+        await asyncio.sleep(0.1)
+        await ingestor.stop()
+        return sink, ws, ingestor.stats
+
+    sink, ws, stats = asyncio.run(run())
+    assert ws.sent == [{"op": "PONG", "timestamp": 1}]
+    assert sink.lines == stats["written"] == stats["received"] == 250
+    assert sink.batches >= 3
+
+
+def test_stop_flushes_batch_in_progress():
+    async def run():
+        sink = NullSink()
+        ingestor = MarketDataIngestor(["X"], sink=sink, batch_size=1000, flush_interval=60)
+        ingestor._tasks = [asyncio.create_task(ingestor._write_loop())]
+        for i in range(50):
+            await ingestor._enqueue(TradeRecord("X", "BUY", float(i), 1.0, i))
+        await asyncio.sleep(0.01)   # writer přesune záznamy do rozpracované dávky
+        assert ingestor.queue.empty()
+        await ingestor.stop()
+        return sink
+
+    assert asyncio.run(run()).lines == 50
+
+
+def test_drop_overflow_keeps_newest():
+    async def run():
+        ingestor = MarketDataIngestor(["X"], sink=NullSink(), queue_size=5, overflow="drop")
+        for i in range(8):
+            await ingestor._enqueue(TradeRecord("X", "BUY", float(i), 1.0, i))
+        return ingestor
+
+    ingestor = asyncio.run(run())
+    assert ingestor.stats["dropped"] == 3
+    assert ingestor.queue.get_nowait().price == 3.0
+
+
+def test_malformed_messages_are_skipped():
+    async def run():
+        ingestor = MarketDataIngestor(["BTC_USDT"], sink=NullSink())
+        ws = FakeWS()
+        bad = ["{nejde o json", "[1, 2]", json.dumps({"topic": "TRADE", "symbol": "BTC_USDT", "data": [{"price": "1"}]}),
+               json.dumps({"topic": "TRADE", "symbol": "BTC_USDT", "data": [{"price": None, "size": 1, "timestamp": 1}]})]
+        for raw in bad:
+            await ingestor.handle_raw(ws, raw)
+        await ingestor.handle_raw(ws, trade_message("BTC_USDT", 2, 0, 100.0))
+        return ingestor.stats, ingestor.queue.qsize()
+
+    stats, queued = asyncio.run(run())
+    assert stats["malformed"] == 4 and stats["received"] == queued == 2
@@ -0,0 +1,126 @@
+import sys
+import os
+import asyncio
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.klines import KlineStore, interval_ms
+
+STEP = 60_000
+NOW = 1_000 * STEP + 30_000  # uprostřed rozpracované svíčky 1000
+
+
+class FakeApi:
+    """Deterministické svíčky close = time/STEP; volitelně chybějící časy."""
+
+    def __init__(self, missing=()):
+        self.calls = []
+        self.missing = set(missing)
+
+    async def get_klines(self, symbol, interval, limit=100, end_time=None):
+        self.calls.append((limit, end_time))
+        end = end_time // STEP * STEP
+        times = [t for t in range(end - (limit - 1) * STEP, end + STEP, STEP) if t not in self.missing]
+        return {"data": {"klines": [
+            {"time": t, "open": t / STEP, "high": t / STEP, "low": t / STEP, "close": t / STEP, "volume": 1.0}
+            for t in times
+        ]}}
+
+
+def test_interval_ms():
+    assert interval_ms("1m") == interval_ms("1M") == STEP
+    assert interval_ms("4H") == 4 * 3_600_000
+
+
+def test_update_fetches_only_missing(tmp_path):
+    store = KlineStore(str(tmp_path))
+    api = FakeApi()
+    assert asyncio.run(store.update(api, "BTCUSDT", "1m", lookback=100, now_ms=NOW)) == 100
+    # Rozpracovaná svíčka 1000 se neukládá
+    assert store.last_time("BTCUSDT", "1m") == 999 * STEP
+    api.calls.clear()
+    assert asyncio.run(store.update(api, "BTCUSDT", "1m", lookback=100, now_ms=NOW + 3 * STEP)) == 3
+    assert api.calls == [(3, 1002 * STEP)]
+    series = store.get("BTCUSDT", "1m", last=10)
+    np.testing.assert_array_equal(series.close, np.arange(993, 1003, dtype=float))
+    assert store.gaps("BTCUSDT", "1m") == []
+
+
+def test_gap_repair_and_unfillable(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("ETHUSDT", "1m", [
+        {"time": t, "close": t / STEP} for t in range(900 * STEP, 1000 * STEP, STEP)
+        if not 950 * STEP <= t < 960 * STEP
+    ])
+    assert store.gaps("ETHUSDT", "1m") == [(950 * STEP, 959 * STEP)]
+    added = asyncio.run(store.update(FakeApi(), "ETHUSDT", "1m", now_ms=NOW))
+    assert added == 10
+    assert store.gaps("ETHUSDT", "1m") == []
+    assert len(store.get("ETHUSDT", "1m")) == 100
+
+    # Díra, kterou burza nevyplní, se podruhé nestahuje
+    store.append("XRPUSDT", "1m", [{"time": t} for t in (100 * STEP, 105 * STEP)])
+    api = FakeApi(missing=range(101 * STEP, 105 * STEP, STEP))
+    asyncio.run(store.update(api, "XRPUSDT", "1m", lookback=1, now_ms=106 * STEP))
+    api.calls.clear()
+    asyncio.run(store.update(api, "XRPUSDT", "1m", lookback=1, now_ms=106 * STEP))
+    assert api.calls == []
+
+
+def test_slices_are_zero_copy_memmaps(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", [{"time": t * STEP, "close": float(t)} for t in range(50)])
+    full = store.series("BTCUSDT", "1m")
+    assert isinstance(full.close, np.memmap)
+    part = store.get("BTCUSDT", "1m", start=10 * STEP, end=19 * STEP)
+    assert len(part) == 10 and np.shares_memory(part.close, full.close)
+    assert store.series("BTCUSDT", "1m") is full  # beze změny souboru se nemapuje znovu
+    # Nová instance (studený start) čte data přímo ze souborů
+    np.testing.assert_array_equal(KlineStore(str(tmp_path)).get("BTCUSDT", "1m").close, np.arange(50.0))
+
+
+def test_append_truncates_torn_columns(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", [{"time": t * STEP, "close": float(t)} for t in range(5)])
+    # Simulace pádu: close dopsán, time ne
+    with open(os.path.join(str(tmp_path), "BTCUSDT", "1m", "close.bin"), "ab") as f:
+        f.write(np.array([99.0]).tobytes())
+    store.append("BTCUSDT", "1m", [{"time": 5 * STEP, "close": 5.0}])
+    np.testing.assert_array_equal(store.get("BTCUSDT", "1m").close, np.arange(6.0))
+
+
+def test_merge_switches_generation_atomically(tmp_path, monkeypatch):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", [{"time": t * STEP, "close": float(t)} for t in range(0, 10, 2)])
+    assert store.merge("BTCUSDT", "1m", [{"time": STEP, "close": 1.0}]) == 1
+    root = os.path.join(str(tmp_path), "BTCUSDT", "1m")
+    assert sorted(os.listdir(root)) == ["CURRENT", "g1"]
+
+    # Pád při zápisu sloupců nové generace: CURRENT se nepřepne, řada zůstane konzistentní
+    real_fsync = os.fsync
+    calls = []
+
+    def crash(fd):
+        calls.append(fd)
+        if len(calls) == 3:
+            raise OSError("disk full")
+        real_fsync(fd)
+    monkeypatch.setattr(os, "fsync", crash)
+    with pytest.raises(OSError):
+        store.merge("BTCUSDT", "1m", [{"time": 3 * STEP, "close": 3.0}])
+    monkeypatch.setattr(os, "fsync", real_fsync)
+    series = KlineStore(str(tmp_path)).get("BTCUSDT", "1m")
+    np.testing.assert_array_equal(series.time, np.array([0, 1, 2, 4, 6, 8]) * STEP)
+    np.testing.assert_array_equal(series.close, [0.0, 1.0, 2.0, 4.0, 6.0, 8.0])
+    # Další merge zbytek nedokončené generace přepíše
+    assert store.merge("BTCUSDT", "1m", [{"time": 3 * STEP, "close": 3.0}]) == 1
+    assert sorted(os.listdir(root)) == ["CURRENT", "g2"] and len(store.get("BTCUSDT", "1m")) == 7
+
+
+def test_rejects_symbols_outside_store(tmp_path):
+    store = KlineStore(str(tmp_path))
+    for symbol in ("../../etc", "BTC/USDT", ""):
+        with pytest.raises(ValueError):
+            store.get(symbol, "1m")
+    with pytest.raises(ValueError):
+        store.append("BTCUSDT", "../x", [{"time": 0}])
@@ -0,0 +1,150 @@
+import sys
+import os
+import asyncio
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import ledger
+from backend.ledger import TradeLedger, apply_fill, FillORM
+
+T0 = 1_700_000_000_000
+
+
+class FakePionex:
+    def __init__(self):
+        self.orders = []
+        self.fills = []
+        self.calls = []
+
+    async def get_all_orders(self, symbol=None, start_time=None, limit=None):
+        return {"data": {"orders": [o for o in self.orders if o["symbol"] == symbol]}}
+
+    async def get_fills(self, order_id=None, symbol=None, start_time=None, end_time=None):
+        self.calls.append(start_time)
+        return {"data": {"fills": [f for f in self.fills if f["symbol"] == symbol and f["timestamp"] >= start_time]}}
+
+
+def _fill(i, order_id, side, size, price, ts):
+    return {"id": f"f{i}", "orderId": order_id, "symbol": "BTCUSDT", "side": side, "size": size, "price": price,
+            "fee": 0.1, "feeCoin": "USDT", "timestamp": ts}
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ledger.db'}")
+    tables = [ledger.OrderORM.__table__, FillORM.__table__, ledger.PositionORM.__table__,
+              ledger.LedgerCursorORM.__table__]
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: ledger.Base.metadata.create_all(c, tables=tables))
+    asyncio.run(setup())
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def test_apply_fill_average_cost():
+    q, p, pnl = apply_fill(0, 0, 0, "BUY", 1, 100)
+    q, p, pnl = apply_fill(q, p, pnl, "BUY", 1, 110)
+    assert (q, p, pnl) == (2, 105, 0)
+    q, p, pnl = apply_fill(q, p, pnl, "SELL", 3, 120)  # uzavření a otočení do shortu
+    assert (q, p, pnl) == (-1, 120, 30)
+    assert apply_fill(q, p, pnl, "BUY", 1, 100) == (0.0, 0.0, 50)
+
+
+def test_reconcile_is_incremental_and_idempotent(sessions):
+    led = TradeLedger(session_factory=sessions, overlap_ms=1000, initial_lookback_ms=T0)
+    api = FakePionex()
+
+    async def run():
+        async with sessions() as db:
+            await led.record_order(db, {"data": {"orderId": "o1"}}, "BTCUSDT", "buy", 100, 2, bot_id=7)
+            await db.commit()
+        api.orders = [{"orderId": "o1", "symbol": "BTCUSDT", "side": "BUY", "size": 2, "filledSize": 2,
+                       "status": "FILLED", "createTime": T0}]
+        api.fills = [_fill(1, "o1", "BUY", 1, 100, T0), _fill(2, "o1", "BUY", 1, 110, T0 + 10)]
+        first = await led.reconcile(api, ["BTCUSDT"])
+        # Druhý běh: staré fill se vrátí v překryvu, započte se jen nový
+        api.fills.append(_fill(3, None, "SELL", 0.5, 120, T0 + 20))
+        api.fills.append(_fill(4, "o1", "SELL", 1, 120, T0 + 30))
+        second = await led.reconcile(api, ["BTCUSDT"])
+        async with sessions() as db:
+            return first, second, await led.positions(db), (await db.execute(select(FillORM))).scalars().all()
+
+    first, second, positions, fills = asyncio.run(run())
+    assert first[0]["fills"] == 2 and first[0]["orders"] == 0
+    assert second[0]["fills"] == 2
+    assert api.calls[1] == T0 + 10 - 1000
+    assert len(fills) == 4
+    by_bot = {p["bot_id"]: p for p in positions}
+    bot = by_bot[7]
+    assert float(bot["quantity"]) == 1 and float(bot["avg_price"]) == 105
+    assert float(bot["realized_pnl"]) == 15 and bot["fill_count"] == 3
+    assert float(by_bot[ledger.UNASSIGNED_BOT]["quantity"]) == -0.5
+
+
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_reconcile_pages_capped_fill_responses(sessions, newest_first):
+    led = TradeLedger(session_factory=sessions, initial_lookback_ms=T0, fills_page_size=3)
+
+    class Capped(FakePionex):
+        async def get_fills(self, order_id=None, symbol=None, start_time=None, end_time=None):
+            self.calls.append((start_time, end_time))
+            window = [f for f in self.fills if f["timestamp"] >= start_time
+                      and (end_time is None or f["timestamp"] <= end_time)]
+            window.sort(key=lambda f: f["timestamp"], reverse=newest_first)
+            return {"data": {"fills": window[:3]}}
+
+    api = Capped()
+    # Dva fill se stejným časem na hranici stránky
+    api.fills = [_fill(i, None, "BUY", 1, 100, T0 + min(i, 8) * 10) for i in range(10)]
+
+    async def run():
+        result = await led.reconcile_symbol(api, "BTCUSDT", now_ms=2 * T0)
+        async with sessions() as db:
+            return result, await led.get_cursor(db, "fills:BTCUSDT")
+
+    result, cursor = asyncio.run(run())
+    assert result["fills"] == 10 and cursor == T0 + 80
+    assert len(api.calls) <= 10
+
+
+def test_reconcile_reports_symbol_errors(sessions):
+    led = TradeLedger(session_factory=sessions)
+
+    class Broken(FakePionex):
+        async def get_fills(self, **kwargs):
+            raise RuntimeError("boom")
+
+    results = asyncio.run(led.reconcile(Broken(), ["BTCUSDT"]))
+    assert results == [{"symbol": "BTCUSDT", "error": "boom"}] and led.stats["errors"] == 1
+
+
+def test_flatten_cancels_and_closes_positions(sessions):
+    led = TradeLedger(session_factory=sessions, initial_lookback_ms=T0)
+    api = FakePionex()
+    api.fills = [_fill(1, "o1", "BUY", 2, 100, T0)]
+    batches = []
+
+    async def get_open_orders(symbol=None):
+        return {"data": {"orders": [{"orderId": "open1", "symbol": symbol}]}}
+
+    async def submit_batch(cancels=(), orders=()):
+        batches.append((list(cancels), list(orders)))
+        return {"cancels": [{"order_id": c, "ok": True} for c in cancels],
+                "orders": [{"ok": True, "order": {"orderId": f"x{i}"}} for i, _ in enumerate(orders)]}
+
+    api.get_open_orders, api.submit_batch = get_open_orders, submit_batch
+
+    async def run():
+        await led.reconcile(api, ["BTCUSDT"])
+        await led.flatten(api)
+        async with sessions() as db:
+            return (await db.execute(select(ledger.OrderORM).where(ledger.OrderORM.order_id == "x0"))).scalar_one()
+
+    order = asyncio.run(run())
+    cancels, orders = batches[0]
+    assert cancels == ["open1"]
+    assert orders == [{"symbol": "BTCUSDT", "side": "SELL", "quantity": 2.0, "type": "MARKET", "exit": True,
+                       "bot_id": ledger.UNASSIGNED_BOT, "client_order_id": "flat-0-BTCUSDT-1"}]
+    assert order.side == "SELL" and order.bot_id is None
@@ -0,0 +1,143 @@
+import sys
+import os
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import pionex
+from backend.db import InstrumentedQueuePool, SESSION_SECONDS
+from backend.metrics import Registry, MetricsMiddleware
+from backend.ratelimit import RateLimiter, SimulatedClock, WAIT_SECONDS
+from backend.realtime import RealtimeHub, SEND_LAG
+
+
+def _sample(text_, line_prefix):
+    return [line for line in text_.splitlines() if line.startswith(line_prefix)]
+
+
+def test_render_exposition_format():
+    reg = Registry(namespace="t")
+    requests = reg.counter("requests_total", "Počet požadavků", ["path"])
+    clients = reg.gauge("clients", "Klienti")
+    latency = reg.histogram("latency_seconds", "Latence", buckets=(0.1, 1.0))
+    requests.labels(path='/a"b').inc(2)
+    clients.set_function(lambda: 3)
+    for value in (0.05, 0.1, 0.5, 5.0):
+        latency.observe(value)
+
+    @latency.time()
+    async def slow():
+        await asyncio.sleep(0)
+    asyncio.run(slow())
+
+    out = reg.render()
+    assert 't_requests_total{path="/a\\"b"} 2.0' in out
+    assert "# TYPE t_clients gauge\nt_clients 3.0" in out
+    # Buckety jsou kumulativní, hranice včetně (le)
+    assert _sample(out, "t_latency_seconds_bucket") == [
+        't_latency_seconds_bucket{le="0.1"} 3', 't_latency_seconds_bucket{le="1.0"} 4',
+        't_latency_seconds_bucket{le="+Inf"} 5']
+    assert _sample(out, "t_latency_seconds_count") == ["t_latency_seconds_count 5"]
+    assert reg.counter("requests_total", "znovu", ["path"]) is requests
+    with pytest.raises(ValueError):
+        requests.labels(other="x")
+    with pytest.raises(ValueError):
+        reg.gauge("requests_total", "jiný typ", ["path"])
+
+
+def test_pionex_retries_and_ratelimit_wait(monkeypatch):
+    async def no_backoff(seconds):
+        pass
+    monkeypatch.setattr(asyncio, "sleep", no_backoff)
+    # První rušení: 429, 503, pak OK; druhé rovnou OK
+    responses = iter([httpx.Response(429), httpx.Response(503), httpx.Response(200, json={"data": {}}),
+                      httpx.Response(200, json={"data": {}})])
+    clock = SimulatedClock(100.0)
+    limiter = RateLimiter(buckets={b: (1, 1) for b in ("market", "account", "orders")},
+                          clock=clock.time, async_sleep=clock.async_sleep)
+    client = httpx.AsyncClient(base_url=pionex.AsyncPionexAPI.BASE_URL,
+                               transport=httpx.MockTransport(lambda request: next(responses)))
+    api = pionex.AsyncPionexAPI("key", "secret", client=client, rate_limiter=limiter)
+    label = "/api/v1/orders/{id}"
+    attempts = pionex.REQUEST_SECONDS.labels(method="DELETE", endpoint=label)
+    before = (attempts.count, pionex.RETRIES.labels(endpoint=label, reason="429").value,
+              pionex.RETRIES.labels(endpoint=label, reason="error").value,
+              pionex.RATE_LIMITED.labels(endpoint=label).value)
+    waits = WAIT_SECONDS.labels(bucket="orders")
+    waits_before = (waits.count, waits.sum)
+
+    async def run():
+        await api.cancel_order("42")
+        await api.cancel_order("43")   # druhý slot čeká 1 s na limiter
+        await api.aclose()
+    asyncio.run(run())
+
+    assert pionex.endpoint_label("/api/v1/orders/client-order-id/pb-1") == "/api/v1/orders/client-order-id/{id}"
+    assert (attempts.count - before[0], pionex.RETRIES.labels(endpoint=label, reason="429").value - before[1],
+            pionex.RETRIES.labels(endpoint=label, reason="error").value - before[2],
+            pionex.RATE_LIMITED.labels(endpoint=label).value - before[3]) == (4, 1, 1, 1)
+    assert waits.count - waits_before[0] == 2 and waits.sum - waits_before[1] == pytest.approx(1.0)
+
+
+def test_db_session_time_and_http_routes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'm.db'}", poolclass=InstrumentedQueuePool, pool_size=1)
+    sessions = SESSION_SECONDS.labels(engine="sync")
+    before = sessions.count
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+    assert sessions.count - before == 3
+
+    reg = Registry(namespace="t")
+    app = FastAPI()
+
+    @app.get("/bots/{bot_id}")
+    async def get_bot(bot_id: int):
+        return {"id": bot_id}
+
+    async def run():
+        transport = httpx.ASGITransport(MetricsMiddleware(app, reg))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in ("/bots/1", "/bots/2", "/missing"):
+                await client.get(path)
+    asyncio.run(run())
+    out = reg.render()
+    # Šablona routy místo konkrétních ID
+    assert 't_http_request_seconds_count{method="GET",route="/bots/{bot_id}",status="200"} 2' in out
+    assert 't_http_request_seconds_count{method="GET",route="unmatched",status="404"} 1' in out
+
+
+def test_ws_send_lag():
+    clock = SimulatedClock(10.0)
+    hub = RealtimeHub(fetch=None, clock=clock.time)
+    before = (SEND_LAG.labels().count, SEND_LAG.labels().sum)
+
+    async def run():
+        sub = hub.subscribe(["BTC"])
+        hub.publish("BTC", {"symbol": "BTC", "price": 1.0})
+        clock.now += 0.25
+        hub.publish("BTC", {"symbol": "BTC", "price": 2.0})
+        ticks = await sub.next(timeout=0)
+        clock.now += 0.05
+        hub.mark_sent(sub)
+        hub.mark_sent(sub)   # bez nové dávky se nic nezaznamená
+        return ticks
+
+    assert asyncio.run(run()) == [{"symbol": "BTC", "price": 2.0}]
+    assert SEND_LAG.labels().count - before[0] == 1
+    assert SEND_LAG.labels().sum - before[1] == pytest.approx(0.3)
+
+
+def test_failed_job_is_counted(monkeypatch):
+    from backend import scheduler
+
+    async def broken():
+        raise RuntimeError("db down")
+    monkeypatch.setattr(scheduler.sentiment_pipeline, "purge_expired", broken)
+    failures = scheduler.JOB_FAILURES.labels(job="sentiment_purge")
+    before = failures.value
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler.purge_sentiment_cache())
+    assert failures.value - before == 1
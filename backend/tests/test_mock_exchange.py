@@ -0,0 +1,95 @@
+import sys
+import os
+import asyncio
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import ledger
+from backend.bench.mock_exchange import MockExchange, create_app
+from backend.orderbook import OrderBookManager
+from backend.pionex import AsyncPionexAPI, normalize_list, normalize_klines
+from backend.ratelimit import RateLimiter
+
+
+def _api(exchange):
+    client = httpx.AsyncClient(base_url=AsyncPionexAPI.BASE_URL, transport=httpx.ASGITransport(create_app(exchange)))
+    limiter = RateLimiter(buckets={b: (1000, 1000) for b in ("market", "account", "orders")})
+    return AsyncPionexAPI("key", "secret", client=client, rate_limiter=limiter)
+
+
+def test_matching_engine_through_client():
+    exchange = MockExchange(["BTC_USDT"], base_prices={"BTC_USDT": 100.0}, tick_size=0.01)
+
+    async def run():
+        api = _api(exchange)
+        depth = await api.get_market_depth("BTC_USDT", 5)
+        best_bid, best_ask = depth["data"]["bids"][0][0], depth["data"]["asks"][0][0]
+        # Pasivní objednávka pod trhem zůstane v knize, agresivní se hned spáruje
+        resting = await api.place_order("BTC_USDT", "BUY", best_bid - 1, 0.5, client_order_id="rest")
+        taken = await api.place_order("BTC_USDT", "BUY", best_ask + 1, 1.5)
+        open_orders = normalize_list(await api.get_open_orders("BTC_USDT"), "orders")
+        fills = normalize_list(await api.get_fills(symbol="BTC_USDT"), "fills")
+        by_cid = await api.get_order_by_client_id("rest")
+        await api.cancel_order(resting["data"]["orderId"])
+        after_cancel = normalize_list(await api.get_open_orders("BTC_USDT"), "orders")
+        klines = normalize_klines(await api.get_klines("BTC_USDT", "1M", 10))
+        books = OrderBookManager()
+        book = books.apply_rest_snapshot("BTC_USDT", await api.get_market_depth("BTC_USDT", 20))
+        await api.aclose()
+        return best_ask, taken, open_orders, fills, by_cid, after_cancel, klines, book
+
+    best_ask, taken, open_orders, fills, by_cid, after_cancel, klines, book = asyncio.run(run())
+    assert [o["clientOrderId"] for o in open_orders] == ["rest"]
+    assert by_cid["data"]["status"] == "NEW"
+    # 1.5 přes dvě úrovně market makera (1.0 + 0.5), cena-čas priorita od nejlepší
+    assert [f["size"] for f in fills] == [1.0, 0.5]
+    assert fills[0]["price"] == best_ask and fills[1]["price"] > best_ask
+    assert all(f["orderId"] == taken["data"]["orderId"] for f in fills)
+    assert after_cancel == []
+    assert len(klines) == 10 and all(k["low"] <= k["close"] <= k["high"] for k in klines)
+    assert book.best_bid() < book.best_ask()
+
+
+def test_injected_429_is_retried(monkeypatch):
+    exchange = MockExchange(["BTC_USDT"], rate_429=1.0)
+    backoffs = []
+
+    async def backoff(seconds):
+        # Klient po 429 čeká; falešná burza mezitím přestane odmítat
+        backoffs.append(seconds)
+        exchange.rate_429 = 0.0
+    monkeypatch.setattr(asyncio, "sleep", backoff)
+
+    async def run():
+        api = _api(exchange)
+        resp = await api.get_book_ticker("BTC_USDT")
+        await api.aclose()
+        return resp
+
+    resp = asyncio.run(run())
+    assert resp["data"]["tickers"][0]["symbol"] == "BTC_USDT"
+    assert backoffs == [1] and exchange.stats["injected_429"] == 1
+
+
+def test_ledger_reconciles_against_mock_exchange(tmp_path):
+    exchange = MockExchange(["BTC_USDT"], base_prices={"BTC_USDT": 100.0})
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ledger.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    tables = [ledger.OrderORM.__table__, ledger.FillORM.__table__, ledger.PositionORM.__table__,
+              ledger.LedgerCursorORM.__table__]
+    led = ledger.TradeLedger(session_factory=sessions)
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: ledger.Base.metadata.create_all(c, tables=tables))
+        api = _api(exchange)
+        await api.place_order("BTC_USDT", "BUY", None, 2.0, "MARKET")
+        await api.place_order("BTC_USDT", "SELL", None, 0.5, "MARKET")
+        await led.reconcile(api, ["BTC_USDT"])
+        await api.aclose()
+        async with sessions() as db:
+            return await led.positions(db)
+
+    positions = asyncio.run(run())
+    assert len(positions) == 1 and float(positions[0]["quantity"]) == 1.5
+    assert positions[0]["fill_count"] == len(exchange.fills)
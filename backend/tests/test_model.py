@@ -0,0 +1,66 @@
+import sys
+import os
+import threading
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.model import ModelRegistry, ModelRegistryError, TimeSeriesModel
+
+X = np.arange(10, dtype=float).reshape(-1, 1)
+
+
+def test_versions_rollback_and_pruning(tmp_path):
+    reg = ModelRegistry(str(tmp_path), keep=3)
+    for slope in (1, 2, 3, 4):
+        reg.train("BTCUSDT", X, slope * X.ravel())
+    assert reg.versions("BTCUSDT") == [2, 3, 4]
+    assert reg.predict("BTCUSDT", [[1.0]])[0] == pytest.approx(4)
+    assert reg.rollback("BTCUSDT") == 3
+    assert reg.predict("BTCUSDT", [[1.0]])[0] == pytest.approx(3)
+    # Nový proces čte verzi z ukazatele CURRENT
+    assert ModelRegistry(str(tmp_path)).predict("BTCUSDT", [[1.0]])[0] == pytest.approx(3)
+    with pytest.raises(ModelRegistryError):
+        reg.activate("BTCUSDT", 1)
+    # Symboly jsou nezávislé
+    assert reg.predict("ETHUSDT", [[1.0]])[0] == 0
+    with pytest.raises(ModelRegistryError):
+        reg.info("../etc")
+
+
+def test_other_process_rollback_is_picked_up(tmp_path, monkeypatch):
+    from backend import model
+    now = [1000.0]
+    monkeypatch.setattr(model.time, "monotonic", lambda: now[0])
+    serving = ModelRegistry(str(tmp_path), current_ttl=2.0)
+    admin = ModelRegistry(str(tmp_path))    # jiný worker (rollback přes API, publish ze scheduleru)
+    for slope in (1, 2):
+        admin.train("BTCUSDT", X, slope * X.ravel())
+    assert serving.predict("BTCUSDT", [[1.0]])[0] == pytest.approx(2)
+    admin.rollback("BTCUSDT")
+    # V rámci TTL se CURRENT nečte, pak se model přepne
+    assert serving.predict("BTCUSDT", [[1.0]])[0] == pytest.approx(2)
+    now[0] += 2.5
+    assert serving.current_version("BTCUSDT") == 1
+    assert serving.predict("BTCUSDT", [[1.0]])[0] == pytest.approx(1)
+    admin.train("BTCUSDT", X, 5 * X.ravel())
+    now[0] += 2.5
+    assert serving.predict("BTCUSDT", [[1.0]])[0] == pytest.approx(5)
+
+
+def test_large_artifacts_are_memory_mapped(tmp_path):
+    reg = ModelRegistry(str(tmp_path), mmap_bytes=0)
+    reg.train("BTCUSDT", X, X.ravel())
+    model = ModelRegistry(str(tmp_path), mmap_bytes=0).get("BTCUSDT")
+    assert isinstance(model.coef_, np.memmap)
+
+
+def test_predict_not_blocked_by_publish(tmp_path):
+    reg = ModelRegistry(str(tmp_path))
+    facade = TimeSeriesModel(reg, "BTCUSDT")
+    facade.fit(X, X.ravel())
+    lock = reg._lock("BTCUSDT")
+    done = threading.Event()
+    with lock:
+        # Publikace drží zámek symbolu, predict jen čte referenci
+        threading.Thread(target=lambda: (facade.predict([[2.0]]), done.set())).start()
+        assert done.wait(2)
@@ -0,0 +1,69 @@
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.orderbook import OrderBook, OrderBookManager
+from backend.bench.orderbook import synthetic_diffs, snapshot, DictBook
+from backend.bench.fake_feed import depth_message
+
+
+def test_incremental_updates_match_reference():
+    bids, asks = snapshot(50)
+    book, ref = OrderBook("BTC_USDT", max_levels=10_000), DictBook(bids, asks)
+    book.apply_snapshot(bids, asks)
+    for is_bid, price, size in synthetic_diffs(20_000, 50, seed=7):
+        book.apply_diff([(price, size)] if is_bid else [], [] if is_bid else [(price, size)])
+        ref.update(is_bid, price, size)
+        assert (book.best_bid()[0], book.best_ask()[0]) == ref.best()
+    assert book.bids.levels(3) == [(p, ref.bids[p]) for p in sorted(ref.bids, reverse=True)[:3]]
+    assert len(book.asks) == len(ref.asks)
+
+
+def test_spread_imbalance_and_level_cap():
+    book = OrderBook("X", max_levels=3)
+    book.apply_snapshot([(99, 3), (98, 1)], [(101, 1), (102, 1)])
+    assert book.spread() == 2 and book.mid() == 100
+    assert book.imbalance(2) == (4 - 2) / 6
+    for price in (97, 96, 95):
+        book.apply_diff([(price, 1)], [])
+    assert book.bids.levels(10) == [(99, 3), (98, 1), (97, 1)]
+
+
+def test_sequence_gap_triggers_resync_and_replays_pending():
+    manager = OrderBookManager()
+    base = {"topic": "DEPTH", "symbol": "X", "action": "UPDATE"}
+    manager.handle_depth({"topic": "DEPTH", "symbol": "X", "seq": 10,
+                          "data": {"bids": [["99", "1"]], "asks": [["101", "1"]]}})
+    assert manager.handle_depth({**base, "seq": 11, "prevSeq": 10, "data": {"bids": [["99.5", "2"]]}})
+    assert not manager.handle_depth({**base, "seq": 13, "prevSeq": 12, "data": {"asks": [["100.5", "1"]]}})
+    book = manager.get("X")
+    assert not book.synced and manager.fresh("X") is None
+    # REST snapshot se seq 12 -> diff 13 se přehraje
+    manager.apply_rest_snapshot("X", {"data": {"bids": [["99", "1"]], "asks": [["101", "1"]], "seq": 12}})
+    assert book.synced and book.seq == 13 and book.best_ask() == (100.5, 1.0)
+
+
+def test_feed_snapshot_message_and_depth_view():
+    manager = OrderBookManager()
+    manager.handle_depth(json.loads(depth_message("BTC_USDT", 100.0)))
+    book = manager.fresh("BTC_USDT")
+    assert book.top()["bid"] == 99.5 and book.top()["ask"] == 100.5
+    assert book.depth(5)["asks"] == [(100.5, 1.0)]
+
+
+def test_market_depth_route_uses_overridable_client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from backend import api
+
+    class Pionex:
+        async def get_market_depth(self, symbol, limit):
+            return {"data": {"bids": [["99", "1"]], "asks": [["101", "1"]], "updateTime": 1}, "limit": limit}
+
+    app = FastAPI()
+    app.include_router(api.router)
+    app.dependency_overrides[api.get_pionex] = Pionex
+    with TestClient(app) as c:
+        assert c.get("/bots/pionex/market_depth", params={"symbol": "ZZZ_USDT", "limit": 5}).json()["limit"] == 5
+        assert c.get("/bots/pionex/market_depth", params={"symbol": "ZZZ_USDT", "limit": 10 ** 6}).status_code == 422
+    api.order_books.books.pop("ZZZ_USDT", None)
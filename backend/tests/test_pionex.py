@@ -0,0 +1,194 @@
+import sys
+import os
+import json
+import asyncio
+import httpx
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.pionex import AsyncPionexAPI, PionexAPIError
+from backend.coalesce import RequestCoalescer
+from backend.ratelimit import RateLimiter
+
+
+def _client(handler):
+    return httpx.AsyncClient(base_url=AsyncPionexAPI.BASE_URL, transport=httpx.MockTransport(handler))
+
+
+def test_async_client_same_surface():
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path, dict(request.url.params)))
+        assert request.headers["Authorization"] == "Bearer key"
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        api = AsyncPionexAPI("key", "secret", client=_client(handler))
+        assert await api.get_ticker_24hr("BTCUSDT") == {"ok": True}
+        assert await api.place_order("BTCUSDT", "BUY", 1.0, 2.0) == {"ok": True}
+        await api.aclose()
+
+    asyncio.run(run())
+    assert calls[0] == ("GET", "/api/v1/ticker/24hr", {"symbol": "BTCUSDT"})
+    assert calls[1][:2] == ("POST", "/api/v1/orders")
+
+
+def test_async_client_retries_rate_limited(monkeypatch):
+    responses = [httpx.Response(429), httpx.Response(200, json=[1])]
+
+    async def no_sleep(_):
+        pass
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+    async def run():
+        api = AsyncPionexAPI("key", "secret", client=_client(lambda request: responses.pop(0)))
+        return await api.get_orders()
+
+    assert asyncio.run(run()) == [1]
+    assert responses == []
+
+
+def test_coalesces_concurrent_requests_and_caches_by_class():
+    calls = []
+    now = [0.0]
+
+    async def handler(request):
+        calls.append((request.method, request.url.path))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"n": len(calls)})
+
+    async def run():
+        coalescer = RequestCoalescer(ttls={"market": 0.5, "account": 1.0}, clock=lambda: now[0])
+        api = AsyncPionexAPI("key", "secret", client=_client(handler), coalescer=coalescer)
+        # 10 souběžných stejných dotazů -> jedno volání burzy
+        results = await asyncio.gather(*(api.get_ticker_24hr("BTCUSDT") for _ in range(10)))
+        assert results == [{"n": 1}] * 10
+        assert await api.get_ticker_24hr("BTCUSDT") == {"n": 1}
+        assert await api.get_ticker_24hr("ETHUSDT") == {"n": 2}
+        now[0] = 0.6
+        assert await api.get_ticker_24hr("BTCUSDT") == {"n": 3}
+        # Data účtu žijí déle, ale objednávka je zneplatní
+        assert await api.get_balance() == {"n": 4}
+        assert await api.get_balance() == {"n": 4}
+        await api.place_order("BTCUSDT", "BUY", 1.0, 2.0)
+        assert await api.get_balance() == {"n": 6}
+        await api.aclose()
+        return coalescer.info()
+
+    info = asyncio.run(run())
+    assert info["classes"]["market"]["upstream"] == 3
+    assert info["classes"]["market"]["coalesced"] == 9
+    assert info["classes"]["market"]["hits"] == 1
+    assert info["classes"]["account"]["saved"] == 1
+    assert info["saved"] == 11
+
+
+def test_coalesced_error_is_not_cached():
+    responses = [httpx.Response(500), httpx.Response(200, json={"ok": True})]
+    coalescer = RequestCoalescer()
+
+    def send():
+        response = responses.pop(0)
+        if response.status_code != 200:
+            raise PionexAPIError("chyba")
+        return response.json()
+
+    with pytest.raises(PionexAPIError):
+        coalescer.call("GET", "/api/v1/ticker/24hr", {"params": {"symbol": "X"}}, send)
+    assert coalescer.call("GET", "/api/v1/ticker/24hr", {"params": {"symbol": "X"}}, send) == {"ok": True}
+    assert coalescer.call("GET", "/api/v1/ticker/24hr", {"params": {"symbol": "X"}}, send) == {"ok": True}
+    assert responses == []
+
+
+def _fast_limiter():
+    return RateLimiter(buckets={"market": (1000, 1000), "account": (1000, 1000), "orders": (1000, 1000)})
+
+
+def test_submit_batch_prioritizes_cancels_and_exits():
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path, json.loads(request.content or b"{}").get("side")))
+        return httpx.Response(200, json={"orderId": len(calls)})
+
+    async def run():
+        api = AsyncPionexAPI("key", "secret", client=_client(handler), rate_limiter=_fast_limiter())
+        result = await api.submit_batch(
+            cancels=["o1"],
+            orders=[{"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "price": 10.0},
+                    {"symbol": "ETHUSDT", "side": "SELL", "quantity": 2, "exit": True}],
+            max_concurrent=1,
+        )
+        await api.aclose()
+        return result
+
+    result = asyncio.run(run())
+    assert calls == [("DELETE", "/api/v1/orders/o1", None), ("POST", "/api/v1/orders", "SELL"),
+                     ("POST", "/api/v1/orders", "BUY")]
+    # Výsledky v pořadí vstupu
+    assert [r["side"] for r in result["orders"]] == ["BUY", "SELL"]
+    assert result["orders"][0]["order"] == {"orderId": 3}
+    assert result["cancels"][0]["ok"]
+
+
+def test_place_orders_idempotent_by_client_order_id(monkeypatch):
+    placed = {}
+
+    async def no_sleep(_):
+        pass
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+    def handler(request):
+        if request.method == "POST":
+            cid = json.loads(request.content)["clientOrderId"]
+            placed[cid] = placed.get(cid, 0) + 1
+            # Objednávka se na burze založí, ale odpověď se ztratí
+            return httpx.Response(502 if cid == "lost" else 200, json={"orderId": f"id-{cid}"})
+        cid = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"orderId": f"id-{cid}"} if cid in placed else {})
+
+    orders = [{"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": "a"},
+              {"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": "a"},
+              {"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": "lost"}]
+
+    async def run():
+        api = AsyncPionexAPI("key", "secret", client=_client(handler), rate_limiter=_fast_limiter())
+        first = await api.place_orders(orders)
+        again = await api.place_orders(orders[:1])
+        await api.aclose()
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert placed["a"] == 1
+    assert [r["ok"] for r in first] == [True, True, True]
+    assert first[2]["recovered"] and first[2]["order"] == {"orderId": "id-lost"}
+    assert again[0]["duplicate"] and again[0]["order"] == {"orderId": "id-a"}
+
+
+def test_cancelled_issuer_does_not_cancel_coalesced_callers():
+    calls = []
+
+    async def run():
+        coalescer = RequestCoalescer(ttls={"market": 0.0})
+        release = asyncio.Event()
+
+        async def send():
+            calls.append(1)
+            await release.wait()
+            return {"price": 1}
+
+        def call():
+            return coalescer.call_async("GET", "/api/v1/ticker/24hr", {"params": {"symbol": "X"}}, send)
+
+        issuer = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        issuer.cancel()   # např. timeout ticku bota, který požadavek spustil
+        await asyncio.sleep(0)
+        release.set()
+        return issuer, await follower, coalescer.info()
+
+    issuer, result, info = asyncio.run(run())
+    assert issuer.cancelled() and result == {"price": 1} and calls == [1]
+    assert info["inflight"] == 0
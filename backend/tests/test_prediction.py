@@ -0,0 +1,54 @@
+import sys
+import os
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.model import ModelRegistry
+from backend.prediction import PredictionService, build_features, latest_features, POOLED_KEY
+
+
+def _closes(n_symbols=3, n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    return {f"S{i}": 100 * np.exp(np.cumsum(rng.normal(0.001, 0.01, n))) for i in range(n_symbols)}
+
+
+def test_feature_windows_match_naive():
+    close = _closes(1, 60)["S0"]
+    X = build_features(close, lags=3, window=5)
+    t = 40
+    row = X[t - 5]
+    r = np.diff(np.log(close))
+    np.testing.assert_allclose(row[:3], [r[t - 1], r[t - 2], r[t - 3]])
+    np.testing.assert_allclose(row[3], r[t - 5:t].mean())
+    np.testing.assert_allclose(row[6], (close[t] - close[t - 4:t + 1].mean()) / close[t - 4:t + 1].std(), rtol=1e-9)
+    tails = np.stack([close[:t + 1][-6:], close[-6:]])
+    np.testing.assert_allclose(latest_features(tails, 3, 5), [row, build_features(close, 3, 5)[-1]])
+
+
+def test_batch_matches_single_and_reports_missing(tmp_path):
+    closes = _closes()
+    service = PredictionService(ModelRegistry(str(tmp_path)), horizons=(1, 5))
+    versions = service.fit_many(closes)
+    assert set(versions) == set(closes) | {POOLED_KEY}
+    batch = service.predict_batch(closes)
+    for symbol, close in closes.items():
+        single = service.predict_batch({symbol: close}, horizons=[5])["predictions"][symbol]
+        assert single[5] == pytest.approx(batch["predictions"][symbol][5])
+        model = service.registry.get(symbol)
+        expected = close[-1] * np.exp(model.predict(build_features(close, model.lags, model.window)[-1:]))[0]
+        assert [batch["predictions"][symbol][h] for h in (1, 5)] == pytest.approx(expected)
+    # Symbol bez vlastního modelu použije sdílený, krátká řada chybí
+    result = service.predict_batch({"NEW": closes["S0"], "SHORT": closes["S0"][:5]})
+    assert set(result["predictions"]) == {"NEW"} and result["missing"] == ["SHORT"]
+    with pytest.raises(ValueError):
+        service.predict_batch(closes, horizons=[3])
+
+
+def test_batch_request_is_bounded():
+    from pydantic import ValidationError
+    from backend.schemas import PredictBatchRequest, MAX_PREDICT_LIMIT, MAX_REQUEST_SYMBOLS
+    assert PredictBatchRequest(symbols=["BTCUSDT"]).limit == 100
+    for bad in ({"limit": MAX_PREDICT_LIMIT + 1}, {"limit": 0}, {"horizons": list(range(1, 100))},
+                {"symbols": [f"S{i}" for i in range(MAX_REQUEST_SYMBOLS + 1)]}):
+        with pytest.raises(ValidationError):
+            PredictBatchRequest(**{"symbols": ["BTCUSDT"], **bad})
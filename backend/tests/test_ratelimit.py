@@ -0,0 +1,59 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.ratelimit import RateLimiter, FileStore, MemoryStore, SimulatedClock
+
+
+def _limiter(clock, store=None, **kwargs):
+    return RateLimiter(clock=clock.time, sleep=clock.sleep, async_sleep=clock.async_sleep,
+                       store=store or MemoryStore(), **kwargs)
+
+
+def test_burst_then_steady_rate():
+    clock = SimulatedClock()
+    limiter = _limiter(clock, buckets={"market": (10, 10)}, rules=[("*", "", "market", 1)])
+    waits = [limiter.acquire("GET", "/api/v1/depth") for _ in range(15)]
+    assert waits[:10] == [0.0] * 10
+    # Po vyčerpání burstu se čeká jen na další slot (0.1 s), ne 10 s
+    assert waits[10] == pytest.approx(0.1)
+    assert clock.now == pytest.approx(0.5)
+
+
+def test_orders_do_not_consume_market_budget():
+    clock = SimulatedClock()
+    limiter = _limiter(clock, buckets={"market": (1, 1), "orders": (1, 1), "account": (1, 1)})
+    assert limiter.acquire("GET", "/api/v1/klines") == 0.0
+    assert limiter.acquire("POST", "/api/v1/orders") == 0.0
+    assert limiter.acquire("GET", "/api/v1/klines") == pytest.approx(1.0)
+
+
+def test_weights():
+    clock = SimulatedClock()
+    limiter = _limiter(clock, buckets={"account": (10, 10)}, rules=[("*", "/api/v1/fills", "account", 5)])
+    assert limiter.reserve("GET", "/api/v1/fills") == 0.0
+    assert limiter.reserve("GET", "/api/v1/fills") == 0.0
+    assert limiter.reserve("GET", "/api/v1/fills") == pytest.approx(0.5)
+
+
+def test_async_acquire_does_not_serialize_waiters():
+    clock = SimulatedClock()
+    limiter = _limiter(clock, buckets={"market": (10, 1)}, rules=[("*", "", "market", 1)])
+
+    async def run():
+        return await asyncio.gather(*(limiter.acquire_async("GET", "/x") for _ in range(5)))
+
+    waits = asyncio.run(run())
+    # Každý čekající dostal vlastní slot předem; čekání se nesčítají přes zámek
+    assert waits == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+    assert clock.now == pytest.approx(0.4)
+
+
+def test_file_store_shares_budget(tmp_path):
+    clock = SimulatedClock()
+    path = str(tmp_path / "ratelimit.json")
+    workers = [_limiter(clock, store=FileStore(path), buckets={"orders": (2, 2)}, rules=[("*", "", "orders", 1)])
+               for _ in range(2)]
+    waits = [workers[i % 2].reserve("POST", "/api/v1/orders") for i in range(4)]
+    assert waits == pytest.approx([0.0, 0.0, 0.5, 1.0])
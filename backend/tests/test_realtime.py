@@ -0,0 +1,61 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.realtime import RealtimeHub
+from backend.bench.realtime import run
+
+
+def test_query_count_independent_of_clients():
+    few = asyncio.run(run(clients=2, duration=0.5, interval=0.05, symbols=["A", "B"]))
+    many = asyncio.run(run(clients=200, duration=0.5, interval=0.05, symbols=["A", "B"]))
+    assert many["ticks_delivered"] > few["ticks_delivered"]
+    assert abs(many["queries"] - few["queries"]) <= 2
+
+
+def test_deltas_filtering_and_coalescing():
+    async def go():
+        hub = RealtimeHub()
+        btc = hub.subscribe(["BTC"])
+        everything = hub.subscribe()
+        hub.publish("BTC", {"price": 1})
+        hub.publish("BTC", {"price": 1})  # beze změny -> nic
+        hub.publish("BTC", {"price": 2})  # nahradí nepřečtený tick
+        hub.publish("ETH", {"price": 10})
+        return await btc.next(0.01), await everything.next(0.01), btc.coalesced, hub.stats["published"]
+
+    btc, everything, coalesced, published = asyncio.run(go())
+    assert btc == [{"price": 2}]
+    assert everything == [{"price": 2}, {"price": 10}]
+    assert coalesced == 1 and published == 3
+
+
+def test_slow_client_dropped():
+    now = [0.0]
+
+    async def go():
+        hub = RealtimeHub(max_lag=5, clock=lambda: now[0])
+        slow = hub.subscribe()
+        hub.publish("BTC", {"price": 1})
+        now[0] = 6.0
+        hub.publish("BTC", {"price": 2})
+        return slow, hub
+
+    slow, hub = asyncio.run(go())
+    assert slow.closed and slow not in hub.subscribers
+    assert hub.stats["dropped_clients"] == 1
+
+
+def test_client_symbols_are_validated():
+    import pytest
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+    from backend.main import app, _parse_symbols
+    assert _parse_symbols("btc_usdt, ETH_USDT") == ["BTC_USDT", "ETH_USDT"]
+    for raw in ('BTC" or true or r.symbol == "X', ["BTC\\"], "BTC-USDT", {"x": 1}):
+        with pytest.raises(ValueError):
+            _parse_symbols(raw)
+    with pytest.raises(WebSocketDisconnect) as e:
+        with TestClient(app).websocket_connect('/ws/realtime?symbols=A") |> drop()'):
+            pass
+    assert e.value.code == 1008
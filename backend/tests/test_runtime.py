@@ -0,0 +1,257 @@
+import sys
+import os
+import json
+import asyncio
+import httpx
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import api
+from backend.klines import KlineStore
+from backend.ledger import OrderORM, PositionORM
+from backend.pionex import AsyncPionexAPI
+from backend.runtime import BotRuntime, BotSpec, BotState, MarketDataCache
+from backend.bench.runtime import candles, fill_store
+
+
+class CountingStrategy:
+    """Počítá zpracované svíčky; signál BUY při každé nové svíčce."""
+
+    def __init__(self):
+        self.seen = 0
+
+    def warmup_indicators(self, symbol, closes):
+        self.seen += len(closes)
+        return {}
+
+    def update_indicators(self, symbol, close):
+        self.seen += 1
+        return {}
+
+    def generate_signals(self, close, ind):
+        return True, False
+
+
+def _runtime(store, **kwargs):
+    signals = []
+    runtime = BotRuntime(market=MarketDataCache(store), strategy_factory=CountingStrategy, api_factory=None,
+                         jitter=0.0, enabled=True, audit=lambda **kw: signals.append(kw), **kwargs)
+    return runtime, signals
+
+
+def test_bots_tick_on_new_candles_only_and_pause_stops_task(tmp_path):
+    store = KlineStore(str(tmp_path))
+    fill_store(store, ["A"], bars=50)
+
+    async def run():
+        runtime, signals = _runtime(store)
+        await runtime.start_bot(BotSpec(1, "a", "A", "1m", 0.02, None))
+        await runtime.start_bot(BotSpec(2, "b", None, "1m", 0.02, None))  # bez symbolu se nespustí
+        await asyncio.sleep(0.1)
+        store.append("A", "1m", candles([101.0, 102.0], 50))
+        await asyncio.sleep(0.1)
+        state = runtime.bots[1]
+        task = state.task
+        assert await runtime.stop_bot(1)
+        return runtime, state, task, signals
+
+    runtime, state, task, signals = asyncio.run(run())
+    assert task.done() and not runtime.bots
+    assert state.ticks >= 5 and state.strategy.seen == 52
+    # Signál jen při warmupu a po nových svíčkách, ne při každém ticku
+    assert len(signals) == 2 and all(s["action"] == "bot_signal" for s in signals)
+
+
+def test_slow_ticks_are_bounded_and_missed_deadlines_counted(tmp_path):
+    store = KlineStore(str(tmp_path))
+    fill_store(store, ["A"], bars=10)
+
+    async def run():
+        runtime, _ = _runtime(store, max_concurrent=1, tick_timeout=0.05)
+        active, concurrent = [], [0, 0]
+
+        async def slow_tick(state):
+            active.append(state.spec.id)
+            concurrent[0] += 1
+            concurrent[1] = max(concurrent)
+            try:
+                await asyncio.sleep(1)
+            finally:
+                concurrent[0] -= 1
+
+        runtime.tick = slow_tick
+        for i in range(3):
+            await runtime.start_bot(BotSpec(i, str(i), "A", "1m", 0.01, None))
+        await asyncio.sleep(0.4)
+        await runtime.shutdown()
+        return runtime, active, concurrent[1]
+
+    runtime, active, max_concurrent = asyncio.run(run())
+    assert set(active) == {0, 1, 2} and max_concurrent == 1
+    # Každý tick skončil timeoutem (poslední mohl zrušit shutdown)
+    assert runtime.stats["timeouts"] >= len(active) - 1 >= 3 and runtime.stats["missed"] > 0
+
+
+def test_load_running_restores_bots_from_db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bots.db'}")
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: api.Base.metadata.create_all(c, tables=[api.BotORM.__table__]))
+            await conn.execute(api.BotORM.__table__.insert(), [
+                {"name": "r1", "status": "running", "symbol": "A", "tick_interval": 5},
+                {"name": "p", "status": "paused", "symbol": "A", "tick_interval": 5},
+                {"name": "r2", "status": "running", "symbol": "B", "tick_interval": None},
+            ])
+        runtime, _ = _runtime(KlineStore(str(tmp_path)), session_factory=async_sessionmaker(engine))
+        started = await runtime.load_running()
+        specs = sorted((s.spec.name, s.spec.tick_interval) for s in runtime.bots.values())
+        await runtime.shutdown()
+        return started, specs
+
+    started, specs = asyncio.run(run())
+    assert started == 2 and specs == [("r1", 5.0), ("r2", 60.0)]
+
+
+class LiveStrategy(CountingStrategy):
+    max_positions = 1
+
+    def market_snapshot(self, symbol):
+        return {"bid": 99.0, "ask": None}   # jednostranná kniha
+
+    def can_open_position(self, open_positions):
+        return open_positions < self.max_positions
+
+
+class FakeApi:
+    def __init__(self):
+        self.orders = []
+
+    async def place_orders(self, orders):
+        results = []
+        for order in orders:
+            self.orders.append((order["side"], order["price"], order["quantity"]))
+            results.append({"ok": True, "order": {"data": {"orderId": f"o{len(self.orders)}"}}})
+        return results
+
+
+def test_live_signals_are_gated_by_ledger_position(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'live.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    api_ = FakeApi()
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: api.Base.metadata.create_all(
+                c, tables=[OrderORM.__table__, PositionORM.__table__]))
+        runtime = BotRuntime(market=MarketDataCache(KlineStore(str(tmp_path))), strategy_factory=LiveStrategy,
+                             api_factory=lambda: api_, session_factory=sessions, live_trading=True, enabled=True,
+                             audit=lambda **kw: None)
+        bot, other = (BotState(BotSpec(i, str(i), "A", "1m", 60, 2.0), LiveStrategy()) for i in (1, 2))
+        await runtime.on_signal(bot, "BUY", 100.0)
+        await runtime.on_signal(bot, "BUY", 101.0)    # objednávka ještě nevyřízená
+        async with sessions() as db:
+            await db.execute(update(OrderORM).values(status="FILLED"))
+            db.add(PositionORM(bot_id=1, symbol="A", quantity=1.0, avg_price=100, realized_pnl=0, fees=0,
+                               fill_count=1))
+            await db.commit()
+        await runtime.on_signal(bot, "BUY", 102.0)    # pozice už je otevřená
+        await runtime.on_signal(bot, "SELL", 103.0)   # jen do velikosti pozice
+        await runtime.on_signal(other, "SELL", 103.0)  # bez pozice žádný short
+        return runtime.stats
+
+    stats = asyncio.run(run())
+    assert api_.orders == [("BUY", 100.0, 2.0), ("SELL", 99.0, 1.0)]
+    assert stats["orders"] == 2 and stats["skipped"] == 3
+
+
+def test_live_order_lost_response_is_not_placed_twice(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'live.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    accepted = {}
+
+    async def no_sleep(_):
+        pass
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+    def handler(request):
+        if request.method == "POST":
+            # Burza objednávku přijme (deduplikace podle clientOrderId), odpověď se ale ztratí
+            cid = json.loads(request.content)["clientOrderId"]
+            accepted.setdefault(cid, f"x{len(accepted) + 1}")
+            raise httpx.ReadTimeout("odpověď ztracena", request=request)
+        cid = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"data": {"orderId": accepted[cid], "clientOrderId": cid}})
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: api.Base.metadata.create_all(
+                c, tables=[OrderORM.__table__, PositionORM.__table__]))
+        client = httpx.AsyncClient(base_url=AsyncPionexAPI.BASE_URL, transport=httpx.MockTransport(handler))
+        pionex = AsyncPionexAPI("key", "secret", client=client)
+        runtime = BotRuntime(market=MarketDataCache(KlineStore(str(tmp_path))), strategy_factory=LiveStrategy,
+                             api_factory=lambda: pionex, session_factory=sessions, live_trading=True, enabled=True,
+                             audit=lambda **kw: None)
+        bot = BotState(BotSpec(1, "1", "A", "1m", 60, 2.0), LiveStrategy())
+        bot.last_time = 1_700_000_000_000
+        await runtime.on_signal(bot, "BUY", 100.0)
+        async with sessions() as db:
+            return [(o.order_id, o.client_order_id) for o in (await db.execute(select(OrderORM))).scalars()]
+
+    assert asyncio.run(run()) == [("x1", "bot-1-1700000000000-BUY")]
+    assert list(accepted) == ["bot-1-1700000000000-BUY"]
+
+
+@pytest.mark.parametrize("ledger_fails", [False, True])
+def test_manual_trade_stops_bot_task(tmp_path, monkeypatch, ledger_fails):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bots.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: api.Base.metadata.create_all(
+                c, tables=[api.BotORM.__table__, OrderORM.__table__]))
+            await conn.execute(api.BotORM.__table__.insert(), [{"name": "r", "status": "running", "symbol": "A"}])
+    asyncio.run(create())
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    posted = []
+
+    def handler(request):
+        posted.append(json.loads(request.content)["clientOrderId"])
+        return httpx.Response(200, json={"data": {"orderId": "m1"}})
+    pionex = AsyncPionexAPI("key", "secret", client=httpx.AsyncClient(
+        base_url=AsyncPionexAPI.BASE_URL, transport=httpx.MockTransport(handler)))
+    stopped = []
+
+    async def stop_bot(bot_id):
+        stopped.append(bot_id)
+
+    async def broken_record_order(db, *args, **kwargs):
+        raise RuntimeError("unique constraint")
+    monkeypatch.setattr(api, "get_pionex", lambda: pionex)
+    monkeypatch.setattr(api.bot_runtime, "stop_bot", stop_bot)
+    if ledger_fails:
+        monkeypatch.setattr(api.trade_ledger, "record_order", broken_record_order)
+    app = FastAPI()
+    app.include_router(api.router)
+    app.dependency_overrides[api.get_async_db] = get_db
+    trade = {"symbol": "A", "side": "BUY", "price": 1.0, "quantity": 2.0, "client_order_id": "manual-1-x"}
+    with TestClient(app) as c:
+        resp = c.post("/bots/1/manual_trade", json=trade)
+        # Opakování téhož požadavku (klient nedostal odpověď) se na burzu znovu neodešle
+        retry = c.post("/bots/1/manual_trade", json=trade)
+    assert resp.status_code == retry.status_code == 200 and resp.json()["order"] == {"data": {"orderId": "m1"}}
+    assert posted == ["manual-1-x"] and stopped == [1, 1]
+
+    async def stored():
+        async with sessions() as db:
+            orders = [(o.order_id, o.client_order_id) for o in (await db.execute(select(OrderORM))).scalars()]
+            return orders, (await db.get(api.BotORM, 1)).status
+    assert asyncio.run(stored()) == ([] if ledger_fails else [("m1", "manual-1-x")], "manual_trade")
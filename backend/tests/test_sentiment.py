@@ -0,0 +1,118 @@
+import sys
+import os
+import json
+import asyncio
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.gemini import AsyncGeminiClient, GeminiAPIError
+from backend.sentiment import SentimentCacheORM, SentimentPipeline, SentimentSeries, text_hash
+
+
+class FakeGemini:
+    def __init__(self):
+        self.batches = []
+
+    async def analyze_batch(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(0.01)
+        return [None if "???" in t else {"score": 0.5 if "up" in t.lower() else -0.5, "label": "x"} for t in texts]
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sentiment.db'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: SentimentCacheORM.__table__.create(c))
+    asyncio.run(setup())
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def test_dedup_batching_and_persistent_cache(sessions):
+    gemini = FakeGemini()
+    texts = [f"BTC up {i}" for i in range(5)] + [f"ETH down {i}" for i in range(5)]
+
+    async def run(pipeline):
+        items = [{"text": t if r % 2 else f"  {t.upper()} ", "symbol": t.split()[0], "ts": 1000.0}
+                 for r in range(3) for t in texts]
+        results = await pipeline.analyze_many(items + [{"text": "??? nejasné"}])
+        await pipeline.stop()
+        return results
+
+    first = SentimentPipeline(session_factory=sessions, client_factory=lambda: gemini, batch_wait=0.05)
+    results = asyncio.run(run(first))
+    # 31 požadavků, 11 unikátních textů (po normalizaci) -> jedna dávka
+    assert [len(b) for b in gemini.batches] == [11]
+    assert results[-1] == {"error": "Model pro text nevrátil skóre"}
+    assert {r["source"] for r in results[:-1]} == {"model"}
+    assert first.stats["deduplicated"] == 20
+    assert first.series.series("BTC") == [{"time": 900, "score": 0.5, "count": 15}]
+    assert first.series.latest("ETH", window=600, now=1100) == -0.5
+
+    # Nový proces (prázdná paměť): výsledky z tabulky, model se nevolá
+    second = SentimentPipeline(session_factory=sessions, client_factory=lambda: gemini, batch_wait=0.01)
+    results = asyncio.run(run(second))
+    assert len(gemini.batches) == 2 and gemini.batches[1] == ["??? nejasné"]
+    assert second.stats["cache_hits"] == 10
+    assert text_hash(" BTC  UP 1") == text_hash("btc up 1")
+
+
+def test_batch_request_is_multipart(monkeypatch):
+    payloads = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        payloads.append((request.url.path, body))
+        # Model vrátí jen první položku, druhá chybí
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [
+            {"text": '```json\n[{"i": 0, "score": 1.7}]\n```'}]}}]})
+
+    async def run():
+        client = httpx.AsyncClient(base_url=AsyncGeminiClient.BASE_URL, transport=httpx.MockTransport(handler))
+        gemini = AsyncGeminiClient("key", client=client)
+        result = await gemini.analyze_batch(["skvělé", "nic"])
+        await gemini.aclose()
+        return result
+
+    result = asyncio.run(run())
+    path, body = payloads[0]
+    assert path.endswith(f"/{AsyncGeminiClient.MODEL}:generateContent")
+    assert [p["text"] for p in body["contents"][0]["parts"][1:]] == ["[0] skvělé", "[1] nic"]
+    assert body["generationConfig"]["responseMimeType"] == "application/json"
+    assert result == [{"score": 1.0, "label": "positive"}, None]
+    # gemini-pro JSON režim nepodporuje – jen parsování textu odpovědi
+    monkeypatch.setattr(AsyncGeminiClient, "MODEL", "gemini-pro")
+    assert asyncio.run(run()) == result
+    assert "responseMimeType" not in payloads[1][1]["generationConfig"]
+
+
+def test_stop_fails_queued_texts(sessions):
+    gemini = FakeGemini()
+
+    async def run():
+        pipeline = SentimentPipeline(session_factory=sessions, client_factory=lambda: gemini, batch_wait=10)
+        waiting = asyncio.create_task(pipeline.analyze("BTC up"))
+        await asyncio.sleep(0.01)   # text čeká v rozpracované dávce batcheru
+        await pipeline.stop()
+        with pytest.raises(GeminiAPIError):
+            await asyncio.wait_for(waiting, 1)
+        # Stejný text po zastavení nenajde osiřelou future, zpracuje se znovu
+        pipeline.batch_wait = 0.01
+        result = await asyncio.wait_for(pipeline.analyze("BTC up"), 1)
+        await pipeline.stop()
+        return result, pipeline.info()["pending"]
+
+    result, pending = asyncio.run(run())
+    assert result["score"] == 0.5 and pending == 0 and gemini.batches == [["BTC up"]]
+
+
+def test_series_window_and_eviction():
+    series = SentimentSeries(bucket_seconds=60, max_buckets=3)
+    for ts, score in [(0, 1.0), (61, -1.0), (130, 0.5), (190, 0.0), (200, 1.0)]:
+        series.add("BTC", ts, score)
+    assert [b["time"] for b in series.series("BTC")] == [60, 120, 180]
+    assert series.latest("BTC", window=60, now=210) == 0.5
+    assert series.latest("ETH") is None
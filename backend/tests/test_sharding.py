@@ -0,0 +1,91 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend import api
+from backend.sharding import HashRing, ShardCoordinator, WorkerORM, LeaseORM
+
+
+class FakeRuntime:
+    def __init__(self):
+        self.bots = {}
+
+    async def start_bot(self, bot):
+        self.bots[bot.id] = bot
+        return True
+
+    async def stop_bot(self, bot_id):
+        return self.bots.pop(bot_id, None) is not None
+
+    async def shutdown(self):
+        self.bots.clear()
+
+
+def test_hash_ring_moves_only_keys_of_new_node():
+    keys = range(2000)
+    before = HashRing(["w1", "w2", "w3", "w4"]).assign(keys)
+    assert all(350 < len(v) < 650 for v in before.values())
+    ring = HashRing(["w1", "w2", "w3", "w4", "w5"])
+    moved = [k for node, ks in before.items() for k in ks if ring.node_for(k) != node]
+    assert all(ring.node_for(k) == "w5" for k in moved)
+    assert 250 < len(moved) < 550
+
+
+def test_leases_split_bots_and_fail_over_after_ttl(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'shard.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    now = [datetime(2024, 1, 1)]
+
+    def coordinator(worker_id):
+        return ShardCoordinator(FakeRuntime(), worker_id, sessions, lease_ttl=15, clock=lambda: now[0])
+
+    async def run():
+        async with engine.begin() as conn:
+            tables = [api.BotORM.__table__, WorkerORM.__table__, LeaseORM.__table__]
+            await conn.run_sync(lambda c: api.Base.metadata.create_all(c, tables=tables))
+            await conn.execute(api.BotORM.__table__.insert(), [
+                {"name": f"b{i}", "status": "running" if i < 40 else "paused", "symbol": "A"} for i in range(50)
+            ])
+        a, b = coordinator("a"), coordinator("b")
+        first = await a.sync()  # jediný worker -> všech 40 běžících botů
+        await b.sync()          # b vidí oba workery, ale jeho boti mají platnou lease u a
+        await a.sync()          # a uvolní boty, které ring přidělil b
+        await b.sync()
+        split = (set(a.runtime.bots), set(b.runtime.bots))
+        # b spadne (žádné heartbeaty); po TTL převezme a vše
+        now[0] += timedelta(seconds=20)
+        await a.sync()
+        return first, split, set(a.runtime.bots)
+
+    first, (owned_a, owned_b), after = asyncio.run(run())
+    running = set(range(1, 41))
+    assert first == running
+    assert owned_a and owned_b and not owned_a & owned_b and owned_a | owned_b == running
+    assert after == running
+
+
+def test_hung_sync_fences_bots_before_lease_expires():
+    now = [datetime(2024, 1, 1)]
+    c = ShardCoordinator(FakeRuntime(), "a", None, lease_ttl=15, heartbeat_interval=0.01, clock=lambda: now[0],
+                         lease_margin=5, sync_timeout=0.02)
+
+    async def hang():
+        await asyncio.Event().wait()   # spojení s databází se zasekne, nespadne
+    c.sync = hang
+
+    async def run():
+        c.runtime.bots, c.owned, c.lease_until = {1: object()}, {1}, now[0] + timedelta(seconds=15)
+        task = asyncio.create_task(c.run())
+        await asyncio.sleep(0.1)
+        before = set(c.runtime.bots)
+        now[0] += timedelta(seconds=11)   # lease platí ještě 4 s, tj. už v rezervě
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return before
+
+    assert asyncio.run(run()) == {1}
+    assert c.runtime.bots == {} and c.owned == set()
+    assert c.stats["fenced"] == 1 and c.stats["errors"] >= 1
@@ -0,0 +1,61 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from backend.klines import KlineStore
+from backend.model import ModelRegistry
+from backend.training import TrainingExecutor
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_klines(self, symbol, interval, limit=100, end_time=None):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        end = end_time // 60_000 * 60_000
+        return [{"time": t, "close": 2.0 * t / 60_000} for t in range(end - (limit - 1) * 60_000, end + 1, 60_000)]
+
+
+def test_retrain_all_fans_out_and_deduplicates(tmp_path):
+    audit = []
+    api = FakeApi()
+    executor = TrainingExecutor(
+        max_workers=2, registry=ModelRegistry(str(tmp_path / "models")),
+        forecast_registry=ModelRegistry(str(tmp_path / "forecast")), store=KlineStore(str(tmp_path / "klines")),
+        api_factory=lambda: api, lookback=50, audit=lambda *args: audit.append(args),
+    )
+
+    async def run():
+        first = executor.submit("BTCUSDT")
+        assert executor.submit("BTCUSDT") is first
+        return await executor.retrain_all(["BTCUSDT", "ETHUSDT"])
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert executor.stats["deduplicated"] == 2 and executor.stats["runs"] == 2
+    assert api.calls == 2
+    # Model publikovaný do registru předpovídá trend close = 2 * index
+    slope = executor.registry.get("ETHUSDT").coef_[0]
+    assert slope == pytest.approx(2.0)
+    assert executor.forecast_registry.versions("BTCUSDT") == [1]
+    assert {a[0] for a in audit} == {"ml_retrain", "ml_retrain_batch"}
+    assert all(r["rows"] == 50 and 0 <= r["fit_s"] <= r["total_s"] for r in results)
+
+
+def test_failed_fetch_is_reported():
+    class BrokenApi:
+        async def get_klines(self, *args, **kwargs):
+            raise RuntimeError("down")
+
+    audit = []
+    executor = TrainingExecutor(store=KlineStore("/nonexistent-klines"), registry=ModelRegistry("/nonexistent"),
+                                api_factory=BrokenApi, audit=lambda *args: audit.append(args))
+    result = asyncio.run(executor.retrain_all(["BTCUSDT"]))[0]
+    assert result["status"] == "error" and "down" in result["error"]
+    assert audit[0][2] == "error" and executor.stats["failed"] == 1
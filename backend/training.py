@@ -0,0 +1,162 @@
+"""
+Retrénink ML modelů mimo event loop webového procesu.
+
+    scheduler -> TrainingExecutor.retrain_all(symboly)
+        -> kline_store.update (async, rate limiter)      ... jen chybějící svíčky
+        -> ProcessPoolExecutor: _fit_worker (sklearn)      ... fit v jiném procesu
+        -> model_registry.publish (vlákno)                 ... atomická výměna modelu
+        -> prediction_service.registry.publish (vlákno)    ... model pro dávkové predikce
+        -> audit_writer (fronta, dávkový zápis)            ... verze a doby trvání
+
+Pro každý symbol běží nejvýše jeden trénink; opakovaný požadavek během
+běhu se připojí k rozběhnutému (deduplikace) a započítá se do `stats["deduplicated"]`.
+"""
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger("training")
+logger.setLevel(logging.INFO)
+
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "1"))
+TRAINING_SYMBOLS = [s.strip() for s in os.getenv("TRAINING_SYMBOLS", "BTCUSDT").split(",") if s.strip()]
+TRAINING_INTERVAL = os.getenv("TRAINING_INTERVAL", "1m")
+TRAINING_LOOKBACK = int(os.getenv("TRAINING_LOOKBACK", "100"))
+
+
+def _fit_worker(closes: np.ndarray):
+    """Běží v procesu poolu: natrénuje modely a vrátí je i s dobou fitu."""
+    from backend.model import model_registry
+    from backend.prediction import prediction_service
+    started = time.perf_counter()
+    # Stejné příznaky jako dříve: index svíčky -> zavírací cena
+    X = np.arange(len(closes)).reshape(-1, 1)
+    model = model_registry.factory()
+    model.fit(X, np.asarray(closes, dtype=float))
+    try:
+        forecast = prediction_service.new_model().fit(closes)
+    except ValueError:
+        forecast = None  # málo svíček pro okna a horizonty
+    return model, forecast, time.perf_counter() - started
+
+
+def _audit(action: str, detail: str, status: str = "success", error: Optional[str] = None):
+    from backend.audit import audit_writer
+    audit_writer.log(user="system", action=action, detail=detail, status=status, error=error)
+
+
+class TrainingExecutor:
+    def __init__(self, max_workers: int = TRAINING_WORKERS, registry=None, forecast_registry=None, store=None,
+                 api_factory=None, interval: str = TRAINING_INTERVAL, lookback: int = TRAINING_LOOKBACK,
+                 audit=_audit):
+        self.max_workers = max(1, max_workers)
+        self.registry = registry
+        self._forecast_registry = forecast_registry
+        self.store = store
+        self.api_factory = api_factory
+        self.interval = interval
+        self.lookback = lookback
+        self.audit = audit
+        self.stats = {"runs": 0, "succeeded": 0, "failed": 0, "deduplicated": 0}
+        self.last_durations: Dict[str, dict] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: fork procesu s běžícím event loopem a vlákny (scheduler, httpx) není bezpečný
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    @property
+    def forecast_registry(self):
+        if self._forecast_registry is None:
+            from backend.prediction import prediction_service
+            self._forecast_registry = prediction_service.registry
+        return self._forecast_registry
+
+    def _deps(self):
+        from backend.model import model_registry
+        from backend.klines import kline_store
+        from backend.pionex import get_async_pionex
+        return (self.registry or model_registry, self.store or kline_store,
+                (self.api_factory or get_async_pionex)())
+
+    # --- jeden symbol ---
+
+    def submit(self, symbol: str) -> asyncio.Task:
+        """Naplánuje retrénink symbolu; běžící trénink téhož symbolu se znovu nespouští."""
+        task = self._inflight.get(symbol)
+        if task is not None and not task.done():
+            self.stats["deduplicated"] += 1
+            return task
+        task = asyncio.create_task(self._retrain(symbol))
+        self._inflight[symbol] = task
+        task.add_done_callback(lambda t, s=symbol: self._inflight.pop(s, None) if self._inflight.get(s) is t else None)
+        return task
+
+    async def _retrain(self, symbol: str) -> dict:
+        self.stats["runs"] += 1
+        registry, store, api = self._deps()
+        started = time.perf_counter()
+        try:
+            await store.update(api, symbol, self.interval, lookback=self.lookback)
+            # Kopie řezu memmapu – do procesu poolu se posílá picklem
+            closes = np.array(store.get(symbol, self.interval, last=self.lookback).close)
+            if len(closes) < 2:
+                raise ValueError(f"Málo dat pro trénink ({len(closes)} svíček)")
+            fetched = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            model, forecast, fit_s = await loop.run_in_executor(self._get_pool(), _fit_worker, closes)
+            version = await asyncio.to_thread(registry.publish, symbol, model)
+            if forecast is not None:
+                await asyncio.to_thread(self.forecast_registry.publish, symbol, forecast)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Retrénink {symbol} selhal: {e}")
+            self.audit("ml_retrain", f"Model retraining failed for {symbol}", "error", str(e))
+            return {"symbol": symbol, "status": "error", "error": str(e)}
+        result = {
+            "symbol": symbol, "status": "success", "version": version, "rows": len(closes),
+            "fetch_s": round(fetched - started, 4), "fit_s": round(fit_s, 4),
+            "total_s": round(time.perf_counter() - started, 4),
+        }
+        self.stats["succeeded"] += 1
+        self.last_durations[symbol] = result
+        self.audit(
+            "ml_retrain",
+            f"Model {symbol} v{version} retrained on {len(closes)} rows "
+            f"(fetch {result['fetch_s']}s, fit {result['fit_s']}s, total {result['total_s']}s)",
+        )
+        return result
+
+    # --- více symbolů ---
+
+    async def retrain_all(self, symbols: Sequence[str] = TRAINING_SYMBOLS) -> List[dict]:
+        """Paralelní retrénink symbolů (souběžnost fitů omezuje velikost poolu)."""
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.submit(s) for s in symbols))
+        ok = sum(r["status"] == "success" for r in results)
+        if len(symbols) > 1:
+            self.audit(
+                "ml_retrain_batch",
+                f"Retrained {ok}/{len(symbols)} symbols in {time.perf_counter() - started:.3f}s",
+                "success" if ok == len(symbols) else "error",
+            )
+        return results
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+training_executor = TrainingExecutor()
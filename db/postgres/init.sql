@@ -38,4 +38,112 @@ CREATE TABLE IF NOT EXISTS logs (
     level VARCHAR(16) NOT NULL,
     message TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id SERIAL PRIMARY KEY,
+    "user" VARCHAR(100),
+    action VARCHAR(100) NOT NULL,
+    detail TEXT,
+    status VARCHAR(20) NOT NULL,
+    error TEXT,
+    created_at TIMESTAMP
+);
+
+-- Sloupce bots používané API a runtime botů (backend/api.py BotORM, backend/runtime.py)
+ALTER TABLE bots ADD COLUMN IF NOT EXISTS description TEXT;
+ALTER TABLE bots ADD COLUMN IF NOT EXISTS status VARCHAR(20) DEFAULT 'paused';
+ALTER TABLE bots ADD COLUMN IF NOT EXISTS symbol VARCHAR(32);
+ALTER TABLE bots ADD COLUMN IF NOT EXISTS "interval" VARCHAR(8) DEFAULT '1m';
+ALTER TABLE bots ADD COLUMN IF NOT EXISTS tick_interval DOUBLE PRECISION;
+ALTER TABLE bots ADD COLUMN IF NOT EXISTS quantity DOUBLE PRECISION;
+CREATE INDEX IF NOT EXISTS ix_bots_status_id ON bots (status, id);
+
+-- Sharding běžících botů mezi workery (backend/sharding.py)
+CREATE TABLE IF NOT EXISTS bot_workers (
+    worker_id VARCHAR(128) PRIMARY KEY,
+    heartbeat_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bot_leases (
+    bot_id INTEGER PRIMARY KEY,
+    worker_id VARCHAR(128) NOT NULL,
+    lease_until TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_bot_leases_worker_id ON bot_leases (worker_id);
+
+-- Ledger objednávek, fillů a pozic (backend/ledger.py)
+CREATE TABLE IF NOT EXISTS orders (
+    id SERIAL PRIMARY KEY,
+    order_id VARCHAR(64) UNIQUE NOT NULL,
+    client_order_id VARCHAR(64),
+    bot_id INTEGER,
+    symbol VARCHAR(32) NOT NULL,
+    side VARCHAR(8) NOT NULL,
+    type VARCHAR(16),
+    price NUMERIC(18,8),
+    quantity NUMERIC(18,8),
+    filled_quantity NUMERIC(18,8),
+    status VARCHAR(16),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    raw_data JSONB
+);
+
+CREATE TABLE IF NOT EXISTS fills (
+    id SERIAL PRIMARY KEY,
+    fill_id VARCHAR(64) UNIQUE NOT NULL,
+    order_id VARCHAR(64),
+    bot_id INTEGER,
+    symbol VARCHAR(32) NOT NULL,
+    side VARCHAR(8) NOT NULL,
+    price NUMERIC(18,8) NOT NULL,
+    quantity NUMERIC(18,8) NOT NULL,
+    fee NUMERIC(18,8),
+    fee_asset VARCHAR(16),
+    filled_at TIMESTAMP NOT NULL,
+    raw_data JSONB
+);
+
+CREATE TABLE IF NOT EXISTS positions (
+    bot_id INTEGER NOT NULL, -- 0 = bez bota
+    symbol VARCHAR(32) NOT NULL,
+    quantity NUMERIC(18,8) NOT NULL DEFAULT 0,
+    avg_price NUMERIC(18,8) NOT NULL DEFAULT 0,
+    realized_pnl NUMERIC(18,8) NOT NULL DEFAULT 0,
+    fees NUMERIC(18,8) NOT NULL DEFAULT 0,
+    fill_count INTEGER NOT NULL DEFAULT 0,
+    last_fill_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (bot_id, symbol)
+);
+
+CREATE TABLE IF NOT EXISTS ledger_cursors (
+    name VARCHAR(64) PRIMARY KEY,
+    last_ts BIGINT NOT NULL, -- ms
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_orders_bot_id ON orders (bot_id);
+CREATE INDEX IF NOT EXISTS ix_orders_symbol_created_at ON orders (symbol, created_at);
+CREATE INDEX IF NOT EXISTS ix_fills_symbol_filled_at_id ON fills (symbol, filled_at, id);
+CREATE INDEX IF NOT EXISTS ix_fills_bot_filled_at_id ON fills (bot_id, filled_at, id);
+
+-- Indexy pro keyset stránkování a filtry historie (backend/history.py)
+CREATE INDEX IF NOT EXISTS ix_trades_opened_at_id ON trades (opened_at, id);
+CREATE INDEX IF NOT EXISTS ix_trades_bot_opened_at_id ON trades (bot_id, opened_at, id);
+CREATE INDEX IF NOT EXISTS ix_trades_symbol_opened_at_id ON trades (symbol, opened_at, id);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_created_at ON audit_logs (created_at);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_action_id ON audit_logs (action, id);
+
+-- Cache sentimentu textů podle hashe obsahu (backend/sentiment.py)
+CREATE TABLE IF NOT EXISTS sentiment_cache (
+    text_hash VARCHAR(64) PRIMARY KEY,
+    score DOUBLE PRECISION NOT NULL,
+    label VARCHAR(16),
+    model VARCHAR(64),
+    created_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sentiment_cache_expires_at ON sentiment_cache (expires_at);